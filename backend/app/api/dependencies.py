@@ -73,7 +73,11 @@ def get_voice_service(
     agent_service: AgentService = Depends(get_agent_service)
 ) -> VoiceService:
     """Get voice service dependency."""
-    return VoiceService(session_repository, message_repository, agent_service)
+    return VoiceService(
+        message_repository=message_repository,
+        session_repository=session_repository,
+        agent_service=agent_service
+    )
 
 def get_oauth_service(
     user_repository: UserRepository = Depends(get_user_repository)
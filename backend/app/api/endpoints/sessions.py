@@ -116,12 +116,16 @@ async def get_user_sessions(
     limit: int = 50,
     current_user: Dict[str, Any] = Depends(get_current_user_supabase),
     session_repo: SessionRepository = Depends(get_session_repository),
-    message_repo: MessageRepository = Depends(get_message_repository)
+    message_repo: MessageRepository = Depends(get_message_repository),
+    agent_service: AgentService = Depends(get_agent_service)
 ):
     """Get all sessions for the current user."""
     try:
         user_id = current_user["id"]
         
+        # The chat list loads before "New Chat" is pressed; get an agent session ready
+        agent_service.warm_agent_sessions(user_id)
+        
         # Get user sessions (already ordered by last_activity_at DESC)
         sessions = await session_repo.get_user_sessions(
             user_id=user_id,
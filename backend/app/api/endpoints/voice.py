@@ -75,6 +75,22 @@ async def process_voice_message(
                     detail="NO_SPEECH_DETECTED"
                 )
             
+            # Agent at capacity: tell the client when to retry
+            if result.get("stage") == "agent_busy":
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="AGENT_BUSY",
+                    headers={"Retry-After": str(result["retry_after"])}
+                )
+            
+            # Agent Engine failing (circuit breaker open): fail fast until it recovers
+            if result.get("stage") == "agent_unavailable":
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="AGENT_UNAVAILABLE",
+                    headers={"Retry-After": str(result["retry_after"])}
+                )
+            
             # Handle other voice processing errors
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
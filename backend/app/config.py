@@ -55,6 +55,53 @@ class Settings(BaseSettings):
     # Vertex AI Agent settings
     VERTEX_AI_AGENT_ID: str = ""
     
+    # Agent runtime: "vertex" (deployed Agent Engine) or "local" (oprina.agent in-process)
+    AGENT_RUNTIME: str = "vertex"
+    AGENT_APP_NAME: str = "oprina"
+    # Local runtime session store: "memory" or "database" (AGENT_SESSION_DB_URL, e.g. Postgres)
+    AGENT_SESSION_STORE: str = "memory"
+    AGENT_SESSION_DB_URL: str = ""
+    # Worker threads that iterate blocking agent streams (or, with the local runtime, run
+    # the synchronous agent tools), and events buffered per turn
+    AGENT_STREAM_WORKERS: int = 16
+    AGENT_STREAM_QUEUE_SIZE: int = 64
+    # Pre-created agent sessions kept ready per user (0 disables), how long they stay usable,
+    # and how many users the pool tracks at once
+    AGENT_SESSION_POOL_SIZE: int = 1
+    AGENT_SESSION_POOL_TTL_SECONDS: int = 1800
+    AGENT_SESSION_POOL_MAX_USERS: int = 1000
+    # Agent turns running at once (overall and per user), turns allowed to wait (overall and
+    # per user), and how long a turn may wait before it is turned away
+    AGENT_MAX_CONCURRENT_TURNS: int = 32
+    AGENT_MAX_TURNS_PER_USER: int = 2
+    AGENT_MAX_QUEUED_TURNS: int = 128
+    AGENT_MAX_QUEUED_TURNS_PER_USER: int = 4
+    AGENT_QUEUE_TIMEOUT_SECONDS: float = 20.0
+    # Circuit breakers for Agent Engine and Gemini calls: open for AGENT_BREAKER_OPEN_SECONDS when
+    # at least AGENT_BREAKER_MIN_CALLS calls in the window fail or exceed the slow-call threshold
+    # at AGENT_BREAKER_FAILURE_RATE or more. Agent calls are timed to their first event.
+    AGENT_BREAKER_WINDOW_SECONDS: int = 60
+    AGENT_BREAKER_MIN_CALLS: int = 10
+    AGENT_BREAKER_FAILURE_RATE: float = 0.5
+    AGENT_BREAKER_OPEN_SECONDS: int = 30
+    AGENT_SLOW_CALL_SECONDS: float = 20.0
+    GEMINI_SLOW_CALL_SECONDS: float = 10.0
+    # Retries with jittered exponential backoff for transient errors; agent queries
+    # (not idempotent) are retried only when they were rejected (429, refused connection)
+    AGENT_RETRY_ATTEMPTS: int = 2
+    AGENT_RETRY_BACKOFF_SECONDS: float = 0.5
+    # Send a duplicate Gemini request when the first is slower than the recent p95
+    GEMINI_HEDGE_ENABLED: bool = True
+    GEMINI_HEDGE_MIN_DELAY_SECONDS: float = 0.5
+    # Store chat messages on a background queue instead of before the response returns.
+    # Queued turns are journaled (encrypted) to MESSAGE_JOURNAL_PATH and replayed after a
+    # restart, so the path must be on a persistent volume; Cloud Run's local disk is not.
+    MESSAGE_WRITE_BEHIND: bool = False
+    MESSAGE_JOURNAL_PATH: str = "data/message_journal.jsonl"
+    MESSAGE_WRITE_QUEUE_SIZE: int = 1000
+    MESSAGE_WRITE_MAX_ATTEMPTS: int = 5
+    MESSAGE_WRITE_RETRY_INTERVAL_SECONDS: float = 60.0
+    
     # Google Cloud settings
     GOOGLE_CLOUD_PROJECT: str = ""
     GOOGLE_CLOUD_LOCATION: str = "us-central1"
@@ -101,6 +148,12 @@ class Settings(BaseSettings):
     VOICE_DEFAULT_VOICE_NAME: str = "en-US-Neural2-F"
     VOICE_DEFAULT_SPEAKING_RATE: float = 1.0
     VOICE_DEFAULT_AUDIO_FORMAT: str = "mp3"
+    # Agent replies are normalized for speech by rules; Gemini rewrites only text flagged complex, if enabled
+    VOICE_LLM_FALLBACK: bool = False
+    VOICE_COMPLEX_MAX_CHARS: int = 1500
+    # Threads for those Gemini rewrites, kept apart from AGENT_STREAM_WORKERS so a slow
+    # rewrite never holds a thread an agent stream needs
+    VOICE_REWRITE_WORKERS: int = 4
     
     # Security settings
     JWT_SECRET_KEY: str = "dev-jwt-secret-change-in-production"
@@ -21,33 +21,37 @@ class MessageRepository:
         self.db = db_client
         self.table_name = TableNames.MESSAGES
     
+    def _prepare_message(self, message_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill in defaults and validate a message before insert."""
+        # Add timestamp (only created_at, no updated_at in schema)
+        message_data.setdefault("created_at", datetime.utcnow().isoformat())
+        
+        # Set defaults for voice integration
+        if "message_type" not in message_data:
+            message_data["message_type"] = "text"
+        if "voice_metadata" not in message_data:
+            message_data["voice_metadata"] = {}
+        
+        # Note: message_index will be auto-set by database trigger
+        # Don't set it manually unless specifically needed
+        
+        # Validate required fields
+        required_fields = ["session_id", "user_id", "role", "content"]
+        for field in required_fields:
+            if field not in message_data:
+                raise ValueError(f"Missing required field: {field}")
+        
+        # Validate role
+        if message_data["role"] not in ["user", "assistant"]:
+            raise ValueError(f"Invalid role: {message_data['role']}")
+        
+        # Serialize data
+        return serialize_for_db(message_data)
+    
     async def create_message(self, message_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new message (voice or text)."""
         try:
-            # Add timestamp (only created_at, no updated_at in schema)
-            message_data["created_at"] = datetime.utcnow().isoformat()
-            
-            # Set defaults for voice integration
-            if "message_type" not in message_data:
-                message_data["message_type"] = "text"
-            if "voice_metadata" not in message_data:
-                message_data["voice_metadata"] = {}
-            
-            # Note: message_index will be auto-set by database trigger
-            # Don't set it manually unless specifically needed
-            
-            # Validate required fields
-            required_fields = ["session_id", "user_id", "role", "content"]
-            for field in required_fields:
-                if field not in message_data:
-                    raise ValueError(f"Missing required field: {field}")
-            
-            # Validate role
-            if message_data["role"] not in ["user", "assistant"]:
-                raise ValueError(f"Invalid role: {message_data['role']}")
-            
-            # Serialize data
-            serialized_data = serialize_for_db(message_data)
+            serialized_data = self._prepare_message(message_data)
             
             # Insert message
             response = self.db.table(self.table_name).insert(serialized_data).execute()
@@ -61,6 +65,32 @@ class MessageRepository:
             logger.error(f"Failed to create message: {e}")
             raise
     
+    async def create_messages(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Create several messages in one insert, indexed in list order.
+        
+        Messages whose id already exists are skipped, so a batch can be retried
+        safely. The messages trigger updates the session's last_activity_at in
+        the same statement.
+        """
+        try:
+            rows = [self._prepare_message(dict(message)) for message in messages]
+            
+            response = (
+                self.db.table(self.table_name)
+                .upsert(rows, on_conflict="id", ignore_duplicates=True)
+                .execute()
+            )
+            
+            created = response.data or []
+            logger.info(f"Created {len(created)} messages for session: {rows[0]['session_id'] if rows else None}")
+            
+            return created
+            
+        except Exception as e:
+            logger.error(f"Failed to create messages: {e}")
+            raise
+    
     async def get_message_by_id(self, message_id: str) -> Optional[Dict[str, Any]]:
         """Get message by ID."""
         try:
@@ -3,15 +3,24 @@ Vertex AI Agent client for communicating with deployed Oprina agent.
 """
 
 import asyncio
-from typing import Optional, Dict, Any, AsyncGenerator
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from typing import Optional, Dict, Any, AsyncGenerator, Callable, Deque, Tuple
 from vertexai import agent_engines
 from google import genai
 import structlog
 
 from app.config import get_settings
+from app.core.integrations.resilience import CircuitBreaker, ResilientCall, is_rejected, is_retryable
+from app.core.integrations.voice_text import SentenceSegmenter, normalize_for_voice
 
 logger = structlog.get_logger(__name__)
 
+# Queue item kinds for the stream_query bridge
+_EVENT, _DONE, _ERROR = "event", "done", "error"
+
 
 class VertexAgentClient:
     """Client for communicating with deployed Vertex AI Agent."""
@@ -22,6 +31,52 @@ class VertexAgentClient:
         self.settings = get_settings()
         self._agent_id = self.settings.VERTEX_AI_AGENT_ID
         self._gemini_model: Optional[Any] = None
+        # Blocking stream_query iteration runs here, never on the event loop
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.settings.AGENT_STREAM_WORKERS,
+            thread_name_prefix="agent-stream"
+        )
+        # Gemini voice rewrites get their own small pool so they can't starve agent streams
+        self.rewrite_executor = ThreadPoolExecutor(
+            max_workers=self.settings.VOICE_REWRITE_WORKERS,
+            thread_name_prefix="voice-rewrite"
+        )
+        # Circuit breakers and retries around Agent Engine and Gemini; only the
+        # Gemini rewrite is idempotent, so it is the only call that is hedged.
+        # A timed-out stream_query may still be running the turn (and its tools),
+        # so it is retried only when the request was turned away
+        self.stream_calls = self._resilient_call(
+            "stream_query", self.settings.AGENT_SLOW_CALL_SECONDS, retryable=is_rejected
+        )
+        self.session_calls = self._resilient_call("create_session", self.settings.AGENT_SLOW_CALL_SECONDS)
+        self.gemini_calls = self._resilient_call(
+            "generate_content", self.settings.GEMINI_SLOW_CALL_SECONDS, hedge=self.settings.GEMINI_HEDGE_ENABLED
+        )
+    
+    def _resilient_call(
+        self,
+        name: str,
+        slow_call_seconds: float,
+        hedge: bool = False,
+        retryable: Callable[[Exception], bool] = is_retryable
+    ) -> ResilientCall:
+        breaker = CircuitBreaker(
+            name,
+            window_seconds=self.settings.AGENT_BREAKER_WINDOW_SECONDS,
+            min_calls=self.settings.AGENT_BREAKER_MIN_CALLS,
+            failure_rate=self.settings.AGENT_BREAKER_FAILURE_RATE,
+            slow_call_seconds=slow_call_seconds,
+            open_seconds=self.settings.AGENT_BREAKER_OPEN_SECONDS
+        )
+        return ResilientCall(
+            breaker,
+            retries=self.settings.AGENT_RETRY_ATTEMPTS,
+            backoff_seconds=self.settings.AGENT_RETRY_BACKOFF_SECONDS,
+            hedge=hedge,
+            hedge_min_delay=self.settings.GEMINI_HEDGE_MIN_DELAY_SECONDS,
+            hedge_workers=self.settings.AGENT_STREAM_WORKERS,
+            retryable=retryable
+        )
 
     def _setup_gemini(self):
         """One-time Gemini setup using new Gen AI SDK with Vertex AI."""
@@ -70,23 +125,30 @@ class VertexAgentClient:
             logger.error(f"Failed to initialize agent client: {e}")
             raise
     
+    def _initial_session_state(self, user_id: str) -> Dict[str, Any]:
+        """User context every new agent session starts with."""
+        return {
+            "user:id": user_id,
+            "user:backend_url": self.settings.BACKEND_API_URL or "http://localhost:8000",
+            "user:session_type": "multi_user",
+            "gmail:connected": False,
+            "calendar:connected": False,
+        }
+    
     async def create_session(self, user_id: str) -> Dict[str, Any]:
         """Create a new agent session with user context in state."""
         if not self._initialized:
             await self.initialize()
         
         try:
-            # Create the Vertex AI session
-            session_response = self._agent_app.create_session(user_id=user_id)
+            # Create the Vertex AI session (a blocking call, kept off the event loop)
+            loop = asyncio.get_running_loop()
+            session_response = await self.session_calls.call(lambda: loop.run_in_executor(
+                self.executor, functools.partial(self._agent_app.create_session, user_id=user_id)
+            ))
             
             # Set initial session state with user context
-            initial_state = {
-                "user:id": user_id,
-                "user:backend_url": self.settings.BACKEND_API_URL or "http://localhost:8000",
-                "user:session_type": "multi_user",
-                "gmail:connected": False,
-                "calendar:connected": False,
-            }
+            initial_state = self._initial_session_state(user_id)
             
             # Update the session with initial state
             # Note: This may vary based on your Vertex AI agent implementation
@@ -112,7 +174,17 @@ class VertexAgentClient:
             
         except Exception as e:
             logger.error(f"Failed to create agent session for user {user_id}: {e}")
-
+    
+    async def delete_session(self, user_id: str, session_id: str) -> None:
+        """Delete an agent session."""
+        if not self._initialized:
+            await self.initialize()
+        
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            self.executor, functools.partial(self._agent_app.delete_session, user_id=user_id, session_id=session_id)
+        )
+        logger.info(f"Deleted agent session {session_id} for user {user_id}")
     
     async def send_message(
         self, 
@@ -126,17 +198,11 @@ class VertexAgentClient:
         
         try:
             # Send message and get response
-            response_events = []
+            response_events = [event async for event in self._stream_query(user_id, session_id, message)]
             
-            for event in self._agent_app.stream_query(
-                user_id=user_id,
-                session_id=session_id,
-                message=message
-            ):
-                response_events.append(event)
-            
-            # Process the response events
-            full_response = self._process_response_events(response_events)
+            # Process the response events (voice optimization is a blocking model call)
+            loop = asyncio.get_running_loop()
+            full_response = await loop.run_in_executor(self.executor, self._process_response_events, response_events)
             
             logger.info(f"Sent message to agent session {session_id}")
             
@@ -162,19 +228,12 @@ class VertexAgentClient:
             await self.initialize()
         
         try:
-            for event in self._agent_app.stream_query(
-                user_id=user_id,
-                session_id=session_id,
-                message=message
-            ):
+            async for event in self._stream_query(user_id, session_id, message):
                 yield {
                     "event": event,
                     "session_id": session_id,
                     "user_id": user_id
                 }
-                
-                # Small delay to prevent overwhelming
-                await asyncio.sleep(0.01)
             
             logger.info(f"Streamed message to agent session {session_id}")
             
@@ -182,6 +241,131 @@ class VertexAgentClient:
             logger.error(f"Failed to stream message to agent: {e}")
             raise
     
+    async def stream_voice_message(
+        self,
+        user_id: str,
+        session_id: str,
+        message: str
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Send a message to the agent and stream the response as spoken sentences.
+        
+        Agent text is cut into sentences as events arrive and each one is
+        optimized for voice on its own, so text-to-speech can start on the
+        first sentence while the rest is still being generated. Segments that
+        go to Gemini are rewritten in parallel and still yielded in order.
+        """
+        loop = asyncio.get_running_loop()
+        segmenter = SentenceSegmenter()
+        pending: Deque[asyncio.Future] = deque()
+        streamed_partial = False
+        index = 0
+        
+        try:
+            async for item in self.stream_message(user_id, session_id, message):
+                event = item["event"]
+                text = self._event_text(event)
+                
+                if isinstance(event, dict) and event.get("partial"):
+                    streamed_partial = True
+                    segments = segmenter.feed(text)
+                elif streamed_partial:
+                    # The final event repeats the text already streamed in partial events
+                    streamed_partial = False
+                    segments = segmenter.feed("\n")
+                else:
+                    segments = segmenter.feed(f"{text}\n") if text else []
+                
+                pending.extend(self._optimize_segment(loop, segment) for segment in segments)
+                while pending and pending[0].done():
+                    spoken = pending.popleft().result()
+                    if spoken:
+                        yield {"text": spoken, "index": index, "session_id": session_id, "user_id": user_id}
+                        index += 1
+            
+            pending.extend(self._optimize_segment(loop, segment) for segment in segmenter.flush())
+            while pending:
+                spoken = await pending.popleft()
+                if spoken:
+                    yield {"text": spoken, "index": index, "session_id": session_id, "user_id": user_id}
+                    index += 1
+            
+            logger.info(f"Streamed {index} voice segments for agent session {session_id}")
+            
+        except Exception as e:
+            logger.error(f"Failed to stream voice response from agent: {e}")
+            raise
+    
+    def _optimize_segment(self, loop: asyncio.AbstractEventLoop, segment: str) -> asyncio.Future:
+        """Voice text for one segment; Gemini rewrites run on the rewrite pool."""
+        normalized = normalize_for_voice(segment, max_chars=self.settings.VOICE_COMPLEX_MAX_CHARS)
+        
+        if normalized.complex and self.settings.VOICE_LLM_FALLBACK:
+            return loop.run_in_executor(self.rewrite_executor, self.rewrite_for_voice, segment, normalized.text)
+        
+        future = loop.create_future()
+        future.set_result(normalized.text)
+        return future
+    
+    def _stream_query(self, user_id: str, session_id: str, message: str) -> AsyncGenerator[Any, None]:
+        """stream_query behind its circuit breaker, retried only if it was turned away before the first event."""
+        return self.stream_calls.stream(lambda: self._query_events(user_id, session_id, message))
+    
+    async def _query_events(self, user_id: str, session_id: str, message: str) -> AsyncGenerator[Any, None]:
+        """
+        Iterate the blocking stream_query generator on a worker thread.
+        
+        Events are handed to the event loop through a queue holding at most
+        AGENT_STREAM_QUEUE_SIZE events: the worker waits while it is full, and
+        stops when the consumer goes away.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        slots = threading.Semaphore(self.settings.AGENT_STREAM_QUEUE_SIZE)
+        stopped = threading.Event()
+        
+        def put(item: Tuple[str, Any]) -> bool:
+            while not slots.acquire(timeout=0.5):
+                if stopped.is_set():
+                    return False
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+                return True
+            except RuntimeError:  # Event loop closed
+                return False
+        
+        def produce() -> None:
+            events = None
+            try:
+                events = self._agent_app.stream_query(
+                    user_id=user_id,
+                    session_id=session_id,
+                    message=message
+                )
+                for event in events:
+                    if stopped.is_set() or not put((_EVENT, event)):
+                        return
+                put((_DONE, None))
+            except Exception as e:
+                put((_ERROR, e))
+            finally:
+                close = getattr(events, "close", None)
+                if close:
+                    close()
+        
+        loop.run_in_executor(self.executor, produce)
+        try:
+            while True:
+                kind, item = await queue.get()
+                slots.release()
+                if kind == _DONE:
+                    return
+                if kind == _ERROR:
+                    raise item
+                yield item
+        finally:
+            stopped.set()
+    
     def _process_response_events(self, events: list) -> str:
         """Process response events into a single response string."""
         
@@ -214,15 +398,31 @@ class VertexAgentClient:
         return optimized_response
     
     def optimize_for_voice(self, text: str) -> str:
+        """
+        Make text voice-friendly with the rule-based normalizer.
+        
+        Text the normalizer flags as complex (code, tables, HTML, very long
+        answers) is rewritten by Gemini when VOICE_LLM_FALLBACK is enabled.
+        """
+        normalized = normalize_for_voice(text, max_chars=self.settings.VOICE_COMPLEX_MAX_CHARS)
+        
+        if normalized.complex and self.settings.VOICE_LLM_FALLBACK:
+            logger.info(f"🔍 VOICE OPTIMIZATION: Complex text ({', '.join(normalized.reasons)}), using Gemini")
+            return self.rewrite_for_voice(text, fallback=normalized.text)
+        
+        return normalized.text
+    
+    def rewrite_for_voice(self, text: str, fallback: Optional[str] = None) -> str:
         """Make text voice-friendly using new Gen AI SDK."""
         logger.info(f"🔍 VOICE OPTIMIZATION: Method called with {len(text)} characters")
+        fallback = text if fallback is None else fallback
         
         if not hasattr(self, '_gemini_client'):
             self._setup_gemini()
         
         if not self._gemini_client:
             logger.error("🔍 VOICE OPTIMIZATION: No Gemini client available!")
-            return text
+            return fallback
         
         try:
             optimization_prompt = f"""
@@ -244,10 +444,11 @@ class VertexAgentClient:
     """
             
             # Use new Gen AI SDK API
-            response = self._gemini_client.models.generate_content(
+            response = self.gemini_calls.call_sync(functools.partial(
+                self._gemini_client.models.generate_content,
                 model='gemini-2.0-flash',
                 contents=optimization_prompt
-            )
+            ))
             
             logger.info(f"🔍 VOICE OPTIMIZATION: Gemini response received")
             
@@ -257,13 +458,22 @@ class VertexAgentClient:
                 return optimized_text
             else:
                 logger.warning("🔍 VOICE OPTIMIZATION: Empty response from Gemini")
-                return text
+                return fallback
             
         except Exception as e:
             logger.error(f"🔍 VOICE OPTIMIZATION: Failed - {e}")
-            return text
+            return fallback
         
 
+    def _event_text(self, event) -> str:
+        """Text parts of an event; tool calls and tool responses have none."""
+        content = event.get("content") if isinstance(event, dict) else None
+        if isinstance(content, dict) and isinstance(content.get("parts"), list):
+            return "".join(
+                str(part["text"]) for part in content["parts"] if isinstance(part, dict) and part.get("text")
+            )
+        return self._extract_text_from_event(event)
+    
     def _extract_text_from_event(self, event) -> str:
         """Extract clean text from various event formats."""
         try:
@@ -335,6 +545,10 @@ class VertexAgentClient:
             return ""
         
     
+    def get_resilience_stats(self) -> Dict[str, Any]:
+        """Breaker state, retries and hedge win rates per upstream call, for monitoring."""
+        return {call.name: call.get_stats() for call in (self.stream_calls, self.session_calls, self.gemini_calls)}
+    
     async def health_check(self) -> bool:
         """Check if the agent is healthy and responding."""
         try:
@@ -349,5 +563,16 @@ class VertexAgentClient:
             return False
 
 
+def create_agent_client() -> VertexAgentClient:
+    """Agent client for the configured AGENT_RUNTIME ("vertex" or "local")."""
+    runtime = get_settings().AGENT_RUNTIME.lower()
+    if runtime == "local":
+        from app.core.integrations.local_client import LocalAgentClient
+        return LocalAgentClient()
+    if runtime != "vertex":
+        raise ValueError(f"Unknown AGENT_RUNTIME '{runtime}' (expected 'vertex' or 'local')")
+    return VertexAgentClient()
+
+
 # Global agent client instance
-agent_client = VertexAgentClient() 
\ No newline at end of file
+agent_client = create_agent_client() 
\ No newline at end of file
@@ -0,0 +1,190 @@
+"""
+In-process agent client for self-hosted deployments.
+
+Runs oprina.agent.root_agent with an ADK Runner inside the backend process
+instead of calling a deployed Agent Engine, so a turn costs no extra network
+round trip. Sessions live in an in-memory store or, for multi-instance
+deployments, in a database (Postgres) through ADK's DatabaseSessionService.
+
+Selected with AGENT_RUNTIME=local; the oprina package must be importable.
+The Gmail and Calendar tools are synchronous, so the runner calls them on a
+tool thread pool (AGENT_STREAM_WORKERS threads) and a turn's Google API calls
+never block the event loop shared with other requests.
+"""
+
+import asyncio
+from typing import Optional, Dict, Any, AsyncGenerator
+import structlog
+
+from app.core.integrations.client import VertexAgentClient
+
+logger = structlog.get_logger(__name__)
+
+
+def create_session_service(store: str, db_url: str = ""):
+    """ADK session service for AGENT_SESSION_STORE."""
+    store = store.lower()
+    if store == "memory":
+        from google.adk.sessions import InMemorySessionService
+        return InMemorySessionService()
+    if store == "database":
+        if not db_url:
+            raise ValueError("AGENT_SESSION_DB_URL must be set when AGENT_SESSION_STORE=database")
+        from google.adk.sessions import DatabaseSessionService
+        return DatabaseSessionService(db_url=db_url)
+    raise ValueError(f"Unknown AGENT_SESSION_STORE '{store}' (expected 'memory' or 'database')")
+
+
+class LocalAgentClient(VertexAgentClient):
+    """Same interface as VertexAgentClient, backed by an in-process ADK Runner."""
+    
+    def __init__(self, agent: Optional[Any] = None, session_service: Optional[Any] = None):
+        super().__init__()
+        self._agent = agent
+        self._session_service = session_service
+        self._runner: Optional[Any] = None
+        self._run_config: Optional[Any] = None
+        self._app_name = self.settings.AGENT_APP_NAME
+    
+    async def initialize(self) -> None:
+        """Build the runner around the root agent and the configured session store."""
+        if self._initialized:
+            return
+        
+        try:
+            from google.adk.agents.run_config import RunConfig, ToolThreadPoolConfig
+            from google.adk.runners import Runner
+            
+            if self._agent is None:
+                from oprina.agent import root_agent
+                self._agent = root_agent
+            if self._session_service is None:
+                self._session_service = create_session_service(
+                    self.settings.AGENT_SESSION_STORE, self.settings.AGENT_SESSION_DB_URL
+                )
+            
+            self._runner = Runner(
+                app_name=self._app_name,
+                agent=self._agent,
+                session_service=self._session_service
+            )
+            self._run_config = RunConfig(
+                tool_thread_pool_config=ToolThreadPoolConfig(max_workers=self.settings.AGENT_STREAM_WORKERS)
+            )
+            
+            self._initialized = True
+            logger.info(f"Local agent runner initialized with {type(self._session_service).__name__}")
+        
+        except ImportError as e:
+            logger.error(f"Local agent runtime needs google-adk and the oprina package: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Failed to initialize local agent runner: {e}")
+            raise
+    
+    async def create_session(self, user_id: str) -> Dict[str, Any]:
+        """Create a session in the local store with user context in state."""
+        if not self._initialized:
+            await self.initialize()
+        
+        session = await self._session_service.create_session(
+            app_name=self._app_name,
+            user_id=user_id,
+            state=self._initial_session_state(user_id)
+        )
+        
+        logger.info(f"Created local agent session {session.id} for user {user_id}")
+        return {
+            "vertex_session_id": session.id,
+            "user_id": user_id,
+            "status": "active"
+        }
+    
+    async def delete_session(self, user_id: str, session_id: str) -> None:
+        """Delete a session from the local store."""
+        if not self._initialized:
+            await self.initialize()
+        
+        await self._session_service.delete_session(
+            app_name=self._app_name,
+            user_id=user_id,
+            session_id=session_id
+        )
+        logger.info(f"Deleted local agent session {session_id} for user {user_id}")
+    
+    async def _run(self, user_id: str, session_id: str, message: str) -> AsyncGenerator[Dict[str, Any], None]:
+        """Run one turn, yielding events in the JSON form Agent Engine's stream_query returns."""
+        from google.genai import types
+        
+        new_message = types.Content(role="user", parts=[types.Part(text=message)])
+        async for event in self._runner.run_async(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=new_message,
+            run_config=self._run_config
+        ):
+            yield event.model_dump(mode="json", exclude_none=True)
+    
+    async def send_message(
+        self,
+        user_id: str,
+        session_id: str,
+        message: str
+    ) -> Dict[str, Any]:
+        """Send a message to the in-process agent and get response."""
+        if not self._initialized:
+            await self.initialize()
+        
+        try:
+            response_events = [event async for event in self._run(user_id, session_id, message)]
+            
+            loop = asyncio.get_running_loop()
+            full_response = await loop.run_in_executor(self.executor, self._process_response_events, response_events)
+            
+            logger.info(f"Sent message to local agent session {session_id}")
+            
+            return {
+                "response": full_response,
+                "session_id": session_id,
+                "user_id": user_id,
+                "message_sent": message
+            }
+        
+        except Exception as e:
+            logger.error(f"Failed to send message to local agent: {e}")
+            raise
+    
+    async def stream_message(
+        self,
+        user_id: str,
+        session_id: str,
+        message: str
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Send a message to the in-process agent and stream the response."""
+        if not self._initialized:
+            await self.initialize()
+        
+        try:
+            async for event in self._run(user_id, session_id, message):
+                yield {
+                    "event": event,
+                    "session_id": session_id,
+                    "user_id": user_id
+                }
+            
+            logger.info(f"Streamed message to local agent session {session_id}")
+        
+        except Exception as e:
+            logger.error(f"Failed to stream message to local agent: {e}")
+            raise
+    
+    async def health_check(self) -> bool:
+        """Check that the runner is built."""
+        try:
+            if not self._initialized:
+                await self.initialize()
+            return self._runner is not None
+        
+        except Exception as e:
+            logger.error(f"Local agent health check failed: {e}")
+            return False
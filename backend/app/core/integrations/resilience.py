@@ -0,0 +1,372 @@
+"""
+Circuit breaking, retries and hedging for Agent Engine and Gemini calls.
+
+Each kind of upstream call gets a ResilientCall: a circuit breaker over a
+rolling window of outcomes (errors and calls slower than slow_call_seconds
+both count against it), retries with full-jitter backoff for transient errors,
+and, for idempotent calls only, a hedged duplicate request sent when the first
+one is slower than the recent p95. Calls that are not idempotent retry only
+errors proving the upstream never accepted the request (is_rejected). While
+the breaker is open, calls fail at once with CircuitOpenError instead of
+waiting for the upstream to time out.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+T = TypeVar("T")
+
+# Error types (google.api_core and genai) and HTTP codes worth another attempt
+_RETRYABLE_ERRORS = {
+    "ServiceUnavailable", "TooManyRequests", "ResourceExhausted", "DeadlineExceeded",
+    "InternalServerError", "BadGateway", "GatewayTimeout", "ServerError"
+}
+_RETRYABLE_CODES = {429, 500, 502, 503, 504}
+
+# Errors meaning the request was turned away before the upstream acted on it
+_REJECTED_ERRORS = {"TooManyRequests", "ResourceExhausted"}
+_REJECTED_CODES = {429}
+_BACKOFF_MAX_SECONDS = 8.0
+
+
+class CircuitOpenError(Exception):
+    """The upstream is failing; calls are refused for retry_after seconds."""
+    
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} is unavailable (circuit open), retry in {retry_after}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an upstream error is transient."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    return type(error).__name__ in _RETRYABLE_ERRORS or getattr(error, "code", None) in _RETRYABLE_CODES
+
+
+def is_rejected(error: Exception) -> bool:
+    """
+    Whether an upstream error proves the request was never accepted.
+    
+    Timeouts and 5xx errors don't: the upstream may still be acting on the
+    request, so only these are safe to retry for calls that are not idempotent.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, ConnectionRefusedError):
+        return True
+    return type(error).__name__ in _REJECTED_ERRORS or getattr(error, "code", None) in _REJECTED_CODES
+
+
+class CircuitBreaker:
+    """
+    Error and latency circuit breaker over a rolling time window.
+    
+    Opens when at least min_calls calls in the last window_seconds ended with
+    a failure rate (errors plus slow calls) of failure_rate or more. After
+    open_seconds it lets one probe call through: success closes it, failure
+    opens it again. Safe to use from worker threads.
+    """
+    
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+    
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float = 60,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 30,
+        open_seconds: float = 30
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        
+        self._lock = threading.Lock()
+        self._calls: Deque[Tuple[float, bool]] = deque()  # (finished_at, failed)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self.stats = {"opened": 0, "rejected": 0, "errors": 0, "slow": 0}
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+    
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+        return self._state
+    
+    def before_call(self) -> None:
+        """
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with a probe in flight
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self.stats["rejected"] += 1
+            retry_after = max(1, round(self.open_seconds - (time.monotonic() - self._opened_at)))
+        raise CircuitOpenError(self.name, retry_after)
+    
+    def release(self) -> None:
+        """Give back a half-open probe whose call was cancelled, recording nothing."""
+        with self._lock:
+            self._probing = False
+    
+    def record(self, ok: bool, duration: float) -> None:
+        """Record how a call that was let through ended."""
+        slow = duration >= self.slow_call_seconds
+        failed = not ok or slow
+        now = time.monotonic()
+        
+        with self._lock:
+            self.stats["errors"] += not ok
+            self.stats["slow"] += ok and slow
+            
+            if self._current_state() == self.HALF_OPEN:
+                self._probing = False
+                if failed:
+                    self._open(now)
+                else:
+                    self._state = self.CLOSED
+                    self._calls.clear()
+                    logger.info(f"Circuit for {self.name} closed")
+                return
+            
+            self._calls.append((now, failed))
+            while self._calls and now - self._calls[0][0] > self.window_seconds:
+                self._calls.popleft()
+            
+            failures = sum(failed for _, failed in self._calls)
+            if (self._state == self.CLOSED and len(self._calls) >= self.min_calls
+                    and failures / len(self._calls) >= self.failure_rate):
+                self._open(now)
+    
+    def _open(self, now: float) -> None:
+        self._state = self.OPEN
+        self._opened_at = now
+        self._calls.clear()
+        self.stats["opened"] += 1
+        logger.warning(f"Circuit for {self.name} opened for {self.open_seconds}s")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = len(self._calls)
+            failures = sum(failed for _, failed in self._calls)
+            return {
+                "state": self._current_state(),
+                "window_calls": calls,
+                "window_failure_rate": round(failures / calls, 3) if calls else None,
+                **self.stats
+            }
+
+
+class ResilientCall:
+    """Circuit breaker, jittered retries and optional hedging for one kind of call."""
+    
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        retries: int = 2,
+        backoff_seconds: float = 0.5,
+        hedge: bool = False,
+        hedge_min_delay: float = 0.5,
+        hedge_workers: int = 8,
+        retryable: Callable[[Exception], bool] = is_retryable
+    ):
+        self.breaker = breaker
+        self.name = breaker.name
+        self.retries = retries
+        self.retryable = retryable
+        self.backoff_seconds = backoff_seconds
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        
+        self._latencies: Deque[float] = deque(maxlen=200)
+        self._hedge_executor = (
+            ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix=f"{self.name}-hedge")
+            if hedge else None
+        )
+        self.stats = {"calls": 0, "retries": 0, "hedged": 0, "hedge_wins": 0}
+    
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number attempt (0-based)."""
+        return random.uniform(0, min(_BACKOFF_MAX_SECONDS, self.backoff_seconds * 2 ** attempt))
+    
+    def hedge_delay(self) -> Optional[float]:
+        """Recent p95 latency, once there are enough samples to trust it."""
+        if len(self._latencies) < 20:
+            return None
+        latencies = sorted(self._latencies)
+        return max(self.hedge_min_delay, latencies[int(len(latencies) * 0.95) - 1])
+    
+    def _attempt(self, fn: Callable[[], T]) -> T:
+        self.breaker.before_call()
+        started = time.monotonic()
+        try:
+            result = fn()
+        except Exception:
+            self.breaker.record(False, time.monotonic() - started)
+            raise
+        duration = time.monotonic() - started
+        self.breaker.record(True, duration)
+        self._latencies.append(duration)
+        return result
+    
+    def call_sync(self, fn: Callable[[], T]) -> T:
+        """
+        Run a blocking call with retries, hedging it when enabled.
+        
+        Raises:
+            CircuitOpenError: If the breaker is open
+        """
+        self.stats["calls"] += 1
+        for attempt in range(self.retries + 1):
+            try:
+                return self._hedged(fn) if self.hedge else self._attempt(fn)
+            except Exception as e:
+                if attempt == self.retries or not self.retryable(e):
+                    raise
+                self.stats["retries"] += 1
+                logger.warning(f"Retrying {self.name} after error: {e}")
+                time.sleep(self.backoff(attempt))
+    
+    def _hedged(self, fn: Callable[[], T]) -> T:
+        """Send a duplicate request if the first is slower than the recent p95; first success wins."""
+        delay = self.hedge_delay()
+        primary = self._hedge_executor.submit(self._attempt, fn)
+        if delay is None:
+            return primary.result()
+        
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        
+        hedge = self._hedge_executor.submit(self._attempt, fn)
+        self.stats["hedged"] += 1
+        
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self.stats["hedge_wins"] += 1
+                    return future.result()
+        # Both failed
+        return primary.result()
+    
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await a call with retries (no hedging).
+        
+        Raises:
+            CircuitOpenError: If the breaker is open
+        """
+        self.stats["calls"] += 1
+        for attempt in range(self.retries + 1):
+            self.breaker.before_call()
+            started = time.monotonic()
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                self.breaker.record(False, time.monotonic() - started)
+                if attempt == self.retries or not self.retryable(e):
+                    raise
+                self.stats["retries"] += 1
+                logger.warning(f"Retrying {self.name} after error: {e}")
+                await asyncio.sleep(self.backoff(attempt))
+                continue
+            duration = time.monotonic() - started
+            self.breaker.record(True, duration)
+            self._latencies.append(duration)
+            return result
+    
+    async def stream(self, open_stream: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """
+        Iterate a stream, timing it by its first item.
+        
+        Only failures before the first item are retried, and only those the
+        retryable predicate accepts: a stream that is not idempotent should
+        retry just the errors that prove the request was never accepted.
+        
+        Raises:
+            CircuitOpenError: If the breaker is open
+        """
+        self.stats["calls"] += 1
+        for attempt in range(self.retries + 1):
+            self.breaker.before_call()
+            started = time.monotonic()
+            stream = open_stream()
+            try:
+                first = await stream.__anext__()
+            except StopAsyncIteration:
+                self.breaker.record(True, time.monotonic() - started)
+                return
+            except asyncio.CancelledError:
+                self.breaker.release()
+                await stream.aclose()
+                raise
+            except Exception as e:
+                self.breaker.record(False, time.monotonic() - started)
+                await stream.aclose()
+                if attempt == self.retries or not self.retryable(e):
+                    raise
+                self.stats["retries"] += 1
+                logger.warning(f"Retrying {self.name} after error: {e}")
+                await asyncio.sleep(self.backoff(attempt))
+                continue
+            break
+        
+        first_item = time.monotonic() - started
+        self._latencies.append(first_item)
+        failed = False
+        try:
+            yield first
+            async for item in stream:
+                yield item
+        except Exception:
+            failed = True
+            raise
+        finally:
+            # A consumer that stops early still got a healthy stream
+            self.breaker.record(not failed, first_item)
+            await stream.aclose()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Breaker state, retry and hedge counters, for monitoring."""
+        hedge_delay = self.hedge_delay()
+        return {
+            "breaker": self.breaker.get_stats(),
+            "hedge_enabled": self.hedge,
+            "hedge_delay_s": round(hedge_delay, 3) if hedge_delay is not None else None,
+            "hedge_win_rate": (
+                round(self.stats["hedge_wins"] / self.stats["hedged"], 3) if self.stats["hedged"] else None
+            ),
+            **self.stats
+        }
@@ -0,0 +1,411 @@
+"""
+Rule-based voice normalization for agent responses.
+
+Turns the markdown-flavoured text the agents produce into plain sentences for
+text-to-speech: strips formatting, drops email addresses and message IDs,
+speaks ISO dates and zero-padded times, and introduces lists. It takes well
+under a millisecond, so it replaces the per-turn Gemini rewrite. Text it can't
+read out well (code, tables, HTML, very long answers) is flagged as complex so
+the caller can still fall back to the LLM rewrite.
+"""
+
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import List, Optional, Tuple
+
+# Text that needs more than rules
+_CODE_BLOCK = re.compile(r"```.*?(?:```|$)", re.S)
+_HTML_TAG = re.compile(r"</?[a-zA-Z][a-zA-Z0-9]*(?:\s[^<>]*)?/?>")
+_TABLE_ROW = re.compile(r"^\s*\|.*\|\s*$", re.M)
+_TABLE_RULE = re.compile(r"^\s*\|?\s*:?-{3,}:?\s*(?:\|\s*:?-{3,}:?\s*)*\|?\s*$", re.M)
+
+# Markdown
+_LINK = re.compile(r"\[([^\]]+)\]\([^)\s]+\)")
+_URL = re.compile(r"\bhttps?://[^\s)>\]]+")
+_HEADING = re.compile(r"^\s{0,3}#{1,6}\s+(?P<title>.+?)[ \t#]*$", re.M)
+_BOLD = re.compile(r"(\*\*|__)(?=\S)(.+?)(?<=\S)\1")
+_ITALIC = re.compile(r"(?<![\w*])\*(?=\S)([^*\n]+?)(?<=\S)\*(?![\w*])|(?<!\w)_(?=\S)([^_\n]+?)(?<=\S)_(?!\w)")
+_INLINE_CODE = re.compile(r"`([^`\n]*)`")
+_LIST_ITEM = re.compile(r"^\s*(?:(?P<number>\d{1,2})[.)]|[-*•+])\s+(?P<item>.+)$")
+_QUOTE = re.compile(r"^\s*>\s?", re.M)
+
+# Email listings and addresses
+_FROM_SUBJECT = re.compile(r"^From:\s*(?P<sender>.+?)\s*\|\s*Subject:\s*(?P<subject>.+)$", re.I)
+_FIELD = re.compile(r"^(?P<field>From|To|Cc|Subject|Date|When|Where|Location):\s*(?P<value>.+)$", re.I)
+_QUOTED_NAME = re.compile(r"\"(?P<name>[^\"\n]+)\"(?=\s*<[^<>\s]+@)")
+_NAMED_ADDRESS = re.compile(r"(?<=[\w.)])\s*<[^<>@\s]+@[^<>\s]+>")
+_ADDRESS = re.compile(r"<?\b(?P<local>[A-Za-z0-9._%+-]+)@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b>?")
+
+# Identifiers: labelled ("Message ID: 18c2f...") or opaque tokens mixing letters and digits,
+# with the preposition that introduced them ("the email with message ID ...")
+_ID_PREPOSITION = r"(?:\b(?:with|for|of)\s+(?:the\s+)?)?"
+_ID_FIELD = re.compile(
+    _ID_PREPOSITION + r"[(\[]?\b(?:(?:message|thread|draft|event|calendar)\s?)?id\b\s*[:#=]?\s*"
+    r"(?P<value>[A-Za-z0-9_@.-]*[A-Za-z0-9_@-])[)\]]?", re.I
+)
+_OPAQUE_ID = re.compile(
+    _ID_PREPOSITION + r"\b(?=[A-Za-z0-9_-]*\d)(?=[A-Za-z0-9_-]*[A-Za-z])[A-Za-z0-9_-]{16,}\b", re.I
+)
+
+# Dates and times
+_MONTHS = ["January", "February", "March", "April", "May", "June", "July",
+           "August", "September", "October", "November", "December"]
+_ISO_DATETIME = re.compile(
+    r"\b(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})"
+    r"(?:[T ](?P<hour>\d{2}):(?P<minute>\d{2})(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?\b"
+)
+_TIME = re.compile(
+    r"\b(?P<hour>[01]?\d|2[0-3]):(?P<minute>[0-5]\d)(?::[0-5]\d)?"
+    r"(?:\s*(?P<meridiem>[AaPp]\.?[Mm]\.?)(?![A-Za-z]))?"
+)
+_PADDED_DAY = re.compile(rf"\b(?P<month>{'|'.join(_MONTHS)}) 0(?=\d\b)")
+_ALL_DAY = re.compile(r"\((?i:all[ -]day)\)")
+_RELATIVE_DAY = re.compile(r"\b(?:at|on) (?=(?:today|tomorrow|yesterday)\b)")
+_LOCATION = re.compile(r"\((?i:location|where):\s*(?P<place>[^)]+)\)")
+
+# Leftover symbols
+_EMOJI = re.compile("[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF\uFE0F\u200D]+")
+# An emoji between a word and a capitalized one marks a new sentence; a leading one is just dropped
+_EMOJI_BREAK = re.compile(r"(?<=[^\s.!?:;,])\s*" + _EMOJI.pattern + r"(?=\s+[A-Z])")
+_ELLIPSIS = re.compile(r"\.{3}|…")
+_ARROW = re.compile(r"->|→|=>")
+_PLURAL = re.compile(r"(?<=\w)\(s\)")
+_DASH = re.compile(r"\s+[-–—]+\s+")
+_WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+# A dash between two times or dates ("10 AM - 11 AM", "June 16 – Friday") reads as "to"
+_RANGE_DASH = re.compile(
+    r"(?P<left>\d|\b(?:AM|PM|noon|midnight|today|tomorrow))(?:\s+[-–—]+\s+|\s*–\s*)"
+    rf"(?=\d|(?:noon|midnight|today|tomorrow|{'|'.join(_WEEKDAYS + _MONTHS)})\b)"
+)
+_STRAY = re.compile(r"[*#`~^\\|<>_]+")
+_SPACE = re.compile(r"[ \t]+")
+_SPACE_BEFORE_PUNCTUATION = re.compile(r"\s+([,.!?;:])")
+_DOUBLE_PUNCTUATION = re.compile(r"([,.!?;:])[,.;:]+")
+
+# Streaming segmentation
+_FENCE = re.compile(r"^\s*```")
+_STRUCTURED_LINE = re.compile(
+    r"^\s*(?:[-*•+>#|`]|\d{1,2}[.)]\s|(?:From|To|Cc|Subject|Date|When|Where|Location):)", re.I
+)
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])[\"')]?\s+(?=[\"'(]?[A-Z0-9])")
+_ABBREVIATION = re.compile(r"(?:\b(?:Dr|Mr|Mrs|Ms|Jr|Sr|St|vs|etc|Inc|Ltd|No|approx|e\.g|i\.e)|\b[A-Z])\.$")
+
+_ORDINALS = ["First", "Second", "Third", "Fourth", "Fifth", "Sixth", "Seventh", "Eighth", "Ninth", "Tenth"]
+_SENTENCE_END = (".", "!", "?", ":")
+
+DEFAULT_COMPLEX_MAX_CHARS = 1500
+
+
+@dataclass
+class VoiceText:
+    """Normalized text, with the reasons it may still need an LLM rewrite."""
+    text: str
+    reasons: List[str] = field(default_factory=list)
+    
+    @property
+    def complex(self) -> bool:
+        return bool(self.reasons)
+
+
+def speak_date(day: date, today: Optional[date] = None) -> str:
+    """ "today", "tomorrow", "Monday, June 16", or with the year when it isn't this year."""
+    today = today or date.today()
+    relative = {0: "today", 1: "tomorrow", -1: "yesterday"}.get((day - today).days)
+    if relative:
+        return relative
+    spoken = f"{day.strftime('%A')}, {_MONTHS[day.month - 1]} {day.day}"
+    return spoken if day.year == today.year else f"{spoken}, {day.year}"
+
+
+def speak_time(hour: int, minute: int) -> str:
+    """ "2 PM", "9:30 AM", "noon", "midnight"."""
+    if minute == 0 and hour in (0, 12):
+        return "midnight" if hour == 0 else "noon"
+    meridiem = "AM" if hour < 12 else "PM"
+    hour = hour % 12 or 12
+    return f"{hour} {meridiem}" if minute == 0 else f"{hour}:{minute:02d} {meridiem}"
+
+
+def _spoken_name(local_part: str) -> str:
+    """Best spoken form of an address local part: john.smith -> John Smith."""
+    words = [w for w in re.split(r"[._+-]+", re.sub(r"\d+", "", local_part)) if w]
+    return " ".join(w.capitalize() for w in words) or "them"
+
+
+def _replace_date(match: re.Match, today: date) -> str:
+    try:
+        day = date(int(match["year"]), int(match["month"]), int(match["day"]))
+    except ValueError:
+        return match.group(0)
+    spoken = speak_date(day, today)
+    if match["hour"] is not None:
+        spoken = f"{spoken} at {speak_time(int(match['hour']), int(match['minute']))}"
+    return spoken
+
+
+def _replace_time(match: re.Match) -> str:
+    hour, minute = int(match["hour"]), int(match["minute"])
+    meridiem = match["meridiem"]
+    if meridiem:
+        if hour > 12:
+            return match.group(0)
+        pm = meridiem[0].lower() == "p"
+        return speak_time(hour % 12 + (12 if pm else 0), minute)
+    # Unpadded times like "9:30" without AM/PM are ambiguous; only read clock times as such
+    if not match["hour"].startswith("0") and hour < 12:
+        return match.group(0) if minute else str(hour)
+    return speak_time(hour, minute)
+
+
+def _strip_id_field(match: re.Match) -> str:
+    """Drop a labelled ID only when its value looks opaque; "ID number" or a short number reads fine."""
+    value = match["value"]
+    opaque = len(value) >= 6 and any(c.isdigit() for c in value) and (
+        any(c.isalpha() for c in value) or len(value) >= 10
+    )
+    return "" if opaque else match.group(0)
+
+
+def _strip_markdown(text: str) -> str:
+    text = _LINK.sub(r"\1", text)
+    text = _URL.sub("a link", text)
+    text = _INLINE_CODE.sub(r"\1", text)
+    text = _BOLD.sub(r"\2", text)
+    return _ITALIC.sub(lambda m: m.group(1) or m.group(2), text)
+
+
+def _strip_addresses(text: str) -> str:
+    if "@" not in text:
+        return text
+    # "Name" <name@host> and Name <name@host> read as the name
+    text = _NAMED_ADDRESS.sub("", _QUOTED_NAME.sub(r"\g<name>", text))
+    return _ADDRESS.sub(lambda m: _spoken_name(m["local"]), text)
+
+
+def _speak_fields(line: str) -> str:
+    listing = _FROM_SUBJECT.match(line)
+    if listing:
+        return f"From {listing['sender']}, about {listing['subject']}"
+    header = _FIELD.match(line)
+    if not header:
+        return line
+    name, value = header["field"].lower(), header["value"]
+    if name == "subject":
+        return f"The subject is {value}"
+    if name in ("from", "to"):
+        return f"{name.capitalize()} {value}"
+    if name == "cc":
+        return f"Copying {value}"
+    return f"{name.capitalize()}: {value}"
+
+
+def _heading(title: str) -> str:
+    """Headings introduce what follows."""
+    return title if title.endswith(_SENTENCE_END) else f"{title}:"
+
+
+def _list_intro(items: List[str]) -> str:
+    if all(item.startswith("From ") for item in items):
+        return "Here are your emails:"
+    if any(re.search(r"\b(?:AM|PM|noon|midnight|today|tomorrow)\b", item) for item in items):
+        return "Your schedule shows:"
+    return "Here's what I found:"
+
+
+def _sentence(text: str) -> str:
+    text = text.strip(" ,;-")
+    if not text:
+        return ""
+    text = text[0].upper() + text[1:]
+    return text if text.endswith(_SENTENCE_END) else f"{text}."
+
+
+def _speak_lines(lines: List[str]) -> List[str]:
+    """Turn lines into sentences, reading list items in order with an introduction."""
+    sentences: List[str] = []
+    pending: List[tuple] = []
+    
+    def flush() -> None:
+        if not pending:
+            return
+        items = [item for _, item in pending]
+        if len(items) > 1 and not (sentences and sentences[-1].endswith(":")):
+            sentences.append(_list_intro(items))
+        numbered = all(number for number, _ in pending)
+        for number, item in pending:
+            # Items keep their own number, so a list read one item at a time still counts up
+            if numbered and 0 < int(number) <= len(_ORDINALS):
+                item = f"{_ORDINALS[int(number) - 1]}, {item[0].lower() + item[1:] if item[1:2].islower() else item}"
+            sentences.append(_sentence(item))
+        pending.clear()
+    
+    for line in lines:
+        item = _LIST_ITEM.match(line)
+        if item or _FROM_SUBJECT.match(line):
+            text = item["item"] if item else line
+            pending.append((item["number"] if item else None, _speak_fields(text)))
+            continue
+        flush()
+        sentence = _sentence(_speak_fields(line))
+        if sentence:
+            sentences.append(sentence)
+    flush()
+    return sentences
+
+
+def _tidy(text: str) -> str:
+    text = _EMOJI_BREAK.sub(".", text)
+    text = _EMOJI.sub("", text)
+    text = _ARROW.sub(" to ", text)
+    text = _RANGE_DASH.sub(r"\g<left> to ", text)
+    text = _DASH.sub(", ", text)
+    text = text.replace(" & ", " and ")
+    text = _PLURAL.sub("s", text)
+    text = re.sub(r"(\d)\s*%", r"\1 percent", text)
+    text = _STRAY.sub(" ", text)
+    text = _SPACE.sub(" ", text)
+    text = _SPACE_BEFORE_PUNCTUATION.sub(r"\1", text)
+    return _DOUBLE_PUNCTUATION.sub(r"\1", text).strip()
+
+
+def normalize_for_voice(
+    text: str,
+    today: Optional[date] = None,
+    max_chars: int = DEFAULT_COMPLEX_MAX_CHARS
+) -> VoiceText:
+    """
+    Make agent output sound natural when read out by text-to-speech.
+    
+    Args:
+        text: Agent response, possibly with markdown, addresses and IDs
+        today: Reference day for "today"/"tomorrow" (defaults to the current date)
+        max_chars: Longer results are flagged complex
+    
+    Returns:
+        VoiceText with the spoken text and any reasons it is complex
+    """
+    if not text or not text.strip():
+        return VoiceText("")
+    today = today or date.today()
+    reasons = []
+    
+    if _CODE_BLOCK.search(text):
+        reasons.append("code")
+        text = _CODE_BLOCK.sub("\n", text)
+    if _HTML_TAG.search(text):
+        reasons.append("html")
+        text = _HTML_TAG.sub(" ", text)
+    if _TABLE_ROW.search(text):
+        reasons.append("table")
+        text = _TABLE_RULE.sub("", text)
+        text = _TABLE_ROW.sub(lambda m: ", ".join(c.strip() for c in m.group(0).strip(" |").split("|")), text)
+    
+    text = _HEADING.sub(lambda m: _heading(m["title"]), text)
+    text = _QUOTE.sub("", text)
+    text = _ALL_DAY.sub(", all day", text)
+    text = _LOCATION.sub(r", at \g<place>", text)
+    text = _ISO_DATETIME.sub(lambda m: _replace_date(m, today), text)
+    text = _TIME.sub(_replace_time, text)
+    text = _PADDED_DAY.sub(r"\g<month> ", text)
+    text = _RELATIVE_DAY.sub("", text)
+    text = _ID_FIELD.sub(_strip_id_field, text)
+    text = _OPAQUE_ID.sub("", text)
+    
+    text = _strip_addresses(_strip_markdown(text))
+    text = _ELLIPSIS.sub(" ", text)
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    
+    spoken = _tidy(" ".join(_speak_lines(lines)))
+    if len(spoken) > max_chars:
+        reasons.append("length")
+    return VoiceText(spoken, reasons)
+
+
+def split_sentences(text: str) -> Tuple[List[str], str]:
+    """
+    Split prose into complete sentences and the unfinished rest.
+    
+    A sentence ends at ".", "!" or "?" followed by whitespace and a capital
+    letter or digit; abbreviations like "Dr." and initials don't end one.
+    """
+    sentences = []
+    start = 0
+    for match in _SENTENCE_BREAK.finditer(text):
+        candidate = text[start:match.start()].strip()
+        if _ABBREVIATION.search(candidate):
+            continue
+        sentences.append(candidate)
+        start = match.end()
+    return sentences, text[start:]
+
+
+class SentenceSegmenter:
+    """
+    Cut streamed agent text into segments that can be spoken on their own.
+    
+    Prose is cut into sentences as soon as the next one starts. List items,
+    email listing lines and header fields are cut at the end of their line,
+    and fenced code blocks and tables are held until they close, so each
+    segment normalizes the same way it would as part of the whole answer.
+    """
+    
+    def __init__(self):
+        self._buffer = ""
+        self._block: List[str] = []
+        self._fenced = False
+    
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text; returns the segments it completed."""
+        self._buffer += text
+        segments = []
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            segments.extend(self._line(line))
+        # A table ends as soon as the next line doesn't start with "|"
+        if self._block and not self._fenced and self._buffer.strip() and not self._buffer.lstrip().startswith("|"):
+            segments.extend(self._close_block())
+        if self._buffer and not (self._fenced or self._block or _STRUCTURED_LINE.match(self._buffer)):
+            sentences, self._buffer = split_sentences(self._buffer)
+            segments.extend(sentences)
+        return segments
+    
+    def flush(self) -> List[str]:
+        """End of the answer; returns whatever is left."""
+        segments = self._line(self._buffer) if self._buffer else []
+        self._buffer = ""
+        segments.extend(self._close_block())
+        self._fenced = False
+        return segments
+    
+    def _close_block(self) -> List[str]:
+        block, self._block = self._block, []
+        return ["\n".join(block)] if block else []
+    
+    def _line(self, line: str) -> List[str]:
+        if self._fenced:
+            self._block.append(line)
+            if _FENCE.match(line):
+                self._fenced = False
+                return self._close_block()
+            return []
+        if _FENCE.match(line):
+            segments = self._close_block()
+            self._block.append(line)
+            self._fenced = True
+            return segments
+        if _TABLE_ROW.match(line):
+            self._block.append(line)
+            return []
+        
+        segments = self._close_block()
+        if not line.strip():
+            return segments
+        if _STRUCTURED_LINE.match(line):
+            segments.append(line)
+            return segments
+        sentences, rest = split_sentences(line)
+        segments.extend(sentences)
+        if rest.strip():
+            segments.append(rest.strip())
+        return segments
@@ -0,0 +1,229 @@
+"""
+Admission control for agent turns.
+
+Caps concurrent agent turns globally (AGENT_MAX_CONCURRENT_TURNS) and per user
+(AGENT_MAX_TURNS_PER_USER), so a burst from a few heavy users can't exhaust
+Agent Engine quota for everyone. Turns over the limit wait in per-user queues
+served by start-time fair queuing: each turn is tagged with the virtual time
+its user would next be due, and the smallest tag among users allowed to run
+goes next. A user with many queued turns therefore doesn't delay other users
+by more than one turn each. Waits are bounded by AGENT_QUEUE_TIMEOUT_SECONDS.
+When queues are full, turns are rejected at once with a retry-after, taken
+from the user with the most queued turns rather than from whoever arrives next.
+"""
+
+import asyncio
+import math
+import statistics
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+import structlog
+
+from app.config import get_settings
+
+logger = structlog.get_logger(__name__)
+
+
+class AgentBusyError(Exception):
+    """The agent is at capacity; retry after retry_after seconds."""
+    
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class _Waiter:
+    user_id: str
+    start_tag: float
+    enqueued_at: float
+    future: asyncio.Future = field(repr=False)
+
+
+class AdmissionController:
+    """Global and per-user concurrency limits with a weighted fair queue."""
+    
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        per_user: Optional[int] = None,
+        max_queued: Optional[int] = None,
+        max_queued_per_user: Optional[int] = None,
+        queue_timeout: Optional[float] = None
+    ):
+        settings = get_settings()
+        self.max_concurrent = settings.AGENT_MAX_CONCURRENT_TURNS if max_concurrent is None else max_concurrent
+        self.per_user = settings.AGENT_MAX_TURNS_PER_USER if per_user is None else per_user
+        self.max_queued = settings.AGENT_MAX_QUEUED_TURNS if max_queued is None else max_queued
+        self.max_queued_per_user = (
+            settings.AGENT_MAX_QUEUED_TURNS_PER_USER if max_queued_per_user is None else max_queued_per_user
+        )
+        self.queue_timeout = settings.AGENT_QUEUE_TIMEOUT_SECONDS if queue_timeout is None else queue_timeout
+        
+        self._active = 0
+        self._in_flight: Dict[str, int] = {}
+        self._queues: Dict[str, Deque[_Waiter]] = {}
+        self._queued = 0
+        
+        # Start-time fair queuing: virtual time and each user's next start tag
+        self._virtual_time = 0.0
+        self._next_tag: Dict[str, float] = {}
+        
+        self._waits: Deque[float] = deque(maxlen=1000)
+        self._service_time = 5.0  # seconds per turn, moving average
+        self.stats = {
+            "admitted": 0,
+            "waited": 0,
+            "rejected": 0,
+            "timed_out": 0
+        }
+    
+    @asynccontextmanager
+    async def admit(self, user_id: str, weight: float = 1.0) -> AsyncIterator[None]:
+        """
+        Hold an agent turn slot for the duration of the block.
+        
+        Raises:
+            AgentBusyError: If the queue is full or the wait exceeds queue_timeout
+        """
+        await self._acquire(user_id, weight)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(user_id, time.monotonic() - started)
+    
+    def retry_after(self) -> int:
+        """Seconds until a new turn would likely get a slot."""
+        return max(1, math.ceil(self._service_time * (self._queued + 1) / self.max_concurrent))
+    
+    async def _acquire(self, user_id: str, weight: float) -> None:
+        start_tag = max(self._virtual_time, self._next_tag.get(user_id, 0.0))
+        self._next_tag[user_id] = start_tag + 1.0 / weight
+        
+        # Slots are handed to waiters as soon as they free up, so a free slot means
+        # nobody who could use it is waiting
+        if not self._queues.get(user_id) and self._can_start(user_id):
+            self._virtual_time = max(self._virtual_time, start_tag)
+            self._start(user_id)
+            self._waits.append(0.0)
+            return
+        
+        queued = len(self._queues.get(user_id, ()))
+        if queued >= self.max_queued_per_user or (self._queued >= self.max_queued and not self._push_out(queued)):
+            self.stats["rejected"] += 1
+            self._next_tag[user_id] -= 1.0 / weight
+            logger.warning(f"Rejected agent turn for user {user_id}: {self._queued} turns queued")
+            raise AgentBusyError("Agent is at capacity, please retry shortly", self.retry_after())
+        
+        waiter = _Waiter(user_id, start_tag, time.monotonic(), asyncio.get_running_loop().create_future())
+        self._queues.setdefault(user_id, deque()).append(waiter)
+        self._queued += 1
+        self.stats["waited"] += 1
+        
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                self._remove(waiter)
+                self.stats["timed_out"] += 1
+                logger.warning(f"Agent turn for user {user_id} timed out after {self.queue_timeout}s in queue")
+                raise AgentBusyError("Agent is busy, please retry shortly", self.retry_after())
+            # Admitted or pushed out just as the deadline passed
+            waiter.future.result()
+        except asyncio.CancelledError:
+            if not waiter.future.done():
+                self._remove(waiter)
+            elif waiter.future.exception() is None:
+                self._release(user_id, None)
+            raise
+        
+        self._waits.append(time.monotonic() - waiter.enqueued_at)
+    
+    def _push_out(self, queue_length: int) -> bool:
+        """
+        Make room in a full queue by rejecting the newest turn of the user with
+        the longest queue, if that queue is longer than the arriving user's would be.
+        """
+        if not self._queues:
+            return False
+        longest = max(self._queues.values(), key=len)
+        if len(longest) <= queue_length + 1:
+            return False
+        
+        waiter = longest[-1]
+        self._remove(waiter)
+        self.stats["rejected"] += 1
+        logger.warning(f"Pushed agent turn for user {waiter.user_id} out of the full queue")
+        waiter.future.set_exception(AgentBusyError("Agent is at capacity, please retry shortly", self.retry_after()))
+        return True
+    
+    def _can_start(self, user_id: str) -> bool:
+        return self._active < self.max_concurrent and self._in_flight.get(user_id, 0) < self.per_user
+    
+    def _start(self, user_id: str) -> None:
+        self._active += 1
+        self._in_flight[user_id] = self._in_flight.get(user_id, 0) + 1
+        self.stats["admitted"] += 1
+    
+    def _remove(self, waiter: _Waiter) -> None:
+        queue = self._queues[waiter.user_id]
+        queue.remove(waiter)
+        if not queue:
+            del self._queues[waiter.user_id]
+        self._queued -= 1
+    
+    def _release(self, user_id: str, service_time: Optional[float]) -> None:
+        self._active -= 1
+        self._in_flight[user_id] -= 1
+        if not self._in_flight[user_id]:
+            del self._in_flight[user_id]
+        if service_time is not None:
+            self._service_time = 0.9 * self._service_time + 0.1 * service_time
+        
+        self._dispatch()
+        
+        # Forget users that are idle and not ahead of virtual time
+        if user_id not in self._in_flight and user_id not in self._queues:
+            if self._next_tag.get(user_id, 0.0) <= self._virtual_time:
+                self._next_tag.pop(user_id, None)
+    
+    def _dispatch(self) -> None:
+        """Hand free slots to the waiting turns with the smallest start tags."""
+        while self._active < self.max_concurrent:
+            eligible = [
+                queue[0] for user_id, queue in self._queues.items()
+                if self._in_flight.get(user_id, 0) < self.per_user
+            ]
+            if not eligible:
+                return
+            
+            waiter = min(eligible, key=lambda w: (w.start_tag, w.enqueued_at))
+            self._remove(waiter)
+            self._virtual_time = max(self._virtual_time, waiter.start_tag)
+            self._start(waiter.user_id)
+            waiter.future.set_result(True)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, wait times and counters, for monitoring."""
+        waits = sorted(self._waits)
+        return {
+            "max_concurrent": self.max_concurrent,
+            "per_user": self.per_user,
+            "in_flight": self._active,
+            "queued": self._queued,
+            "users_in_flight": len(self._in_flight),
+            "users_queued": len(self._queues),
+            "wait_ms_p50": round(statistics.median(waits) * 1000, 1) if waits else None,
+            "wait_ms_p95": round(waits[int(len(waits) * 0.95) - 1] * 1000, 1) if waits else None,
+            "wait_ms_max": round(waits[-1] * 1000, 1) if waits else None,
+            "service_time_s": round(self._service_time, 2),
+            **self.stats
+        }
+
+
+# Global admission controller instance
+admission_controller = AdmissionController()
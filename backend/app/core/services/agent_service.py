@@ -6,6 +6,10 @@ from typing import Dict, Any, AsyncGenerator, Optional
 import structlog
 
 from app.core.integrations.client import agent_client
+from app.core.integrations.resilience import CircuitOpenError
+from app.core.services.session_pool import session_pool
+from app.core.services.admission import AgentBusyError, admission_controller
+from app.core.services.message_writer import ChatTurn, message_writer, new_message
 from app.core.database.repositories.session_repository import SessionRepository
 from app.core.database.repositories.message_repository import MessageRepository
 
@@ -28,6 +32,9 @@ class AgentService:
         self.session_repo = session_repo
         self.message_repo = message_repo
         self.agent_client = agent_client
+        self.session_pool = session_pool
+        self.admission = admission_controller
+        self.message_writer = message_writer
     
     async def create_agent_session(
         self, 
@@ -36,13 +43,21 @@ class AgentService:
     ) -> Dict[str, Any]:
         """
         Create a new Vertex AI agent session and link it to user session.
+        Claims a pre-created session from the warm pool when one is ready.
         Gracefully handles Vertex AI failures - session creation still succeeds.
         """
         try:
             # Try to create Vertex AI session
             try:
-                agent_session_data = await self.agent_client.create_session(user_id)
-                vertex_session_id = agent_session_data["vertex_session_id"]
+                vertex_session_id = self.session_pool.claim(user_id)
+                if vertex_session_id:
+                    logger.info(f"Claimed warm Vertex AI session {vertex_session_id} for user {user_id}")
+                else:
+                    agent_session_data = await self.agent_client.create_session(user_id)
+                    vertex_session_id = agent_session_data["vertex_session_id"]
+                
+                # Have the next session ready before the user asks for it
+                self.session_pool.warm(user_id)
                 
                 # Update the user session with Vertex AI session ID
                 await self.session_repo.update_session_links(
@@ -78,11 +93,46 @@ class AgentService:
             logger.error(f"Failed to create agent session for user {user_id}: {e}")
             raise AgentError(f"Failed to create agent session: {str(e)}")
     
+    def warm_agent_sessions(self, user_id: str) -> None:
+        """Pre-create agent sessions for the user in the background."""
+        self.session_pool.warm(user_id)
+    
     async def send_message(
         self, 
         user_id: str, 
         session_id: str, 
-        message: str
+        message: str,
+        message_type: str = "text",
+        voice_metadata: Optional[Dict[str, Any]] = None,
+        persist: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Send a message to the agent once the turn is admitted.
+        
+        Both messages are stored together after the agent answers (see
+        message_writer.py). With persist=False the caller gets the unsaved
+        "turn" and stores it with persist_turn, e.g. after adding metadata.
+        If the agent fails, the user message is stored on its own before the
+        error is raised, whatever persist says.
+        
+        Raises:
+            AgentBusyError: If the agent is at capacity; nothing has been stored
+        """
+        async with self.admission.admit(user_id):
+            return await self._send_message(user_id, session_id, message, message_type, voice_metadata, persist)
+    
+    async def persist_turn(self, turn: ChatTurn) -> None:
+        """Store a chat turn, in the background when write-behind is enabled."""
+        await self.message_writer.write(turn, self.message_repo, self.session_repo)
+    
+    async def _send_message(
+        self, 
+        user_id: str, 
+        session_id: str, 
+        message: str,
+        message_type: str,
+        voice_metadata: Optional[Dict[str, Any]],
+        persist: bool
     ) -> Dict[str, Any]:
         """Send a message to the agent."""
         try:
@@ -93,56 +143,42 @@ class AgentService:
                 raise AgentError("No agent session found")
             
             vertex_session_id = session_data["vertex_session_id"]
+            user_message = new_message(session_id, user_id, "user", message, message_type, voice_metadata)
             
-            # Store user message
-            user_message = await self.message_repo.create_message({
-                "session_id": session_id,
-                "user_id": user_id,
-                "role": "user",
-                "content": message,
-                "message_type": "text"
-            })
-
+            # Send to agent directly
             try:
-                # Check if this is the first user message (message_index = 1)
-                if user_message.get("message_index") == 1:
-                    # Auto-generate title from first message
-                    await self.session_repo.auto_generate_title_from_message(
-                        session_id, 
-                        message
-                    )
-                    logger.info(f"Auto-generated title for session {session_id} from first message")
-            except Exception as title_error:
-                # Don't fail the message sending if title generation fails
-                logger.warning(f"Failed to auto-generate title for session {session_id}: {title_error}")
+                agent_response = await self.agent_client.send_message(
+                    user_id=user_id,
+                    session_id=vertex_session_id,
+                    message=message
+                )
+            except Exception:
+                # Timeouts, 5xx and an open circuit still keep what the user said
+                await self._persist_unanswered(session_data, user_message)
+                raise
             
-            # Send to agent directly
-            agent_response = await self.agent_client.send_message(
+            # Store both messages in one write; the first turn also titles the session
+            assistant_message = new_message(session_id, user_id, "assistant", agent_response["response"])
+            turn = ChatTurn(
+                session_id=session_id,
                 user_id=user_id,
-                session_id=vertex_session_id,
-                message=message
+                messages=[user_message, assistant_message] if agent_response["response"] else [user_message],
+                generate_title=self._is_untitled(session_data)
             )
-            
-            # Store agent response
-            assistant_message = await self.message_repo.create_message({
-                "session_id": session_id,
-                "user_id": user_id,
-                "role": "assistant",
-                "content": agent_response["response"],
-                "message_type": "text"
-            })
-            
-            # Update session activity
-            await self.session_repo.update_last_activity(session_id)
+            if persist:
+                await self.persist_turn(turn)
             
             logger.info(f"Sent message to agent for session {session_id}")
             return {
                 "user_message": user_message,
                 "assistant_message": assistant_message,
                 "response": agent_response["response"],
-                "session_id": session_id
+                "session_id": session_id,
+                "turn": turn
             }
             
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.error(f"Failed to send message for session {session_id}: {e}", 
                         extra={"user_id": user_id, "session_id": session_id})
@@ -153,6 +189,25 @@ class AgentService:
         user_id: str, 
         session_id: str, 
         message: str
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Send a message to the agent once the turn is admitted, and stream the response."""
+        try:
+            async with self.admission.admit(user_id):
+                async for event in self._stream_message(user_id, session_id, message):
+                    yield event
+        except AgentBusyError as e:
+            yield {
+                "type": "error",
+                "error": str(e),
+                "retry_after": e.retry_after,
+                "session_id": session_id
+            }
+    
+    async def _stream_message(
+        self, 
+        user_id: str, 
+        session_id: str, 
+        message: str
     ) -> AsyncGenerator[Dict[str, Any], None]:
         """Send a message to the agent and stream the response."""
         try:
@@ -164,15 +219,7 @@ class AgentService:
                 return
             
             vertex_session_id = session_data["vertex_session_id"]
-            
-            # Store user message
-            user_message = await self.message_repo.create_message({
-                "session_id": session_id,
-                "user_id": user_id,
-                "role": "user",
-                "content": message,
-                "message_type": "text"
-            })
+            user_message = new_message(session_id, user_id, "user", message)
             
             yield {
                 "type": "user_message",
@@ -180,35 +227,34 @@ class AgentService:
                 "session_id": session_id
             }
             
-            # Stream from agent directly
+            # Stream voice-ready sentences from the agent as they are generated
             response_parts = []
             
-            async for event in self.agent_client.stream_message(
+            async for segment in self.agent_client.stream_voice_message(
                 user_id=user_id,
                 session_id=vertex_session_id,
                 message=message
             ):
-                # Extract content from event
-                if event.get("content"):
-                    response_parts.append(event["content"])
-                    
-                    yield {
-                        "type": "agent_response_chunk",
-                        "content": event["content"],
-                        "session_id": session_id
-                    }
+                response_parts.append(segment["text"])
+                
+                yield {
+                    "type": "agent_response_chunk",
+                    "content": segment["text"],
+                    "session_id": session_id
+                }
             
-            # Store complete response
+            # Store both messages in one write once the response is complete
             full_response = " ".join(response_parts).strip()
+            turn = ChatTurn(
+                session_id=session_id,
+                user_id=user_id,
+                messages=[user_message],
+                generate_title=self._is_untitled(session_data)
+            )
             
             if full_response:
-                assistant_message = await self.message_repo.create_message({
-                    "session_id": session_id,
-                    "user_id": user_id,
-                    "role": "assistant",
-                    "content": full_response,
-                    "message_type": "text"
-                })
+                assistant_message = new_message(session_id, user_id, "assistant", full_response)
+                turn.messages.append(assistant_message)
                 
                 yield {
                     "type": "agent_response_complete",
@@ -216,11 +262,18 @@ class AgentService:
                     "session_id": session_id
                 }
             
-            # Update session activity
-            await self.session_repo.update_last_activity(session_id)
+            await self.persist_turn(turn)
             
             logger.info(f"Streamed message to agent for session {session_id}")
             
+        except CircuitOpenError as e:
+            logger.warning(f"Agent unavailable for session {session_id}: {e}")
+            yield {
+                "type": "error",
+                "error": str(e),
+                "retry_after": e.retry_after,
+                "session_id": session_id
+            }
         except Exception as e:
             logger.error(f"Failed to stream message for session {session_id}: {e}",
                         extra={"user_id": user_id, "session_id": session_id})
@@ -230,6 +283,23 @@ class AgentService:
                 "session_id": session_id
             }
 
+    async def _persist_unanswered(self, session_data: Dict[str, Any], user_message: Dict[str, Any]) -> None:
+        """Store a user message the agent failed to answer; a storage error must not mask the agent's."""
+        turn = ChatTurn(
+            session_id=user_message["session_id"],
+            user_id=user_message["user_id"],
+            messages=[user_message],
+            generate_title=self._is_untitled(session_data)
+        )
+        try:
+            await self.persist_turn(turn)
+        except Exception as e:
+            logger.warning(f"Failed to store unanswered message for session {turn.session_id}: {e}")
+
+    def _is_untitled(self, session_data: Dict[str, Any]) -> bool:
+        """Whether the session still has the default title, i.e. this is its first turn."""
+        return session_data.get("title") in (None, "", "New Chat")
+    
     async def get_user_sessions(self, user_id: str) -> list[Dict[str, Any]]:
         """Get all sessions for a user from database."""
         try:
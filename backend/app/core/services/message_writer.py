@@ -0,0 +1,316 @@
+"""
+Write-behind persistence for chat turns.
+
+A turn (the user message and the agent's answer) is stored with one batched
+insert; the messages trigger updates the session's last_activity_at in the
+same statement, and voice metadata travels in the rows themselves. With
+MESSAGE_WRITE_BEHIND the insert happens on a background queue so the response
+doesn't wait on the database.
+
+A queued turn is encrypted (ENCRYPTION_KEY), appended and fsynced to a
+journal (MESSAGE_JOURNAL_PATH) before it is queued, and marked done once
+stored. Turns that fail MESSAGE_WRITE_MAX_ATTEMPTS times are queued again every
+MESSAGE_WRITE_RETRY_INTERVAL_SECONDS, and turns still in the journal after a
+crash are replayed on the next startup. Message ids are generated up front and
+inserts skip ids that already exist, so a replay never duplicates a message.
+
+The journal only survives a restart if it is on a persistent volume; on an
+ephemeral filesystem (e.g. Cloud Run) turns queued when an instance is
+replaced are lost, which is why write-behind is off by default.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import structlog
+
+from app.config import get_settings
+from app.core.database.repositories.message_repository import MessageRepository
+from app.core.database.repositories.session_repository import SessionRepository
+
+logger = structlog.get_logger(__name__)
+
+
+def new_message(
+    session_id: str,
+    user_id: str,
+    role: str,
+    content: str,
+    message_type: str = "text",
+    voice_metadata: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """A message row with its id and timestamp set, ready to insert."""
+    return {
+        "id": str(uuid.uuid4()),
+        "session_id": session_id,
+        "user_id": user_id,
+        "role": role,
+        "content": content,
+        "message_type": message_type,
+        "voice_metadata": voice_metadata or {},
+        "created_at": datetime.utcnow().isoformat()
+    }
+
+
+@dataclass
+class ChatTurn:
+    """Messages of one exchange, stored together."""
+    session_id: str
+    user_id: str
+    messages: List[Dict[str, Any]]
+    generate_title: bool = False
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+
+
+class _Journal:
+    """Append-only JSON lines file of encrypted queued turns and finished turn ids."""
+    
+    def __init__(self, path: str, encrypt: Callable[[str], str], decrypt: Callable[[str], str]):
+        self.path = path
+        self.encrypt = encrypt
+        self.decrypt = decrypt
+        self._lock = threading.Lock()
+    
+    def append_turn(self, turn: "ChatTurn") -> None:
+        self.append({"id": turn.id, "turn": self.encrypt(json.dumps(asdict(turn)))})
+    
+    def append(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+    
+    def _pending(self) -> List[Dict[str, Any]]:
+        """Turn records (still encrypted) not marked done."""
+        if not os.path.exists(self.path):
+            return []
+        
+        records: Dict[str, Dict[str, Any]] = {}
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn write from a crash
+                if "turn" in record:
+                    records[record["id"]] = record
+                else:
+                    records.pop(record.get("done"), None)
+        return list(records.values())
+    
+    def pending(self) -> List[Dict[str, Any]]:
+        """Turns written to the journal but not marked done."""
+        with self._lock:
+            records = self._pending()
+        return [json.loads(self.decrypt(record["turn"])) for record in records]
+    
+    def compact(self) -> None:
+        """Rewrite the journal with only the pending turns."""
+        with self._lock:
+            pending = self._pending()
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                for record in pending:
+                    f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+
+def _default_repositories() -> Tuple[MessageRepository, SessionRepository]:
+    from app.core.database.connection import get_database_client
+    
+    db = get_database_client()
+    return MessageRepository(db), SessionRepository(db)
+
+
+def _encrypt(data: str) -> str:
+    from app.utils.encryption import encrypt_sensitive_data
+    return encrypt_sensitive_data(data)
+
+
+def _decrypt(data: str) -> str:
+    from app.utils.encryption import decrypt_sensitive_data
+    return decrypt_sensitive_data(data)
+
+
+class MessageWriter:
+    """Stores chat turns with one batched insert, inline or on a durable background queue."""
+    
+    def __init__(
+        self,
+        write_behind: Optional[bool] = None,
+        journal_path: Optional[str] = None,
+        max_queued: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_interval: Optional[float] = None,
+        retry_seconds: float = 1.0,
+        repositories: Callable[[], Tuple[MessageRepository, SessionRepository]] = _default_repositories,
+        encrypt: Callable[[str], str] = _encrypt,
+        decrypt: Callable[[str], str] = _decrypt
+    ):
+        settings = get_settings()
+        self.write_behind = settings.MESSAGE_WRITE_BEHIND if write_behind is None else write_behind
+        self.journal = _Journal(settings.MESSAGE_JOURNAL_PATH if journal_path is None else journal_path,
+                                encrypt, decrypt)
+        self.max_queued = settings.MESSAGE_WRITE_QUEUE_SIZE if max_queued is None else max_queued
+        self.max_attempts = settings.MESSAGE_WRITE_MAX_ATTEMPTS if max_attempts is None else max_attempts
+        self.retry_interval = (
+            settings.MESSAGE_WRITE_RETRY_INTERVAL_SECONDS if retry_interval is None else retry_interval
+        )
+        self.retry_seconds = retry_seconds
+        self.repositories = repositories
+        
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._retrier: Optional[asyncio.Task] = None
+        self._failed: List[Tuple[ChatTurn, MessageRepository, SessionRepository]] = []
+        self.stats = {
+            "written": 0,
+            "queued": 0,
+            "inline": 0,
+            "retries": 0,
+            "failed": 0,
+            "requeued": 0,
+            "replayed": 0
+        }
+    
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+    
+    async def start(self) -> None:
+        """Start the background writer and requeue turns left in the journal."""
+        if not self.write_behind or self.running:
+            return
+        
+        loop = asyncio.get_running_loop()
+        os.makedirs(os.path.dirname(self.journal.path) or ".", exist_ok=True)
+        # Rewrite first so a torn last line can't swallow the next record appended
+        await loop.run_in_executor(None, self.journal.compact)
+        try:
+            pending = await loop.run_in_executor(None, self.journal.pending)
+        except Exception as e:
+            logger.error(f"Cannot read chat turns from {self.journal.path}: {e}")
+            pending = []
+        
+        self._queue = asyncio.Queue()
+        if pending:
+            try:
+                message_repo, session_repo = self.repositories()
+            except Exception as e:
+                logger.error(f"Cannot replay {len(pending)} chat turns from {self.journal.path}: {e}")
+            else:
+                for turn in pending:
+                    self._queue.put_nowait((ChatTurn(**turn), message_repo, session_repo))
+                self.stats["replayed"] += len(pending)
+                logger.info(f"Replaying {len(pending)} chat turns from {self.journal.path}")
+        
+        self._worker = loop.create_task(self._run())
+        self._retrier = loop.create_task(self._requeue_failed())
+    
+    async def write(self, turn: ChatTurn, message_repo: MessageRepository, session_repo: SessionRepository) -> None:
+        """
+        Store a turn: queued when write-behind is running and the queue has room,
+        otherwise inline.
+        """
+        if self.running and self._queue.qsize() < self.max_queued:
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(None, self.journal.append_turn, turn)
+            except Exception as e:
+                logger.warning(f"Cannot journal chat turn {turn.id}, storing it inline: {e}")
+            else:
+                self._queue.put_nowait((turn, message_repo, session_repo))
+                self.stats["queued"] += 1
+                return
+        
+        self.stats["inline"] += 1
+        await self._persist(turn, message_repo, session_repo)
+        self.stats["written"] += 1
+    
+    async def _persist(self, turn: ChatTurn, message_repo: MessageRepository, session_repo: SessionRepository) -> None:
+        await message_repo.create_messages(turn.messages)
+        
+        if turn.generate_title:
+            try:
+                await session_repo.auto_generate_title_from_message(turn.session_id, turn.messages[0]["content"])
+            except Exception as e:
+                # Don't fail the turn if title generation fails
+                logger.warning(f"Failed to auto-generate title for session {turn.session_id}: {e}")
+    
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            turn, message_repo, session_repo = await self._queue.get()
+            try:
+                for attempt in range(1, self.max_attempts + 1):
+                    try:
+                        await self._persist(turn, message_repo, session_repo)
+                    except Exception as e:
+                        if attempt == self.max_attempts:
+                            # Stays in the journal and is queued again by _requeue_failed
+                            self._failed.append((turn, message_repo, session_repo))
+                            self.stats["failed"] += 1
+                            logger.error(f"Failed to store chat turn {turn.id} for session {turn.session_id}: {e}")
+                            break
+                        self.stats["retries"] += 1
+                        logger.warning(f"Retrying chat turn {turn.id} after error: {e}")
+                        await asyncio.sleep(self.retry_seconds * 2 ** (attempt - 1))
+                    else:
+                        await loop.run_in_executor(None, self.journal.append, {"done": turn.id})
+                        self.stats["written"] += 1
+                        break
+                
+                if self._queue.empty():
+                    await loop.run_in_executor(None, self.journal.compact)
+            except Exception as e:
+                logger.error(f"Message writer error on turn {turn.id}: {e}")
+            finally:
+                self._queue.task_done()
+    
+    async def _requeue_failed(self) -> None:
+        """Give turns that ran out of attempts another round every retry_interval seconds."""
+        while True:
+            await asyncio.sleep(self.retry_interval)
+            if not self._failed:
+                continue
+            failed, self._failed = self._failed, []
+            for item in failed:
+                self._queue.put_nowait(item)
+            self.stats["requeued"] += len(failed)
+            logger.info(f"Retrying {len(failed)} chat turns that could not be stored")
+    
+    async def close(self, timeout: float = 10.0) -> None:
+        """Wait up to timeout seconds for queued turns to be stored, then stop."""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self._queue.qsize()} chat turns left in the journal for the next startup")
+        if self._failed:
+            logger.warning(f"{len(self._failed)} failed chat turns left in the journal for the next startup")
+        self._retrier.cancel()
+        self._worker.cancel()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth and write counters, for monitoring."""
+        return {
+            "write_behind": self.running,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "failed_pending": len(self._failed),
+            "journal_path": self.journal.path,
+            **self.stats
+        }
+
+
+# Global message writer instance
+message_writer = MessageWriter()
@@ -0,0 +1,168 @@
+"""
+Warm pool of pre-created agent sessions.
+
+Creating an Agent Engine session is a network round trip on the critical path
+of every new chat. The pool keeps up to AGENT_SESSION_POOL_SIZE sessions ready
+per user and refills them in the background, so create_agent_session only has
+to claim one. Agent sessions belong to the user they were created for, which
+is why the pool is per user rather than global.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional, Set, Tuple
+import structlog
+
+from app.config import get_settings
+from app.core.integrations.client import agent_client
+
+logger = structlog.get_logger(__name__)
+
+
+class AgentSessionPool:
+    """Per-user pool of ready agent sessions, refilled in the background."""
+    
+    def __init__(
+        self,
+        client: Any,
+        size: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        max_users: Optional[int] = None
+    ):
+        settings = get_settings()
+        self.client = client
+        self.size = settings.AGENT_SESSION_POOL_SIZE if size is None else size
+        self.ttl_seconds = settings.AGENT_SESSION_POOL_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_users = settings.AGENT_SESSION_POOL_MAX_USERS if max_users is None else max_users
+        
+        # user_id -> (created_at, session_id), least recently warmed user first
+        self._ready: "OrderedDict[str, Deque[Tuple[float, str]]]" = OrderedDict()
+        self._refills: Dict[str, asyncio.Task] = {}
+        self._deletes: Set[asyncio.Task] = set()
+        
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "created": 0,
+            "expired": 0,
+            "evicted": 0,
+            "failures": 0
+        }
+    
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+    
+    def claim(self, user_id: str) -> Optional[str]:
+        """
+        Take a ready session for the user, or None when there is none.
+        
+        There is no await between finding a session and removing it, so two
+        concurrent claims never get the same session.
+        """
+        if not self.enabled:
+            return None
+        
+        ready = self._ready.get(user_id)
+        while ready:
+            created_at, session_id = ready.popleft()
+            if time.monotonic() - created_at < self.ttl_seconds:
+                self.stats["hits"] += 1
+                return session_id
+            self.stats["expired"] += 1
+            self._delete(user_id, session_id)
+        
+        self.stats["misses"] += 1
+        return None
+    
+    def warm(self, user_id: str) -> None:
+        """Top the user's pool up in the background; returns immediately."""
+        if not self.enabled or user_id in self._refills:
+            return
+        
+        self._prune(user_id)
+        if len(self._ready.get(user_id, ())) >= self.size:
+            return
+        
+        task = asyncio.get_running_loop().create_task(self._refill(user_id))
+        self._refills[user_id] = task
+        task.add_done_callback(lambda _: self._refills.pop(user_id, None))
+    
+    async def _refill(self, user_id: str) -> None:
+        try:
+            while len(self._ready.get(user_id, ())) < self.size:
+                session = await self.client.create_session(user_id)
+                if not session or not session.get("vertex_session_id"):
+                    self.stats["failures"] += 1
+                    return
+                
+                ready = self._ready.setdefault(user_id, deque())
+                ready.append((time.monotonic(), session["vertex_session_id"]))
+                self._ready.move_to_end(user_id)
+                self.stats["created"] += 1
+                self._evict_users()
+            
+            logger.info(f"Agent session pool warmed for user {user_id}")
+        
+        except Exception as e:
+            self.stats["failures"] += 1
+            logger.warning(f"Failed to warm agent sessions for user {user_id}: {e}")
+    
+    def _prune(self, user_id: str) -> None:
+        """Drop the user's sessions that are past their TTL."""
+        ready = self._ready.get(user_id)
+        now = time.monotonic()
+        while ready and now - ready[0][0] >= self.ttl_seconds:
+            _, session_id = ready.popleft()
+            self.stats["expired"] += 1
+            self._delete(user_id, session_id)
+    
+    def _evict_users(self) -> None:
+        """Keep at most max_users users, dropping the least recently warmed."""
+        while len(self._ready) > self.max_users:
+            user_id, ready = self._ready.popitem(last=False)
+            for _, session_id in ready:
+                self.stats["evicted"] += 1
+                self._delete(user_id, session_id)
+    
+    def _delete(self, user_id: str, session_id: str) -> None:
+        """Delete a session that will never be handed out, without waiting for it."""
+        task = asyncio.get_running_loop().create_task(self._delete_session(user_id, session_id))
+        self._deletes.add(task)
+        task.add_done_callback(self._deletes.discard)
+    
+    async def _delete_session(self, user_id: str, session_id: str) -> None:
+        try:
+            await self.client.delete_session(user_id, session_id)
+        except Exception as e:
+            logger.warning(f"Failed to delete pooled agent session {session_id}: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool size and hit/miss counters, for monitoring."""
+        claims = self.stats["hits"] + self.stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "size_per_user": self.size,
+            "ttl_seconds": self.ttl_seconds,
+            "users": len(self._ready),
+            "ready_sessions": sum(len(ready) for ready in self._ready.values()),
+            "refilling": len(self._refills),
+            "hit_rate": round(self.stats["hits"] / claims, 3) if claims else None,
+            **self.stats
+        }
+    
+    async def close(self) -> None:
+        """Stop refilling and delete every session still in the pool."""
+        for task in list(self._refills.values()):
+            task.cancel()
+        while self._ready:
+            user_id, ready = self._ready.popitem()
+            for _, session_id in ready:
+                self._delete(user_id, session_id)
+        if self._deletes:
+            await asyncio.gather(*self._deletes, return_exceptions=True)
+
+
+# Global session pool instance
+session_pool = AgentSessionPool(agent_client)
@@ -10,6 +10,8 @@ from datetime import datetime
 
 from app.core.integrations.speech import SpeechToTextService, TextToSpeechService
 from app.core.services.agent_service import AgentService
+from app.core.integrations.resilience import CircuitOpenError
+from app.core.services.admission import AgentBusyError
 from app.core.database.repositories.message_repository import MessageRepository
 from app.core.database.repositories.session_repository import SessionRepository
 from app.utils.errors import ValidationError, OprinaError
@@ -90,13 +92,19 @@ class VoiceService:
             
             # Step 2: Process text through agent service
             try:
+                # Messages are stored after synthesis, together with their voice metadata;
+                # if the agent fails, the user message is stored with its transcription metadata
                 agent_response = await self.agent_service.send_message(
                     user_id=user_id,
                     session_id=session_id,
-                    message=user_text
+                    message=user_text,
+                    message_type="voice",
+                    voice_metadata=self._voice_metadata(transcription_result, None),
+                    persist=False
                 )
                 
                 if not agent_response.get("response"):
+                    await self._persist_turn(agent_response["turn"], transcription_result, None, session_id)
                     return {
                         "success": False,
                         "error": "Agent processing failed",
@@ -108,21 +116,19 @@ class VoiceService:
                     }
                 
                 agent_text = agent_response["response"]
-
-                #Auto-generate title if this is the first user message
-                try:
-                    # Check if this is the first user message (message_index = 1)
-                    if agent_response.get("user_message", {}).get("message_index") == 1:
-                        # Auto-generate title from first voice message
-                        await self.session_repository.auto_generate_title_from_message(
-                            session_id, 
-                            user_text
-                        )
-                        logger.info(f"Auto-generated title for voice session {session_id} from first message")
-                except Exception as title_error:
-                    # Don't fail the voice processing if title generation fails
-                    logger.warning(f"Failed to auto-generate title for voice session {session_id}: {title_error}")
                 
+            except (AgentBusyError, CircuitOpenError) as busy_error:
+                logger.warning(f"Agent busy for voice session {session_id}: {busy_error}")
+                return {
+                    "success": False,
+                    "error": str(busy_error),
+                    "stage": "agent_busy" if isinstance(busy_error, AgentBusyError) else "agent_unavailable",
+                    "retry_after": busy_error.retry_after,
+                    "transcription": {
+                        "text": user_text,
+                        "confidence": transcription_result.get("confidence")
+                    }
+                }
             except Exception as agent_error:
                 logger.error(f"Agent service failed: {agent_error}")
                 return {
@@ -137,6 +143,7 @@ class VoiceService:
             
             # Step 3: Convert agent response to speech (if requested)
             audio_response = None
+            synthesis_result = None
             if include_audio_response and agent_text.strip():
                 synthesis_result = await self.tts_service.synthesize_speech(
                     text=agent_text
@@ -151,19 +158,8 @@ class VoiceService:
                 else:
                     logger.warning(f"TTS synthesis failed: {synthesis_result.get('error')}")
             
-            # Step 4: Store voice metadata in the messages (already stored by agent_service)
-            # The agent_service already stores both user and assistant messages
-            # We just need to update the user message with voice metadata
-            try:
-                if agent_response.get("user_message", {}).get("id"):
-                    user_message_id = agent_response["user_message"]["id"]
-                    await self._update_message_voice_metadata(
-                        message_id=user_message_id,
-                        transcription_data=transcription_result,
-                        synthesis_data=synthesis_result if include_audio_response else None
-                    )
-            except Exception as metadata_error:
-                logger.warning(f"Failed to update voice metadata: {metadata_error}")
+            # Step 4: Store both messages, with voice metadata on the user message
+            await self._persist_turn(agent_response["turn"], transcription_result, synthesis_result, session_id)
             
             # Return complete voice interaction result
             result = {
@@ -260,36 +256,40 @@ class VoiceService:
                 "audio_format": "mp3"
             }
     
-    async def _update_message_voice_metadata(
+    def _voice_metadata(
         self,
-        message_id: str,
         transcription_data: Dict[str, Any],
         synthesis_data: Optional[Dict[str, Any]] = None
-    ):
-        """Update message with voice interaction metadata."""
-        try:
-            voice_metadata = {
-                "transcription": {
-                    "confidence": transcription_data.get("confidence"),
-                    "service": transcription_data.get("service")
-                }
+    ) -> Dict[str, Any]:
+        """Voice interaction metadata stored with the user message."""
+        voice_metadata = {
+            "transcription": {
+                "confidence": transcription_data.get("confidence"),
+                "service": transcription_data.get("service")
             }
-            
-            if synthesis_data:
-                voice_metadata["synthesis"] = {
-                    "audio_size": synthesis_data.get("audio_size"),
-                    "service": synthesis_data.get("service")
-                }
-            
-            # Update the message with voice metadata
-            # Note: This assumes your message repository has an update method
-            await self.message_repository.update_message_metadata(
-                message_id=message_id,
-                metadata_update={"voice": voice_metadata}
-            )
-            
-        except Exception as e:
-            logger.warning(f"Failed to update message voice metadata: {str(e)}")
+        }
+        
+        if synthesis_data and synthesis_data.get("success"):
+            voice_metadata["synthesis"] = {
+                "audio_size": synthesis_data.get("audio_size"),
+                "service": synthesis_data.get("service")
+            }
+        
+        return {"voice": voice_metadata}
+    
+    async def _persist_turn(
+        self,
+        turn,
+        transcription_data: Dict[str, Any],
+        synthesis_data: Optional[Dict[str, Any]],
+        session_id: str
+    ) -> None:
+        """Store a voice turn, with voice metadata on the user message."""
+        try:
+            turn.messages[0]["voice_metadata"] = self._voice_metadata(transcription_data, synthesis_data)
+            await self.agent_service.persist_turn(turn)
+        except Exception as storage_error:
+            logger.warning(f"Failed to store voice messages for session {session_id}: {storage_error}")
     
     def is_available(self) -> bool:
         """Check if voice services are available."""
@@ -32,6 +32,12 @@ from app.core.services.background_tasks import (
     get_background_token_service
 )
 
+# Warm agent session pool
+from app.core.services.session_pool import session_pool
+from app.core.services.admission import admission_controller
+from app.core.services.message_writer import message_writer
+from app.core.integrations.client import agent_client
+
 # Initialize settings
 settings = get_settings()
 
@@ -192,6 +198,30 @@ async def background_service_status():
     bg_service = get_background_token_service()
     return bg_service.get_stats()
 
+# Agent session pool status endpoint
+@app.get("/api/v1/admin/session-pool-status")
+async def session_pool_status():
+    """Get warm agent session pool status (for monitoring)."""
+    return session_pool.get_stats()
+
+# Agent admission status endpoint
+@app.get("/api/v1/admin/agent-admission-status")
+async def agent_admission_status():
+    """Get agent turn concurrency, queue depth and wait times (for monitoring)."""
+    return admission_controller.get_stats()
+
+# Agent Engine and Gemini resilience status endpoint
+@app.get("/api/v1/admin/agent-resilience-status")
+async def agent_resilience_status():
+    """Get circuit breaker state, retries and hedge win rates (for monitoring)."""
+    return agent_client.get_resilience_stats()
+
+# Message write-behind status endpoint
+@app.get("/api/v1/admin/message-writer-status")
+async def message_writer_status():
+    """Get chat message write queue depth and counters (for monitoring)."""
+    return message_writer.get_stats()
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
@@ -221,6 +251,10 @@ async def startup_event():
     logger.info("  🔗 OAuth: GET /api/v1/oauth/callback")
     logger.info("  🔗 OAuth: GET /api/v1/oauth/status")
     logger.info("  🔗 OAuth: GET /api/v1/oauth/background-status")
+    logger.info("  💬 Admin: GET /api/v1/admin/session-pool-status")
+    logger.info("  💬 Admin: GET /api/v1/admin/agent-admission-status")
+    logger.info("  💬 Admin: GET /api/v1/admin/agent-resilience-status")
+    logger.info("  💬 Admin: GET /api/v1/admin/message-writer-status")
     logger.info("  🎤 Voice: POST /api/v1/voice/message")
     logger.info("  🎤 Voice: POST /api/v1/voice/transcribe")
     logger.info("  🎤 Voice: POST /api/v1/voice/synthesize")
@@ -261,6 +295,14 @@ async def startup_event():
     except Exception as e:
         logger.error(f"  ❌ Failed to start background service: {str(e)}")
     
+    # Start the background message writer (replays turns left from the last run)
+    try:
+        await message_writer.start()
+        if message_writer.running:
+            logger.info(f"  💾 Message write-behind started, journal: {message_writer.journal.path}")
+    except Exception as e:
+        logger.error(f"  ❌ Failed to start message writer: {str(e)}")
+    
     logger.info("  📖 Docs: /docs")
 
 # Shutdown event
@@ -274,6 +316,18 @@ async def shutdown_event():
         logger.info("🔄 Background token refresh service stopped")
     except Exception as e:
         logger.error(f"Error stopping background service: {str(e)}")
+    
+    try:
+        await session_pool.close()
+        logger.info("💬 Agent session pool drained")
+    except Exception as e:
+        logger.error(f"Error draining agent session pool: {str(e)}")
+    
+    try:
+        await message_writer.close()
+        logger.info("💾 Message writer drained")
+    except Exception as e:
+        logger.error(f"Error draining message writer: {str(e)}")
 
 if __name__ == "__main__":
     import uvicorn
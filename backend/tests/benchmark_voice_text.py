@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark: rule-based voice normalization vs the Gemini rewrite.
+
+Runs every case in data/voice_corpus.json through normalize_for_voice and
+scores the output. A case passes when every required fact is still there
+(an inner list gives acceptable alternatives), none of the excluded strings
+remain, no markdown, address or opaque ID survives, and the complexity flag
+matches. Prints per-case failures, the pass rate and latency.
+
+With --live the same corpus also goes through VertexAgentClient.rewrite_for_voice
+(the previous per-turn Gemini call; needs GOOGLE_CLOUD_PROJECT and credentials),
+and through the hybrid path that only rewrites text flagged complex.
+
+Usage:
+    cd backend && python tests/benchmark_voice_text.py [--repeat 200] [--live] [--show]
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from datetime import date
+
+# Add backend root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.integrations.voice_text import normalize_for_voice
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "voice_corpus.json")
+
+_LEFTOVERS = re.compile(r"\*\*|`|\||^#|\S+@\S+\.\w+|\b(?=\w*\d)(?=\w*[A-Za-z])\w{16,}\b", re.M)
+
+
+def load_corpus():
+    with open(CORPUS) as f:
+        corpus = json.load(f)
+    return date.fromisoformat(corpus["today"]), corpus["cases"]
+
+
+def check(case: dict, text: str) -> list:
+    """Problems with one spoken result; empty when the case passes."""
+    problems = []
+    lowered = text.lower()
+    for required in case["include"]:
+        alternatives = required if isinstance(required, list) else [required]
+        if not any(a.lower() in lowered for a in alternatives):
+            problems.append(f"missing {alternatives[0]!r}")
+    for excluded in case["exclude"]:
+        if excluded.lower() in lowered:
+            problems.append(f"kept {excluded!r}")
+    leftover = _LEFTOVERS.search(text)
+    if leftover:
+        problems.append(f"leftover {leftover.group(0)!r}")
+    return problems
+
+
+def score(name: str, cases: list, outputs: list, latencies_ms: list, show: bool) -> None:
+    failures = 0
+    for case, output in zip(cases, outputs):
+        problems = check(case, output)
+        if problems:
+            failures += 1
+            print(f"  [{name}] {case['name']}: {', '.join(problems)}")
+        if show:
+            print(f"  [{name}] {case['name']}: {output}")
+    passed = len(cases) - failures
+    latencies_ms = sorted(latencies_ms)
+    p95 = latencies_ms[int(len(latencies_ms) * 0.95) - 1] if latencies_ms else 0
+    print(f"{name:<10} quality {passed}/{len(cases)} ({passed / len(cases):.0%})  "
+          f"latency p50 {statistics.median(latencies_ms):9.3f} ms  p95 {p95:9.3f} ms")
+
+
+def run_rules(today: date, cases: list, repeat: int, show: bool) -> list:
+    results, latencies = [], []
+    for case in cases:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            result = normalize_for_voice(case["text"], today=today)
+        latencies.append((time.perf_counter() - started) * 1000 / repeat)
+        results.append(result)
+    
+    flag_errors = [c["name"] for c, r in zip(cases, results) if r.complex != c.get("complex", False)]
+    score("rules", cases, [r.text for r in results], latencies, show)
+    print(f"{'':<10} complex flagged {sum(r.complex for r in results)}/{len(cases)}, "
+          f"flag mismatches: {', '.join(flag_errors) or 'none'}")
+    return results
+
+
+def run_live(cases: list, rules: list, show: bool) -> None:
+    from app.core.integrations.client import VertexAgentClient
+    
+    client = VertexAgentClient()
+    outputs, latencies = [], []
+    for case in cases:
+        started = time.perf_counter()
+        outputs.append(client.rewrite_for_voice(case["text"]))
+        latencies.append((time.perf_counter() - started) * 1000)
+    score("gemini", cases, outputs, latencies, show)
+    
+    # Hybrid: rules everywhere, Gemini only for complex text
+    hybrid_outputs, hybrid_latencies = [], []
+    for case, rule, output, latency in zip(cases, rules, outputs, latencies):
+        hybrid_outputs.append(output if rule.complex else rule.text)
+        hybrid_latencies.append(latency if rule.complex else 0.0)
+    score("hybrid", cases, hybrid_outputs, hybrid_latencies, show)
+    print(f"{'':<10} Gemini calls {sum(r.complex for r in rules)}/{len(cases)} turns")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200, help="normalizer runs per case for timing")
+    parser.add_argument("--live", action="store_true", help="also run the Gemini rewrite")
+    parser.add_argument("--show", action="store_true", help="print every spoken result")
+    args = parser.parse_args()
+    
+    today, cases = load_corpus()
+    print(f"{len(cases)} cases, today = {today}")
+    rules = run_rules(today, cases, args.repeat, args.show)
+    if args.live:
+        run_live(cases, rules, args.show)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Load test: agent turns with and without the admission controller.
+
+A stub agent stands in for Agent Engine with a fixed quota of concurrent
+turns. Above the quota every turn slows down in proportion, and above twice
+the quota turns fail outright (quota exhausted). A few heavy users fire bursts
+of turns while many light users send one turn at a time. The test reports
+latency percentiles per user class, plus failed and rejected turns, first with
+no limit and then through AdmissionController.
+
+Usage:
+    cd backend && python tests/loadtest_agent_admission.py [--quota 8] [--heavy 3] [--light 30]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from contextlib import asynccontextmanager
+
+# Add backend root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.services.admission import AdmissionController, AgentBusyError
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+class StubAgentEngine:
+    """Agent stand-in that degrades above its concurrency quota."""
+    
+    def __init__(self, quota: int, turn_seconds: float):
+        self.quota = quota
+        self.turn_seconds = turn_seconds
+        self.running = 0
+        self.peak = 0
+    
+    async def turn(self) -> None:
+        if self.running >= 2 * self.quota:
+            raise QuotaExceeded()
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            slowdown = max(1.0, self.running / self.quota)
+            await asyncio.sleep(self.turn_seconds * slowdown * random.uniform(0.8, 1.2))
+        finally:
+            self.running -= 1
+
+
+@asynccontextmanager
+async def no_limit(user_id: str):
+    yield
+
+
+def percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    return values[max(0, int(len(values) * pct) - 1)]
+
+
+async def run(name: str, admit, args) -> None:
+    random.seed(7)
+    agent = StubAgentEngine(args.quota, args.turn)
+    latencies = {"heavy": [], "light": []}
+    outcomes = {"ok": 0, "failed": 0, "rejected": 0}
+    
+    async def turn(kind: str, user_id: str) -> None:
+        started = time.perf_counter()
+        try:
+            async with admit(user_id):
+                await agent.turn()
+            latencies[kind].append(time.perf_counter() - started)
+            outcomes["ok"] += 1
+        except QuotaExceeded:
+            outcomes["failed"] += 1
+        except AgentBusyError:
+            outcomes["rejected"] += 1
+    
+    async def heavy_user(i: int) -> None:
+        for _ in range(args.bursts):
+            await asyncio.gather(*(turn("heavy", f"heavy-{i}") for _ in range(args.burst_size)))
+    
+    async def light_user(i: int) -> None:
+        await asyncio.sleep(random.uniform(0, args.turn * 4))
+        for _ in range(3):
+            await turn("light", f"light-{i}")
+            await asyncio.sleep(random.uniform(0, args.turn))
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(heavy_user(i) for i in range(args.heavy)),
+                         *(light_user(i) for i in range(args.light)))
+    elapsed = time.perf_counter() - started
+    
+    print(f"{name}: {elapsed:.2f}s, peak agent concurrency {agent.peak} (quota {args.quota}), "
+          f"ok {outcomes['ok']}, quota failures {outcomes['failed']}, rejected {outcomes['rejected']}")
+    for kind, values in latencies.items():
+        if values:
+            print(f"  {kind:<6} turns {len(values):4d}  p50 {statistics.median(values) * 1000:7.0f} ms  "
+                  f"p95 {percentile(values, 0.95) * 1000:7.0f} ms  p99 {percentile(values, 0.99) * 1000:7.0f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quota", type=int, default=8, help="agent turns the stub runs at full speed")
+    parser.add_argument("--turn", type=float, default=0.05, help="seconds per turn at full speed")
+    parser.add_argument("--heavy", type=int, default=3, help="users sending bursts")
+    parser.add_argument("--bursts", type=int, default=4, help="bursts per heavy user")
+    parser.add_argument("--burst-size", type=int, default=12, help="turns per burst")
+    parser.add_argument("--light", type=int, default=30, help="users sending one turn at a time")
+    args = parser.parse_args()
+    
+    await run("no limit", no_limit, args)
+    
+    controller = AdmissionController(max_concurrent=args.quota, per_user=2, max_queued=4 * args.quota,
+                                     max_queued_per_user=args.burst_size, queue_timeout=args.turn * 40)
+    await run("admission", controller.admit, args)
+    print(f"  stats {controller.get_stats()}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
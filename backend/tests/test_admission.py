@@ -0,0 +1,196 @@
+"""
+Tests for admission control and fair queuing of agent turns.
+
+Usage:
+    cd backend && python -m pytest tests/test_admission.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+import unittest
+from unittest.mock import AsyncMock
+
+# Add backend root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.services.admission import AdmissionController, AgentBusyError
+
+TURN = 0.05
+
+
+class StubAgent:
+    """Agent stand-in that takes TURN seconds per turn and records concurrency."""
+    
+    def __init__(self, controller):
+        self.controller = controller
+        self.running = 0
+        self.peak = 0
+        self.order = []
+    
+    async def turn(self, user_id, duration=TURN):
+        async with self.controller.admit(user_id):
+            self.order.append(user_id)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            try:
+                await asyncio.sleep(duration)
+            finally:
+                self.running -= 1
+
+
+class TestAdmissionController(unittest.IsolatedAsyncioTestCase):
+    """Test limits, fair ordering, deadlines and rejection"""
+    
+    async def test_global_and_per_user_limits(self):
+        controller = AdmissionController(max_concurrent=3, per_user=1, max_queued=50,
+                                         max_queued_per_user=10, queue_timeout=5)
+        agent = StubAgent(controller)
+        
+        await asyncio.gather(*(agent.turn(f"user-{i % 4}") for i in range(12)))
+        
+        self.assertEqual(agent.peak, 3)
+        stats = controller.get_stats()
+        self.assertEqual((stats["admitted"], stats["in_flight"], stats["queued"]), (12, 0, 0))
+    
+    async def test_heavy_user_does_not_delay_others(self):
+        controller = AdmissionController(max_concurrent=1, per_user=1, max_queued=50,
+                                         max_queued_per_user=10, queue_timeout=5)
+        agent = StubAgent(controller)
+        
+        heavy = [asyncio.create_task(agent.turn("heavy", TURN / 5)) for _ in range(6)]
+        await asyncio.sleep(0)
+        light = [asyncio.create_task(agent.turn(user_id, TURN / 5)) for user_id in ("ann", "bob")]
+        await asyncio.gather(*heavy, *light)
+        
+        # Light users are served after at most one more heavy turn, not after all of them
+        self.assertEqual(agent.order[:5], ["heavy", "ann", "bob", "heavy", "heavy"])
+    
+    async def test_weight_shares_slots(self):
+        controller = AdmissionController(max_concurrent=1, per_user=1, max_queued=50,
+                                         max_queued_per_user=10, queue_timeout=5)
+        order = []
+        
+        async def turn(user_id, weight):
+            async with controller.admit(user_id, weight=weight):
+                order.append(user_id)
+                await asyncio.sleep(0.001)
+        
+        await asyncio.gather(turn("blocker", 1),
+                             *(turn("pro", 2) for _ in range(4)),
+                             *(turn("free", 1) for _ in range(4)))
+        
+        self.assertEqual(order[1:7].count("pro"), 4)
+    
+    async def test_full_queue_rejected_with_retry_after(self):
+        controller = AdmissionController(max_concurrent=1, per_user=1, max_queued=10,
+                                         max_queued_per_user=1, queue_timeout=5)
+        agent = StubAgent(controller)
+        
+        running = [asyncio.create_task(agent.turn("alice")) for _ in range(2)]
+        await asyncio.sleep(0)
+        
+        started = time.perf_counter()
+        with self.assertRaises(AgentBusyError) as ctx:
+            await agent.turn("alice")
+        self.assertLess(time.perf_counter() - started, TURN / 5)
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+        
+        # Another user can still queue
+        await asyncio.gather(agent.turn("bob"), *running)
+        self.assertEqual(controller.get_stats()["rejected"], 1)
+    
+    async def test_full_queue_pushes_out_heaviest_user(self):
+        controller = AdmissionController(max_concurrent=1, per_user=1, max_queued=3,
+                                         max_queued_per_user=10, queue_timeout=5)
+        agent = StubAgent(controller)
+        
+        heavy = [asyncio.create_task(agent.turn("heavy", TURN / 5)) for _ in range(4)]
+        await asyncio.sleep(0)
+        await agent.turn("light", TURN / 5)
+        results = await asyncio.gather(*heavy, return_exceptions=True)
+        
+        self.assertIsInstance(results[-1], AgentBusyError)
+        self.assertEqual(agent.order[:2], ["heavy", "light"])
+        self.assertEqual(controller.get_stats()["rejected"], 1)
+    
+    async def test_queue_deadline(self):
+        controller = AdmissionController(max_concurrent=1, per_user=1, max_queued=10,
+                                         max_queued_per_user=5, queue_timeout=TURN / 2)
+        agent = StubAgent(controller)
+        
+        running = asyncio.create_task(agent.turn("alice", TURN * 2))
+        await asyncio.sleep(0)
+        with self.assertRaises(AgentBusyError):
+            await agent.turn("bob")
+        await running
+        
+        stats = controller.get_stats()
+        self.assertEqual((stats["timed_out"], stats["queued"], stats["in_flight"]), (1, 0, 0))
+    
+    async def test_cancelled_waiter_leaves_queue(self):
+        controller = AdmissionController(max_concurrent=1, per_user=1, max_queued=10,
+                                         max_queued_per_user=5, queue_timeout=5)
+        agent = StubAgent(controller)
+        
+        running = asyncio.create_task(agent.turn("alice"))
+        waiting = asyncio.create_task(agent.turn("bob"))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await running
+        
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(agent.order, ["alice"])
+        self.assertEqual(controller.get_stats()["queued"], 0)
+
+
+class TestAdmissionLoad(unittest.IsolatedAsyncioTestCase):
+    """Load against a stub agent: tail latency stays bounded for light users"""
+    
+    async def test_light_user_tail_latency_bounded_under_burst(self):
+        controller = AdmissionController(max_concurrent=4, per_user=2, max_queued=200,
+                                         max_queued_per_user=100, queue_timeout=10)
+        agent = StubAgent(controller)
+        latencies = []
+        
+        async def light_turn(user_id):
+            started = time.perf_counter()
+            await agent.turn(user_id, TURN / 5)
+            latencies.append(time.perf_counter() - started)
+        
+        # Two heavy users queue 40 turns each just before 20 light users arrive
+        heavy = [asyncio.create_task(agent.turn(f"heavy-{i % 2}", TURN / 5)) for i in range(80)]
+        await asyncio.sleep(0)
+        await asyncio.gather(*(light_turn(f"light-{i}") for i in range(20)), *heavy)
+        
+        # Without fair queuing the light users would wait behind all 80 heavy turns
+        # (20 rounds of 4); with it they get through in a handful
+        self.assertLess(max(latencies), 8 * TURN / 5)
+        self.assertEqual(agent.peak, 4)
+
+
+class TestAgentServiceAdmission(unittest.IsolatedAsyncioTestCase):
+    """Test that busy turns are turned away before anything is stored"""
+    
+    async def test_busy_turn_not_stored(self):
+        from app.core.services.agent_service import AgentService
+        
+        service = AgentService(session_repo=AsyncMock(), message_repo=AsyncMock())
+        service.admission = AdmissionController(max_concurrent=1, per_user=1, max_queued=0,
+                                                max_queued_per_user=0, queue_timeout=1)
+        
+        async with service.admission.admit("alice"):
+            with self.assertRaises(AgentBusyError):
+                await service.send_message("alice", "chat-1", "hi")
+            
+            events = [event async for event in service.stream_message("alice", "chat-1", "hi")]
+        
+        self.assertEqual(events[0]["type"], "error")
+        self.assertGreaterEqual(events[0]["retry_after"], 1)
+        service.message_repo.create_message.assert_not_awaited()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Concurrency tests for VertexAgentClient's stream_query bridge.
+
+stream_query is a blocking generator; these tests check that simultaneous
+agent turns run in parallel on the worker pool instead of serializing on the
+event loop, that a slow consumer applies backpressure, and that an abandoned
+stream stops its worker.
+
+Usage:
+    cd backend && python -m pytest tests/test_agent_client_concurrency.py
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+
+# Add backend root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.integrations.client import VertexAgentClient
+
+TURN_EVENTS = 5
+EVENT_DELAY = 0.05  # seconds the fake agent blocks before each event
+
+
+class FakeAgentApp:
+    """Deployed agent stand-in whose stream_query blocks like a network call."""
+    
+    def __init__(self, events=TURN_EVENTS, delay=EVENT_DELAY):
+        self.events = events
+        self.delay = delay
+        self.produced = 0
+        self.closed = threading.Event()
+    
+    def stream_query(self, user_id, session_id, message):
+        try:
+            for i in range(self.events):
+                time.sleep(self.delay)
+                self.produced += 1
+                yield {"content": {"parts": [{"text": f"{message} part {i}"}]}}
+        finally:
+            self.closed.set()
+
+
+class TestStreamQueryBridge(unittest.IsolatedAsyncioTestCase):
+    """Test that blocking agent streams don't block the event loop"""
+    
+    def setUp(self):
+        self.client = VertexAgentClient()
+        self.client._initialized = True
+        self.client._agent_app = FakeAgentApp()
+        self.client._process_response_events = lambda events: " ".join(
+            self.client._extract_text_from_event(event) for event in events
+        )
+    
+    async def _turn(self, number):
+        events = [event async for event in self.client.stream_message("user", f"session-{number}", f"turn {number}")]
+        return len(events)
+    
+    async def test_simultaneous_turns_do_not_serialize(self):
+        turns = 8
+        serial_time = turns * TURN_EVENTS * EVENT_DELAY
+        
+        started = time.perf_counter()
+        counts = await asyncio.gather(*(self._turn(i) for i in range(turns)))
+        elapsed = time.perf_counter() - started
+        
+        self.assertEqual(counts, [TURN_EVENTS] * turns)
+        self.assertLess(elapsed, serial_time / 3)
+    
+    async def test_event_loop_stays_responsive(self):
+        ticks = 0
+        
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        
+        ticking = asyncio.create_task(ticker())
+        response = await self.client.send_message("user", "session", "hello")
+        ticking.cancel()
+        
+        self.assertIn("hello part 4", response["response"])
+        # The turn blocks for TURN_EVENTS * EVENT_DELAY = 0.25s; the loop keeps ticking meanwhile
+        self.assertGreater(ticks, 10)
+    
+    async def test_slow_consumer_applies_backpressure(self):
+        self.client.settings.AGENT_STREAM_QUEUE_SIZE = 1
+        app = self.client._agent_app = FakeAgentApp(events=20, delay=0)
+        
+        stream = self.client.stream_message("user", "session", "hello")
+        await stream.__anext__()
+        await asyncio.sleep(0.2)
+        
+        # One event consumed, one queued, one blocked in put
+        self.assertLessEqual(app.produced, 3)
+        await stream.aclose()
+    
+    async def test_abandoned_stream_stops_worker(self):
+        app = self.client._agent_app = FakeAgentApp(events=100, delay=0.01)
+        
+        stream = self.client.stream_message("user", "session", "hello")
+        await stream.__anext__()
+        await stream.aclose()
+        
+        closed = await asyncio.get_running_loop().run_in_executor(None, app.closed.wait, 2)
+        self.assertTrue(closed)
+        self.assertLess(app.produced, 100)
+    
+    async def test_agent_errors_reach_caller(self):
+        def failing_stream(**kwargs):
+            raise RuntimeError("agent unavailable")
+            yield
+        
+        self.client._agent_app.stream_query = failing_stream
+        
+        with self.assertRaises(RuntimeError):
+            await self._turn(0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+Tests for LocalAgentClient, the in-process ADK runner mode (AGENT_RUNTIME=local).
+
+A stub agent stands in for oprina's root_agent, so the runner, the in-memory
+session store and the event post-processing run for real without a model. A
+scripted model that calls a blocking tool checks that simultaneous turns run
+their synchronous tools off the event loop.
+
+Usage:
+    cd backend && python -m pytest tests/test_local_agent_client.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+import unittest
+from typing import AsyncGenerator
+
+# Add backend root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.events import Event
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app.core.integrations.local_client import LocalAgentClient, create_session_service
+
+
+class EchoAgent(BaseAgent):
+    """Agent stand-in that answers each turn with the number of turns so far."""
+    
+    async def _run_async_impl(self, ctx) -> AsyncGenerator[Event, None]:
+        turns = sum(1 for event in ctx.session.events if event.author == "user")
+        text = ctx.user_content.parts[0].text
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            content=types.Content(role="model", parts=[types.Part(text=f"Turn {turns}: {text}")])
+        )
+
+
+TOOL_DELAY = 0.3  # seconds the blocking tool sleeps, like a Gmail API round trip
+
+
+def slow_lookup() -> str:
+    """Blocking tool stand-in."""
+    time.sleep(TOOL_DELAY)
+    return "found"
+
+
+class ToolCallingLlm(BaseLlm):
+    """Model stand-in that calls slow_lookup, then answers once it has the result."""
+    
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        if llm_request.contents[-1].parts[0].function_response:
+            part = types.Part(text="Done")
+        else:
+            part = types.Part(function_call=types.FunctionCall(name="slow_lookup", args={}))
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+
+class TestLocalAgentClient(unittest.IsolatedAsyncioTestCase):
+    """Test sessions and turns through the in-process runner"""
+    
+    async def asyncSetUp(self):
+        self.sessions = InMemorySessionService()
+        self.client = LocalAgentClient(agent=EchoAgent(name="oprina_agent"), session_service=self.sessions)
+        self.session_id = (await self.client.create_session("alice"))["vertex_session_id"]
+    
+    async def test_session_starts_with_user_context(self):
+        session = await self.sessions.get_session(
+            app_name=self.client._app_name, user_id="alice", session_id=self.session_id
+        )
+        
+        self.assertEqual(session.state["user:id"], "alice")
+        self.assertFalse(session.state["gmail:connected"])
+    
+    async def test_turns_share_session_history(self):
+        first = await self.client.send_message("alice", self.session_id, "Hello there")
+        second = await self.client.send_message("alice", self.session_id, "Anything new")
+        
+        self.assertEqual(first["response"], "Turn 1: Hello there.")
+        self.assertEqual(second["response"], "Turn 2: Anything new.")
+    
+    async def test_stream_yields_stream_query_json(self):
+        events = [e async for e in self.client.stream_message("alice", self.session_id, "Hi")]
+        
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["event"]["content"]["parts"][0]["text"], "Turn 1: Hi")
+        self.assertEqual(events[0]["session_id"], self.session_id)
+    
+    async def test_deleted_session_is_gone(self):
+        await self.client.delete_session("alice", self.session_id)
+        
+        self.assertIsNone(await self.sessions.get_session(
+            app_name=self.client._app_name, user_id="alice", session_id=self.session_id
+        ))
+        self.assertTrue(await self.client.health_check())
+    
+    def test_unknown_session_store_rejected(self):
+        with self.assertRaises(ValueError):
+            create_session_service("redis")
+        with self.assertRaises(ValueError):
+            create_session_service("database")
+
+
+
+class TestLocalTurnConcurrency(unittest.IsolatedAsyncioTestCase):
+    """Test that synchronous tools in local turns don't block the event loop"""
+    
+    async def asyncSetUp(self):
+        agent = LlmAgent(name="oprina_agent", model=ToolCallingLlm(model="scripted"), tools=[slow_lookup])
+        self.client = LocalAgentClient(agent=agent, session_service=InMemorySessionService())
+        # Warm up declaration building so timings only cover the turns
+        await self._turn("warmup")
+    
+    async def _turn(self, user_id):
+        session_id = (await self.client.create_session(user_id))["vertex_session_id"]
+        return [event async for event in self.client.stream_message(user_id, session_id, "Look it up")]
+    
+    async def test_simultaneous_turns_overlap(self):
+        turns = 4
+        
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self._turn(f"user-{i}") for i in range(turns)))
+        elapsed = time.perf_counter() - started
+        
+        self.assertTrue(all(events[-1]["event"]["content"]["parts"][0]["text"] == "Done" for events in results))
+        self.assertLess(elapsed, turns * TOOL_DELAY / 2)
+    
+    async def test_event_loop_stays_responsive(self):
+        ticks = 0
+        
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        
+        task = asyncio.create_task(ticker())
+        await self._turn("user-1")
+        task.cancel()
+        
+        self.assertGreater(ticks, TOOL_DELAY / 0.01 / 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,295 @@
+"""
+Tests for batched, write-behind storage of chat turns.
+
+Usage:
+    cd backend && python -m pytest tests/test_message_writer.py
+"""
+
+import asyncio
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from dataclasses import asdict
+from unittest.mock import AsyncMock
+
+# Add backend root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.services.message_writer import ChatTurn, MessageWriter, new_message
+
+DB_DELAY = 0.05
+
+
+def encode(data):
+    return base64.b64encode(data.encode()).decode()
+
+
+def decode(data):
+    return base64.b64decode(data).decode()
+
+
+def make_writer(**kwargs):
+    """MessageWriter with a stand-in cipher, so no ENCRYPTION_KEY is needed."""
+    options = dict(encrypt=encode, decrypt=decode)
+    options.update(kwargs)
+    return MessageWriter(**options)
+
+
+class FakeMessageRepository:
+    """Message repository stand-in with a round-trip delay; skips ids it already has."""
+    
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.rows = {}
+        self.batches = []
+    
+    async def create_messages(self, messages):
+        await asyncio.sleep(DB_DELAY)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("database unavailable")
+        self.batches.append([m["role"] for m in messages])
+        created = [m for m in messages if m["id"] not in self.rows]
+        self.rows.update((m["id"], m) for m in created)
+        return created
+
+
+def make_turn(session_id="chat-1", generate_title=False):
+    return ChatTurn(
+        session_id=session_id,
+        user_id="alice",
+        messages=[
+            new_message(session_id, "alice", "user", "What's on today?"),
+            new_message(session_id, "alice", "assistant", "Standup at 9 AM.")
+        ],
+        generate_title=generate_title
+    )
+
+
+class TestMessageWriter(unittest.IsolatedAsyncioTestCase):
+    """Test batching, write-behind and journal replay"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.journal_path = os.path.join(self.tmp.name, "journal.jsonl")
+        self.message_repo = FakeMessageRepository()
+        self.session_repo = AsyncMock()
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def writer(self, write_behind=True, **kwargs):
+        options = dict(journal_path=self.journal_path, max_queued=100, max_attempts=3, retry_seconds=0.001,
+                       retry_interval=60, repositories=lambda: (self.message_repo, self.session_repo))
+        options.update(kwargs)
+        return make_writer(write_behind=write_behind, **options)
+    
+    async def test_inline_turn_is_one_batch(self):
+        writer = self.writer(write_behind=False)
+        
+        await writer.write(make_turn(generate_title=True), self.message_repo, self.session_repo)
+        
+        self.assertEqual(self.message_repo.batches, [["user", "assistant"]])
+        self.session_repo.auto_generate_title_from_message.assert_awaited_once_with("chat-1", "What's on today?")
+        self.session_repo.update_last_activity.assert_not_called()
+    
+    async def test_write_behind_returns_before_storage(self):
+        writer = self.writer()
+        await writer.start()
+        
+        started = time.perf_counter()
+        await writer.write(make_turn(), self.message_repo, self.session_repo)
+        self.assertLess(time.perf_counter() - started, DB_DELAY)
+        self.assertEqual(len(self.message_repo.rows), 0)
+        
+        await writer.close()
+        self.assertEqual(len(self.message_repo.rows), 2)
+        self.assertEqual(writer.journal.pending(), [])
+    
+    async def test_failed_turn_retried(self):
+        self.message_repo.failures = 2
+        writer = self.writer()
+        await writer.start()
+        
+        await writer.write(make_turn(), self.message_repo, self.session_repo)
+        await writer.close()
+        
+        self.assertEqual(len(self.message_repo.rows), 2)
+        self.assertEqual(writer.get_stats()["retries"], 2)
+    
+    async def test_unstored_turns_replayed_without_duplicates(self):
+        # A crash after the insert but before the turn was marked done, plus a torn line
+        stored, lost = make_turn(), make_turn()
+        await self.writer(write_behind=False).write(stored, self.message_repo, self.session_repo)
+        with open(self.journal_path, "w") as f:
+            for turn in (stored, lost):
+                f.write(json.dumps({"id": turn.id, "turn": encode(json.dumps(asdict(turn)))}) + "\n")
+            f.write('{"done": ')
+        
+        writer = self.writer()
+        await writer.start()
+        await writer.close()
+        
+        self.assertEqual(writer.get_stats()["replayed"], 2)
+        self.assertEqual(len(self.message_repo.rows), 4)
+        self.assertEqual(writer.journal.pending(), [])
+    
+    async def test_turn_kept_in_journal_when_storage_keeps_failing(self):
+        self.message_repo.failures = 100
+        writer = self.writer()
+        await writer.start()
+        
+        await writer.write(make_turn(), self.message_repo, self.session_repo)
+        await writer.close()
+        
+        self.assertEqual(writer.get_stats()["failed"], 1)
+        self.assertEqual(len(writer.journal.pending()), 1)
+    
+    async def test_failed_turn_retried_periodically(self):
+        self.message_repo.failures = 3
+        writer = self.writer(retry_interval=0.01)
+        await writer.start()
+        
+        await writer.write(make_turn(), self.message_repo, self.session_repo)
+        await asyncio.sleep(0.5)
+        await writer.close()
+        
+        stats = writer.get_stats()
+        self.assertEqual((stats["failed"], stats["requeued"], stats["failed_pending"]), (1, 1, 0))
+        self.assertEqual(len(self.message_repo.rows), 2)
+        self.assertEqual(writer.journal.pending(), [])
+    
+    async def test_journal_does_not_hold_plaintext(self):
+        self.message_repo.failures = 100
+        writer = self.writer()
+        await writer.start()
+        
+        await writer.write(make_turn(), self.message_repo, self.session_repo)
+        await writer.close()
+        
+        with open(self.journal_path) as f:
+            self.assertNotIn("Standup at 9 AM", f.read())
+        self.assertEqual(writer.journal.pending()[0]["messages"][1]["content"], "Standup at 9 AM.")
+    
+    async def test_unjournaled_turn_written_inline(self):
+        def broken_cipher(data):
+            raise ValueError("ENCRYPTION_KEY must be set")
+        
+        writer = self.writer(encrypt=broken_cipher)
+        await writer.start()
+        
+        await writer.write(make_turn(), self.message_repo, self.session_repo)
+        
+        self.assertEqual(len(self.message_repo.rows), 2)
+        self.assertEqual(writer.get_stats()["inline"], 1)
+        await writer.close()
+    
+    async def test_full_queue_writes_inline(self):
+        writer = self.writer(max_queued=0)
+        await writer.start()
+        
+        await writer.write(make_turn(), self.message_repo, self.session_repo)
+        
+        self.assertEqual(len(self.message_repo.rows), 2)
+        self.assertEqual(writer.get_stats()["inline"], 1)
+        await writer.close()
+
+
+class FakeAgentClient:
+    def __init__(self, response="Standup at 9 AM.", error=None):
+        self.response = response
+        self.error = error
+    
+    async def send_message(self, user_id, session_id, message):
+        if self.error is not None:
+            raise self.error
+        return {"response": self.response, "session_id": session_id}
+
+
+class TestAgentServiceWriteBehind(unittest.IsolatedAsyncioTestCase):
+    """Test that send_message answers without waiting on storage"""
+    
+    async def test_send_message_stores_turn_in_background(self):
+        from app.core.services.agent_service import AgentService
+        from app.core.services.admission import AdmissionController
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            message_repo = FakeMessageRepository()
+            session_repo = AsyncMock()
+            session_repo.get_session_with_links.return_value = {
+                "id": "chat-1", "vertex_session_id": "agent-1", "title": "New Chat"
+            }
+            service = AgentService(session_repo=session_repo, message_repo=message_repo)
+            service.agent_client = FakeAgentClient()
+            service.admission = AdmissionController(max_concurrent=4, per_user=2, max_queued=4,
+                                                    max_queued_per_user=2, queue_timeout=1)
+            service.message_writer = make_writer(write_behind=True, journal_path=os.path.join(tmp, "journal.jsonl"),
+                                                 max_queued=10, max_attempts=1)
+            await service.message_writer.start()
+            
+            started = time.perf_counter()
+            result = await service.send_message("alice", "chat-1", "What's on today?")
+            self.assertLess(time.perf_counter() - started, DB_DELAY)
+            self.assertEqual(result["response"], "Standup at 9 AM.")
+            
+            await service.message_writer.close()
+        
+        self.assertEqual(message_repo.batches, [["user", "assistant"]])
+        self.assertEqual(message_repo.rows[result["assistant_message"]["id"]]["content"], "Standup at 9 AM.")
+        session_repo.auto_generate_title_from_message.assert_awaited_once()
+        session_repo.update_last_activity.assert_not_called()
+
+
+class TestAgentServiceFailedTurns(unittest.IsolatedAsyncioTestCase):
+    """Test that a turn the agent fails to answer still keeps the user message"""
+    
+    def make_service(self, agent_client):
+        from app.core.services.agent_service import AgentService
+        from app.core.services.admission import AdmissionController
+        
+        self.message_repo = FakeMessageRepository()
+        session_repo = AsyncMock()
+        session_repo.get_session_with_links.return_value = {
+            "id": "chat-1", "vertex_session_id": "agent-1", "title": "Standup"
+        }
+        service = AgentService(session_repo=session_repo, message_repo=self.message_repo)
+        service.agent_client = agent_client
+        service.admission = AdmissionController(max_concurrent=4, per_user=2, max_queued=4,
+                                                max_queued_per_user=2, queue_timeout=1)
+        service.message_writer = make_writer(write_behind=False)
+        return service
+    
+    async def test_agent_error_stores_user_message_and_raises(self):
+        from app.core.services.agent_service import AgentError
+        service = self.make_service(FakeAgentClient(error=TimeoutError("agent timed out")))
+        
+        with self.assertRaises(AgentError):
+            await service.send_message("alice", "chat-1", "What's on today?", persist=False)
+        
+        self.assertEqual(self.message_repo.batches, [["user"]])
+        self.assertEqual(list(self.message_repo.rows.values())[0]["content"], "What's on today?")
+    
+    async def test_open_circuit_stores_user_message_and_raises(self):
+        from app.core.integrations.resilience import CircuitOpenError
+        service = self.make_service(FakeAgentClient(error=CircuitOpenError("agent", retry_after=30)))
+        
+        with self.assertRaises(CircuitOpenError):
+            await service.send_message("alice", "chat-1", "What's on today?")
+        
+        self.assertEqual(self.message_repo.batches, [["user"]])
+    
+    async def test_empty_response_stores_only_user_message(self):
+        service = self.make_service(FakeAgentClient(response=""))
+        
+        result = await service.send_message("alice", "chat-1", "What's on today?")
+        
+        self.assertEqual(result["turn"].messages, [result["user_message"]])
+        self.assertEqual(self.message_repo.batches, [["user"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,208 @@
+"""
+Tests for circuit breaking, retries and hedging around Agent Engine and Gemini.
+
+Usage:
+    cd backend && python -m pytest tests/test_resilience.py
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+# Add backend root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.integrations.resilience import CircuitBreaker, CircuitOpenError, ResilientCall
+
+
+class ServiceUnavailable(Exception):
+    """Stand-in for google.api_core.exceptions.ServiceUnavailable."""
+
+
+class TooManyRequests(Exception):
+    """Stand-in for google.api_core.exceptions.TooManyRequests."""
+
+
+def breaker(**kwargs):
+    options = dict(window_seconds=60, min_calls=4, failure_rate=0.5, slow_call_seconds=1, open_seconds=0.05)
+    options.update(kwargs)
+    return CircuitBreaker("test", **options)
+
+
+def resilient(**kwargs):
+    return ResilientCall(breaker(), retries=2, backoff_seconds=0.001, **kwargs)
+
+
+class FlakyAgentApp:
+    """Deployed agent stand-in whose first stream_query calls fail before any event."""
+    
+    def __init__(self, failures, error=ServiceUnavailable("503 Service Unavailable")):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+    
+    def stream_query(self, user_id, session_id, message):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        yield {"content": {"parts": [{"text": "Hello there."}]}}
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test opening on errors and slow calls, and recovering through a probe"""
+    
+    def test_opens_on_failure_rate_and_fails_fast(self):
+        b = breaker()
+        for ok in (True, False, True, False):
+            b.before_call()
+            b.record(ok, 0.01)
+        
+        self.assertEqual(b.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError) as ctx:
+            b.before_call()
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+    
+    def test_slow_calls_count_as_failures(self):
+        b = breaker()
+        for duration in (0.01, 2, 0.01, 2):
+            b.record(True, duration)
+        
+        self.assertEqual(b.state, CircuitBreaker.OPEN)
+        self.assertEqual(b.get_stats()["slow"], 2)
+    
+    def test_half_open_probe(self):
+        b = breaker(min_calls=1)
+        b.record(False, 0.01)
+        time.sleep(0.06)
+        
+        b.before_call()
+        with self.assertRaises(CircuitOpenError):
+            b.before_call()  # only one probe at a time
+        b.record(False, 0.01)
+        self.assertEqual(b.state, CircuitBreaker.OPEN)
+        
+        time.sleep(0.06)
+        b.before_call()
+        b.record(True, 0.01)
+        self.assertEqual(b.state, CircuitBreaker.CLOSED)
+
+
+class TestResilientCall(unittest.IsolatedAsyncioTestCase):
+    """Test retries, hedging and streams"""
+    
+    async def test_transient_errors_retried(self):
+        call = resilient()
+        attempts = []
+        
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ServiceUnavailable("503")
+            return "ok"
+        
+        self.assertEqual(await call.call(flaky), "ok")
+        self.assertEqual(call.get_stats()["retries"], 2)
+    
+    async def test_other_errors_not_retried(self):
+        call = resilient()
+        fn = MagicMock(side_effect=ValueError("bad request"))
+        
+        with self.assertRaises(ValueError):
+            call.call_sync(fn)
+        self.assertEqual(fn.call_count, 1)
+    
+    async def test_slow_request_hedged(self):
+        call = resilient(hedge=True, hedge_min_delay=0.01, hedge_workers=4)
+        for _ in range(20):
+            call.call_sync(lambda: time.sleep(0.01))
+        calls = []
+        lock = threading.Lock()
+        
+        def stalls_first_time():
+            with lock:
+                calls.append(1)
+                first = len(calls) == 1
+            time.sleep(1 if first else 0.01)
+            return "first" if first else "hedge"
+        
+        started = time.perf_counter()
+        self.assertEqual(call.call_sync(stalls_first_time), "hedge")
+        self.assertLess(time.perf_counter() - started, 0.5)
+        stats = call.get_stats()
+        self.assertEqual((stats["hedged"], stats["hedge_wins"], stats["hedge_win_rate"]), (1, 1, 1.0))
+    
+    async def test_stream_retried_only_before_first_item(self):
+        call = resilient()
+        opened = []
+        
+        async def events():
+            opened.append(1)
+            if len(opened) == 1:
+                raise ServiceUnavailable("503")
+            yield "a"
+            raise ServiceUnavailable("503")
+        
+        received = []
+        with self.assertRaises(ServiceUnavailable):
+            async for item in call.stream(events):
+                received.append(item)
+        
+        self.assertEqual((received, len(opened)), (["a"], 2))
+        self.assertEqual(call.breaker.get_stats()["errors"], 2)
+
+
+class TestAgentClientResilience(unittest.IsolatedAsyncioTestCase):
+    """Test the breaker and retries around VertexAgentClient calls"""
+    
+    def setUp(self):
+        from app.core.integrations.client import VertexAgentClient
+        
+        self.client = VertexAgentClient()
+        self.client._initialized = True
+        self.client.stream_calls.breaker = breaker()
+        self.client.stream_calls.backoff_seconds = 0.001
+    
+    async def test_rejected_query_retried(self):
+        self.client._agent_app = FlakyAgentApp(failures=1, error=TooManyRequests("429 Too Many Requests"))
+        
+        result = await self.client.send_message("user", "session", "hi")
+        
+        self.assertEqual(result["response"], "Hello there.")
+        self.assertEqual(self.client._agent_app.calls, 2)
+    
+    async def test_timed_out_query_not_retried(self):
+        # The agent may still be running the turn, so a retry could run its tools twice
+        self.client._agent_app = FlakyAgentApp(failures=1)
+        
+        with self.assertRaises(ServiceUnavailable):
+            await self.client.send_message("user", "session", "hi")
+        self.assertEqual(self.client._agent_app.calls, 1)
+    
+    async def test_open_breaker_fails_fast(self):
+        self.client._agent_app = FlakyAgentApp(failures=100)
+        self.client.stream_calls.retries = 0
+        
+        for _ in range(4):
+            with self.assertRaises(ServiceUnavailable):
+                await self.client.send_message("user", "session", "hi")
+        
+        with self.assertRaises(CircuitOpenError):
+            await self.client.send_message("user", "session", "hi")
+        self.assertEqual(self.client._agent_app.calls, 4)
+        self.assertEqual(self.client.stream_calls.breaker.state, "open")
+    
+    def test_rewrite_falls_back_while_gemini_breaker_open(self):
+        self.client._gemini_client = MagicMock()
+        self.client.gemini_calls = resilient()
+        self.client.gemini_calls.breaker._open(time.monotonic())
+        
+        self.assertEqual(self.client.rewrite_for_voice("| a |", fallback="a"), "a")
+        self.client._gemini_client.models.generate_content.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+"""
+Tests for the warm pool of pre-created agent sessions.
+
+Usage:
+    cd backend && python -m pytest tests/test_session_pool.py
+"""
+
+import asyncio
+import itertools
+import os
+import sys
+import time
+import unittest
+from unittest.mock import AsyncMock, patch
+
+# Add backend root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.services.session_pool import AgentSessionPool
+
+CREATE_DELAY = 0.05
+
+
+class FakeAgentClient:
+    """Agent client stand-in whose sessions take a while to create."""
+    
+    def __init__(self):
+        self.ids = itertools.count(1)
+        self.created = []
+        self.deleted = []
+    
+    async def create_session(self, user_id):
+        await asyncio.sleep(CREATE_DELAY)
+        session_id = f"{user_id}-{next(self.ids)}"
+        self.created.append(session_id)
+        return {"vertex_session_id": session_id, "user_id": user_id, "status": "active"}
+    
+    async def delete_session(self, user_id, session_id):
+        self.deleted.append(session_id)
+
+
+class TestAgentSessionPool(unittest.IsolatedAsyncioTestCase):
+    """Test claiming, refilling and expiring pooled sessions"""
+    
+    def setUp(self):
+        self.client = FakeAgentClient()
+        self.pool = AgentSessionPool(self.client, size=2, ttl_seconds=60, max_users=10)
+    
+    async def _settle(self):
+        await asyncio.gather(*self.pool._refills.values(), *self.pool._deletes)
+    
+    async def test_claim_after_warm_is_instant(self):
+        self.assertIsNone(self.pool.claim("alice"))
+        
+        self.pool.warm("alice")
+        await self._settle()
+        
+        started = time.perf_counter()
+        session_id = self.pool.claim("alice")
+        self.assertLess(time.perf_counter() - started, CREATE_DELAY / 10)
+        self.assertTrue(session_id.startswith("alice-"))
+        self.assertEqual(self.pool.get_stats()["ready_sessions"], 1)
+        self.assertEqual(self.pool.get_stats()["hit_rate"], 0.5)
+    
+    async def test_sessions_stay_with_their_user(self):
+        self.pool.warm("alice")
+        await self._settle()
+        
+        self.assertIsNone(self.pool.claim("bob"))
+        self.assertTrue(self.pool.claim("alice").startswith("alice-"))
+    
+    async def test_concurrent_claims_never_share_a_session(self):
+        self.pool.warm("alice")
+        await self._settle()
+        
+        async def claim():
+            await asyncio.sleep(0)
+            return self.pool.claim("alice")
+        
+        claimed = [c for c in await asyncio.gather(*(claim() for _ in range(5))) if c]
+        self.assertEqual(len(claimed), 2)
+        self.assertEqual(len(set(claimed)), 2)
+    
+    async def test_expired_sessions_discarded(self):
+        pool = AgentSessionPool(self.client, size=1, ttl_seconds=0.01, max_users=10)
+        pool.warm("alice")
+        await asyncio.gather(*pool._refills.values())
+        await asyncio.sleep(0.02)
+        
+        self.assertIsNone(pool.claim("alice"))
+        await asyncio.gather(*pool._deletes)
+        self.assertEqual(self.client.deleted, self.client.created)
+        self.assertEqual(pool.get_stats()["expired"], 1)
+    
+    async def test_least_recently_warmed_user_evicted(self):
+        pool = AgentSessionPool(self.client, size=1, ttl_seconds=60, max_users=2)
+        for user_id in ("alice", "bob", "carol"):
+            pool.warm(user_id)
+            await asyncio.gather(*pool._refills.values())
+        await asyncio.gather(*pool._deletes)
+        
+        self.assertIsNone(pool.claim("alice"))
+        self.assertEqual(self.client.deleted, ["alice-1"])
+        self.assertEqual(pool.get_stats()["users"], 2)
+    
+    async def test_failed_create_counted(self):
+        self.client.create_session = AsyncMock(return_value=None)
+        
+        self.pool.warm("alice")
+        await self._settle()
+        
+        self.assertEqual(self.pool.get_stats()["failures"], 1)
+        self.assertIsNone(self.pool.claim("alice"))
+    
+    async def test_disabled_pool_never_creates(self):
+        pool = AgentSessionPool(self.client, size=0)
+        pool.warm("alice")
+        
+        self.assertIsNone(pool.claim("alice"))
+        self.assertEqual(self.client.created, [])
+    
+    async def test_close_deletes_ready_sessions(self):
+        self.pool.warm("alice")
+        await self._settle()
+        
+        await self.pool.close()
+        
+        self.assertEqual(sorted(self.client.deleted), sorted(self.client.created))
+        self.assertEqual(self.pool.get_stats()["ready_sessions"], 0)
+
+
+class TestCreateAgentSession(unittest.IsolatedAsyncioTestCase):
+    """Test that new chats claim a pooled session and refill the pool"""
+    
+    async def test_new_chat_claims_warm_session(self):
+        from app.core.services.agent_service import AgentService
+        
+        client = FakeAgentClient()
+        pool = AgentSessionPool(client, size=1, ttl_seconds=60, max_users=10)
+        service = AgentService(session_repo=AsyncMock(), message_repo=AsyncMock())
+        service.agent_client, service.session_pool = client, pool
+        
+        service.warm_agent_sessions("alice")
+        await asyncio.gather(*pool._refills.values())
+        
+        with patch.object(client, "create_session", wraps=client.create_session) as create:
+            result = await service.create_agent_session("alice", "chat-1")
+            create.assert_not_called()
+        
+        self.assertEqual(result["agent_session_id"], "alice-1")
+        service.session_repo.update_session_links.assert_awaited_once_with(
+            session_id="chat-1", vertex_session_id="alice-1"
+        )
+        
+        # The claim refills the pool in the background
+        await asyncio.gather(*pool._refills.values())
+        self.assertEqual(pool.get_stats()["ready_sessions"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
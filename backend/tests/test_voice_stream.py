@@ -0,0 +1,150 @@
+"""
+Tests for sentence-level voice optimization while the agent response streams.
+
+Usage:
+    cd backend && python -m pytest tests/test_voice_stream.py
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+# Add backend root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.integrations.voice_text import SentenceSegmenter, split_sentences
+
+
+def segment(chunks):
+    segmenter = SentenceSegmenter()
+    segments = []
+    for chunk in chunks:
+        segments.append(segmenter.feed(chunk))
+    segments.append(segmenter.flush())
+    return segments
+
+
+def text_event(text, partial=False):
+    event = {"content": {"role": "model", "parts": [{"text": text}]}}
+    if partial:
+        event["partial"] = True
+    return event
+
+
+class FakeAgentApp:
+    """Deployed agent stand-in streaming events with a delay before each."""
+    
+    def __init__(self, events, delay=0.1):
+        self.events = events
+        self.delay = delay
+    
+    def stream_query(self, user_id, session_id, message):
+        for event in self.events:
+            time.sleep(self.delay)
+            yield event
+
+
+class TestSentenceSegmenter(unittest.TestCase):
+    """Test cutting streamed text into speakable segments"""
+    
+    def test_sentence_released_when_next_starts(self):
+        self.assertEqual(segment(["Dr. Patel called. ", "She'll call ", "back at 3. Bye"]),
+                         [[], ["Dr. Patel called."], ["She'll call back at 3."], ["Bye"]])
+    
+    def test_structured_lines_released_at_line_end(self):
+        self.assertEqual(segment(["From: Ann | Subject: Hi. ", "Re: lunch\n1. Standup. ", "Daily\n"]),
+                         [[], ["From: Ann | Subject: Hi. Re: lunch"], ["1. Standup. Daily"], []])
+    
+    def test_code_and_tables_held_together(self):
+        chunks = ["Run:\n```\nquery. More\n", "```\n| a | b |\n| 1 | 2 |\n", "Done."]
+        
+        self.assertEqual(segment(chunks),
+                         [["Run:"], ["```\nquery. More\n```"], ["| a | b |\n| 1 | 2 |"], ["Done."]])
+    
+    def test_split_sentences_keeps_rest(self):
+        self.assertEqual(split_sentences("Hi J. Smith! It's 5 p.m. Are you"),
+                         (["Hi J. Smith!", "It's 5 p.m."], "Are you"))
+
+
+class TestStreamVoiceMessage(unittest.IsolatedAsyncioTestCase):
+    """Test that voice segments stream in order before the agent finishes"""
+    
+    def setUp(self):
+        from app.core.integrations.client import VertexAgentClient
+        
+        self.client = VertexAgentClient()
+        self.client._initialized = True
+        self.fallback = self.client.settings.VOICE_LLM_FALLBACK
+    
+    def tearDown(self):
+        self.client.settings.VOICE_LLM_FALLBACK = self.fallback
+    
+    async def _stream(self):
+        started = time.perf_counter()
+        segments = []
+        async for item in self.client.stream_voice_message("user", "session", "hi"):
+            segments.append((time.perf_counter() - started, item["index"], item["text"]))
+        return segments, time.perf_counter() - started
+    
+    async def test_first_sentence_before_answer_completes(self):
+        self.client._agent_app = FakeAgentApp([
+            text_event("Here are your **meetings**: ", partial=True),
+            text_event("Standup is at 09:00. Lunch ", partial=True),
+            text_event("is at 12:30.", partial=True),
+            text_event("Here are your **meetings**: Standup is at 09:00. Lunch is at 12:30."),
+        ])
+        
+        segments, total = await self._stream()
+        
+        self.assertEqual([text for _, _, text in segments],
+                         ["Here are your meetings: Standup is at 9 AM.", "Lunch is at 12:30 PM."])
+        self.assertEqual([index for _, index, _ in segments], [0, 1])
+        self.assertLess(segments[0][0], total - 0.15)
+    
+    async def test_tool_events_and_separate_messages(self):
+        self.client._agent_app = FakeAgentApp([
+            text_event("Let me check"),
+            {"content": {"parts": [{"function_call": {"name": "gmail_list_messages", "args": {}}}]}},
+            text_event("From: Ann <ann@example.com> | Subject: Hi"),
+        ], delay=0)
+        
+        segments, _ = await self._stream()
+        
+        self.assertEqual([text for _, _, text in segments], ["Let me check.", "From Ann, about Hi."])
+    
+    async def test_rewrites_run_in_parallel_and_keep_order(self):
+        self.client.settings.VOICE_LLM_FALLBACK = True
+        self.client._agent_app = FakeAgentApp([
+            text_event("```\nslow\n```\n```\nfast\n```\nDone."),
+        ], delay=0)
+        
+        def rewrite(text, fallback=None):
+            time.sleep(0.3 if "slow" in text else 0.1)
+            return "rewritten slow" if "slow" in text else "rewritten fast"
+        
+        self.client.rewrite_for_voice = rewrite
+        segments, total = await self._stream()
+        
+        self.assertEqual([text for _, _, text in segments], ["rewritten slow", "rewritten fast", "Done."])
+        self.assertLess(total, 0.38)
+    
+    async def test_rewrites_stay_off_the_stream_pool(self):
+        self.client.settings.VOICE_LLM_FALLBACK = True
+        self.client._agent_app = FakeAgentApp([text_event("```\ncode\n```\nDone.")], delay=0)
+        threads = []
+        
+        def rewrite(text, fallback=None):
+            threads.append(threading.current_thread().name)
+            return "rewritten"
+        
+        self.client.rewrite_for_voice = rewrite
+        await self._stream()
+        
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith("voice-rewrite"), threads[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
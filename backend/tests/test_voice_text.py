@@ -0,0 +1,104 @@
+"""
+Tests for the rule-based voice normalizer and the Gemini fallback switch.
+
+Usage:
+    cd backend && python -m pytest tests/test_voice_text.py
+"""
+
+import os
+import sys
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+# Add backend root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.integrations.voice_text import normalize_for_voice, speak_date, speak_time
+
+TODAY = date(2025, 6, 14)
+
+
+def speak(text):
+    return normalize_for_voice(text, today=TODAY).text
+
+
+class TestVoiceNormalizer(unittest.TestCase):
+    """Test rule-based normalization of agent responses"""
+    
+    def test_email_listing(self):
+        text = ("Here are the 2 most recent emails in your inbox:\n\n"
+                "From: \"Acme Billing\" <billing@acme.com> | Subject: Your invoice\n"
+                "From: jane.doe@example.com | Subject: Lunch?\n"
+                "... and 4 more messages")
+        
+        self.assertEqual(speak(text), "Here are the 2 most recent emails in your inbox: "
+                                      "From Acme Billing, about Your invoice. From Jane Doe, about Lunch? "
+                                      "And 4 more messages.")
+    
+    def test_markdown_and_ids_removed(self):
+        text = "## Done\n**Sent** to `Marcus` (see [thread](https://mail.google.com/x)). Message ID: 18c2f9a7b3d4e5f6"
+        
+        self.assertEqual(speak(text), "Done: Sent to Marcus (see thread).")
+    
+    def test_only_opaque_ids_removed(self):
+        self.assertEqual(speak("I've archived the email with message ID 18c2f3a4b5d6e7f8."),
+                         "I've archived the email.")
+        self.assertEqual(speak("Your ID number is 123456 for the booking."),
+                         "Your ID number is 123456 for the booking.")
+    
+    def test_dates_and_times(self):
+        self.assertEqual(speak("Standup at 2025-06-15T09:00:00Z"), "Standup tomorrow at 9 AM.")
+        self.assertEqual(speak("Review on Monday, June 16 at 02:30 PM (All day)"),
+                         "Review on Monday, June 16 at 2:30 PM, all day.")
+        self.assertEqual(speak("Free after 17:00, back at 9:30"), "Free after 5 PM, back at 9:30.")
+        self.assertEqual(speak_date(date(2026, 1, 2), TODAY), "Friday, January 2, 2026")
+        self.assertEqual(speak_time(12, 0), "noon")
+    
+    def test_ranges_and_emoji(self):
+        self.assertEqual(speak("Team sync from 10:00 AM - 11:00 AM"), "Team sync from 10 AM to 11 AM.")
+        self.assertEqual(speak("Offsite 2025-06-16 – 2025-06-20"), "Offsite Monday, June 16 to Friday, June 20.")
+        self.assertEqual(speak("📅 Team Sync: Monday at 2 PM"), "Team Sync: Monday at 2 PM.")
+        self.assertEqual(speak("Event created ✅ Invitation sent"), "Event created. Invitation sent.")
+    
+    def test_numbered_list_read_in_order(self):
+        text = "1. Standup - 09:00\n2. Lunch with Sarah - 12:30"
+        
+        self.assertEqual(speak(text), "Your schedule shows: First, standup, 9 AM. Second, lunch with Sarah, 12:30 PM.")
+    
+    def test_complex_text_flagged(self):
+        self.assertEqual(normalize_for_voice("```\nquery\n```\nRun it?").reasons, ["code"])
+        self.assertEqual(normalize_for_voice("| a | b |\n|---|---|\n| 1 | 2 |").reasons, ["table"])
+        self.assertTrue(normalize_for_voice("word " * 400).complex)
+        self.assertFalse(normalize_for_voice("You have no meetings today.").complex)
+
+
+class TestVoiceFallback(unittest.TestCase):
+    """Test that Gemini only rewrites complex text, and only when enabled"""
+    
+    def setUp(self):
+        from app.core.integrations.client import VertexAgentClient
+        
+        self.client = VertexAgentClient()
+        self.fallback = self.client.settings.VOICE_LLM_FALLBACK
+    
+    def tearDown(self):
+        self.client.settings.VOICE_LLM_FALLBACK = self.fallback
+    
+    def test_simple_text_never_calls_gemini(self):
+        self.client.settings.VOICE_LLM_FALLBACK = True
+        with patch.object(self.client, 'rewrite_for_voice') as rewrite:
+            self.assertEqual(self.client.optimize_for_voice("**Done**"), "Done.")
+        rewrite.assert_not_called()
+    
+    def test_complex_text_uses_gemini_when_enabled(self):
+        with patch.object(self.client, 'rewrite_for_voice', return_value="rewritten") as rewrite:
+            self.client.settings.VOICE_LLM_FALLBACK = False
+            self.assertEqual(self.client.optimize_for_voice("```\ncode\n```\nOk"), "Ok.")
+            self.client.settings.VOICE_LLM_FALLBACK = True
+            self.assertEqual(self.client.optimize_for_voice("```\ncode\n```\nOk"), "rewritten")
+        rewrite.assert_called_once_with("```\ncode\n```\nOk", fallback="Ok.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,8 @@
 
 from google.adk.agents import Agent
 from oprina import prompt
+from oprina.common.intent_router import route_to_sub_agent
+from oprina.common.prompt_cache import cache_static_prompt, instruction_for
 from oprina.sub_agents.email.agent import email_agent
 from oprina.sub_agents.calendar.agent import calendar_agent
 
@@ -10,7 +12,9 @@ root_agent = Agent(
     model="gemini-2.0-flash",  # Use config for model
     name="oprina",
     description="Multimodal voice-enabled Gmail and Calendar assistant",
-    instruction=prompt.ROOT_AGENT_INSTR,
+    instruction=instruction_for("oprina", prompt.ROOT_AGENT_INSTR),
+    # Fast path for unambiguous commands (OPRINA_FAST_ROUTER), then the static prompt cache (OPRINA_PROMPT_CACHE)
+    before_model_callback=[route_to_sub_agent, cache_static_prompt],
     sub_agents=[
         email_agent,
         calendar_agent
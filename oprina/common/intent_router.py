@@ -0,0 +1,243 @@
+"""
+Deterministic fast-path router for high-frequency commands.
+
+Utterances like "read my latest email" or "what's on my calendar today" are
+recognized with compiled patterns instead of an LLM:
+
+- the root agent's before_model_callback answers its own model call with a
+  transfer_to_agent call to the right sub-agent
+- the sub-agent's before_model_callback answers its first model call of the turn
+  with the tool call for the intent (when the intent maps to one tool)
+
+The model is still called afterwards to phrase the tool result, so a routed
+turn makes one LLM call instead of three. Anything the patterns do not match
+with certainty returns None and goes through the LLM router unchanged.
+
+Enable with OPRINA_FAST_ROUTER=true.
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+from google.genai import types
+from google.adk.models import LlmResponse
+
+from oprina.services.logging.logger import setup_logger
+
+logger = setup_logger("intent_router", sampling=True)
+
+FAST_ROUTER_ENABLED = os.getenv("OPRINA_FAST_ROUTER", "false").lower() == "true"
+
+# Marks the invocation whose first sub-agent model call was already answered
+ROUTER_DISPATCHED = "temp:router_dispatched_invocation"
+
+# Marks the invocation the router already transferred, so a later model call
+# of the same turn (e.g. after the sub-agent hands back) goes to the LLM
+ROUTER_TRANSFERRED = "temp:router_transferred_invocation"
+
+EMAIL_AGENT = "email_agent"
+CALENDAR_AGENT = "calendar_agent"
+
+
+class Intent:
+    """A recognized command: target agent and, optionally, the tool call to make."""
+
+    __slots__ = ("name", "agent", "tool", "args")
+
+    def __init__(self, name: str, agent: str, tool: Optional[str] = None, args: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.agent = agent
+        self.tool = tool
+        self.args = args or {}
+
+    def __repr__(self) -> str:
+        return f"Intent({self.name!r}, agent={self.agent!r}, tool={self.tool!r}, args={self.args!r})"
+
+
+# Leading/trailing filler removed before matching
+_FILLER_PREFIX = re.compile(
+    r"^(?:(?:hey|hi|ok|okay)\s+oprina\s+|oprina\s+)?"
+    r"(?:(?:please|can you|could you|would you|will you|i want to|i'd like to|i would like to|let's)\s+)*"
+)
+_FILLER_SUFFIX = re.compile(r"\s+(?:please|for me|now|thanks|thank you)$")
+_PUNCTUATION = re.compile(r"[^\w\s'@.:-]+")
+
+_EMAIL = r"(?:emails?|e-mails?|mails?|messages?)"
+_LATEST = r"(?:latest|last|most recent|newest|new(?:est)?|recent)"
+_SHOW = r"(?:read|show|check|open|get|give|tell me about|what(?:'s|s| is))"
+_CALENDAR = r"(?:calendar|schedule|agenda)"
+_IT = r"(?:it|that|that one|that email|this email|this one|the email)"
+_EVENT = r"(?:events?|meetings?|appointments?|calls?|standups?|sync)"
+_COUNT = r"(?:\d{1,2}|one|two|three|four|five|six|seven|eight|nine|ten)"
+_NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+                 "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+
+# (intent name, agent, tool, pattern, fixed tool args); first match wins.
+# Named groups in a pattern become tool args (counts are converted to int).
+_RULES: List[Tuple[str, str, Optional[str], str, Dict[str, Any]]] = [
+    # Email reading
+    ("read_latest_email", EMAIL_AGENT, "gmail_get_message",
+     rf"(?:{_SHOW}|what does) (?:me )?(?:my )?(?:the )?{_LATEST} {_EMAIL}(?: say)?(?: in my inbox)?",
+     {"message_id": "latest"}),
+    ("list_unread_emails", EMAIL_AGENT, "gmail_list_messages",
+     rf"(?:{_SHOW}|list|any|do i have(?: any)?) (?:me )?(?:my )?(?:the )?(?:new )?unread {_EMAIL}",
+     {"query": "is:unread"}),
+    ("list_emails", EMAIL_AGENT, "gmail_list_messages",
+     rf"(?:{_SHOW}|list) (?:me )?(?:my )?(?:the )?(?:(?P<max_results>{_COUNT}) )?(?:{_LATEST} )?(?:{_EMAIL}|inbox)(?: in my inbox)?",
+     {}),
+    ("list_emails", EMAIL_AGENT, "gmail_list_messages",
+     rf"(?:do i have )?any (?:new )?{_EMAIL}|what(?:'s|s| is) in my inbox",
+     {}),
+
+    # Follow-ups on the email just discussed (reversible actions only)
+    ("archive_it", EMAIL_AGENT, "gmail_archive_message", rf"archive {_IT}", {"message_id": "it"}),
+    ("mark_it_read", EMAIL_AGENT, "gmail_mark_as_read", rf"mark {_IT} as read", {"message_id": "it"}),
+    ("star_it", EMAIL_AGENT, "gmail_star_message", rf"star {_IT}", {"message_id": "it"}),
+    ("summarize_it", EMAIL_AGENT, "gmail_summarize_message", rf"summari[sz]e {_IT}", {"message_id": "it"}),
+    ("read_it", EMAIL_AGENT, "gmail_get_message", rf"(?:read|open) {_IT}", {"message_id": "it"}),
+    ("gmail_profile", EMAIL_AGENT, "gmail_get_profile",
+     rf"(?:{_SHOW}|what(?:'s| is)) (?:me )?my (?:gmail |email )?(?:profile|account)(?: information| info| details)?", {}),
+
+    # Calendar reading
+    ("calendar_today", CALENDAR_AGENT, "calendar_list_events",
+     rf"(?:what(?:'s|s| is)|what do i have|{_SHOW}) (?:on )?(?:my )?(?:{_CALENDAR} )?(?:for )?today"
+     rf"|(?:{_SHOW}) (?:me )?my {_CALENDAR} (?:for )?today|what(?:'s|s| is) on my {_CALENDAR} today",
+     {"days": 1}),
+    ("calendar_week", CALENDAR_AGENT, "calendar_list_events",
+     rf"(?:what(?:'s|s| is)|what do i have|{_SHOW}) (?:on )?(?:me )?(?:my )?(?:{_CALENDAR} )?(?:for )?this week"
+     rf"|what(?:'s|s| is) on my {_CALENDAR} this week",
+     {"days": 7}),
+    ("calendar_next_days", CALENDAR_AGENT, "calendar_list_events",
+     rf"(?:{_SHOW}|list|what do i have) (?:me )?(?:on )?(?:my )?(?:upcoming )?(?:{_CALENDAR} )?(?:events |meetings )?"
+     rf"(?:for |in )?the next (?P<days>{_COUNT}) days",
+     {}),
+    ("list_events", CALENDAR_AGENT, "calendar_list_events",
+     rf"(?:{_SHOW}|list) (?:me )?(?:my )?(?:upcoming )?(?:{_CALENDAR}|events|meetings)|what(?:'s|s| is) on my {_CALENDAR}",
+     {}),
+    ("agenda", CALENDAR_AGENT, "calendar_list_agenda",
+     rf"(?:{_SHOW}|list) (?:me )?(?:my )?(?:full |combined )?agenda(?: across (?:all )?(?:my )?calendars)?",
+     {}),
+
+    # Agent-only routing: the sub-agent's model still picks the tool and arguments
+    ("compose_email", EMAIL_AGENT, None,
+     rf"(?:send|write|compose|draft) (?:an? )?(?:new )?(?:email|e-mail|mail|message) to .+", {}),
+    ("reply_email", EMAIL_AGENT, None, rf"reply to (?:the |my |this |that )?(?:{_LATEST} )?{_EMAIL}?.*", {}),
+    ("search_email", EMAIL_AGENT, None, rf"(?:search|look) (?:for |through )?(?:my )?(?:{_EMAIL}|inbox)\b.*", {}),
+    ("create_event", CALENDAR_AGENT, None,
+     rf"(?:create|add|schedule|book|set up|put) (?:.+ )?{_EVENT}\b(?!.*\b(?:invite|invitation)\b).*", {}),
+    ("change_event", CALENDAR_AGENT, None,
+     rf"(?:cancel|delete|remove|update|move|reschedule|rename|change) (?:.+ )?{_EVENT}\b.*", {}),
+]
+
+_COMPILED: List[Tuple[str, str, Optional[str], Pattern, Dict[str, Any]]] = [
+    (name, agent, tool, re.compile(rf"^(?:{pattern})$"), args) for name, agent, tool, pattern, args in _RULES
+]
+
+# Words that make an utterance span both agents (left to the LLM router)
+_EMAIL_WORDS = re.compile(r"\b(?:email|e-mail|mail|inbox|message|reply|gmail)s?\b")
+_CALENDAR_WORDS = re.compile(r"\b(?:calendar|schedule|meeting|event|agenda|appointment)s?\b")
+
+
+def normalize_utterance(utterance: str) -> str:
+    """Lowercase, strip punctuation and polite filler."""
+    text = _PUNCTUATION.sub(" ", utterance.lower().replace("’", "'"))
+    text = " ".join(text.split()).rstrip(".")
+    text = _FILLER_PREFIX.sub("", text)
+    previous = None
+    while previous != text:
+        previous = text
+        text = _FILLER_SUFFIX.sub("", text)
+    return text
+
+
+def classify(utterance: str) -> Optional[Intent]:
+    """The intent for an utterance, or None when it should go to the LLM router."""
+    if not utterance:
+        return None
+    text = normalize_utterance(utterance)
+    if _EMAIL_WORDS.search(text) and _CALENDAR_WORDS.search(text):
+        return None
+
+    for name, agent, tool, pattern, args in _COMPILED:
+        match = pattern.match(text)
+        if match:
+            intent_args = dict(args)
+            for key, value in match.groupdict().items():
+                if value:
+                    intent_args[key] = int(value) if value.isdigit() else _NUMBER_WORDS.get(value, value)
+            return Intent(name, agent, tool, intent_args)
+    return None
+
+
+def user_text(callback_context) -> str:
+    """Text of the user message that started the invocation."""
+    content = getattr(callback_context, "user_content", None)
+    if not content or not content.parts:
+        return ""
+    return " ".join(part.text for part in content.parts if getattr(part, "text", None))
+
+
+def _function_call_response(name: str, args: Dict[str, Any]) -> LlmResponse:
+    return LlmResponse(content=types.Content(
+        role="model",
+        parts=[types.Part.from_function_call(name=name, args=args)]
+    ))
+
+
+def _transfer_once(callback_context, intent: Intent) -> Optional[LlmResponse]:
+    """transfer_to_agent call for the intent, made at most once per invocation."""
+    if callback_context.state.get(ROUTER_TRANSFERRED) == callback_context.invocation_id:
+        return None
+    callback_context.state[ROUTER_TRANSFERRED] = callback_context.invocation_id
+    logger.info("Fast path: %s -> %s", intent.name, intent.agent)
+    return _function_call_response("transfer_to_agent", {"agent_name": intent.agent})
+
+
+def route_to_sub_agent(callback_context, llm_request) -> Optional[LlmResponse]:
+    """Root agent before_model_callback: transfer recognized commands without an LLM call."""
+    if not FAST_ROUTER_ENABLED:
+        return None
+    intent = classify(user_text(callback_context))
+    if intent is None:
+        return None
+    return _transfer_once(callback_context, intent)
+
+
+def dispatch_tool_call(callback_context, llm_request) -> Optional[LlmResponse]:
+    """
+    Sub-agent before_model_callback: answer the first model call of a routed turn with its tool call.
+
+    Also transfers turns that belong to the other sub-agent, which happens when
+    the session's active agent is already a sub-agent.
+    """
+    if not FAST_ROUTER_ENABLED:
+        return None
+    intent = classify(user_text(callback_context))
+    if intent is None or callback_context.state.get(ROUTER_DISPATCHED) == callback_context.invocation_id:
+        return None
+    tools = (llm_request.tools_dict or {}) if llm_request is not None else {}
+
+    # A follow-up turn that belongs to the other sub-agent
+    if intent.agent != callback_context.agent_name:
+        if "transfer_to_agent" not in tools:
+            return None
+        return _transfer_once(callback_context, intent)
+
+    if intent.tool is None or intent.tool not in tools:
+        return None
+
+    callback_context.state[ROUTER_DISPATCHED] = callback_context.invocation_id
+    logger.info("Fast path: %s -> %s(%s)", intent.name, intent.tool, intent.args)
+    return _function_call_response(intent.tool, intent.args)
+
+
+__all__ = [
+    "Intent",
+    "classify",
+    "normalize_utterance",
+    "user_text",
+    "route_to_sub_agent",
+    "dispatch_tool_call",
+    "FAST_ROUTER_ENABLED"
+]
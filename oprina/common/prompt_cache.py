@@ -0,0 +1,451 @@
+"""
+Prompt build step: fingerprinting, compaction and provider-side context caching.
+
+The root, email and calendar instructions are about 55 KB of static text that
+every model call repeats. This module:
+
+- fingerprints each built instruction (sha256 of its text) so a prompt change
+  is visible in logs and cache keys
+- optionally compacts the instructions (OPRINA_PROMPT_COMPACT=true): markdown
+  emphasis, indentation and repeated rule lines are dropped, and rules shared
+  by several prompts are moved into one identical trailing block
+- registers the static part of a request (system instruction plus tool
+  declarations) once as cached content with the provider and sends only its
+  id afterwards (OPRINA_PROMPT_CACHE=true)
+
+From the model callback the registration runs on a background thread: the
+request that triggers it (and any sent while it is in flight) goes out
+unchanged, later ones use the cache. A failed create is retried after
+OPRINA_PROMPT_CACHE_RETRY_AFTER seconds.
+
+Gemini does not accept system_instruction or tools next to cached_content, so
+both go into the cache and a request's fingerprint covers both. Requests below
+the provider's minimum cacheable size are sent unchanged.
+
+LocalCacheProvider stands in for the Gemini cache service in tests and
+benchmarks.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.genai import types
+
+from oprina.services.logging.logger import setup_logger
+
+logger = setup_logger("prompt_cache", sampling=True)
+
+PROMPT_CACHE_ENABLED = os.getenv("OPRINA_PROMPT_CACHE", "false").lower() == "true"
+PROMPT_COMPACT = os.getenv("OPRINA_PROMPT_COMPACT", "false").lower() == "true"
+PROMPT_CACHE_TTL = int(os.getenv("OPRINA_PROMPT_CACHE_TTL", "3600"))
+
+# How long plain requests are sent after a failed create before it is tried again
+PROMPT_CACHE_RETRY_AFTER = int(os.getenv("OPRINA_PROMPT_CACHE_RETRY_AFTER", "60"))
+
+# Cached content is replaced this long before the provider expires it
+_REFRESH_MARGIN = 60
+
+# Gemini 2.0 Flash rejects explicit caches smaller than this
+PROMPT_CACHE_MIN_TOKENS = int(os.getenv("OPRINA_PROMPT_CACHE_MIN_TOKENS", "4096"))
+
+# Rough token estimate used for reports and the minimum-size check
+CHARS_PER_TOKEN = 4
+
+# Rule lines shorter than this are too generic to deduplicate
+_MIN_RULE_CHARS = 30
+
+SHARED_RULES_HEADING = "## Shared Rules"
+
+
+def fingerprint(*parts: Any) -> str:
+    """Short stable hash of the given strings (other values are JSON-encoded)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        text = part if isinstance(part, str) else json.dumps(part, sort_keys=True, default=str)
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text or "") // CHARS_PER_TOKEN
+
+
+# =============================================================================
+# Compaction
+# =============================================================================
+
+def _rule_key(line: str) -> Optional[str]:
+    """Comparison key for a bullet rule line, or None if the line is not a rule."""
+    if not line.startswith("- ") or len(line) < _MIN_RULE_CHARS:
+        return None
+    return re.sub(r"[^\w ]+", "", line.lower()).strip()
+
+
+def compact_text(text: str) -> str:
+    """Drop emphasis, indentation, extra spaces and repeated rule lines (code fences are kept as-is)."""
+    lines: List[str] = []
+    seen_rules = set()
+    in_fence = False
+    for raw in text.strip().splitlines():
+        line = raw.rstrip()
+        if line.strip().startswith("```"):
+            in_fence = not in_fence
+            lines.append(line.strip())
+            continue
+        if in_fence:
+            lines.append(line)
+            continue
+
+        line = re.sub(r" {2,}", " ", line.replace("**", "").strip())
+        key = _rule_key(line)
+        if key is not None:
+            if key in seen_rules:
+                continue
+            seen_rules.add(key)
+        if not line and lines and not lines[-1]:
+            continue
+        lines.append(line)
+    return "\n".join(lines).strip()
+
+
+def compact_prompts(prompts: Dict[str, str]) -> Tuple[str, Dict[str, str]]:
+    """
+    Compact each prompt and pull out the rule lines found in more than one of them.
+
+    Returns the shared rules block and the per-prompt remainders.
+    """
+    compacted = {name: compact_text(text) for name, text in prompts.items()}
+    counts = Counter(key for text in compacted.values()
+                     for key in {_rule_key(line) for line in text.splitlines()} if key)
+    shared_keys = {key for key, count in counts.items() if count > 1}
+
+    shared: Dict[str, str] = {}
+    remainders = {}
+    for name, text in compacted.items():
+        kept = []
+        for line in text.splitlines():
+            key = _rule_key(line)
+            if key in shared_keys:
+                shared.setdefault(key, line)
+                continue
+            kept.append(line)
+        remainders[name] = "\n".join(kept).strip()
+
+    block = f"{SHARED_RULES_HEADING}\n" + "\n".join(shared.values()) if shared else ""
+    return block, remainders
+
+
+class PromptBuild:
+    """A built instruction and its fingerprint."""
+
+    __slots__ = ("name", "text", "fingerprint", "tokens")
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.text = text
+        self.fingerprint = fingerprint(text)
+        self.tokens = estimate_tokens(text)
+
+    def __repr__(self) -> str:
+        return f"PromptBuild({self.name!r}, fingerprint={self.fingerprint!r}, tokens={self.tokens})"
+
+
+def build_prompts(prompts: Dict[str, str], compact: bool = False) -> Dict[str, PromptBuild]:
+    """Build each instruction, compacted and followed by the shared rules block when compact is set."""
+    if not compact:
+        return {name: PromptBuild(name, text) for name, text in prompts.items()}
+    shared, remainders = compact_prompts(prompts)
+    return {name: PromptBuild(name, f"{text}\n\n{shared}" if shared else text) for name, text in remainders.items()}
+
+
+@lru_cache(maxsize=1)
+def agent_prompts() -> Dict[str, str]:
+    """The source instructions of the agent tree, by agent name."""
+    from oprina import prompt as root_prompt
+    from oprina.sub_agents.calendar import prompt as calendar_prompt
+    from oprina.sub_agents.email import prompt as email_prompt
+
+    return {
+        "oprina": root_prompt.ROOT_AGENT_INSTR,
+        "email_agent": email_prompt.EMAIL_AGENT_INSTR,
+        "calendar_agent": calendar_prompt.CALENDAR_AGENT_INSTR,
+    }
+
+
+@lru_cache(maxsize=2)
+def built_agent_prompts(compact: bool) -> Dict[str, PromptBuild]:
+    return build_prompts(agent_prompts(), compact=compact)
+
+
+def instruction_for(agent_name: str, instruction: str) -> str:
+    """The instruction an agent is constructed with: the compacted build if enabled, else unchanged."""
+    if not PROMPT_COMPACT:
+        return instruction
+    build = built_agent_prompts(True)[agent_name]
+    logger.info("Compacted %s instruction: %d -> %d estimated tokens (fingerprint %s)",
+                agent_name, estimate_tokens(instruction), build.tokens, build.fingerprint)
+    return build.text
+
+
+def token_report(compact: bool = True) -> List[Dict[str, Any]]:
+    """Per-agent instruction size, original and compacted, with fingerprints."""
+    original = built_agent_prompts(False)
+    compacted = built_agent_prompts(True) if compact else {}
+    rows = []
+    for name, build in original.items():
+        row = {"agent": name, "chars": len(build.text), "tokens": build.tokens, "fingerprint": build.fingerprint}
+        if name in compacted:
+            row.update({"compact_chars": len(compacted[name].text), "compact_tokens": compacted[name].tokens,
+                        "compact_fingerprint": compacted[name].fingerprint})
+        rows.append(row)
+    return rows
+
+
+# =============================================================================
+# Cache providers
+# =============================================================================
+
+class CacheProvider:
+    """Creates and deletes provider-side cached content."""
+
+    def create(self, model: str, system_instruction: str, tools: Optional[list], ttl: int, display_name: str) -> str:
+        """Register the static request prefix; returns the cached content name."""
+        raise NotImplementedError
+
+    def delete(self, name: str) -> None:
+        raise NotImplementedError
+
+
+class GeminiCacheProvider(CacheProvider):
+    """Cached content through the google-genai client (Gemini API or Vertex AI, per the usual env vars)."""
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from google import genai
+            self._client = genai.Client()
+        return self._client
+
+    def create(self, model: str, system_instruction: str, tools: Optional[list], ttl: int, display_name: str) -> str:
+        cached = self.client.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                system_instruction=system_instruction,
+                tools=tools or None,
+                ttl=f"{ttl}s",
+                display_name=display_name
+            )
+        )
+        return cached.name
+
+    def delete(self, name: str) -> None:
+        self.client.caches.delete(name=name)
+
+
+class LocalCacheProvider(CacheProvider):
+    """In-memory stand-in for tests and benchmarks; records what was cached."""
+
+    def __init__(self):
+        self.contents: Dict[str, Dict[str, Any]] = {}
+        self.created = 0
+        self.deleted = 0
+
+    def create(self, model: str, system_instruction: str, tools: Optional[list], ttl: int, display_name: str) -> str:
+        self.created += 1
+        name = f"cachedContents/local-{self.created}"
+        self.contents[name] = {
+            "model": model,
+            "system_instruction": system_instruction,
+            "tools": tools,
+            "display_name": display_name,
+            "tokens": estimate_tokens(system_instruction) + estimate_tokens(
+                json.dumps([t.model_dump(exclude_none=True) for t in tools or []]))
+        }
+        return name
+
+    def delete(self, name: str) -> None:
+        self.deleted += 1
+        self.contents.pop(name, None)
+
+
+# =============================================================================
+# Request caching
+# =============================================================================
+
+class PromptCache:
+    """Maps request fingerprints to provider cached content and rewrites requests to use it."""
+
+    def __init__(self, provider: Optional[CacheProvider] = None, ttl: int = PROMPT_CACHE_TTL,
+                 min_tokens: int = PROMPT_CACHE_MIN_TOKENS, max_entries: int = 32,
+                 retry_after: int = PROMPT_CACHE_RETRY_AFTER):
+        self.provider = provider or GeminiCacheProvider()
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.max_entries = max_entries
+        self.retry_after = retry_after
+        # fingerprint -> (cached content name or None after a failed create, usable until)
+        self._entries: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+        # fingerprints with a create in flight; the provider is never called under _lock
+        self._creating: set = set()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.hits = 0
+        self.creates = 0
+        self.errors = 0
+        self.skipped = 0
+
+    def cached_content_for(self, model: str, system_instruction: str, tools: Optional[list],
+                           wait: bool = True) -> Optional[str]:
+        """
+        Cached content name for this static prefix, creating it on first use.
+
+        With wait=False the create runs on a background thread and None is
+        returned until it completes. While a create for the same prefix is in
+        flight, other callers get None rather than waiting for it.
+        """
+        tool_dump = [t.model_dump(exclude_none=True) for t in tools or []]
+        if estimate_tokens(system_instruction) + estimate_tokens(json.dumps(tool_dump)) < self.min_tokens:
+            self.skipped += 1
+            return None
+
+        key = fingerprint(model, system_instruction, tool_dump)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                if entry[0] is not None:
+                    self.hits += 1
+                return entry[0]
+            if key in self._creating:
+                return None
+            self._creating.add(key)
+            if not wait and self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prompt-cache")
+
+        if not wait:
+            self._executor.submit(self._create, key, model, system_instruction, tools)
+            return None
+        return self._create(key, model, system_instruction, tools)
+
+    def _create(self, key: str, model: str, system_instruction: str, tools: Optional[list]) -> Optional[str]:
+        """Register the prefix with the provider and record the outcome under key."""
+        try:
+            name = self.provider.create(model, system_instruction, tools, self.ttl, f"oprina-{key}")
+            usable_for = max(self.ttl - _REFRESH_MARGIN, 0)
+            logger.info("Cached static prompt %s for %s as %s", key, model, name)
+        except Exception as e:
+            # Don't retry a failing create on every call; send plain requests for a short while
+            name = None
+            usable_for = self.retry_after
+            logger.warning("Prompt cache create failed for %s: %s", key, e)
+
+        evicted = []
+        with self._lock:
+            self._creating.discard(key)
+            if name is None:
+                self.errors += 1
+            else:
+                self.creates += 1
+            self._entries[key] = (name, time.monotonic() + usable_for)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                _, (evicted_name, _) = self._entries.popitem(last=False)
+                if evicted_name:
+                    evicted.append(evicted_name)
+
+        for evicted_name in evicted:
+            try:
+                self.provider.delete(evicted_name)
+            except Exception as e:
+                logger.debug("Prompt cache delete failed for %s: %s", evicted_name, e)
+        return name
+
+    def apply(self, llm_request, wait: bool = True) -> bool:
+        """Replace the request's system instruction and tools with a cached content reference."""
+        config = llm_request.config
+        if config is None or config.cached_content or not isinstance(config.system_instruction, str):
+            return False
+        name = self.cached_content_for(llm_request.model, config.system_instruction, config.tools, wait=wait)
+        if name is None:
+            return False
+        config.cached_content = name
+        config.system_instruction = None
+        config.tools = None
+        return True
+
+    def before_model_callback(self, callback_context, llm_request):
+        """before_model_callback that switches the request to cached content; never answers the call."""
+        if PROMPT_CACHE_ENABLED:
+            # Runs on the event loop: never wait for the provider here
+            self.apply(llm_request, wait=False)
+        return None
+
+    def clear(self) -> None:
+        """Delete every cached content this instance created."""
+        with self._lock:
+            entries, self._entries = list(self._entries.values()), OrderedDict()
+        for name, _ in entries:
+            if name:
+                try:
+                    self.provider.delete(name)
+                except Exception as e:
+                    logger.debug("Prompt cache delete failed for %s: %s", name, e)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "creates": self.creates,
+                "errors": self.errors,
+                "skipped": self.skipped
+            }
+
+
+_prompt_cache: Optional[PromptCache] = None
+
+
+def get_prompt_cache() -> PromptCache:
+    global _prompt_cache
+    if _prompt_cache is None:
+        _prompt_cache = PromptCache()
+    return _prompt_cache
+
+
+def cache_static_prompt(callback_context, llm_request):
+    """Agent before_model_callback; must run after callbacks that change tools or instruction."""
+    if not PROMPT_CACHE_ENABLED:
+        return None
+    return get_prompt_cache().before_model_callback(callback_context, llm_request)
+
+
+__all__ = [
+    "fingerprint",
+    "estimate_tokens",
+    "compact_text",
+    "compact_prompts",
+    "PromptBuild",
+    "build_prompts",
+    "instruction_for",
+    "token_report",
+    "CacheProvider",
+    "GeminiCacheProvider",
+    "LocalCacheProvider",
+    "PromptCache",
+    "get_prompt_cache",
+    "cache_static_prompt",
+    "PROMPT_CACHE_ENABLED",
+    "PROMPT_COMPACT"
+]
@@ -20,13 +20,14 @@ EMAIL_CURRENT = "email:current_emails"
 EMAIL_LAST_FETCH = "email:last_fetch"
 EMAIL_UNREAD_COUNT = "email:unread_count"
 EMAIL_LAST_SENT = "email:last_sent"
-EMAIL_CURRENT_RESULTS = "email:current_results"
-EMAIL_LAST_QUERY = "email:last_query"
-EMAIL_RESULTS_COUNT = "email:results_count"
+EMAIL_CURRENT_RESULTS = "email:current_results"  # Superseded by EMAIL_LISTING
+EMAIL_LAST_QUERY = "email:last_query"  # Superseded by EMAIL_LISTING
+EMAIL_RESULTS_COUNT = "email:results_count"  # Superseded by EMAIL_LISTING
 EMAIL_LAST_SENT_TO = "email:last_sent_to"
 
-EMAIL_MESSAGE_INDEX_MAP = "email:message_index_map"  # Maps position to message_id
-EMAIL_LAST_LISTED_MESSAGES = "email:last_listed_messages"  # Full message data with IDs
+EMAIL_LISTING = "email:listing"  # Last listing as parallel columns (see oprina/tools/email_listing.py)
+EMAIL_MESSAGE_INDEX_MAP = "email:message_index_map"  # Superseded by EMAIL_LISTING
+EMAIL_LAST_LISTED_MESSAGES = "email:last_listed_messages"  # Superseded by EMAIL_LISTING; read as a fallback
 EMAIL_LAST_SINGLE_RESULT = "email:last_single_result"  # Single email context for "yes" responses
 # Email message operations
 EMAIL_LAST_MESSAGE_VIEWED = "email:last_message_viewed"
@@ -142,6 +143,13 @@ CALENDAR_LAST_DELETED_EVENT = "calendar:last_deleted_event"
 CALENDAR_LAST_DELETED_ID = "calendar:last_deleted_id"            # NEW
 CALENDAR_LAST_DELETED_AT = "calendar:last_deleted_at"            # NEW
 
+# Conflicts found for the last created/updated event
+CALENDAR_LAST_CONFLICTS = "calendar:last_conflicts"
+
+# Batch mutations
+CALENDAR_LAST_BATCH_RESULT = "calendar:last_batch_result"
+CALENDAR_LAST_BATCH_AT = "calendar:last_batch_at"
+
 # =============================================================================
 # Cross-Agent Workflow Keys
 # =============================================================================
@@ -151,6 +159,9 @@ ACTIVE_WORKFLOW = "workflow:active"
 WORKFLOW_HISTORY = "workflow:history"
 LAST_AGENT_TRANSFER = "workflow:last_transfer"
 
+# Memoized workflow step outputs (input hash -> output), reused when a workflow is re-invoked
+WORKFLOW_STEP_CACHE = "workflow:step_cache"
+
 # Meeting coordination workflows
 MEETING_COORDINATION_ACTIVE = "workflow:meeting_coordination"
 MEETING_INVITES_PENDING = "workflow:meeting_invites"
@@ -168,4 +179,5 @@ AVAILABILITY_CHECK_RESULTS = "workflow:availability_results"
 # Follow-up action tracking
 EMAIL_LAST_OPERATED_MESSAGE = "email:last_operated_message"
 EMAIL_LAST_OPERATED_MESSAGE_AT = "email:last_operated_message_at"
-EMAIL_LAST_OPERATION_TYPE = "email:last_operation_type"
\ No newline at end of file
+EMAIL_LAST_OPERATION_TYPE = "email:last_operation_type"
+EMAIL_ACTIVE_TOOL_GROUPS = "email:active_tool_groups"  # Tool groups exposed to email_agent, with turns left
\ No newline at end of file
@@ -0,0 +1,158 @@
+"""
+Coalesced session state writes for ADK tools.
+
+Every tool_context.state[...] assignment becomes part of the ADK state delta
+that the session service persists. A state transaction buffers the writes made
+during a tool call, drops writes that would not change the stored value, and
+applies the rest as one update at the end of the call.
+
+Usage:
+    @coalesce_state_writes
+    def my_tool(..., tool_context=None):
+        state = get_state(tool_context)
+        state[SOME_KEY] = value          # buffered
+        update_agent_activity(...)       # utilities share the same transaction
+
+Set OPRINA_COALESCE_STATE_WRITES=false to write straight through.
+"""
+
+import contextvars
+import functools
+import os
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from oprina.services.logging.logger import setup_logger
+
+logger = setup_logger("state_transaction")
+
+# Kill switch for coalescing (writes go straight to tool_context.state when off)
+COALESCE_STATE_WRITES = os.getenv("OPRINA_COALESCE_STATE_WRITES", "true").lower() != "false"
+
+# Values of these types cannot be mutated in place, so an equal value is a true no-op
+_IMMUTABLE_TYPES = (str, int, float, bool, type(None), tuple, frozenset, bytes)
+
+_active_transaction: contextvars.ContextVar[Optional["StateTransaction"]] = contextvars.ContextVar(
+    "oprina_state_transaction", default=None
+)
+
+
+class StateTransaction:
+    """Dict-like view over tool_context.state that buffers writes until commit()."""
+
+    def __init__(self, tool_context):
+        self.tool_context = tool_context
+        self._state = tool_context.state
+        self._writes: Dict[str, Any] = {}
+        self.write_count = 0
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._writes:
+            return self._writes[key]
+        return self._state[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._writes[key] = value
+        self.write_count += 1
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._writes or key in self._state
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._writes:
+            return self._writes[key]
+        return self._state.get(key, default)
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        if key in self:
+            return self[key]
+        self[key] = default
+        return default
+
+    def update(self, values: Dict[str, Any]) -> None:
+        for key, value in values.items():
+            self[key] = value
+
+    @property
+    def pending(self) -> Dict[str, Any]:
+        """Buffered writes (last value per key)."""
+        return dict(self._writes)
+
+    def commit(self) -> Dict[str, int]:
+        """
+        Apply buffered writes to the session state as one update.
+
+        Returns:
+            Dict with "writes" (assignments made), "changed" (keys applied) and
+            "skipped" (keys whose value was already stored)
+        """
+        changed = {key: value for key, value in self._writes.items() if not self._is_noop(key, value)}
+        if changed:
+            self._state.update(changed)
+
+        stats = {
+            "writes": self.write_count,
+            "changed": len(changed),
+            "skipped": len(self._writes) - len(changed)
+        }
+        self._writes.clear()
+        self.write_count = 0
+        return stats
+
+    def _is_noop(self, key: str, value: Any) -> bool:
+        """A write is a no-op when the stored value is equal and cannot have been mutated in place."""
+        try:
+            if key not in self._state:
+                return False
+            current = self._state[key]
+            if current is value and not isinstance(value, _IMMUTABLE_TYPES):
+                return False
+            return current == value
+        except Exception:
+            return False
+
+
+@contextmanager
+def state_transaction(tool_context):
+    """
+    Buffer state writes for tool_context until the block exits.
+
+    Nested transactions for the same tool_context share the outer one.
+    """
+    active = _active_transaction.get()
+    if (not COALESCE_STATE_WRITES or tool_context is None or not hasattr(tool_context, 'state')
+            or (active is not None and active.tool_context is tool_context)):
+        yield get_state(tool_context)
+        return
+
+    transaction = StateTransaction(tool_context)
+    token = _active_transaction.set(transaction)
+    try:
+        yield transaction
+    finally:
+        _active_transaction.reset(token)
+        try:
+            stats = transaction.commit()
+            logger.debug(f"Committed state transaction: {stats}")
+        except Exception as e:
+            logger.error(f"Failed to commit state transaction: {e}")
+
+
+def get_state(tool_context):
+    """The active transaction for tool_context, or tool_context.state when there is none."""
+    active = _active_transaction.get()
+    if active is not None and active.tool_context is tool_context:
+        return active
+    return tool_context.state
+
+
+def coalesce_state_writes(func: Callable) -> Callable:
+    """Decorator that runs a tool inside a state transaction for its tool_context argument."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        tool_context = kwargs.get("tool_context")
+        if tool_context is None:
+            return func(*args, **kwargs)
+        with state_transaction(tool_context):
+            return func(*args, **kwargs)
+    return wrapper
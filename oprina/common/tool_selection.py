@@ -0,0 +1,161 @@
+"""
+Per-turn tool subsets for sub-agents with large tool lists.
+
+email_agent has 34 Gmail tools, and every model call would otherwise carry all
+of their declarations. A ToolSelector exposes a small core set plus the groups
+the turn needs:
+
+- groups whose keywords appear in the user's utterance
+- the group of the tool the intent router classified the turn as
+- the group of the last message operation (so "undo that" after a star works)
+
+A selected group stays exposed for a few turns, so confirmations like "yes,
+send it" still see the tools of the workflow they belong to.
+
+Only the declarations sent to the model are trimmed; llm_request.tools_dict is
+left whole, so every tool stays callable.
+
+Enable with OPRINA_TOOL_SELECTION=true.
+"""
+
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from oprina.common.intent_router import classify, user_text
+from oprina.common.session_keys import EMAIL_ACTIVE_TOOL_GROUPS, EMAIL_LAST_OPERATION_TYPE
+from oprina.services.logging.logger import setup_logger
+
+logger = setup_logger("tool_selection", sampling=True)
+
+TOOL_SELECTION_ENABLED = os.getenv("OPRINA_TOOL_SELECTION", "false").lower() == "true"
+
+# Turns a group stays exposed, counting the one that triggered it
+# (compose and reply take four: draft, revise, confirm, send)
+STICKY_TURNS = int(os.getenv("OPRINA_TOOL_GROUP_TURNS", "4"))
+
+# Invocation whose groups were already computed (later model calls reuse them)
+SELECTION_INVOCATION = "temp:tool_selection_invocation"
+
+
+class ToolSelector:
+    """Chooses the tool declarations a sub-agent's model sees on each turn."""
+
+    def __init__(self, core: Iterable[str], groups: Dict[str, Tuple[str, List[str]]], state_key: str,
+                 operation_state_key: Optional[str] = None, sticky_turns: int = STICKY_TURNS):
+        self.core = frozenset(core)
+        self.groups = {name: (re.compile(pattern, re.IGNORECASE), frozenset(tools))
+                       for name, (pattern, tools) in groups.items()}
+        self.state_key = state_key
+        self.operation_state_key = operation_state_key
+        self.sticky_turns = sticky_turns
+        self.group_of = {tool: name for name, (_, tools) in self.groups.items() for tool in tools}
+        self.managed = self.core | frozenset(self.group_of)
+
+    def triggered_groups(self, text: str, state) -> Set[str]:
+        """Groups the current utterance asks for."""
+        groups = {name for name, (pattern, _) in self.groups.items() if pattern.search(text)}
+
+        intent = classify(text)
+        if intent is not None and intent.tool in self.group_of:
+            groups.add(self.group_of[intent.tool])
+
+        if not groups and self.operation_state_key:
+            operation = state.get(self.operation_state_key)
+            for tool, name in self.group_of.items():
+                if operation and (tool == operation or tool.endswith("_" + operation)):
+                    groups.add(name)
+        return groups
+
+    def active_groups(self, callback_context) -> Dict[str, int]:
+        """Groups exposed this turn with their remaining turns, advancing once per invocation."""
+        state = callback_context.state
+        active = dict(state.get(self.state_key) or {})
+        if state.get(SELECTION_INVOCATION) == callback_context.invocation_id:
+            return active
+
+        active = {name: turns - 1 for name, turns in active.items() if turns > 1 and name in self.groups}
+        for name in self.triggered_groups(user_text(callback_context), state):
+            active[name] = self.sticky_turns
+
+        state[SELECTION_INVOCATION] = callback_context.invocation_id
+        if active != state.get(self.state_key):
+            state[self.state_key] = active
+        return active
+
+    def allowed_tools(self, groups: Iterable[str]) -> Set[str]:
+        allowed = set(self.core)
+        for name in groups:
+            allowed |= self.groups[name][1]
+        return allowed
+
+    def restrict(self, llm_request, allowed: Set[str]) -> int:
+        """Drop managed declarations not in allowed; other declarations (transfer_to_agent) stay."""
+        exposed = 0
+        for tool in (llm_request.config.tools or []) if llm_request.config else []:
+            declarations = getattr(tool, "function_declarations", None)
+            if not declarations:
+                continue
+            tool.function_declarations = [d for d in declarations if d.name not in self.managed or d.name in allowed]
+            exposed += len(tool.function_declarations)
+        return exposed
+
+    def before_model_callback(self, callback_context, llm_request):
+        """before_model_callback that trims the request's tool declarations; never answers the call."""
+        if not TOOL_SELECTION_ENABLED:
+            return None
+        groups = self.active_groups(callback_context)
+        exposed = self.restrict(llm_request, self.allowed_tools(groups))
+        logger.debug("Exposing %d tool declarations to %s (groups: %s)",
+                     exposed, callback_context.agent_name, ", ".join(sorted(groups)) or "core")
+        return None
+
+
+# Core Gmail tools: reading and the everyday follow-ups on a listed email
+EMAIL_CORE_TOOLS = [
+    "gmail_list_messages",
+    "gmail_get_message",
+    "gmail_search_messages",
+    "gmail_mark_as_read",
+    "gmail_archive_message",
+    "gmail_summarize_message",
+]
+
+# group name -> (utterance pattern, tools)
+EMAIL_TOOL_GROUPS = {
+    "compose": (r"\b(?:send|write|compose|e-?mail (?:to|him|her|them)|new (?:e-?mail|message))\b",
+                ["gmail_generate_email", "gmail_parse_subject_and_body", "gmail_confirm_and_send",
+                 "gmail_send_message"]),
+    "reply": (r"\b(?:repl(?:y|ies|ied)|respond|answer|write back)\b",
+              ["gmail_generate_reply", "gmail_confirm_and_reply", "gmail_reply_to_message"]),
+    "analysis": (r"\b(?:sentiment|tone|mood|action items?|tasks?|to-?dos?|follow[- ]?ups?|analy[sz]e|extract)\b",
+                 ["gmail_analyze_sentiment", "gmail_extract_action_items"]),
+    "delete": (r"\b(?:delete|trash|remove|get rid of)\b", ["gmail_delete_message"]),
+    "drafts": (r"\bdrafts?\b",
+               ["gmail_create_draft", "gmail_list_drafts", "gmail_send_draft", "gmail_delete_draft"]),
+    "labels": (r"\b(?:labels?|tag|folders?|categor(?:y|ies|ize))\b",
+               ["gmail_list_labels", "gmail_create_label", "gmail_apply_label", "gmail_remove_label"]),
+    "status": (r"\b(?:star|starred|unstar|important|priority|flag)\b",
+               ["gmail_star_message", "gmail_unstar_message", "gmail_mark_important", "gmail_mark_not_important"]),
+    "spam": (r"\b(?:spam|junk|phishing)\b", ["gmail_mark_spam", "gmail_unmark_spam"]),
+    "threads": (r"\b(?:thread|conversation)s?\b", ["gmail_get_thread", "gmail_modify_thread"]),
+    "attachments": (r"\b(?:attach\w*|files?|pdfs?|documents?)\b", ["gmail_list_attachments"]),
+    "profile": (r"\b(?:profile|account|my (?:e-?mail )?address|how many (?:e-?mails|messages))\b",
+                ["gmail_get_profile"]),
+}
+
+EMAIL_TOOL_SELECTOR = ToolSelector(
+    EMAIL_CORE_TOOLS, EMAIL_TOOL_GROUPS, EMAIL_ACTIVE_TOOL_GROUPS, operation_state_key=EMAIL_LAST_OPERATION_TYPE
+)
+
+select_email_tools = EMAIL_TOOL_SELECTOR.before_model_callback
+
+
+__all__ = [
+    "ToolSelector",
+    "EMAIL_CORE_TOOLS",
+    "EMAIL_TOOL_GROUPS",
+    "EMAIL_TOOL_SELECTOR",
+    "select_email_tools",
+    "TOOL_SELECTION_ENABLED"
+]
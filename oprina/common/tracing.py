@@ -0,0 +1,234 @@
+"""
+Tool execution tracing for Oprina agents.
+
+Every tool call is wrapped in a span that records:
+- start/end timestamps and duration
+- Google API calls made during the call and the bytes sent/received
+- LLM calls and their latency
+- the last operation/outcome reported through log_tool_execution
+
+Finished spans go into a fixed-size in-process ring buffer (never into session
+state), and get_tool_latency_histograms() aggregates them per tool.
+"""
+
+import bisect
+import contextvars
+import functools
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+# Finished spans kept in memory (oldest are overwritten first)
+TRACE_BUFFER_SIZE = 1000
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+_trace_buffer = deque(maxlen=TRACE_BUFFER_SIZE)
+_trace_lock = threading.Lock()
+_current_span: contextvars.ContextVar[Optional["ToolSpan"]] = contextvars.ContextVar("oprina_tool_span", default=None)
+
+
+class ToolSpan:
+    """Timing and I/O counters for one tool call."""
+
+    __slots__ = ("tool", "parent", "started_at", "_started", "duration_ms", "success", "operation",
+                 "details", "error", "api_calls", "api_bytes", "llm_calls", "llm_ms", "_lock")
+
+    def __init__(self, tool: str, parent: Optional["ToolSpan"] = None):
+        self.tool = tool
+        self.parent = parent
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.success = True
+        self.operation = ""
+        self.details = ""
+        self.error: Optional[str] = None
+        self.api_calls = 0
+        self.api_bytes = 0
+        self.llm_calls = 0
+        self.llm_ms = 0.0
+        self._lock = threading.Lock()
+
+    def add_api_call(self, num_bytes: int) -> None:
+        with self._lock:
+            self.api_calls += 1
+            self.api_bytes += num_bytes
+
+    def add_llm_call(self, latency_ms: float) -> None:
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_ms += latency_ms
+
+    def finish(self) -> Dict[str, Any]:
+        """Close the span, roll its counters into the parent and return its record."""
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 2)
+        if self.parent is not None:
+            with self.parent._lock:
+                self.parent.api_calls += self.api_calls
+                self.parent.api_bytes += self.api_bytes
+                self.parent.llm_calls += self.llm_calls
+                self.parent.llm_ms += self.llm_ms
+
+        return {
+            "tool": self.tool,
+            "parent": self.parent.tool if self.parent else None,
+            "started_at": self.started_at,
+            "ended_at": self.started_at + self.duration_ms / 1000,
+            "duration_ms": self.duration_ms,
+            "success": self.success,
+            "operation": self.operation,
+            "details": self.details,
+            "error": self.error,
+            "api_calls": self.api_calls,
+            "api_bytes": self.api_bytes,
+            "llm_calls": self.llm_calls,
+            "llm_ms": round(self.llm_ms, 2)
+        }
+
+
+@contextmanager
+def tool_span(tool: str):
+    """Trace a block of code as a call of the named tool."""
+    span = ToolSpan(tool, parent=_current_span.get())
+    token = _current_span.set(span)
+    try:
+        yield span
+    except Exception as e:
+        span.success = False
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        record = span.finish()
+        with _trace_lock:
+            _trace_buffer.append(record)
+
+
+def trace_tool(func: Callable) -> Callable:
+    """Decorator that runs every call of a tool function inside a tool_span."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with tool_span(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def current_span() -> Optional[ToolSpan]:
+    """The span of the tool call currently executing, if any."""
+    return _current_span.get()
+
+
+def record_api_call(num_bytes: int = 0) -> None:
+    """Count a Google API request (and its request + response bytes) on the current span."""
+    span = _current_span.get()
+    if span is not None:
+        span.add_api_call(num_bytes)
+
+
+def record_llm_call(latency_ms: float) -> None:
+    """Count an LLM request and its latency on the current span."""
+    span = _current_span.get()
+    if span is not None:
+        span.add_llm_call(latency_ms)
+
+
+@contextmanager
+def llm_call():
+    """Time an LLM request and record it on the current span."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_llm_call((time.perf_counter() - started) * 1000)
+
+
+def note_tool_outcome(tool_name: str, operation: str, success: bool, details: str = "") -> None:
+    """
+    Attach a log_tool_execution outcome to the current span.
+
+    Outside of a traced call the outcome is kept as its own zero-duration record.
+    """
+    span = _current_span.get()
+    if span is not None:
+        span.operation = operation
+        span.details = details[:200]
+        span.success = span.success and success
+        return
+
+    now = time.time()
+    with _trace_lock:
+        _trace_buffer.append({
+            "tool": tool_name, "parent": None, "started_at": now, "ended_at": now,
+            "duration_ms": None, "success": success, "operation": operation,
+            "details": details[:200], "error": None, "api_calls": 0, "api_bytes": 0,
+            "llm_calls": 0, "llm_ms": 0.0
+        })
+
+
+def submit_in_span(executor, fn: Callable, *args, **kwargs):
+    """executor.submit() that keeps the caller's span active in the worker thread."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def get_recent_spans(limit: int = 50, tool: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Most recent finished span records, newest last."""
+    with _trace_lock:
+        records = list(_trace_buffer)
+    if tool:
+        records = [record for record in records if record["tool"] == tool]
+    return records[-limit:]
+
+
+def get_tool_latency_histograms() -> Dict[str, Dict[str, Any]]:
+    """
+    Aggregate the ring buffer per tool.
+
+    Returns:
+        Dict of tool name -> count, errors, p50/p95/max latency, average API calls,
+        bytes and LLM time per call, and latency histogram bucket counts
+    """
+    with _trace_lock:
+        records = [record for record in _trace_buffer if record["duration_ms"] is not None]
+
+    by_tool: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        by_tool.setdefault(record["tool"], []).append(record)
+
+    labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+    histograms = {}
+    for tool, tool_records in by_tool.items():
+        durations = sorted(record["duration_ms"] for record in tool_records)
+        buckets = [0] * len(labels)
+        for duration in durations:
+            buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, duration)] += 1
+
+        count = len(tool_records)
+        histograms[tool] = {
+            "count": count,
+            "errors": sum(1 for record in tool_records if not record["success"]),
+            "p50_ms": _percentile(durations, 0.50),
+            "p95_ms": _percentile(durations, 0.95),
+            "max_ms": durations[-1],
+            "avg_api_calls": round(sum(record["api_calls"] for record in tool_records) / count, 2),
+            "avg_api_bytes": round(sum(record["api_bytes"] for record in tool_records) / count),
+            "avg_llm_ms": round(sum(record["llm_ms"] for record in tool_records) / count, 2),
+            "buckets": dict(zip(labels, buckets))
+        }
+    return histograms
+
+
+def clear_traces() -> None:
+    """Drop all recorded spans."""
+    with _trace_lock:
+        _trace_buffer.clear()
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
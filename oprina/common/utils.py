@@ -11,6 +11,8 @@ import logging
 from oprina.common.session_keys import (
     USER_ID, USER_NAME, USER_EMAIL, USER_PREFERENCES, USER_LAST_ACTIVITY
 )
+from oprina.common.tracing import note_tool_outcome
+from oprina.common.state_transaction import get_state
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -125,16 +127,19 @@ def update_agent_activity(tool_context, agent_name: str, activity: str) -> bool:
             logger.debug(f"Cannot update agent activity - no session state available")
             return False
         
+        # Writes join the tool's state transaction when one is active
+        state = get_state(tool_context)
+        
         # Update last agent used
-        tool_context.state["last_agent_used"] = agent_name
+        state["last_agent_used"] = agent_name
         
         # Update agent-specific activity (remove '_agent' suffix for cleaner keys)
         service_name = agent_name.replace('_agent', '')
-        tool_context.state[f"{service_name}:last_activity"] = activity
-        tool_context.state[f"{service_name}:last_activity_time"] = format_timestamp()
+        state[f"{service_name}:last_activity"] = activity
+        state[f"{service_name}:last_activity_time"] = format_timestamp()
         
         # Update user's last activity timestamp using session key constant
-        tool_context.state[USER_LAST_ACTIVITY] = format_timestamp()
+        state[USER_LAST_ACTIVITY] = format_timestamp()
         
         return True
         
@@ -158,7 +163,7 @@ def get_user_preferences(tool_context, default_prefs: Optional[Dict[str, Any]] =
     
     try:
         if (tool_context and hasattr(tool_context, 'session') and hasattr(tool_context.session, 'state')):
-            return tool_context.state.get(USER_PREFERENCES, default_prefs or {})
+            return get_state(tool_context).get(USER_PREFERENCES, default_prefs or {})
     except Exception as e:
         logger.warning(f"Could not get user preferences: {e}")
     
@@ -184,9 +189,10 @@ def update_user_preferences(tool_context, preferences: Dict[str, Any]) -> bool:
             return False
         
         # Use session key constant
-        current_prefs = tool_context.state.get(USER_PREFERENCES, {})
+        state = get_state(tool_context)
+        current_prefs = state.get(USER_PREFERENCES, {})
         current_prefs.update(preferences)
-        tool_context.state[USER_PREFERENCES] = current_prefs
+        state[USER_PREFERENCES] = current_prefs
         
         return True
         
@@ -198,7 +204,7 @@ def update_user_preferences(tool_context, preferences: Dict[str, Any]) -> bool:
 # Cross-Agent Workflow Coordination
 # =============================================================================
 
-def start_workflow(tool_context, workflow_name: str, workflow_data: Dict[str, Any]) -> str:
+def start_workflow(tool_context, workflow_name: str, workflow_data: Dict[str, Any], resume: bool = False) -> str:
     """
     Start a multi-step workflow and store its state.
     
@@ -206,6 +212,7 @@ def start_workflow(tool_context, workflow_name: str, workflow_data: Dict[str, An
         tool_context: ADK tool context
         workflow_name: Unique name for the workflow
         workflow_data: Initial workflow data
+        resume: Reuse the active workflow if it has the same name and data and has not completed
         
     Returns:
         str: Workflow ID for tracking
@@ -214,6 +221,24 @@ def start_workflow(tool_context, workflow_name: str, workflow_data: Dict[str, An
         return "workflow_fallback"
     
     try:
+        if resume and hasattr(tool_context, 'state'):
+            state = get_state(tool_context)
+            active_id = state.get("active_workflow")
+            active = state.get(f"workflow:{active_id}") if active_id else None
+            if (active and active.get("name") == workflow_name and active.get("data") == workflow_data
+                    and active.get("status") != "completed"):
+                # Progress is recorded again as steps are replayed (completed ones from memoized outputs)
+                active["status"] = "resumed"
+                active["resume_count"] = active.get("resume_count", 0) + 1
+                active["steps_completed"] = 0
+                active["current_step"] = 1
+                active["results"] = {}
+                active["last_updated"] = format_timestamp()
+                state[f"workflow:{active_id}"] = active
+                
+                logger.info(f"Resumed workflow: {workflow_name} ({active_id})")
+                return active_id
+        
         workflow_id = f"workflow_{workflow_name}_{format_timestamp().replace(':', '_')}"
         
         workflow_state = {
@@ -231,8 +256,9 @@ def start_workflow(tool_context, workflow_name: str, workflow_data: Dict[str, An
         
         # Store in session state
         if hasattr(tool_context, 'state'):
-            tool_context.state[f"workflow:{workflow_id}"] = workflow_state
-            tool_context.state["active_workflow"] = workflow_id
+            state = get_state(tool_context)
+            state[f"workflow:{workflow_id}"] = workflow_state
+            state["active_workflow"] = workflow_id
         
         logger.info(f"Started workflow: {workflow_name} ({workflow_id})")
         return workflow_id
@@ -260,12 +286,13 @@ def update_workflow(tool_context, workflow_id: str, step_result: Dict[str, Any])
         if not hasattr(tool_context, 'state'):
             return False
             
+        state = get_state(tool_context)
         workflow_key = f"workflow:{workflow_id}"
-        if workflow_key not in tool_context.state:
+        if workflow_key not in state:
             logger.warning(f"Workflow {workflow_id} not found in session")
             return False
         
-        workflow = tool_context.state[workflow_key]
+        workflow = state[workflow_key]
         
         # Update workflow state
         workflow["steps_completed"] += 1
@@ -278,7 +305,7 @@ def update_workflow(tool_context, workflow_id: str, step_result: Dict[str, Any])
             workflow["status"] = "completed"
             workflow["completed_at"] = format_timestamp()
             
-        tool_context.state[workflow_key] = workflow
+        state[workflow_key] = workflow
         
         logger.info(f"Updated workflow {workflow_id}: step {workflow['steps_completed']}/{workflow['total_steps']}")
         return True
@@ -287,6 +314,48 @@ def update_workflow(tool_context, workflow_id: str, step_result: Dict[str, Any])
         logger.error(f"Failed to update workflow {workflow_id}: {e}")
         return False
 
+def finish_workflow(tool_context, workflow_id: str, status: str, summary: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Mark a workflow finished with an explicit status.
+    
+    Args:
+        tool_context: ADK tool context
+        workflow_id: Workflow identifier
+        status: Final status ("completed", "failed" or "cancelled")
+        summary: Optional run summary (e.g. timings) stored with the workflow
+    
+    Returns:
+        bool: True if successful
+    """
+    if not validate_tool_context(tool_context, "finish_workflow"):
+        return False
+    
+    try:
+        if not hasattr(tool_context, 'state'):
+            return False
+    
+        state = get_state(tool_context)
+        workflow_key = f"workflow:{workflow_id}"
+        if workflow_key not in state:
+            logger.warning(f"Workflow {workflow_id} not found in session")
+            return False
+    
+        workflow = state[workflow_key]
+        workflow["status"] = status
+        workflow["last_updated"] = format_timestamp()
+        workflow["completed_at"] = format_timestamp()
+        if summary:
+            workflow["summary"] = summary
+    
+        state[workflow_key] = workflow
+    
+        logger.info(f"Finished workflow {workflow_id}: {status}")
+        return True
+    
+    except Exception as e:
+        logger.error(f"Failed to finish workflow {workflow_id}: {e}")
+        return False
+
 def get_workflow_data(tool_context, workflow_id: str) -> Optional[Dict[str, Any]]:
     """
     Get workflow data and current state.
@@ -306,7 +375,7 @@ def get_workflow_data(tool_context, workflow_id: str) -> Optional[Dict[str, Any]
             return None
             
         workflow_key = f"workflow:{workflow_id}"
-        return tool_context.state.get(workflow_key)
+        return get_state(tool_context).get(workflow_key)
         
     except Exception as e:
         logger.error(f"Failed to get workflow data {workflow_id}: {e}")
@@ -344,8 +413,9 @@ def pass_data_between_agents(tool_context, from_agent: str, to_agent: str,
             "timestamp": format_timestamp()
         }
         
-        tool_context.state[transfer_key] = transfer_data
-        tool_context.state["last_agent_transfer"] = transfer_key
+        state = get_state(tool_context)
+        state[transfer_key] = transfer_data
+        state["last_agent_transfer"] = transfer_key
         
         logger.info(f"Data passed from {from_agent} to {to_agent} for {operation}")
         return True
@@ -359,6 +429,9 @@ def log_tool_execution(tool_context, tool_name: str, operation: str,
     """
     Log tool execution for debugging and monitoring.
     
+    The outcome is attached to the current tool trace span (see oprina.common.tracing)
+    rather than written to session state, so it does not add to the state delta.
+    
     Args:
         tool_context: ADK tool context
         tool_name: Name of the tool being executed
@@ -372,32 +445,4 @@ def log_tool_execution(tool_context, tool_name: str, operation: str,
     else:
         logger.warning(f"Tool execution failed: {tool_name}.{operation} - {details}")
     
-    # Try to log to session state if available
-    try:
-        if not (tool_context and hasattr(tool_context, 'session') and hasattr(tool_context.session, 'state')):
-            return  # No session state available, but that's okay
-        
-        user_info = extract_user_info_from_session(tool_context)
-        
-        log_data = {
-            "tool": tool_name,
-            "operation": operation,
-            "success": success,
-            "user_id": user_info.get("user_id", "unknown"),
-            "session_id": user_info.get("session_id", "unknown"),
-            "timestamp": format_timestamp(),
-            "details": details
-        }
-        
-        # Store execution log in temporary session state for debugging
-        execution_logs = tool_context.state.get("temp:tool_execution_log", [])
-        execution_logs.append(log_data)
-        
-        # Keep only last 10 executions to avoid memory bloat
-        if len(execution_logs) > 10:
-            execution_logs = execution_logs[-10:]
-        
-        tool_context.state["temp:tool_execution_log"] = execution_logs
-        
-    except Exception as e:
-        logger.warning(f"Could not log to session state: {e}")
\ No newline at end of file
+    note_tool_outcome(tool_name, operation, success, details)
@@ -1,116 +1,52 @@
+"""
+Log collector for Oprina agent processes.
+
+Wire format: each frame is a 4-byte big-endian length followed by a UTF-8 JSON
+array of record dicts (see record_to_dict). Clients send batches; the server
+never unpickles anything.
+
+One asyncio loop reads all connections. Decoded batches go through a bounded
+queue to a single writer thread that keeps one rotating file handler per logger
+name for the life of the server. Files go under logs/server/ by default, apart
+from the agent processes' own logs/<name>.log files, so the two never rotate
+the same file. When the writer falls behind, readers stop
+reading from their sockets and TCP flow control pushes back on the clients.
+"""
+
+import argparse
+import asyncio
+import json
 import logging
 import logging.handlers
-import socketserver
 import struct
-import pickle
-import threading
+import sys
 import time
-import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import sys
-from queue import Queue
-import socket
+from typing import Any, Dict, List, Optional
 
-class LogQueueHandler(logging.handlers.QueueHandler):
-    """Queue handler for buffering log records"""
-    def enqueue(self, record):
-        try:
-            self.queue.put_nowait(record)
-        except Exception:
-            pass
+HEADER = struct.Struct('>L')
+MAX_FRAME_BYTES = 8 * 1024 * 1024
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+SERVER_LOG_DIR = Path("logs") / "server"
+
+# Record attributes carried over the wire
+RECORD_FIELDS = ("name", "levelno", "levelname", "msg", "created", "msecs", "process",
+                 "processName", "thread", "threadName", "pathname", "lineno", "funcName", "exc_text")
+
+
+def record_to_dict(record: logging.LogRecord) -> Dict[str, Any]:
+    """JSON-safe dict of a record (message formatted, args dropped)."""
+    data = {field: getattr(record, field, None) for field in RECORD_FIELDS}
+    data["msg"] = record.getMessage()
+    return data
+
+
+def encode_batch(records: List[Dict[str, Any]]) -> bytes:
+    """Frame a batch of record dicts for sending."""
+    payload = json.dumps(records, default=str, separators=(',', ':')).encode('utf-8')
+    return HEADER.pack(len(payload)) + payload
 
-class ResilientLogRecordStreamHandler(socketserver.StreamRequestHandler):
-    """Handler with connection recovery"""
-    
-    def setup(self):
-        super().setup()
-        self.connection_alive = True
-        self.log_queue = Queue()
-        self.setup_logger()
-
-    def setup_logger(self):
-        self.logger = logging.getLogger("LogServer")
-        self.logger.setLevel(logging.INFO)
-        
-        # Console handler
-        console = logging.StreamHandler()
-        console.setFormatter(
-            logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        )
-        self.logger.addHandler(console)
-
-    def handle(self):
-        while self.connection_alive:
-            try:
-                chunk = self.connection.recv(4)
-                if len(chunk) < 4:
-                    break
-                    
-                slen = struct.unpack('>L', chunk)[0]
-                chunk = self.connection.recv(slen)
-                
-                while len(chunk) < slen and self.connection_alive:
-                    chunk = chunk + self.connection.recv(slen - len(chunk))
-                    
-                record = logging.makeLogRecord(pickle.loads(chunk))
-                self.handle_log_record(record)
-                
-            except (ConnectionError, socket.error) as e:
-                self.logger.warning(f"Connection issue: {e}")
-                self.attempt_reconnection()
-            except Exception as e:
-                self.logger.error(f"Error handling log record: {e}")
-                self.connection_alive = False
-
-    def attempt_reconnection(self):
-        """Attempt to restore connection"""
-        max_attempts = 3
-        attempt = 0
-        
-        while attempt < max_attempts and not self.connection_alive:
-            try:
-                self.logger.info(f"Attempting reconnection {attempt + 1}/{max_attempts}")
-                self.connection = self.request
-                self.connection_alive = True
-                self.logger.info("Connection restored")
-                break
-            except Exception as e:
-                attempt += 1
-                self.logger.error(f"Reconnection attempt {attempt} failed: {e}")
-                time.sleep(1)
-
-    def handle_log_record(self, record):
-        if not hasattr(self, 'log_handlers'):
-            self.log_handlers = {}
-            
-        logger_name = record.name
-        if logger_name not in self.log_handlers:
-            # Create logger
-            logger = logging.getLogger(logger_name)
-            logger.handlers = []  # Remove existing handlers
-            logger.propagate = False
-            
-            # File handler
-            log_dir = Path("logs")
-            log_dir.mkdir(exist_ok=True)
-            file_handler = logging.FileHandler(
-                log_dir / f"{logger_name.replace('.', '_')}.log"
-            )
-            file_handler.setFormatter(
-                logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-            )
-            logger.addHandler(file_handler)
-            
-            # Console handler with colors
-            console_handler = logging.StreamHandler(sys.stdout)
-            console_handler.stream.reconfigure(encoding='utf-8')
-            console_handler.setFormatter(ColoredFormatter())
-            logger.addHandler(console_handler)
-            
-            self.log_handlers[logger_name] = logger
-            
-        logger = self.log_handlers[logger_name]
-        logger.handle(record)
 
 class ColoredFormatter(logging.Formatter):
     """Colored formatter for console output"""
@@ -124,28 +60,220 @@ class ColoredFormatter(logging.Formatter):
             'CRITICAL': '\033[37;41m',  # White on Red
             'RESET': '\033[0m'
         }
-        self.fmt = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        self.formatter = logging.Formatter(LOG_FORMAT)
 
     def format(self, record):
         color = self.colors.get(record.levelname, self.colors['RESET'])
-        formatted_msg = logging.Formatter(self.fmt).format(record)
+        formatted_msg = self.formatter.format(record)
         return f"{color}{formatted_msg}{self.colors['RESET']}"
 
-class ResilientLogServer(socketserver.ThreadingTCPServer):
-    """TCP Server with connection recovery"""
-    allow_reuse_address = True
-    daemon_threads = True
 
-def serve_logging(host='localhost', port=9020):
-    """Start the logging server with connection recovery"""
-    while True:
+class LogCollector:
+    """Asyncio log server: framed JSON batches in, per-logger rotating files out."""
+
+    def __init__(self, host: str = 'localhost', port: int = 9020, log_dir: Path = SERVER_LOG_DIR,
+                 max_pending_batches: int = 1000, max_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 5, console_level: Optional[int] = logging.INFO,
+                 metrics_interval: float = 10.0):
+        self.host = host
+        self.port = port
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.metrics_interval = metrics_interval
+        self.max_pending_batches = max_pending_batches
+
+        self._file_handlers: Dict[str, logging.handlers.RotatingFileHandler] = {}
+        self._file_formatter = logging.Formatter(LOG_FORMAT)
+        self._console: Optional[logging.Handler] = None
+        if console_level is not None:
+            self._console = logging.StreamHandler(sys.stdout)
+            self._console.setLevel(console_level)
+            self._console.setFormatter(ColoredFormatter())
+
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-writer")
+        self._queue: Optional[asyncio.Queue] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._tasks: List[asyncio.Task] = []
+
+        self.metrics = {
+            "connections": 0,
+            "active_connections": 0,
+            "batches": 0,
+            "records_received": 0,
+            "records_written": 0,
+            "bytes_received": 0,
+            "dropped_frames": 0,
+            "dropped_records": 0,
+            "backpressure_waits": 0,
+            "ingest_rate": 0.0
+        }
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_pending_batches)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._tasks = [asyncio.create_task(self._write_loop())]
+        if self.metrics_interval:
+            self._tasks.append(asyncio.create_task(self._report_loop()))
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        print('\033[32m' + f"Log server started on {self.host}:{self.port}" + '\033[0m')
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self) -> None:
+        """Stop accepting connections, write out queued batches and close the files."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._queue is not None:
+            await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._writer.shutdown(wait=True)
+        for handler in self._file_handlers.values():
+            handler.close()
+        self._file_handlers.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics = dict(self.metrics)
+        metrics["pending_batches"] = self._queue.qsize() if self._queue is not None else 0
+        return metrics
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.metrics["connections"] += 1
+        self.metrics["active_connections"] += 1
         try:
-            server = ResilientLogServer((host, port), ResilientLogRecordStreamHandler)
-            print('\033[32m' + f"Log server started on {host}:{port}" + '\033[0m')
-            server.serve_forever()
-        except Exception as e:
-            print('\033[31m' + f"Server error: {e}, restarting..." + '\033[0m')
-            time.sleep(1)
+            while True:
+                try:
+                    header = await reader.readexactly(HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break
+
+                (length,) = HEADER.unpack(header)
+                if length > MAX_FRAME_BYTES:
+                    # Cannot resync after an oversized frame; drop the connection
+                    self.metrics["dropped_frames"] += 1
+                    break
+
+                payload = await reader.readexactly(length)
+                self.metrics["bytes_received"] += HEADER.size + length
+                try:
+                    batch = json.loads(payload)
+                    if not isinstance(batch, list):
+                        raise ValueError("frame is not a list")
+                except ValueError:
+                    self.metrics["dropped_frames"] += 1
+                    continue
+
+                self.metrics["batches"] += 1
+                self.metrics["records_received"] += len(batch)
+                if self._queue.full():
+                    self.metrics["backpressure_waits"] += 1
+                await self._queue.put(batch)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.metrics["active_connections"] -= 1
+            writer.close()
+
+    async def _write_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batches = [await self._queue.get()]
+            while not self._queue.empty() and len(batches) < 64:
+                batches.append(self._queue.get_nowait())
+            try:
+                await loop.run_in_executor(self._writer, self._write_batches, batches)
+            finally:
+                for _ in batches:
+                    self._queue.task_done()
+
+    def _write_batches(self, batches: List[List[Dict[str, Any]]]) -> None:
+        """Runs on the writer thread. Each logger's lines are written to its file in one call."""
+        lines_by_logger: Dict[str, List[str]] = {}
+        dropped = 0
+        for batch in batches:
+            for data in batch:
+                try:
+                    record = logging.makeLogRecord(data)
+                    lines_by_logger.setdefault(record.name, []).append(self._file_formatter.format(record))
+                    if self._console is not None and record.levelno >= self._console.level:
+                        self._console.handle(record)
+                except Exception:
+                    dropped += 1
+
+        written = 0
+        for logger_name, lines in lines_by_logger.items():
+            handler = self._file_handler(logger_name)
+            text = "\n".join(lines) + "\n"
+            handler.acquire()
+            try:
+                if handler.stream is None:
+                    handler.stream = handler._open()
+                if handler.maxBytes and handler.stream.tell() + len(text) >= handler.maxBytes:
+                    handler.doRollover()
+                handler.stream.write(text)
+                handler.stream.flush()
+                written += len(lines)
+            except Exception:
+                dropped += len(lines)
+            finally:
+                handler.release()
+
+        self.metrics["records_written"] += written
+        self.metrics["dropped_records"] += dropped
+
+    def _file_handler(self, logger_name: str) -> logging.handlers.RotatingFileHandler:
+        handler = self._file_handlers.get(logger_name)
+        if handler is None:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                self.log_dir / f"{logger_name.replace('.', '_')}.log",
+                maxBytes=self.max_bytes,
+                backupCount=self.backup_count,
+                encoding="utf-8"
+            )
+            handler.setFormatter(self._file_formatter)
+            self._file_handlers[logger_name] = handler
+        return handler
+
+    async def _report_loop(self) -> None:
+        last_received = self.metrics["records_received"]
+        last_time = time.monotonic()
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            now = time.monotonic()
+            received = self.metrics["records_received"]
+            self.metrics["ingest_rate"] = round((received - last_received) / (now - last_time), 1)
+            last_received, last_time = received, now
+
+            metrics = self.get_metrics()
+            if metrics["ingest_rate"] or metrics["dropped_frames"] or metrics["dropped_records"]:
+                print(f"[log-server] {metrics['ingest_rate']} rec/s, "
+                      f"{metrics['active_connections']} connections, "
+                      f"{metrics['pending_batches']} pending batches, "
+                      f"dropped {metrics['dropped_frames']} frames / {metrics['dropped_records']} records")
+
+
+def serve_logging(host='localhost', port=9020, console=True, log_dir=SERVER_LOG_DIR):
+    """Start the logging server"""
+    collector = LogCollector(host, port, log_dir=Path(log_dir), console_level=logging.INFO if console else None)
+    try:
+        asyncio.run(collector.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
 
 if __name__ == '__main__':
-    serve_logging()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Oprina log server")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=9020)
+    parser.add_argument("--no-console", action="store_true", help="only write log files")
+    parser.add_argument("--log-dir", default=str(SERVER_LOG_DIR),
+                        help="directory for collected logs (keep it apart from the agents' own log directory)")
+    args = parser.parse_args()
+    serve_logging(args.host, args.port, console=not args.no_console, log_dir=args.log_dir)
@@ -1,8 +1,58 @@
+"""
+Logging setup for Oprina agents.
+
+Loggers created by setup_logger() only enqueue records. One background
+QueueListener thread drains the bounded queue and does all file and socket I/O:
+
+- per-logger rotating files in logs/
+- forwarding to the log server in length-prefixed JSON batches (see log_server.py)
+
+When the queue is full, DEBUG/INFO records are dropped immediately and
+WARNING+ records wait briefly for space before being dropped; drops are
+counted per level (get_logging_stats()).
+
+Environment:
+    OPRINA_LOG_LEVEL         level for setup_logger() loggers (default DEBUG)
+    OPRINA_LOG_QUEUE_SIZE    queue capacity in records (default 10000)
+    OPRINA_LOG_MAX_BYTES     size at which a log file rotates (default 10 MB)
+    OPRINA_LOG_BACKUP_COUNT  rotated files kept per logger (default 5)
+    OPRINA_LOG_SERVER        host:port of the log server, empty to disable (default localhost:9020)
+"""
+
+import atexit
 import logging
 import logging.handlers
+import os
+import queue
+import socket
 import sys
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional
+
+from oprina.services.logging.log_server import record_to_dict, encode_batch
+from oprina.services.logging.sampling import SamplingFilter, LOG_SAMPLING
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_DIR = Path("logs")
+
+LOG_LEVEL = os.getenv("OPRINA_LOG_LEVEL", "DEBUG").upper()
+LOG_QUEUE_SIZE = int(os.getenv("OPRINA_LOG_QUEUE_SIZE", "10000"))
+LOG_MAX_BYTES = int(os.getenv("OPRINA_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("OPRINA_LOG_BACKUP_COUNT", "5"))
+LOG_SERVER = os.getenv("OPRINA_LOG_SERVER", "localhost:9020")
+
+# How long a WARNING+ record may wait for queue space before it is dropped
+PRIORITY_ENQUEUE_TIMEOUT = 0.05
+
+# Records per frame sent to the log server, and the longest a partial batch waits
+SERVER_BATCH_SIZE = 200
+SERVER_FLUSH_INTERVAL = 0.5
+SERVER_RETRY_MAX = 30.0
+
+# Longest a connect or a batch send may block the listener thread
+SERVER_SEND_TIMEOUT = 1.0
 
 class CustomFormatter(logging.Formatter):
     """Custom formatter with colors for different log levels"""
@@ -30,42 +80,268 @@ class CustomFormatter(logging.Formatter):
         formatter = logging.Formatter(log_fmt)
         return formatter.format(record)
 
+class DropCountingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks on a full queue for low-priority records and counts drops."""
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.dropped: Dict[str, int] = {}
+
+    def enqueue(self, record):
+        try:
+            if record.levelno >= logging.WARNING:
+                self.queue.put(record, timeout=PRIORITY_ENQUEUE_TIMEOUT)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped[record.levelname] = self.dropped.get(record.levelname, 0) + 1
+            return
+        with self._lock:
+            self.enqueued += 1
+
+
+class PerLoggerFileHandler(logging.Handler):
+    """Routes records to one rotating file per logger name (logs/<name>.log)."""
+    
+    def __init__(self, log_dir: Path = LOG_DIR, max_bytes: int = LOG_MAX_BYTES,
+                 backup_count: int = LOG_BACKUP_COUNT):
+        super().__init__()
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.enabled_loggers = set()
+        self._handlers: Dict[str, logging.Handler] = {}
+        self._formatter = logging.Formatter(LOG_FORMAT)
+
+    def emit(self, record):
+        if record.name not in self.enabled_loggers:
+            return
+        handler = self._handlers.get(record.name)
+        if handler is None:
+            self.log_dir.mkdir(exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                self.log_dir / f"{record.name.replace('.', '_')}.log",
+                maxBytes=self.max_bytes,
+                backupCount=self.backup_count,
+                encoding="utf-8"
+            )
+            handler.setFormatter(self._formatter)
+            self._handlers[record.name] = handler
+        handler.handle(record)
+
+    def close(self):
+        for handler in self._handlers.values():
+            handler.close()
+        self._handlers.clear()
+        super().close()
+
+
+class BatchSocketHandler(logging.Handler):
+    """
+    Sends records to the log server as framed JSON batches.
+    
+    Runs only on the listener thread. While the server is unreachable, batches are
+    dropped (and counted) and reconnects back off exponentially up to SERVER_RETRY_MAX.
+    A server that stops reading costs at most SERVER_SEND_TIMEOUT per batch: the
+    timed-out batch is dropped and the connection reset.
+    """
+    
+    def __init__(self, host: str, port: int, batch_size: int = SERVER_BATCH_SIZE,
+                 flush_interval: float = SERVER_FLUSH_INTERVAL):
+        super().__init__()
+        self.address = (host, port)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.sent = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._first_buffered = 0.0
+        self._sock: Optional[socket.socket] = None
+        self._retry_delay = 1.0
+        self._retry_at = 0.0
+
+    def emit(self, record):
+        if not self._buffer:
+            self._first_buffered = time.monotonic()
+        self._buffer.append(record_to_dict(record))
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._first_buffered >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        sock = self._connect()
+        if sock is None:
+            self.dropped += len(batch)
+            return
+        try:
+            sock.sendall(encode_batch(batch))
+            self.sent += len(batch)
+        except OSError:
+            # Includes socket.timeout; a partly sent frame leaves the stream unusable
+            self.dropped += len(batch)
+            self._disconnect()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._disconnect()
+            super().close()
+
+    def _connect(self) -> Optional[socket.socket]:
+        if self._sock is not None:
+            return self._sock
+        now = time.monotonic()
+        if now < self._retry_at:
+            return None
+        try:
+            self._sock = socket.create_connection(self.address, timeout=SERVER_SEND_TIMEOUT)
+            self._retry_delay = 1.0
+        except OSError:
+            self._retry_at = now + self._retry_delay
+            self._retry_delay = min(self._retry_delay * 2, SERVER_RETRY_MAX)
+        return self._sock
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+            self._retry_at = time.monotonic() + self._retry_delay
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """QueueListener that flushes its handlers whenever the queue has been idle for flush_interval."""
+    
+    def __init__(self, log_queue, *handlers, flush_interval: float = SERVER_FLUSH_INTERVAL, **kwargs):
+        super().__init__(log_queue, *handlers, **kwargs)
+        self.flush_interval = flush_interval
+
+    def dequeue(self, block):
+        while True:
+            try:
+                return self.queue.get(block, timeout=self.flush_interval)
+            except queue.Empty:
+                for handler in self.handlers:
+                    handler.flush()
+
+
+class LogPipeline:
+    """Bounded queue, its QueueHandler, and the single background listener that writes records out."""
+    
+    def __init__(self, capacity: int = LOG_QUEUE_SIZE, log_dir: Path = LOG_DIR,
+                 log_server: Optional[str] = LOG_SERVER):
+        self.capacity = capacity
+        self.queue: queue.Queue = queue.Queue(maxsize=capacity)
+        self.handler = DropCountingQueueHandler(self.queue)
+        self.file_handler = PerLoggerFileHandler(log_dir)
+
+        self.server_handler: Optional[BatchSocketHandler] = None
+        handlers = [self.file_handler]
+        if log_server:
+            host, _, port = log_server.rpartition(":")
+            self.server_handler = BatchSocketHandler(host or "localhost", int(port))
+            handlers.append(self.server_handler)
+
+        self.listener = BatchingQueueListener(self.queue, *handlers, respect_handler_level=True)
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if not self._started:
+                self.listener.start()
+                self._started = True
+
+    def stop(self) -> None:
+        """Drain the queue, stop the listener thread and close the writers."""
+        with self._lock:
+            if not self._started:
+                return
+            self.listener.stop()
+            self._started = False
+        for handler in self.listener.handlers:
+            handler.close()
+
+    def stats(self) -> Dict[str, object]:
+        with self.handler._lock:
+            dropped = dict(self.handler.dropped)
+            enqueued = self.handler.enqueued
+        return {
+            "enqueued": enqueued,
+            "dropped": dropped,
+            "dropped_total": sum(dropped.values()),
+            "queue_depth": self.queue.qsize(),
+            "capacity": self.capacity,
+            "server_sent": self.server_handler.sent if self.server_handler else 0,
+            "server_dropped": self.server_handler.dropped if self.server_handler else 0
+        }
+
+
+_pipeline: Optional[LogPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_log_pipeline() -> LogPipeline:
+    """The process-wide logging pipeline (started on first use)."""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                pipeline = LogPipeline()
+                pipeline.start()
+                atexit.register(pipeline.stop)
+                _pipeline = pipeline
+    return _pipeline
+
+
+def get_logging_stats() -> Dict[str, object]:
+    """Enqueued/dropped record counts and current queue depth."""
+    return get_log_pipeline().stats()
+
+
 def setup_logger(
     name: str,
-    level: int = logging.DEBUG,
+    level: Optional[int] = None,
     log_file: bool = True,
-    console_output: bool = True
+    console_output: bool = True,
+    sampling: bool = False
 ) -> logging.Logger:
     """
-    Set up logger with socket handler and optionally file and console handlers
+    Set up logger that hands records to the background logging pipeline
     
     Args:
         name: Logger name
-        level: Logging level
+        level: Logging level (defaults to OPRINA_LOG_LEVEL)
         log_file: Whether to write to log file
         console_output: Whether to output to console
+        sampling: Rate-limit and deduplicate records below WARNING (see sampling.py)
     """
     logger = logging.getLogger(name)
-    logger.setLevel(level)
+    logger.setLevel(level if level is not None else LOG_LEVEL)
 
-    # Remove existing handlers
+    # Remove existing handlers and filters
     logger.handlers = []
+    logger.filters = []
 
-    # Socket handler for remote logging
-    socket_handler = logging.handlers.SocketHandler('localhost', 9020)
-    logger.addHandler(socket_handler)
+    # Sampling runs before the record is enqueued or formatted
+    if sampling and LOG_SAMPLING:
+        logger.addFilter(SamplingFilter())
 
-    # File handler
+    # Queue handler: file and socket output happen on the listener thread
+    pipeline = get_log_pipeline()
     if log_file:
-        log_dir = Path("logs")
-        log_dir.mkdir(exist_ok=True)
-        file_handler = logging.FileHandler(
-            log_dir / f"{name.replace('.', '_')}.log"
-        )
-        file_handler.setFormatter(
-            logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        )
-        logger.addHandler(file_handler)
+        pipeline.file_handler.enabled_loggers.add(name)
+    else:
+        pipeline.file_handler.enabled_loggers.discard(name)
+    logger.addHandler(pipeline.handler)
 
     # Console handler
     # if console_output:
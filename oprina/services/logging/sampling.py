@@ -0,0 +1,129 @@
+"""
+Sampling and rate limiting for chatty loggers.
+
+SamplingFilter is attached by setup_logger(..., sampling=True). For records
+below WARNING it keeps, per call site (file and line):
+
+- a token bucket: at most `burst` records at once, refilled at `rate` per second
+- deduplication: a record with the same message and arguments as the last one
+  from that site within `dedup_window` seconds is dropped
+
+The next record that passes from a site notes how many were suppressed there.
+WARNING and above always pass unchanged.
+
+Filtering happens before the record is formatted, so hot paths should log with
+%-style arguments instead of f-strings, and wrap expensive values in lazy():
+
+    logger.debug("Index map: %s", lazy(json.dumps, index_map))
+
+Environment:
+    OPRINA_LOG_SAMPLING       set to false to disable sampling (default true)
+    OPRINA_LOG_SAMPLE_RATE    records per second per call site (default 1)
+    OPRINA_LOG_SAMPLE_BURST   records a call site may emit at once (default 5)
+    OPRINA_LOG_DEDUP_WINDOW   seconds an identical record is suppressed (default 10)
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+LOG_SAMPLING = os.getenv("OPRINA_LOG_SAMPLING", "true").lower() != "false"
+SAMPLE_RATE = float(os.getenv("OPRINA_LOG_SAMPLE_RATE", "1"))
+SAMPLE_BURST = int(os.getenv("OPRINA_LOG_SAMPLE_BURST", "5"))
+DEDUP_WINDOW = float(os.getenv("OPRINA_LOG_DEDUP_WINDOW", "10"))
+
+
+class Lazy:
+    """Defers an expensive log argument until the record is actually formatted."""
+
+    __slots__ = ("func", "args", "kwargs")
+
+    def __init__(self, func: Callable, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self) -> str:
+        return str(self.func(*self.args, **self.kwargs))
+
+    def __repr__(self) -> str:
+        return repr(self.func(*self.args, **self.kwargs))
+
+
+def lazy(func: Callable, *args, **kwargs) -> Lazy:
+    """Log argument that calls func(*args, **kwargs) only if the record is emitted."""
+    return Lazy(func, *args, **kwargs)
+
+
+class _CallSite:
+    __slots__ = ("tokens", "updated", "last_msg", "last_args", "last_at", "repeats", "rate_limited")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+        self.last_msg: Any = None
+        self.last_args: Any = None
+        self.last_at = 0.0
+        self.repeats = 0
+        self.rate_limited = 0
+
+
+class SamplingFilter(logging.Filter):
+    """Per-call-site token bucket and duplicate suppression for records below passthrough_level."""
+
+    def __init__(self, rate: float = SAMPLE_RATE, burst: int = SAMPLE_BURST,
+                 dedup_window: float = DEDUP_WINDOW, passthrough_level: int = logging.WARNING):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.dedup_window = dedup_window
+        self.passthrough_level = passthrough_level
+        self._sites: Dict[Tuple[str, int], _CallSite] = {}
+        self._lock = threading.Lock()
+        self.passed = 0
+        self.suppressed_repeats = 0
+        self.suppressed_rate = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.passthrough_level:
+            return True
+
+        now = time.monotonic()
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None:
+                site = self._sites[key] = _CallSite(self.burst, now)
+
+            if (now - site.last_at < self.dedup_window and record.msg == site.last_msg
+                    and record.args == site.last_args):
+                site.repeats += 1
+                self.suppressed_repeats += 1
+                return False
+
+            site.tokens = min(self.burst, site.tokens + (now - site.updated) * self.rate)
+            site.updated = now
+            if site.tokens < 1:
+                site.rate_limited += 1
+                self.suppressed_rate += 1
+                return False
+
+            site.tokens -= 1
+            site.last_msg, site.last_args, site.last_at = record.msg, record.args, now
+            if site.repeats or site.rate_limited:
+                record.msg = (f"{record.msg} [suppressed here since last record: "
+                              f"{site.repeats} repeated, {site.rate_limited} rate-limited]")
+                site.repeats = site.rate_limited = 0
+            self.passed += 1
+            return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "passed": self.passed,
+                "suppressed_repeats": self.suppressed_repeats,
+                "suppressed_rate": self.suppressed_rate,
+                "call_sites": len(self._sites)
+            }
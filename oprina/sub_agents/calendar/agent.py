@@ -2,6 +2,8 @@
 
 from google.adk.agents import Agent
 
+from oprina.common.intent_router import dispatch_tool_call
+from oprina.common.prompt_cache import cache_static_prompt, instruction_for
 from oprina.sub_agents.calendar import prompt
 from oprina.tools.calendar import CALENDAR_TOOLS
 
@@ -9,8 +11,9 @@ calendar_agent = Agent(
     model="gemini-2.0-flash",
     name="calendar_agent",
     description="Handles Google Calendar operations including events, scheduling, and availability",
-    instruction=prompt.CALENDAR_AGENT_INSTR,
+    instruction=instruction_for("calendar_agent", prompt.CALENDAR_AGENT_INSTR),
     tools=CALENDAR_TOOLS,
+    before_model_callback=[dispatch_tool_call, cache_static_prompt],
 )
 
 # # ADK evaluation framework expects 'root_agent' variable
@@ -2,6 +2,9 @@
 
 from google.adk.agents import Agent
 
+from oprina.common.intent_router import dispatch_tool_call
+from oprina.common.prompt_cache import cache_static_prompt, instruction_for
+from oprina.common.tool_selection import select_email_tools
 from oprina.sub_agents.email import prompt
 from oprina.tools.gmail import GMAIL_TOOLS
 
@@ -9,8 +12,9 @@ email_agent = Agent(
     model="gemini-2.0-flash",
     name="email_agent",
     description="Handles Gmail operations with direct API access and session state integration",
-    instruction=prompt.EMAIL_AGENT_INSTR,
+    instruction=instruction_for("email_agent", prompt.EMAIL_AGENT_INSTR),
     tools=GMAIL_TOOLS,
+    before_model_callback=[select_email_tools, dispatch_tool_call, cache_static_prompt],
 )
 
 # # ADK evaluation framework expects 'root_agent' variable
@@ -0,0 +1,127 @@
+"""
+Benchmark: fast-path intent router accuracy and latency.
+
+Classifies the recorded utterance set (data/router_utterances.json) plus the
+user turns from the ADK eval sets and reports:
+
+- coverage: share of turns the router handles without the LLM router
+- mis-routes: routed turns that went to the wrong agent or tool, or that
+  should have gone to the LLM (the number that must stay at zero)
+- classify latency per utterance
+- LLM calls per turn with and without the router
+
+Usage:
+    python oprina/tests/benchmarks/benchmark_intent_router.py [--repeat 200]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+current_file = os.path.abspath(__file__)
+project_root = current_file
+for _ in range(4):  # Go up 4 levels from tests/benchmarks/benchmark_intent_router.py
+    project_root = os.path.dirname(project_root)
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from oprina.common.intent_router import classify
+
+UTTERANCES_FILE = Path(__file__).parent / "data" / "router_utterances.json"
+EVAL_DATA_DIR = Path(project_root) / "oprina" / "eval" / "data"
+
+# LLM calls for a single-tool turn: root routing, sub-agent tool choice, sub-agent answer
+LLM_CALLS_BASELINE = 3
+
+
+def _expected_from_tools(tools: list) -> tuple:
+    """Expected agent/tool for an eval turn, judged by the tools the reference run used."""
+    agents = {"email_agent" if t.startswith("gmail_") else "calendar_agent" if t.startswith("calendar_") else None
+              for t in tools}
+    if len(agents) != 1 or None in agents:
+        return None, None
+    return agents.pop(), tools[0] if len(tools) == 1 else None
+
+
+def load_utterances() -> list:
+    cases = [(u["text"], u["agent"], u["tool"]) for u in json.loads(UTTERANCES_FILE.read_text())["utterances"]]
+    for path in sorted(EVAL_DATA_DIR.glob("*.test.json")):
+        for case in json.loads(path.read_text()).get("eval_cases", []):
+            for turn in case.get("conversation", []):
+                text = " ".join(p.get("text", "") for p in turn["user_content"]["parts"])
+                tools = [t["name"] for t in turn.get("intermediate_data", {}).get("tool_uses", [])]
+                cases.append((text, *_expected_from_tools(tools)))
+    return cases
+
+
+def evaluate(cases: list) -> dict:
+    routed = tool_dispatched = misroutes = 0
+    llm_calls = 0
+    failures = []
+    for text, agent, tool in cases:
+        intent = classify(text)
+        if intent is None:
+            llm_calls += LLM_CALLS_BASELINE
+            continue
+        routed += 1
+        # A tool dispatch must match the reference tool; an agent-only route must match the agent
+        wrong = intent.agent != agent or (intent.tool is not None and intent.tool != tool)
+        if wrong:
+            misroutes += 1
+            failures.append((text, agent, tool, intent))
+        if intent.tool is not None:
+            tool_dispatched += 1
+            llm_calls += 1
+        else:
+            llm_calls += LLM_CALLS_BASELINE - 1
+    return {
+        "turns": len(cases),
+        "routed": routed,
+        "tool_dispatched": tool_dispatched,
+        "coverage_pct": round(100 * routed / len(cases), 1),
+        "misroutes": misroutes,
+        "llm_calls_per_turn": round(llm_calls / len(cases), 2),
+        "llm_calls_per_turn_baseline": LLM_CALLS_BASELINE,
+        "failures": failures
+    }
+
+
+def measure_latency(cases: list, repeat: int) -> dict:
+    samples = []
+    for text, _, _ in cases:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            classify(text)
+        samples.append((time.perf_counter() - started) / repeat * 1e6)
+    samples.sort()
+    return {
+        "classify_us_p50": round(statistics.median(samples), 1),
+        "classify_us_p95": round(samples[int(len(samples) * 0.95) - 1], 1),
+        "classify_us_max": round(samples[-1], 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200, help="classifications per utterance for timing")
+    args = parser.parse_args()
+    
+    cases = load_utterances()
+    result = evaluate(cases)
+    failures = result.pop("failures")
+    result.update(measure_latency(cases, args.repeat))
+    
+    for key, value in result.items():
+        print(f"  {key:<30}{value}")
+    for text, agent, tool, intent in failures:
+        print(f"  MIS-ROUTE {text!r}: expected {agent}/{tool}, got {intent}")
+
+
+if __name__ == '__main__':
+    main()
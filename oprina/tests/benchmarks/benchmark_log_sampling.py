@@ -0,0 +1,96 @@
+"""
+Benchmark: log records emitted and CPU spent logging on the Gmail hot path.
+
+Repeatedly lists messages and resolves position/sender references (the
+GET_MESSAGE/RESOLVE trace paths) against a mocked Gmail service, with and without
+the sampling filter on the gmail_tools and auth_utils loggers. Reports records
+handed to the logging pipeline and process CPU time per call.
+
+Usage:
+    python oprina/tests/benchmarks/benchmark_log_sampling.py [--calls 2000] [--level DEBUG]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from unittest.mock import Mock, patch
+
+# Add project root to path
+current_file = os.path.abspath(__file__)
+project_root = current_file
+for _ in range(4):  # Go up 4 levels from tests/benchmarks/benchmark_log_sampling.py
+    project_root = os.path.dirname(project_root)
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from oprina.services.logging.logger import get_log_pipeline
+from oprina.services.logging.sampling import SamplingFilter
+from oprina.tools.gmail import gmail_list_messages, _get_message_id_by_reference
+
+LOGGER_NAMES = ("gmail_tools", "auth_utils")
+
+
+def _gmail_service():
+    service = Mock()
+    service.users().messages().list().execute.return_value = {
+        'messages': [{'id': f'msg{i}'} for i in range(10)]
+    }
+    service.users().messages().get().execute.return_value = {
+        'payload': {'headers': [
+            {'name': 'From', 'value': 'Sender <sender@example.com>'},
+            {'name': 'Subject', 'value': 'Quarterly planning follow-up'},
+            {'name': 'Date', 'value': 'Mon, 15 Jan 2024 10:00:00 +0000'}
+        ]}
+    }
+    return service
+
+
+def _run(calls: int, sampled: bool, level: int) -> dict:
+    for name in LOGGER_NAMES:
+        logger = logging.getLogger(name)
+        logger.setLevel(level)
+        logger.filters = [SamplingFilter()] if sampled else []
+    
+    pipeline = get_log_pipeline()
+    enqueued_before = pipeline.handler.enqueued
+    dropped_before = sum(pipeline.handler.dropped.values())
+    
+    tool_context = Mock()
+    tool_context.state = {}
+    references = ["3", "the fifth one", "sender", "quarterly", "yes"]
+    
+    with patch('oprina.tools.gmail.get_gmail_service', return_value=_gmail_service()):
+        started = time.process_time()
+        for i in range(calls):
+            if i % 10 == 0:
+                gmail_list_messages(max_results=10, tool_context=tool_context)
+            _get_message_id_by_reference(references[i % len(references)], tool_context)
+        cpu = time.process_time() - started
+    
+    records = (pipeline.handler.enqueued - enqueued_before) + (sum(pipeline.handler.dropped.values()) - dropped_before)
+    return {
+        "records": records,
+        "records_per_call": round(records / calls, 2),
+        "cpu_us_per_call": round(cpu / calls * 1e6, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--level", default="DEBUG")
+    args = parser.parse_args()
+    level = logging.getLevelName(args.level.upper())
+    
+    print(f"{args.calls} reference resolutions at {args.level.upper()}\n")
+    print(f"{'mode':<12}{'records':>10}{'records/call':>15}{'cpu us/call':>14}")
+    for label, sampled in (("unsampled", False), ("sampled", True)):
+        result = _run(args.calls, sampled, level)
+        print(f"{label:<12}{result['records']:>10}{result['records_per_call']:>15}{result['cpu_us_per_call']:>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: log collector ingest throughput from several agent processes.
+
+Starts a LogCollector in this process, then spawns client processes that each
+send records through BatchSocketHandler (the same sender the agent logging
+pipeline uses). Reports records/second from first send to last record written.
+
+Usage:
+    python oprina/tests/benchmarks/benchmark_log_server.py [--clients 4] [--records 50000]
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+current_file = os.path.abspath(__file__)
+project_root = current_file
+for _ in range(4):  # Go up 4 levels from tests/benchmarks/benchmark_log_server.py
+    project_root = os.path.dirname(project_root)
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from oprina.services.logging.log_server import LogCollector
+from oprina.services.logging.logger import BatchSocketHandler
+
+
+def _client(port: int, client_id: int, records: int) -> None:
+    handler = BatchSocketHandler('localhost', port)
+    for i in range(records):
+        record = logging.LogRecord(f"bench_client_{client_id}", logging.INFO, __file__, 1,
+                                   "GET_MESSAGE: resolved reference %s to message %s", (i, f"msg{i}"), None)
+        handler.handle(record)
+    handler.close()
+
+
+async def _run(clients: int, records: int) -> dict:
+    collector = LogCollector(port=0, log_dir=Path(tempfile.mkdtemp()), console_level=None, metrics_interval=0)
+    await collector.start()
+    
+    processes = [multiprocessing.Process(target=_client, args=(collector.port, i, records)) for i in range(clients)]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    
+    expected = clients * records
+    while collector.metrics["records_written"] < expected and any(p.is_alive() for p in processes):
+        await asyncio.sleep(0.05)
+    while collector.metrics["records_written"] < collector.metrics["records_received"]:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    
+    for process in processes:
+        process.join()
+    await collector.stop()
+    
+    metrics = collector.get_metrics()
+    return {
+        "written": metrics["records_written"],
+        "expected": expected,
+        "seconds": round(elapsed, 2),
+        "records_per_second": round(metrics["records_written"] / elapsed),
+        "backpressure_waits": metrics["backpressure_waits"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--records", type=int, default=50000, help="records per client")
+    args = parser.parse_args()
+    
+    result = asyncio.run(_run(args.clients, args.records))
+    print(f"{args.clients} clients x {args.records} records")
+    for key, value in result.items():
+        print(f"  {key:<20}{value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark: per-turn input tokens with prompt compaction and static prompt caching.
+
+Prints the instruction token report, then replays a number of turns per agent
+through PromptCache backed by LocalCacheProvider. For each turn it counts the
+input tokens sent uncached: the system instruction and tool declarations,
+unless the request was switched to cached content, plus the user message.
+
+With --live the same requests go to Gemini (needs GOOGLE_API_KEY or Vertex AI
+credentials). The benchmark then reports time to first token and the
+provider's prompt and cached token counts, with and without the cache.
+
+Usage:
+    python oprina/tests/benchmarks/benchmark_prompt_cache.py [--turns 20] [--live]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+# Add project root to path
+current_file = os.path.abspath(__file__)
+project_root = current_file
+for _ in range(4):  # Go up 4 levels from tests/benchmarks/benchmark_prompt_cache.py
+    project_root = os.path.dirname(project_root)
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from oprina.common.prompt_cache import (
+    GeminiCacheProvider, LocalCacheProvider, PromptCache, built_agent_prompts, estimate_tokens, token_report
+)
+from oprina.tools.calendar import CALENDAR_TOOLS
+from oprina.tools.gmail import GMAIL_TOOLS
+
+MODEL = "gemini-2.0-flash"
+AGENT_TOOLS = {"oprina": [], "email_agent": GMAIL_TOOLS, "calendar_agent": CALENDAR_TOOLS}
+USER_MESSAGE = "What's on my calendar tomorrow afternoon?"
+
+
+def _request(agent: str, compact: bool) -> LlmRequest:
+    request = LlmRequest(model=MODEL)
+    request.config.system_instruction = built_agent_prompts(compact)[agent].text
+    if AGENT_TOOLS[agent]:
+        request.append_tools(AGENT_TOOLS[agent])
+    request.contents = [types.Content(role="user", parts=[types.Part(text=USER_MESSAGE)])]
+    return request
+
+
+def _uncached_tokens(request: LlmRequest) -> int:
+    config = request.config
+    tokens = estimate_tokens(USER_MESSAGE)
+    if not config.cached_content:
+        tokens += estimate_tokens(config.system_instruction or "")
+        tokens += estimate_tokens(json.dumps([t.model_dump(exclude_none=True) for t in config.tools or []]))
+    return tokens
+
+
+def replay(turns: int, compact: bool, cached: bool) -> dict:
+    cache = PromptCache(provider=LocalCacheProvider())
+    per_turn = []
+    for agent in AGENT_TOOLS:
+        for _ in range(turns):
+            request = _request(agent, compact)
+            if cached:
+                cache.apply(request)
+            per_turn.append(_uncached_tokens(request))
+    return {"input_tokens_per_turn": round(statistics.mean(per_turn)), **cache.stats()}
+
+
+def live(turns: int) -> None:
+    provider = GeminiCacheProvider()
+    cache = PromptCache(provider=provider)
+    for agent in AGENT_TOOLS:
+        for cached in (False, True):
+            ttfts, prompt_tokens, cached_tokens = [], [], []
+            for _ in range(turns):
+                request = _request(agent, compact=False)
+                if cached and not cache.apply(request):
+                    break
+                started = time.perf_counter()
+                first_token = usage = None
+                for chunk in provider.client.models.generate_content_stream(
+                        model=MODEL, contents=request.contents, config=request.config):
+                    first_token = first_token or time.perf_counter()
+                    usage = chunk.usage_metadata or usage
+                ttfts.append((first_token - started) * 1000)
+                prompt_tokens.append(usage.prompt_token_count if usage else 0)
+                cached_tokens.append((usage.cached_content_token_count or 0) if usage else 0)
+            if not ttfts:
+                print(f"  {agent:<16}{'cached' if cached else 'plain':<8} below the minimum cacheable size")
+                continue
+            print(f"  {agent:<16}{'cached' if cached else 'plain':<8}ttft p50 {statistics.median(ttfts):7.0f} ms"
+                  f"  prompt {statistics.mean(prompt_tokens):7.0f}  cached {statistics.mean(cached_tokens):7.0f}")
+    cache.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20, help="turns per agent")
+    parser.add_argument("--live", action="store_true", help="also measure against Gemini")
+    args = parser.parse_args()
+    
+    print(f"{'agent':<16}{'tokens':>8}{'compact':>9}  fingerprint")
+    for row in token_report():
+        print(f"{row['agent']:<16}{row['tokens']:>8}{row['compact_tokens']:>9}  "
+              f"{row['fingerprint']} -> {row['compact_fingerprint']}")
+    
+    print(f"\n{args.turns} turns per agent, estimated uncached input tokens")
+    print(f"{'mode':<20}{'tokens/turn':>12}{'creates':>9}{'hits':>7}")
+    for label, compact, cached in (("baseline", False, False), ("compact", True, False),
+                                   ("cached", False, True), ("compact + cached", True, True)):
+        result = replay(args.turns, compact, cached)
+        print(f"{label:<20}{result['input_tokens_per_turn']:>12}{result['creates']:>9}{result['hits']:>7}")
+    
+    if args.live:
+        print("\nlive")
+        live(args.turns)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark: session state delta per tool turn, with and without coalesced writes.
+
+Runs gmail_list_messages and calendar_list_events against mocked Google services
+on a real ADK State, then persists each turn's delta through the in-memory ADK
+session service (the same append_event path the Vertex session service uses).
+
+Reports, per turn:
+- state assignments made by the tool (including update_agent_activity)
+- writes that reached the ADK State
+- keys and serialized bytes in the persisted delta
+- time to persist the delta
+
+Usage:
+    python oprina/tests/benchmarks/benchmark_state_writes.py [--turns 50]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from unittest.mock import Mock, patch
+
+# Add project root to path
+current_file = os.path.abspath(__file__)
+project_root = current_file
+for _ in range(4):  # Go up 4 levels from tests/benchmarks/benchmark_state_writes.py
+    project_root = os.path.dirname(project_root)
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from google.adk.events import Event, EventActions
+from google.adk.sessions import InMemorySessionService
+from google.adk.sessions.state import State
+
+from oprina.common import state_transaction
+from oprina.tools.gmail import gmail_list_messages
+from oprina.tools.calendar import calendar_list_events
+
+
+class CountingState(State):
+    """ADK State that counts writes reaching it."""
+    
+    def __init__(self, value, delta):
+        super().__init__(value=value, delta=delta)
+        self.writes = 0
+    
+    def __setitem__(self, key, value):
+        self.writes += 1
+        super().__setitem__(key, value)
+    
+    def update(self, delta):
+        self.writes += 1
+        super().update(delta)
+
+
+class BenchToolContext:
+    """Minimal stand-in for an ADK ToolContext backed by a real State."""
+    
+    def __init__(self, session):
+        self.session = session
+        self.state = CountingState(value=session.state, delta={})
+        self._invocation_context = Mock(user_id=session.user_id)
+
+
+def _gmail_service(message_count=10):
+    service = Mock()
+    service.users().messages().list().execute.return_value = {
+        'messages': [{'id': f'msg{i}'} for i in range(message_count)]
+    }
+    service.users().messages().get().execute.side_effect = lambda: {
+        'payload': {'headers': [
+            {'name': 'From', 'value': 'Sender <sender@example.com>'},
+            {'name': 'Subject', 'value': 'Quarterly planning follow-up'},
+            {'name': 'Date', 'value': 'Mon, 15 Jan 2024 10:00:00 +0000'}
+        ]}
+    }
+    return service
+
+
+def _calendar_service(event_count=10):
+    service = Mock()
+    service.events().list().execute.return_value = {
+        'items': [{
+            'id': f'evt{i}', 'summary': f'Meeting {i}',
+            'start': {'dateTime': '2030-01-15T10:00:00Z'}, 'end': {'dateTime': '2030-01-15T11:00:00Z'}
+        } for i in range(event_count)]
+    }
+    return service
+
+
+async def _run(turns: int, coalesce: bool) -> dict:
+    session_service = InMemorySessionService()
+    session = await session_service.create_session(app_name="oprina", user_id="bench-user")
+    
+    totals = {"assignments": 0, "state_writes": 0, "delta_keys": 0, "delta_bytes": 0, "persist_ms": 0.0}
+    original_commit = state_transaction.StateTransaction.commit
+    
+    def counting_commit(transaction):
+        stats = original_commit(transaction)
+        totals["assignments"] += stats["writes"]
+        return stats
+    
+    with patch.object(state_transaction, 'COALESCE_STATE_WRITES', coalesce), \
+         patch.object(state_transaction.StateTransaction, 'commit', counting_commit), \
+         patch('oprina.tools.gmail.get_gmail_service', return_value=_gmail_service()), \
+         patch('oprina.tools.calendar.get_calendar_service', return_value=_calendar_service()), \
+         patch('oprina.tools.calendar._get_event_cache', return_value=None):
+        for turn in range(turns):
+            tool_context = BenchToolContext(session)
+            if turn % 2 == 0:
+                gmail_list_messages(max_results=10, tool_context=tool_context)
+            else:
+                calendar_list_events(days=7, tool_context=tool_context)
+            
+            if not coalesce:
+                totals["assignments"] += tool_context.state.writes
+            
+            delta = dict(tool_context.state._delta)
+            totals["state_writes"] += tool_context.state.writes
+            totals["delta_keys"] += len(delta)
+            totals["delta_bytes"] += len(json.dumps(delta, default=str))
+            
+            event = Event(author="email_agent", invocation_id=f"turn-{turn}",
+                          actions=EventActions(state_delta=delta))
+            started = time.perf_counter()
+            await session_service.append_event(session, event)
+            totals["persist_ms"] += (time.perf_counter() - started) * 1000
+    
+    return {key: round(value / turns, 3) for key, value in totals.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+    
+    print(f"Per-turn averages over {args.turns} turns (alternating email and calendar listings)\n")
+    print(f"{'mode':<12}{'assignments':>13}{'state writes':>14}{'delta keys':>12}{'delta bytes':>13}{'persist ms':>12}")
+    for label, coalesce in (("direct", False), ("coalesced", True)):
+        result = asyncio.run(_run(args.turns, coalesce))
+        print(f"{label:<12}{result['assignments']:>13}{result['state_writes']:>14}"
+              f"{result['delta_keys']:>12}{result['delta_bytes']:>13}{result['persist_ms']:>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark: email_agent tool declarations per model call with and without tool selection.
+
+Replays the conversations in data/email_conversations.json through the email
+ToolSelector, building each turn's LlmRequest from GMAIL_TOOLS the way ADK
+does. Reports, per turn:
+
+- tool declarations sent to the model and their estimated prompt tokens
+  (serialized declaration size / 4 characters per token)
+- recall: turns where every tool the turn needs was exposed
+- time spent selecting and serializing the tool config
+
+Usage:
+    python oprina/tests/benchmarks/benchmark_tool_selection.py [--repeat 50]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+# Add project root to path
+current_file = os.path.abspath(__file__)
+project_root = current_file
+for _ in range(4):  # Go up 4 levels from tests/benchmarks/benchmark_tool_selection.py
+    project_root = os.path.dirname(project_root)
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from oprina.common import tool_selection
+from oprina.common.session_keys import EMAIL_LAST_OPERATION_TYPE
+from oprina.common.tool_selection import EMAIL_TOOL_SELECTOR
+from oprina.sub_agents.email.prompt import EMAIL_AGENT_INSTR
+from oprina.tools.gmail import GMAIL_TOOLS
+
+CONVERSATIONS_FILE = Path(__file__).parent / "data" / "email_conversations.json"
+CHARS_PER_TOKEN = 4
+
+# Operations gmail.py records in EMAIL_LAST_OPERATION_TYPE
+TRACKED_OPERATIONS = {"mark_as_read", "archive_message", "star_message", "unstar_message", "mark_important"}
+
+
+def _request() -> LlmRequest:
+    request = LlmRequest()
+    request.append_tools(GMAIL_TOOLS)
+    return request
+
+
+def _declarations(request: LlmRequest) -> list:
+    return [d for tool in request.config.tools for d in (tool.function_declarations or [])]
+
+
+def _tokens(request: LlmRequest) -> int:
+    return len(json.dumps([d.model_dump(exclude_none=True) for d in _declarations(request)])) // CHARS_PER_TOKEN
+
+
+def _replay(conversations: list, selected: bool) -> dict:
+    declarations, tokens, timings = [], [], []
+    recalled = turns = 0
+    for conversation in conversations:
+        state = {}
+        for number, turn in enumerate(conversation):
+            context = Mock()
+            context.state = state
+            context.agent_name = "email_agent"
+            context.invocation_id = f"inv-{number}"
+            context.user_content = types.Content(role="user", parts=[types.Part(text=turn["text"])])
+            
+            request = _request()
+            started = time.perf_counter()
+            if selected:
+                EMAIL_TOOL_SELECTOR.before_model_callback(context, request)
+            request.config.model_dump_json(exclude_none=True)
+            timings.append((time.perf_counter() - started) * 1e6)
+            
+            exposed = {d.name for d in _declarations(request)}
+            declarations.append(len(exposed))
+            tokens.append(_tokens(request))
+            turns += 1
+            recalled += set(turn["tools"]) <= exposed
+            
+            for tool in turn["tools"]:
+                if tool.startswith("gmail_") and tool[len("gmail_"):] in TRACKED_OPERATIONS:
+                    state[EMAIL_LAST_OPERATION_TYPE] = tool[len("gmail_"):]
+    return {
+        "turns": turns,
+        "declarations_per_call": round(statistics.mean(declarations), 1),
+        "declaration_tokens_per_call": round(statistics.mean(tokens)),
+        "recall_pct": round(100 * recalled / turns, 1),
+        "select_and_serialize_us_p50": round(statistics.median(timings), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50, help="replays of the conversation set for timing")
+    args = parser.parse_args()
+    
+    conversations = json.loads(CONVERSATIONS_FILE.read_text())["conversations"] * args.repeat
+    instruction_tokens = len(EMAIL_AGENT_INSTR) // CHARS_PER_TOKEN
+    
+    with patch.object(tool_selection, 'TOOL_SELECTION_ENABLED', True):
+        results = {label: _replay(conversations, selected) for label, selected in (("all tools", False), ("selected", True))}
+    
+    print(f"email_agent instruction: ~{instruction_tokens} tokens per call\n")
+    print(f"{'mode':<12}{'decls/call':>12}{'decl tokens':>13}{'recall %':>10}{'us/call':>10}")
+    for label, result in results.items():
+        print(f"{label:<12}{result['declarations_per_call']:>12}{result['declaration_tokens_per_call']:>13}"
+              f"{result['recall_pct']:>10}{result['select_and_serialize_us_p50']:>10}")
+    
+    saved = results["all tools"]["declaration_tokens_per_call"] - results["selected"]["declaration_tokens_per_call"]
+    total = results["all tools"]["declaration_tokens_per_call"] + instruction_tokens
+    print(f"\nsaved ~{saved} prompt tokens per model call ({100 * saved / total:.0f}% of instruction + tools)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,340 @@
+"""
+Unit tests for the Calendar event cache - title index and fuzzy matching
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import os
+import sys
+import time
+
+# Add project root to path
+current_file = os.path.abspath(__file__)
+project_root = current_file
+for _ in range(4):  # Go up 4 levels from tests/unit/test_calendar_cache.py
+    project_root = os.path.dirname(project_root)
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from oprina.tools.calendar_cache import (
+    CalendarEventCache, title_similarity, normalize_title, get_event_cache, clear_event_cache
+)
+from oprina.tools.calendar import (
+    calendar_create_event, calendar_delete_event, calendar_update_event, calendar_batch_delete_events,
+    _find_event_by_summary
+)
+
+
+def _ts_utc(value):
+    from datetime import datetime
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _event(event_id, summary, start='2024-01-15T12:00:00+00:00'):
+    return {
+        'id': event_id,
+        'summary': summary,
+        'start': {'dateTime': start},
+        'end': {'dateTime': start}
+    }
+
+
+class TestTitleSimilarity(unittest.TestCase):
+    """Test title normalization and scoring"""
+    
+    def test_normalize_title(self):
+        self.assertEqual(normalize_title("  Team-Lunch: Planning!! "), "team lunch planning")
+    
+    def test_exact_title_scores_highest(self):
+        self.assertEqual(title_similarity("lunch", "Lunch"), 1.0)
+        self.assertGreater(title_similarity("lunch", "Lunch"), title_similarity("lunch", "Team Lunch Planning"))
+    
+    def test_unrelated_short_title_does_not_match(self):
+        """A title that merely appears inside the query should not be a match"""
+        self.assertLess(title_similarity("lunch with sarah", "a"), 0.6)
+        self.assertLess(title_similarity("lunch", "Launch Review"), 0.6)
+
+
+class TestCalendarEventCache(unittest.TestCase):
+    """Test the per-user event cache and title index"""
+    
+    def setUp(self):
+        self.cache = CalendarEventCache()
+    
+    def test_ranked_search_prefers_exact_title(self):
+        self.cache.add_events([
+            _event('e1', 'Team Lunch Planning'),
+            _event('e2', 'Lunch'),
+            _event('e3', 'Launch Review'),
+        ])
+        
+        results = self.cache.search("lunch")
+        
+        self.assertEqual(results[0][2]['id'], 'e2')
+        self.assertNotIn('e3', [event['id'] for _, similarity, event in results if similarity >= 0.6])
+    
+    def test_date_proximity_breaks_ties(self):
+        """Recurring instances share a title; the nearest one should win"""
+        now = time.time()
+        self.cache.add_events([
+            _event('far', 'Standup', time.strftime('%Y-%m-%dT09:00:00+00:00', time.gmtime(now + 20 * 86400))),
+            _event('near', 'Standup', time.strftime('%Y-%m-%dT09:00:00+00:00', time.gmtime(now + 86400))),
+        ])
+        
+        self.assertEqual(self.cache.find_best("standup")['id'], 'near')
+    
+    def test_removed_and_expired_events_are_not_returned(self):
+        self.cache.add_event(_event('e1', 'Dentist'))
+        self.cache.remove_event('e1')
+        self.assertIsNone(self.cache.find_best("dentist"))
+        
+        expiring = CalendarEventCache(ttl_seconds=0)
+        expiring.add_event(_event('e2', 'Dentist'))
+        time.sleep(0.01)
+        self.assertIsNone(expiring.find_best("dentist"))
+        self.assertEqual(len(expiring), 0)
+    
+    def test_calendar_ids_are_kept_separate(self):
+        self.cache.add_event(_event('e1', 'Offsite'), calendar_id='team@group.calendar.google.com')
+        self.assertIsNone(self.cache.find_best("offsite"))
+        self.assertIsNotNone(self.cache.find_best("offsite", 'team@group.calendar.google.com'))
+    
+    def test_max_events_evicts_oldest(self):
+        cache = CalendarEventCache(max_events=2)
+        cache.add_events([_event('e1', 'One'), _event('e2', 'Two'), _event('e3', 'Three')])
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.find_best("one"))
+    
+    def test_search_is_fast_on_large_index(self):
+        """Ranked lookups should stay well under a millisecond for a busy calendar"""
+        self.cache.add_events([_event(f'e{i}', f'Meeting {i} with client {i % 37}') for i in range(2000)])
+        self.cache.add_event(_event('target', 'Quarterly Budget Review'))
+        
+        started = time.perf_counter()
+        for _ in range(100):
+            match = self.cache.find_best("budget review")
+        elapsed_ms = (time.perf_counter() - started) * 1000 / 100
+        
+        self.assertEqual(match['id'], 'target')
+        self.assertLess(elapsed_ms, 5)
+
+
+class TestIntervalIndex(unittest.TestCase):
+    """Test overlap queries and window coverage"""
+    
+    def setUp(self):
+        self.cache = CalendarEventCache()
+        self.cache.add_events([
+            {'id': 'morning', 'summary': 'Morning', 'start': {'dateTime': '2024-01-15T09:00:00+00:00'},
+             'end': {'dateTime': '2024-01-15T10:00:00+00:00'}},
+            {'id': 'offsite', 'summary': 'Offsite', 'start': {'dateTime': '2024-01-15T08:00:00+00:00'},
+             'end': {'dateTime': '2024-01-15T17:00:00+00:00'}},
+            {'id': 'lunch', 'summary': 'Lunch', 'start': {'dateTime': '2024-01-15T12:00:00+00:00'},
+             'end': {'dateTime': '2024-01-15T13:00:00+00:00'}},
+            {'id': 'holiday', 'summary': 'Holiday', 'start': {'date': '2024-01-15'}, 'end': {'date': '2024-01-16'}},
+        ])
+    
+    def _ts(self, hour, minute=0):
+        return _ts_utc(f'2024-01-15T{hour:02d}:{minute:02d}:00+00:00')
+    
+    def test_overlap_query_includes_long_running_events(self):
+        ids = {e['id'] for e in self.cache.find_overlapping('primary', self._ts(12, 30), self._ts(14))}
+        self.assertEqual(ids, {'offsite', 'lunch'})
+    
+    def test_touching_events_and_all_day_events_do_not_conflict(self):
+        ids = {e['id'] for e in self.cache.find_overlapping('primary', self._ts(17), self._ts(18))}
+        self.assertEqual(ids, set())
+        ids = {e['id'] for e in self.cache.find_overlapping('primary', self._ts(10), self._ts(11), exclude_id='offsite')}
+        self.assertEqual(ids, set())
+    
+    def test_shared_event_kept_per_calendar(self):
+        """An invited meeting has the same id on primary and on a shared calendar"""
+        team = 'team@group.calendar.google.com'
+        sync = {'id': 'sync', 'summary': 'Team Sync', 'start': {'dateTime': '2024-01-15T15:00:00+00:00'},
+                'end': {'dateTime': '2024-01-15T15:30:00+00:00'}}
+        self.cache.add_event(sync)
+        self.cache.add_event(sync, calendar_id=team)
+        
+        for calendar_id in ('primary', team):
+            ids = {e['id'] for e in self.cache.find_overlapping(calendar_id, self._ts(15), self._ts(16))}
+            self.assertIn('sync', ids)
+            self.assertIsNotNone(self.cache.find_best("team sync", calendar_id))
+        
+        self.cache.remove_event('sync', team)
+        self.assertIsNone(self.cache.get_event('sync', team))
+        self.assertIsNotNone(self.cache.get_event('sync'))
+    
+    def test_window_coverage(self):
+        self.cache.mark_window_covered('primary', self._ts(0), self._ts(23))
+        self.assertTrue(self.cache.covers('primary', self._ts(9), self._ts(10)))
+        self.assertFalse(self.cache.covers('primary', self._ts(22), self._ts(23, 30)))
+        self.assertFalse(self.cache.covers('team', self._ts(9), self._ts(10)))
+
+
+class TestConflictDetection(unittest.TestCase):
+    """Test conflict reporting on create and update"""
+    
+    def setUp(self):
+        clear_event_cache()
+        self.mock_session = Mock()
+        self.mock_session.state = {}
+        self.mock_tool_context = Mock()
+        self.mock_tool_context.session = self.mock_session
+        self.mock_tool_context.state = self.mock_session.state
+        self.mock_tool_context._invocation_context.user_id = "conflict_test_user"
+        
+        self.mock_service = Mock()
+        self.mock_service.settings().list().execute.return_value = {
+            'items': [{'id': 'timezone', 'value': 'UTC'}]
+        }
+        self.mock_service.events().insert.return_value.execute.return_value = {'id': 'new_event', 'summary': 'Review'}
+        
+        cache = get_event_cache("conflict_test_user")
+        cache.add_event({'id': 'standup', 'summary': 'Standup', 'start': {'dateTime': '2024-01-15T14:30:00+00:00'},
+                         'end': {'dateTime': '2024-01-15T15:00:00+00:00'}})
+        cache.mark_window_covered('primary', _ts_utc('2024-01-15T00:00:00+00:00'), _ts_utc('2024-01-16T00:00:00+00:00'))
+    
+    def tearDown(self):
+        clear_event_cache()
+    
+    @patch('oprina.tools.calendar.get_calendar_service')
+    def test_create_reports_conflicts_from_cached_window(self, mock_get_service):
+        mock_get_service.return_value = self.mock_service
+        
+        result = calendar_create_event(summary="Review", start_time="2024-01-15 14:00", end_time="2024-01-15 15:00",
+                                       tool_context=self.mock_tool_context)
+        
+        self.assertEqual([c['id'] for c in result['conflicts']], ['standup'])
+        self.mock_service.events().list.assert_not_called()
+        self.assertEqual(len(self.mock_session.state["calendar:last_conflicts"]), 1)
+    
+    @patch('oprina.tools.calendar.get_calendar_service')
+    def test_create_outside_cached_window_fetches_only_the_slot(self, mock_get_service):
+        mock_get_service.return_value = self.mock_service
+        self.mock_service.events().list.return_value.execute.return_value = {'items': []}
+        
+        result = calendar_create_event(summary="Review", start_time="2024-01-20 14:00", end_time="2024-01-20 15:00",
+                                       tool_context=self.mock_tool_context)
+        
+        self.assertNotIn('conflicts', result)
+        list_kwargs = self.mock_service.events().list.call_args.kwargs
+        self.assertEqual(list_kwargs['timeMin'], '2024-01-20T14:00:00Z')
+        self.assertEqual(list_kwargs['timeMax'], '2024-01-20T15:00:00Z')
+    
+    @patch('oprina.tools.calendar.get_calendar_service')
+    def test_update_excludes_the_event_itself(self, mock_get_service):
+        mock_get_service.return_value = self.mock_service
+        standup_id = 'standup_event_id_0000001'
+        get_event_cache("conflict_test_user").add_event({
+            'id': standup_id, 'summary': 'Planning', 'start': {'dateTime': '2024-01-15T10:00:00+00:00'},
+            'end': {'dateTime': '2024-01-15T11:00:00+00:00'}})
+        self.mock_service.events().get.return_value.execute.return_value = {
+            'id': standup_id, 'summary': 'Planning',
+            'start': {'dateTime': '2024-01-15T10:00:00+00:00', 'timeZone': 'UTC'},
+            'end': {'dateTime': '2024-01-15T11:00:00+00:00', 'timeZone': 'UTC'}}
+        self.mock_service.events().update.return_value.execute.return_value = {'id': standup_id, 'summary': 'Planning'}
+        
+        result = calendar_update_event(event_id=standup_id, start_time="2024-01-15 10:30", end_time="2024-01-15 11:30",
+                                       tool_context=self.mock_tool_context)
+        self.assertNotIn('conflicts', result)
+        
+        result = calendar_update_event(event_id=standup_id, start_time="2024-01-15 14:45", end_time="2024-01-15 15:45",
+                                       tool_context=self.mock_tool_context)
+        self.assertEqual([c['id'] for c in result['conflicts']], ['standup'])
+
+
+class TestCachedTitleLookup(unittest.TestCase):
+    """Test that update/delete resolve titles through the cache"""
+    
+    def setUp(self):
+        self.mock_session = Mock()
+        self.mock_session.state = {}
+        self.mock_tool_context = Mock()
+        self.mock_tool_context.session = self.mock_session
+        self.mock_tool_context.state = self.mock_session.state
+        self.mock_tool_context._invocation_context.user_id = "cache_test_user"
+        clear_event_cache()
+    
+    def tearDown(self):
+        clear_event_cache()
+    
+    @patch('oprina.tools.calendar.get_calendar_service')
+    def test_delete_by_title_skips_listing_on_exact_cache_hit(self, mock_get_service):
+        mock_service = Mock()
+        mock_get_service.return_value = mock_service
+        cache = get_event_cache("cache_test_user")
+        cache.add_event(_event('dentist_123', 'Dentist Appointment'))
+        cache.mark_window_covered('primary', 0, 4e9)
+        
+        result = calendar_delete_event(event_id="dentist appointment", confirm=True, tool_context=self.mock_tool_context)
+        
+        self.assertTrue(result.get("success"))
+        mock_service.events().list.assert_not_called()
+        mock_service.events().delete.assert_called_with(calendarId="primary", eventId="dentist_123")
+        self.assertIsNone(cache.find_best("dentist"))
+    
+    @patch('oprina.tools.calendar.get_calendar_service')
+    def test_fuzzy_title_match_asks_for_confirmation(self, mock_get_service):
+        mock_service = Mock()
+        mock_get_service.return_value = mock_service
+        cache = get_event_cache("cache_test_user")
+        cache.add_event(_event('planning_123', 'Team Lunch Planning'))
+        cache.mark_window_covered('primary', 0, 4e9)
+        
+        result = calendar_delete_event(event_id="lunch", confirm=True, tool_context=self.mock_tool_context)
+        
+        self.assertIn("Did you mean", result["error"])
+        self.assertEqual([candidate['id'] for candidate in result["candidates"]], ['planning_123'])
+        mock_service.events().list.assert_not_called()
+        mock_service.events().delete.assert_not_called()
+    
+    def test_clear_fuzzy_winner_answered_from_covered_cache(self):
+        mock_service = Mock()
+        cache = get_event_cache("cache_test_user")
+        cache.add_event(_event('planning_123', 'Team Lunch Planning'))
+        cache.add_event(_event('launch_123', 'Launch Review'))
+        cache.mark_window_covered('primary', 0, 4e9)
+        
+        event, similarity, candidates = _find_event_by_summary(mock_service, "lunch", event_cache=cache)
+        
+        self.assertEqual(event['id'], 'planning_123')
+        self.assertLess(similarity, 0.95)
+        self.assertEqual([candidate['id'] for candidate in candidates], ['planning_123'])
+        mock_service.events().list.assert_not_called()
+    
+    @patch('oprina.tools.calendar.get_calendar_service')
+    def test_batch_delete_skips_ambiguous_titles(self, mock_get_service):
+        mock_service = Mock()
+        mock_get_service.return_value = mock_service
+        cache = get_event_cache("cache_test_user")
+        cache.add_event(_event('qbr_123', 'Quarterly Business Review Prep'))
+        cache.add_event(_event('design_123', 'Design Review Sync'))
+        cache.mark_window_covered('primary', 0, 4e9)
+        
+        result = calendar_batch_delete_events(event_ids=["review"], confirm=True, tool_context=self.mock_tool_context)
+        
+        self.assertIn("Did you mean", result["results"][0]["error"])
+        mock_service.events().list.assert_not_called()
+        mock_service.new_batch_http_request.assert_not_called()
+    
+    @patch('oprina.tools.calendar.get_calendar_service')
+    def test_update_by_title_falls_back_to_api_and_feeds_cache(self, mock_get_service):
+        mock_service = Mock()
+        mock_get_service.return_value = mock_service
+        listed = _event('review_123', 'Design Review')
+        mock_service.events().list.return_value.execute.return_value = {'items': [listed]}
+        mock_service.events().get.return_value.execute.return_value = dict(listed, description="Keep me")
+        mock_service.events().update.return_value.execute.return_value = dict(listed, summary="Design Review v2")
+        
+        result = calendar_update_event(event_id="design review", summary="Design Review v2",
+                                       tool_context=self.mock_tool_context)
+        
+        self.assertEqual(result['summary'], "Design Review v2")
+        update_body = mock_service.events().update.call_args.kwargs['body']
+        self.assertEqual(update_body['description'], "Keep me")
+        self.assertEqual(get_event_cache("cache_test_user").find_best("design review v2")['id'], 'review_123')
+
+
+if __name__ == '__main__':
+    unittest.main()
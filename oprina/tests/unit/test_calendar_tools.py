@@ -20,7 +20,10 @@ if project_root not in sys.path:
 # Import the functions we're testing
 from oprina.tools.calendar import (
     calendar_create_event, calendar_list_events, calendar_update_event,
-    calendar_delete_event, _parse_datetime, _format_event_time
+    calendar_delete_event, _parse_datetime, _format_event_time,
+    _find_event_by_summary, _iter_event_pages,
+    calendar_batch_create_events, calendar_batch_update_events, calendar_batch_delete_events,
+    calendar_list_agenda
 )
 
 # Import session key constants
@@ -30,7 +33,7 @@ from oprina.common.session_keys import (
     CALENDAR_LAST_EVENT_CREATED, CALENDAR_LAST_EVENT_CREATED_AT, 
     CALENDAR_LAST_CREATED_EVENT_ID, CALENDAR_LAST_UPDATED_EVENT,
     CALENDAR_LAST_EVENT_UPDATED_AT, CALENDAR_LAST_DELETED_EVENT,
-    CALENDAR_LAST_DELETED_ID, CALENDAR_LAST_DELETED_AT
+    CALENDAR_LAST_DELETED_ID, CALENDAR_LAST_DELETED_AT, CALENDAR_LAST_BATCH_RESULT
 )
 
 
@@ -510,5 +513,356 @@ class TestCalendarToolIntegration(unittest.TestCase):
         for tool_func in tool_functions:
             self.assertIn(tool_func.__name__, agent_tool_names)
 
+
+class TestCalendarPagination(unittest.TestCase):
+    """Test paged event listing and title search"""
+    
+    def setUp(self):
+        self.mock_session = Mock()
+        self.mock_session.state = {}
+        self.mock_session.id = "test_session_123"
+        
+        self.mock_tool_context = Mock()
+        self.mock_tool_context.session = self.mock_session
+        self.mock_tool_context.state = self.mock_session.state
+    
+    def _make_events(self, count, prefix="Event"):
+        return [
+            {
+                'id': f'{prefix.lower()}_{i}',
+                'summary': f'{prefix} {i}',
+                'start': {'dateTime': '2024-01-15T09:00:00-05:00'},
+                'end': {'dateTime': '2024-01-15T10:00:00-05:00'}
+            }
+            for i in range(count)
+        ]
+    
+    def _paged_service(self, pages):
+        """Build a mock service whose events().list() returns the given pages in order"""
+        mock_service = Mock()
+        responses = []
+        for i, items in enumerate(pages):
+            response = {'items': items}
+            if i < len(pages) - 1:
+                response['nextPageToken'] = f'token_{i + 1}'
+            responses.append(response)
+        mock_service.events().list.return_value.execute.side_effect = responses
+        mock_service.events().list.reset_mock()
+        return mock_service
+    
+    def test_iter_event_pages_follows_page_tokens(self):
+        """Test that every page is requested with a partial-response field mask"""
+        mock_service = self._paged_service([self._make_events(2), self._make_events(1)])
+        
+        pages = list(_iter_event_pages(mock_service, "primary", "t0", "t1"))
+        
+        self.assertEqual([len(p) for p in pages], [2, 1])
+        calls = mock_service.events().list.call_args_list
+        self.assertEqual(len(calls), 2)
+        self.assertNotIn('pageToken', calls[0].kwargs)
+        self.assertEqual(calls[1].kwargs['pageToken'], 'token_1')
+        self.assertEqual(calls[0].kwargs['fields'], "nextPageToken,items(id,summary,start,end,location)")
+    
+    @patch('oprina.tools.calendar.get_calendar_service')
+    def test_list_events_reports_exact_total_across_pages(self, mock_get_service):
+        """Test that listings beyond one page report the full count but keep a bounded slice"""
+        mock_get_service.return_value = self._paged_service([
+            self._make_events(250), self._make_events(250), self._make_events(20)
+        ])
+        
+        result = calendar_list_events(start_date="2024-01-15", days=30, tool_context=self.mock_tool_context)
+        
+        self.assertIn("Found 520 event(s)", result)
+        self.assertIn("... and 515 more events", result)
+        self.assertEqual(self.mock_session.state[CALENDAR_LAST_LIST_COUNT], 520)
+        self.assertEqual(len(self.mock_session.state[CALENDAR_CURRENT]), 50)
+    
+    def test_find_event_stops_at_exact_match(self):
+        """Test that title search stops paging once an exact title match is found"""
+        first_page = self._make_events(3, prefix="Lunch") + [
+            {'id': 'standup', 'summary': 'Standup', 'start': {}, 'end': {}}
+        ]
+        mock_service = self._paged_service([first_page, self._make_events(5)])
+        
+        event, similarity, _ = _find_event_by_summary(mock_service, "standup")
+        
+        self.assertEqual(event['id'], 'standup')
+        self.assertEqual(similarity, 1.0)
+        self.assertEqual(mock_service.events().list.call_count, 1)
+    
+    def test_find_event_falls_back_to_partial_match(self):
+        """Test that a partial match on a later page is still found"""
+        later = [{'id': 'planning', 'summary': 'Quarterly Planning Review', 'start': {}, 'end': {}}]
+        mock_service = self._paged_service([self._make_events(3), later])
+        
+        event, similarity, candidates = _find_event_by_summary(mock_service, "planning review")
+        
+        self.assertEqual(event['id'], 'planning')
+        self.assertLess(similarity, 1.0)
+        self.assertEqual([candidate['id'] for candidate in candidates], ['planning'])
+
+
+class FakeBatchRequest:
+    """Stand-in for googleapiclient BatchHttpRequest that runs each request on execute()"""
+    
+    def __init__(self, callback):
+        self.callback = callback
+        self.requests = []
+    
+    def add(self, request, request_id=None):
+        self.requests.append((request_id, request))
+    
+    def execute(self):
+        for request_id, request in self.requests:
+            try:
+                self.callback(request_id, request.execute(), None)
+            except Exception as e:
+                self.callback(request_id, None, e)
+
+
+class TestCalendarBatchTools(unittest.TestCase):
+    """Test batch create/update/delete tools"""
+    
+    def setUp(self):
+        self.mock_session = Mock()
+        self.mock_session.state = {}
+        self.mock_tool_context = Mock()
+        self.mock_tool_context.session = self.mock_session
+        self.mock_tool_context.state = self.mock_session.state
+        self.mock_tool_context._invocation_context.user_id = None
+        
+        self.mock_service = Mock()
+        self.batches = []
+        
+        def new_batch(callback):
+            batch = FakeBatchRequest(callback)
+            self.batches.append(batch)
+            return batch
+        
+        self.mock_service.new_batch_http_request.side_effect = new_batch
+        self.mock_service.settings().list().execute.return_value = {
+            'items': [{'id': 'timezone', 'value': 'America/New_York'}]
+        }
+    
+    @patch('oprina.tools.calendar.get_calendar_service')
+    def test_batch_create_reports_per_item_outcomes(self, mock_get_service):
+        mock_get_service.return_value = self.mock_service
+        
+        def insert(calendarId, body):
+            request = Mock()
+            request.execute.return_value = {'id': f"id_{body['summary']}", 'summary': body['summary'],
+                                            'start': body['start']}
+            return request
+        self.mock_service.events().insert.side_effect = insert
+        
+        result = calendar_batch_create_events(
+            events=[
+                {'summary': 'Sprint Review', 'start_time': '2024-01-15 14:00', 'end_time': '2024-01-15 15:00'},
+                {'summary': 'Bad Event', 'start_time': 'not a date', 'end_time': '2024-01-15 15:00'},
+                {'summary': 'Retro', 'start_time': '2024-01-16 14:00', 'end_time': '2024-01-16 15:00'},
+            ],
+            tool_context=self.mock_tool_context
+        )
+        
+        self.assertEqual(result['succeeded'], 2)
+        self.assertEqual(result['failed'], 1)
+        self.assertEqual([r['status'] for r in result['results']], ['created', 'error', 'created'])
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual(len(self.batches[0].requests), 2)
+        self.assertEqual(self.mock_session.state[CALENDAR_LAST_BATCH_RESULT]['succeeded'], 2)
+    
+    @patch('oprina.tools.calendar.get_calendar_service')
+    def test_batch_update_resolves_titles_with_one_listing(self, mock_get_service):
+        mock_get_service.return_value = self.mock_service
+        self.mock_service.events().list.return_value.execute.return_value = {'items': [
+            {'id': 'standup', 'summary': 'Friday Standup',
+             'start': {'dateTime': '2024-01-19T09:00:00-05:00'}, 'end': {'dateTime': '2024-01-19T09:30:00-05:00'}},
+            {'id': 'demo', 'summary': 'Friday Demo',
+             'start': {'dateTime': '2024-01-19T15:00:00-05:00'}, 'end': {'dateTime': '2024-01-19T16:00:00-05:00'}},
+        ]}
+        self.mock_service.events().list.reset_mock()
+        
+        def patch_event(calendarId, eventId, body):
+            request = Mock()
+            request.execute.return_value = dict(body, id=eventId)
+            return request
+        self.mock_service.events().patch.side_effect = patch_event
+        
+        result = calendar_batch_update_events(
+            updates=[
+                {'event_id': 'friday standup', 'shift_minutes': 60},
+                {'event_id': 'friday demo', 'shift_minutes': 60},
+                {'event_id': 'board meeting', 'shift_minutes': 60},
+            ],
+            tool_context=self.mock_tool_context
+        )
+        
+        self.assertEqual(self.mock_service.events().list.call_count, 1)
+        self.assertEqual([r['status'] for r in result['results']], ['updated', 'updated', 'error'])
+        first_patch = self.mock_service.events().patch.call_args_list[0].kwargs
+        self.assertEqual(first_patch['eventId'], 'standup')
+        self.assertEqual(first_patch['body']['start']['dateTime'], '2024-01-19T10:00:00-05:00')
+        self.assertEqual(first_patch['body']['end']['dateTime'], '2024-01-19T10:30:00-05:00')
+    
+    @patch('oprina.tools.calendar.get_calendar_service')
+    def test_batch_update_fetches_uncached_event_before_shifting(self, mock_get_service):
+        mock_get_service.return_value = self.mock_service
+        event_id = 'e' * 26
+        self.mock_service.events().get.return_value.execute.return_value = {
+            'id': event_id, 'summary': 'Planning',
+            'start': {'dateTime': '2024-01-19T09:00:00-05:00'}, 'end': {'dateTime': '2024-01-19T10:00:00-05:00'}
+        }
+        self.mock_service.events().patch.side_effect = lambda calendarId, eventId, body: Mock(
+            execute=Mock(return_value=dict(body, id=eventId))
+        )
+        
+        result = calendar_batch_update_events(
+            updates=[{'event_id': event_id, 'shift_minutes': -30}],
+            tool_context=self.mock_tool_context
+        )
+        
+        self.assertEqual(result['results'][0]['status'], 'updated')
+        self.mock_service.events().get.assert_called_with(calendarId='primary', eventId=event_id)
+        body = self.mock_service.events().patch.call_args.kwargs['body']
+        self.assertEqual(body['start']['dateTime'], '2024-01-19T08:30:00-05:00')
+        self.assertEqual(body['end']['dateTime'], '2024-01-19T09:30:00-05:00')
+    
+    @patch('oprina.tools.calendar.get_calendar_service')
+    def test_batch_update_rejects_shift_with_explicit_times(self, mock_get_service):
+        mock_get_service.return_value = self.mock_service
+        self.mock_service.events().get.return_value.execute.return_value = {
+            'id': 'e' * 26, 'start': {'dateTime': '2024-01-19T09:00:00-05:00'},
+            'end': {'dateTime': '2024-01-19T10:00:00-05:00'}
+        }
+        
+        result = calendar_batch_update_events(
+            updates=[{'event_id': 'e' * 26, 'shift_minutes': 30, 'start_time': '2024-01-19 11:00'}],
+            tool_context=self.mock_tool_context
+        )
+        
+        self.assertEqual(result['results'][0]['status'], 'error')
+        self.assertIn("not both", result['results'][0]['error'])
+        self.mock_service.events().patch.assert_not_called()
+    
+    @patch('oprina.tools.calendar.get_calendar_service')
+    def test_batch_delete_requires_confirmation_and_reports_failures(self, mock_get_service):
+        mock_get_service.return_value = self.mock_service
+        
+        result = calendar_batch_delete_events(event_ids=['a' * 26], tool_context=self.mock_tool_context)
+        self.assertIn("Please confirm", result['error'])
+        
+        def delete(calendarId, eventId):
+            request = Mock()
+            if eventId.startswith('b'):
+                request.execute.side_effect = Exception("Resource has been deleted")
+            else:
+                request.execute.return_value = ''
+            return request
+        self.mock_service.events().delete.side_effect = delete
+        
+        result = calendar_batch_delete_events(event_ids=['a' * 26, 'b' * 26], confirm=True,
+                                              tool_context=self.mock_tool_context)
+        
+        self.assertFalse(result['success'])
+        self.assertEqual([r['status'] for r in result['results']], ['deleted', 'error'])
+        self.assertIn("Resource has been deleted", result['results'][1]['error'])
+
+
+class TestCalendarAgenda(unittest.TestCase):
+    """Test the aggregated multi-calendar agenda"""
+    
+    def setUp(self):
+        from oprina.tools.calendar_cache import clear_event_cache
+        clear_event_cache()
+        self.mock_session = Mock()
+        self.mock_session.state = {}
+        self.mock_tool_context = Mock()
+        self.mock_tool_context.session = self.mock_session
+        self.mock_tool_context.state = self.mock_session.state
+        self.mock_tool_context._invocation_context.user_id = "agenda_test_user"
+        
+        self.mock_service = Mock()
+        self.mock_service.calendarList().list.return_value.execute.return_value = {'items': [
+            {'id': 'me@example.com', 'summary': 'me@example.com', 'primary': True, 'selected': True},
+            {'id': 'team@group.calendar.google.com', 'summary': 'Team', 'selected': True},
+            {'id': 'holidays@group.calendar.google.com', 'summary': 'Holidays', 'hidden': True},
+        ]}
+        self.mock_service.calendarList().list.reset_mock()
+        
+        windows = {
+            'primary': [
+                {'id': 'p1', 'iCalUID': 'shared-sync', 'summary': 'Team Sync',
+                 'start': {'dateTime': '2024-01-15T10:00:00-05:00'}},
+                {'id': 'p2', 'iCalUID': 'p2', 'summary': 'Dentist',
+                 'start': {'dateTime': '2024-01-15T16:00:00-05:00'}},
+            ],
+            'team@group.calendar.google.com': [
+                {'id': 't1', 'iCalUID': 't1', 'summary': 'Release Planning',
+                 'start': {'dateTime': '2024-01-15T09:00:00-05:00'}},
+                {'id': 't2', 'iCalUID': 'shared-sync', 'summary': 'Team Sync',
+                 'start': {'dateTime': '2024-01-15T10:00:00-05:00'}},
+            ],
+        }
+        
+        def list_events(**kwargs):
+            self.assertNotEqual(kwargs['calendarId'], 'holidays@group.calendar.google.com')
+            request = Mock()
+            request.execute.return_value = {'items': windows[kwargs['calendarId']]}
+            return request
+        self.mock_service.events().list.side_effect = list_events
+        
+        credentials_patcher = patch('oprina.tools.calendar.get_oauth_credentials', return_value=None)
+        self.mock_get_credentials = credentials_patcher.start()
+        self.addCleanup(credentials_patcher.stop)
+    
+    def tearDown(self):
+        from oprina.tools.calendar_cache import clear_event_cache
+        clear_event_cache()
+    
+    @patch('oprina.tools.calendar.get_calendar_service')
+    def test_agenda_merges_by_start_and_deduplicates(self, mock_get_service):
+        mock_get_service.return_value = self.mock_service
+        
+        result = calendar_list_agenda(start_date="2024-01-15", days=1, tool_context=self.mock_tool_context)
+        
+        self.assertIn("Found 3 event(s) across your 2 calendars", result)
+        summaries = [event['summary'] for event in self.mock_session.state[CALENDAR_CURRENT]]
+        self.assertEqual(summaries, ['Release Planning', 'Team Sync', 'Dentist'])
+        self.assertIn("(Team)", result)
+    
+    @patch('oprina.tools.calendar.get_calendar_service')
+    def test_agenda_reuses_cached_calendar_list(self, mock_get_service):
+        mock_get_service.return_value = self.mock_service
+        
+        calendar_list_agenda(start_date="2024-01-15", days=1, tool_context=self.mock_tool_context)
+        calendar_list_agenda(start_date="2024-01-16", days=1, tool_context=self.mock_tool_context)
+        
+        self.assertEqual(self.mock_service.calendarList().list.call_count, 1)
+    
+    @patch('oprina.tools.calendar._new_thread_http')
+    @patch('oprina.tools.calendar.get_calendar_service')
+    def test_agenda_gives_each_fetch_its_own_http(self, mock_get_service, mock_new_http):
+        mock_get_service.return_value = self.mock_service
+        credentials = Mock()
+        self.mock_get_credentials.return_value = credentials
+        
+        calendar_list_agenda(start_date="2024-01-15", days=1, tool_context=self.mock_tool_context)
+        
+        self.mock_get_credentials.assert_called_once_with("agenda_test_user", "calendar")
+        self.assertEqual(mock_new_http.call_count, 2)
+        mock_new_http.assert_called_with(credentials)
+    
+    @patch('oprina.tools.calendar.ThreadPoolExecutor')
+    @patch('oprina.tools.calendar._new_thread_http')
+    @patch('oprina.tools.calendar.get_calendar_service')
+    def test_agenda_fetches_sequentially_without_credentials(self, mock_get_service, mock_new_http, mock_executor):
+        mock_get_service.return_value = self.mock_service
+        
+        result = calendar_list_agenda(start_date="2024-01-15", days=1, tool_context=self.mock_tool_context)
+        
+        self.assertIn("Found 3 event(s) across your 2 calendars", result)
+        mock_executor.assert_not_called()
+        mock_new_http.assert_not_called()
+
 if __name__ == '__main__':
     unittest.main()
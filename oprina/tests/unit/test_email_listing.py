@@ -0,0 +1,129 @@
+"""
+Unit tests for the compact email listing record
+"""
+
+import json
+import unittest
+from unittest.mock import Mock, patch
+import os
+import sys
+
+# Add project root to path
+current_file = os.path.abspath(__file__)
+project_root = current_file
+for _ in range(4):  # Go up 4 levels from tests/unit/test_email_listing.py
+    project_root = os.path.dirname(project_root)
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from oprina.common.session_keys import EMAIL_LISTING, EMAIL_LAST_LISTED_MESSAGES
+from oprina.tools.email_listing import (
+    build_listing, store_listing, get_listing, listing_size, listing_message_id,
+    listing_message, listing_messages, listing_index_map, date_header_to_epoch, epoch_to_display
+)
+from oprina.tools.gmail import gmail_list_messages, _get_message_id_by_reference
+
+
+SUMMARIES = [
+    {"id": "msg1", "from": "Sam <sam@example.com>", "subject": "Quarterly plan",
+     "date": "Mon, 15 Jan 2024 10:00:00 +0000"},
+    {"id": "msg2", "from": "Alex <alex@example.com>", "subject": "Lunch", "date": "Unknown"}
+]
+
+
+class TestListingRecord(unittest.TestCase):
+    """Test building and reading the listing record"""
+    
+    def test_build_listing_columns(self):
+        listing = build_listing("in:inbox", SUMMARIES)
+        
+        self.assertEqual(listing["q"], "in:inbox")
+        self.assertEqual(listing["ids"], ["msg1", "msg2"])
+        self.assertEqual(listing["subj"], ["Quarterly plan", "Lunch"])
+        self.assertEqual(listing["ts"], [1705312800, 0])
+    
+    def test_accessors_use_one_based_positions(self):
+        listing = build_listing("", SUMMARIES)
+        
+        self.assertEqual(listing_size(listing), 2)
+        self.assertEqual(listing_message_id(listing, 1), "msg1")
+        self.assertIsNone(listing_message_id(listing, 0))
+        self.assertIsNone(listing_message_id(listing, 3))
+        self.assertEqual(listing_index_map(listing), {"1": "msg1", "2": "msg2"})
+        
+        message = listing_message(listing, 2)
+        self.assertEqual(message["from"], "Alex <alex@example.com>")
+        self.assertEqual(message["date"], "Unknown")
+        self.assertEqual(message["position"], 2)
+        self.assertEqual([msg["id"] for msg in listing_messages(listing)], ["msg1", "msg2"])
+    
+    def test_accessors_handle_missing_listing(self):
+        self.assertEqual(listing_size(None), 0)
+        self.assertIsNone(listing_message(None, 1))
+        self.assertEqual(listing_messages(None), [])
+        self.assertEqual(listing_index_map(None), {})
+    
+    def test_date_conversion(self):
+        self.assertEqual(date_header_to_epoch("Mon, 15 Jan 2024 10:00:00 +0000"), 1705312800)
+        self.assertEqual(date_header_to_epoch("not a date"), 0)
+        self.assertEqual(date_header_to_epoch(None), 0)
+        self.assertEqual(epoch_to_display(1705312800), "Mon, 15 Jan 2024 10:00 UTC")
+        self.assertEqual(epoch_to_display(0), "Unknown")
+    
+    def test_store_and_get(self):
+        state = {}
+        store_listing(state, "from:sam", SUMMARIES)
+        
+        self.assertEqual(get_listing(state)["ids"], ["msg1", "msg2"])
+        self.assertIsNone(get_listing({}))
+        self.assertIsNone(get_listing(None))
+    
+    def test_legacy_listed_messages_fallback(self):
+        legacy = [dict(msg, position=i) for i, msg in enumerate(SUMMARIES, 1)]
+        listing = get_listing({EMAIL_LAST_LISTED_MESSAGES: legacy})
+        
+        self.assertEqual(listing["ids"], ["msg1", "msg2"])
+    
+    def test_record_smaller_than_legacy_keys(self):
+        summaries = [dict(SUMMARIES[0], id=f"msg{i}") for i in range(10)]
+        legacy = {
+            "current_results": summaries,
+            "message_index_map": {str(i): msg["id"] for i, msg in enumerate(summaries, 1)},
+            "last_listed_messages": [dict(msg, position=i) for i, msg in enumerate(summaries, 1)]
+        }
+        
+        compact_bytes = len(json.dumps(build_listing("in:inbox", summaries)))
+        self.assertLess(compact_bytes * 2, len(json.dumps(legacy)))
+
+
+class TestGmailListingIntegration(unittest.TestCase):
+    """Test that Gmail tools store and resolve through the listing record"""
+    
+    def setUp(self):
+        self.tool_context = Mock()
+        self.tool_context.state = {}
+    
+    @patch('oprina.tools.gmail.get_gmail_service')
+    def test_list_messages_stores_listing_only(self, mock_get_service):
+        service = Mock()
+        mock_get_service.return_value = service
+        service.users().messages().list().execute.return_value = {'messages': [{'id': 'msg1'}, {'id': 'msg2'}]}
+        service.users().messages().get().execute.return_value = {
+            'payload': {'headers': [{'name': 'From', 'value': 'sam@example.com'}, {'name': 'Subject', 'value': 'Hi'}]}
+        }
+        
+        gmail_list_messages(query="in:inbox", tool_context=self.tool_context)
+        
+        self.assertEqual(self.tool_context.state[EMAIL_LISTING]["ids"], ["msg1", "msg2"])
+        self.assertNotIn(EMAIL_LAST_LISTED_MESSAGES, self.tool_context.state)
+    
+    def test_reference_resolution_reads_listing(self):
+        store_listing(self.tool_context.state, "in:inbox", SUMMARIES)
+        
+        self.assertEqual(_get_message_id_by_reference("2", self.tool_context), "msg2")
+        self.assertEqual(_get_message_id_by_reference("lunch", self.tool_context), "msg2")
+
+
+if __name__ == '__main__':
+    unittest.main()
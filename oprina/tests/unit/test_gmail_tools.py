@@ -29,8 +29,7 @@ from oprina.tools.gmail import (
 
 # Import session key constants
 from oprina.common.session_keys import (
-    EMAIL_CURRENT_RESULTS, EMAIL_LAST_FETCH, EMAIL_LAST_QUERY,
-    EMAIL_RESULTS_COUNT, EMAIL_LAST_SENT_TO, EMAIL_LAST_SENT,
+    EMAIL_LISTING, EMAIL_LAST_SENT_TO, EMAIL_LAST_SENT,
     EMAIL_LAST_MESSAGE_VIEWED, EMAIL_LAST_MESSAGE_VIEWED_AT,
     EMAIL_LAST_SENT_SUBJECT, EMAIL_LAST_SENT_ID,
     EMAIL_LAST_AI_SUMMARY, EMAIL_LAST_AI_SUMMARY_AT,
@@ -104,10 +103,9 @@ class TestGmailTools(unittest.TestCase):
         self.assertIn("Found", result)
         
         # Check session state updates
-        self.assertIn(EMAIL_LAST_FETCH, self.mock_session.state)
-        self.assertEqual(self.mock_session.state[EMAIL_LAST_QUERY], "test")
-        self.assertEqual(self.mock_session.state[EMAIL_RESULTS_COUNT], 3)
-        self.assertIn(EMAIL_CURRENT_RESULTS, self.mock_session.state)
+        listing = self.mock_session.state[EMAIL_LISTING]
+        self.assertEqual(listing["q"], "test")
+        self.assertEqual(listing["ids"], ["msg1", "msg2", "msg3"])
 
     @patch('oprina.tools.gmail.get_gmail_service')
     def test_gmail_list_messages_no_service(self, mock_get_service):
@@ -557,8 +555,7 @@ class TestGmailAgentBehavior(unittest.TestCase):
         self.assertIn("Found", result)
         
         # Should maintain workflow state
-        self.assertIn(EMAIL_CURRENT_RESULTS, self.mock_session.state)
-        self.assertIn(EMAIL_LAST_QUERY, self.mock_session.state)
+        self.assertIn(EMAIL_LISTING, self.mock_session.state)
 
     @patch('oprina.tools.gmail._process_with_ai')
     @patch('oprina.tools.gmail.get_gmail_service')
@@ -721,9 +718,8 @@ class TestGmailAgentBehavior(unittest.TestCase):
         gmail_get_message("msg1", tool_context=self.mock_tool_context)
         
         # Check session state continuity
-        self.assertIn(EMAIL_LAST_FETCH, self.mock_session.state)
+        self.assertIn(EMAIL_LISTING, self.mock_session.state)
         self.assertIn(EMAIL_LAST_MESSAGE_VIEWED, self.mock_session.state)
-        self.assertIn(EMAIL_CURRENT_RESULTS, self.mock_session.state)
         
         # State should be available for subsequent operations
         self.assertEqual(self.mock_session.state[EMAIL_LAST_MESSAGE_VIEWED], "msg1")
@@ -749,7 +745,7 @@ class TestGmailAgentBehavior(unittest.TestCase):
         gmail_archive_message("workflow_msg", tool_context=self.mock_tool_context)
         
         # Verify workflow continuity in session state
-        self.assertEqual(self.mock_session.state[EMAIL_LAST_QUERY], "meeting request")
+        self.assertEqual(self.mock_session.state[EMAIL_LISTING]["q"], "meeting request")
         self.assertEqual(self.mock_session.state[EMAIL_LAST_MESSAGE_VIEWED], "workflow_msg")
         self.assertIn(EMAIL_LAST_ARCHIVED, self.mock_session.state)
 
@@ -0,0 +1,138 @@
+"""
+Unit tests for the fast-path intent router
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import os
+import sys
+
+# Add project root to path
+current_file = os.path.abspath(__file__)
+project_root = current_file
+for _ in range(4):  # Go up 4 levels from tests/unit/test_intent_router.py
+    project_root = os.path.dirname(project_root)
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from google.genai import types
+
+from oprina.common import intent_router
+from oprina.common.intent_router import classify, dispatch_tool_call, route_to_sub_agent
+
+
+def _context(text, agent_name="oprina", invocation_id="inv-1"):
+    context = Mock()
+    context.user_content = types.Content(role="user", parts=[types.Part(text=text)])
+    context.agent_name = agent_name
+    context.invocation_id = invocation_id
+    context.state = {}
+    return context
+
+
+def _request(*tools):
+    request = Mock()
+    request.tools_dict = {name: Mock() for name in tools}
+    return request
+
+
+def _function_call(response):
+    return response.content.parts[0].function_call
+
+
+class TestClassify(unittest.TestCase):
+    """Test utterance classification"""
+    
+    def test_read_latest_email(self):
+        intent = classify("Hey Oprina, read me my latest email please.")
+        
+        self.assertEqual(intent.agent, "email_agent")
+        self.assertEqual(intent.tool, "gmail_get_message")
+        self.assertEqual(intent.args, {"message_id": "latest"})
+    
+    def test_calendar_today(self):
+        for text in ("What's on my calendar today?", "whats on my calendar today", "What do I have today"):
+            intent = classify(text)
+            self.assertEqual((intent.agent, intent.tool, intent.args), ("calendar_agent", "calendar_list_events", {"days": 1}))
+    
+    def test_counts_become_tool_args(self):
+        self.assertEqual(classify("Show me my 3 most recent emails").args, {"max_results": 3})
+        self.assertEqual(classify("What do I have in the next two days").args, {"days": 2})
+    
+    def test_agent_only_intents(self):
+        intent = classify("Send an email to bob@example.com saying I'll be late")
+        
+        self.assertEqual(intent.agent, "email_agent")
+        self.assertIsNone(intent.tool)
+        self.assertEqual(classify("Cancel my dentist appointment").agent, "calendar_agent")
+    
+    def test_ambiguous_and_destructive_go_to_llm(self):
+        for text in ("Delete it", "Yes, go ahead", "The second one", "",
+                     "Check my email for meeting invites and add them to my calendar"):
+            self.assertIsNone(classify(text), text)
+
+
+class TestCallbacks(unittest.TestCase):
+    """Test the root and sub-agent before_model_callbacks"""
+    
+    def setUp(self):
+        patcher = patch.object(intent_router, 'FAST_ROUTER_ENABLED', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_disabled_router_defers_to_llm(self):
+        with patch.object(intent_router, 'FAST_ROUTER_ENABLED', False):
+            self.assertIsNone(route_to_sub_agent(_context("Read my latest email"), _request("transfer_to_agent")))
+            self.assertIsNone(dispatch_tool_call(_context("Read my latest email", "email_agent"),
+                                                 _request("gmail_get_message")))
+    
+    def test_root_transfers_to_sub_agent(self):
+        response = route_to_sub_agent(_context("Read my latest email"), _request("transfer_to_agent"))
+        
+        call = _function_call(response)
+        self.assertEqual(call.name, "transfer_to_agent")
+        self.assertEqual(call.args, {"agent_name": "email_agent"})
+        self.assertIsNone(route_to_sub_agent(_context("Yes, go ahead"), _request("transfer_to_agent")))
+    
+    def test_root_transfers_once_per_invocation(self):
+        context = _context("Read my latest email")
+        
+        self.assertIsNotNone(route_to_sub_agent(context, _request("transfer_to_agent")))
+        # Control returned to the root within the same turn: let the LLM decide
+        self.assertIsNone(route_to_sub_agent(context, _request("transfer_to_agent")))
+        
+        context.invocation_id = "inv-2"
+        self.assertIsNotNone(route_to_sub_agent(context, _request("transfer_to_agent")))
+    
+    def test_sub_agent_dispatches_tool_once_per_invocation(self):
+        context = _context("Read my latest email", "email_agent")
+        request = _request("gmail_get_message", "transfer_to_agent")
+        
+        call = _function_call(dispatch_tool_call(context, request))
+        self.assertEqual(call.name, "gmail_get_message")
+        self.assertEqual(call.args, {"message_id": "latest"})
+        
+        # The follow-up model call phrases the tool result
+        self.assertIsNone(dispatch_tool_call(context, request))
+        
+        context.invocation_id = "inv-2"
+        self.assertIsNotNone(dispatch_tool_call(context, request))
+    
+    def test_sub_agent_skips_unavailable_tool(self):
+        context = _context("Read my latest email", "email_agent")
+        
+        self.assertIsNone(dispatch_tool_call(context, _request("gmail_list_messages")))
+        self.assertNotIn(intent_router.ROUTER_DISPATCHED, context.state)
+    
+    def test_sub_agent_transfers_to_sibling(self):
+        context = _context("What's on my calendar today", "email_agent")
+        
+        call = _function_call(dispatch_tool_call(context, _request("gmail_get_message", "transfer_to_agent")))
+        self.assertEqual(call.name, "transfer_to_agent")
+        self.assertEqual(call.args, {"agent_name": "calendar_agent"})
+        self.assertIsNone(dispatch_tool_call(context, _request("gmail_get_message")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Unit tests for log sampling, deduplication and lazy arguments
+"""
+
+import logging
+import unittest
+from unittest.mock import Mock, patch
+import os
+import sys
+
+# Add project root to path
+current_file = os.path.abspath(__file__)
+project_root = current_file
+for _ in range(4):  # Go up 4 levels from tests/unit/test_log_sampling.py
+    project_root = os.path.dirname(project_root)
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from oprina.services.logging import sampling
+from oprina.services.logging.sampling import SamplingFilter, lazy
+
+
+def _record(msg="message %s", args=(1,), level=logging.INFO, lineno=10):
+    return logging.LogRecord("sampling_test", level, "tool.py", lineno, msg, args, None)
+
+
+class TestSamplingFilter(unittest.TestCase):
+    """Test per-call-site token buckets and deduplication"""
+    
+    def setUp(self):
+        self.clock = Mock(return_value=100.0)
+        patcher = patch.object(sampling.time, 'monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_token_bucket_per_call_site(self):
+        log_filter = SamplingFilter(rate=1, burst=3, dedup_window=0)
+        
+        passed = [log_filter.filter(_record(args=(i,))) for i in range(10)]
+        other_site = log_filter.filter(_record(lineno=20))
+        
+        self.assertEqual(passed.count(True), 3)
+        self.assertTrue(other_site)
+        self.assertEqual(log_filter.stats()["suppressed_rate"], 7)
+    
+    def test_bucket_refills(self):
+        log_filter = SamplingFilter(rate=1, burst=1, dedup_window=0)
+        
+        self.assertTrue(log_filter.filter(_record(args=(1,))))
+        self.assertFalse(log_filter.filter(_record(args=(2,))))
+        
+        self.clock.return_value = 101.0
+        record = _record(args=(3,))
+        self.assertTrue(log_filter.filter(record))
+        self.assertIn("1 rate-limited", record.getMessage())
+    
+    def test_duplicates_suppressed_within_window(self):
+        log_filter = SamplingFilter(rate=100, burst=100, dedup_window=10)
+        
+        passed = [log_filter.filter(_record()) for _ in range(5)]
+        self.assertEqual(passed, [True, False, False, False, False])
+        
+        self.clock.return_value = 111.0
+        record = _record()
+        self.assertTrue(log_filter.filter(record))
+        self.assertIn("4 repeated", record.getMessage())
+    
+    def test_warnings_and_errors_always_pass(self):
+        log_filter = SamplingFilter(rate=0, burst=0, dedup_window=10)
+        
+        for level in (logging.WARNING, logging.ERROR):
+            for _ in range(3):
+                self.assertTrue(log_filter.filter(_record(level=level)))
+
+
+class TestLazy(unittest.TestCase):
+    """Test deferred log arguments"""
+    
+    def test_only_evaluated_when_formatted(self):
+        func = Mock(return_value={"1": "msg1"})
+        value = lazy(func, "arg")
+        
+        func.assert_not_called()
+        self.assertEqual(str(value), "{'1': 'msg1'}")
+        func.assert_called_once_with("arg")
+    
+    def test_not_evaluated_for_disabled_level(self):
+        func = Mock(return_value="expensive")
+        test_logger = logging.getLogger("lazy_test")
+        test_logger.setLevel(logging.INFO)
+        
+        test_logger.debug("value: %s", lazy(func))
+        
+        func.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+Unit tests for the asyncio log collector and the batch socket client
+"""
+
+import asyncio
+import logging
+import socket
+import struct
+import tempfile
+import time
+import unittest
+from pathlib import Path
+import os
+import sys
+
+# Add project root to path
+current_file = os.path.abspath(__file__)
+project_root = current_file
+for _ in range(4):  # Go up 4 levels from tests/unit/test_log_server.py
+    project_root = os.path.dirname(project_root)
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from oprina.services.logging.log_server import LogCollector, encode_batch, record_to_dict
+from oprina.services.logging.logger import BatchSocketHandler, PerLoggerFileHandler, SERVER_SEND_TIMEOUT
+
+
+def _record(name="agent_tools", msg="tool call %s", args=("done",), level=logging.INFO):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+class TestLogCollector(unittest.TestCase):
+    """Test framing, per-logger files and metrics"""
+    
+    def setUp(self):
+        self.log_dir = Path(tempfile.mkdtemp())
+    
+    def _collector(self):
+        return LogCollector(port=0, log_dir=self.log_dir, console_level=None, metrics_interval=0)
+    
+    def test_default_dir_apart_from_agent_files(self):
+        self.assertNotEqual(LogCollector().log_dir, PerLoggerFileHandler().log_dir)
+    
+    def test_record_to_dict_formats_message(self):
+        data = record_to_dict(_record())
+        
+        self.assertEqual(data["msg"], "tool call done")
+        self.assertEqual(data["levelname"], "INFO")
+    
+    def test_batches_written_per_logger(self):
+        async def scenario():
+            collector = self._collector()
+            await collector.start()
+            
+            _, writer = await asyncio.open_connection('localhost', collector.port)
+            writer.write(encode_batch([record_to_dict(_record("gmail_tools", "first", ())),
+                                       record_to_dict(_record("calendar_tools", "second", ()))]))
+            writer.write(encode_batch([record_to_dict(_record("gmail_tools", "third", ()))]))
+            await writer.drain()
+            writer.close()
+            await asyncio.sleep(0.1)
+            
+            await collector.stop()
+            return collector.get_metrics()
+        
+        metrics = asyncio.run(scenario())
+        
+        gmail_log = (self.log_dir / "gmail_tools.log").read_text()
+        self.assertIn("first", gmail_log)
+        self.assertIn("third", gmail_log)
+        self.assertIn("second", (self.log_dir / "calendar_tools.log").read_text())
+        self.assertEqual(metrics["batches"], 2)
+        self.assertEqual(metrics["records_written"], 3)
+    
+    def test_malformed_frame_dropped(self):
+        async def scenario():
+            collector = self._collector()
+            await collector.start()
+            
+            _, writer = await asyncio.open_connection('localhost', collector.port)
+            payload = b"not json"
+            writer.write(struct.pack('>L', len(payload)) + payload)
+            writer.write(encode_batch([record_to_dict(_record())]))
+            await writer.drain()
+            writer.close()
+            await asyncio.sleep(0.1)
+            
+            await collector.stop()
+            return collector.get_metrics()
+        
+        metrics = asyncio.run(scenario())
+        
+        self.assertEqual(metrics["dropped_frames"], 1)
+        self.assertEqual(metrics["records_written"], 1)
+
+
+class TestBatchSocketHandler(unittest.TestCase):
+    """Test the client side of the framing"""
+    
+    def test_handler_batches_to_collector(self):
+        log_dir = Path(tempfile.mkdtemp())
+        
+        async def scenario():
+            collector = LogCollector(port=0, log_dir=log_dir, console_level=None, metrics_interval=0)
+            await collector.start()
+            
+            handler = BatchSocketHandler('localhost', collector.port, batch_size=10)
+            
+            def send():
+                for i in range(25):
+                    handler.handle(_record("client_test", "line %d", (i,)))
+                handler.close()
+            
+            await asyncio.get_running_loop().run_in_executor(None, send)
+            await asyncio.sleep(0.1)
+            await collector.stop()
+            return handler, collector.get_metrics()
+        
+        handler, metrics = asyncio.run(scenario())
+        
+        self.assertEqual(handler.sent, 25)
+        self.assertEqual(metrics["batches"], 3)
+        self.assertIn("line 24", (log_dir / "client_test.log").read_text())
+    
+    def test_unreachable_server_drops_and_counts(self):
+        handler = BatchSocketHandler('localhost', 1, batch_size=5)
+        
+        for i in range(10):
+            handler.handle(_record())
+        handler.close()
+        
+        self.assertEqual(handler.dropped, 10)
+        self.assertEqual(handler.sent, 0)
+    
+    def test_stalled_server_times_out_and_drops(self):
+        # Accepts connections (via the backlog) but never reads
+        server = socket.create_server(('localhost', 0))
+        self.addCleanup(server.close)
+        handler = BatchSocketHandler('localhost', server.getsockname()[1], batch_size=1)
+        
+        started = time.monotonic()
+        handler.handle(_record(msg="x" * (32 * 1024 * 1024), args=()))
+        elapsed = time.monotonic() - started
+        
+        self.assertLess(elapsed, SERVER_SEND_TIMEOUT * 3)
+        self.assertEqual(handler.dropped, 1)
+        self.assertIsNone(handler._sock)
+        handler.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Unit tests for the queue-based logging pipeline
+"""
+
+import logging
+import queue
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+import os
+import sys
+
+# Add project root to path
+current_file = os.path.abspath(__file__)
+project_root = current_file
+for _ in range(4):  # Go up 4 levels from tests/unit/test_logger.py
+    project_root = os.path.dirname(project_root)
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from oprina.services.logging import logger as logger_module
+from oprina.services.logging.logger import (
+    DropCountingQueueHandler, LogPipeline, setup_logger, get_log_pipeline
+)
+
+
+def _record(level=logging.INFO, name="test_logger", msg="message"):
+    return logging.LogRecord(name, level, __file__, 1, msg, None, None)
+
+
+class TestDropCountingQueueHandler(unittest.TestCase):
+    """Test bounded enqueue and drop accounting"""
+    
+    def test_drops_low_priority_records_when_full(self):
+        handler = DropCountingQueueHandler(queue.Queue(maxsize=2))
+        
+        for _ in range(5):
+            handler.handle(_record(logging.DEBUG))
+        
+        self.assertEqual(handler.enqueued, 2)
+        self.assertEqual(handler.dropped, {"DEBUG": 3})
+    
+    def test_priority_records_wait_then_drop(self):
+        handler = DropCountingQueueHandler(queue.Queue(maxsize=1))
+        handler.handle(_record(logging.INFO))
+        
+        with patch.object(logger_module, 'PRIORITY_ENQUEUE_TIMEOUT', 0.01):
+            handler.handle(_record(logging.ERROR))
+        
+        self.assertEqual(handler.dropped, {"ERROR": 1})
+
+
+class TestLogPipeline(unittest.TestCase):
+    """Test the background listener writes per-logger files"""
+    
+    def setUp(self):
+        self.log_dir = Path(tempfile.mkdtemp())
+        self.pipeline = LogPipeline(capacity=100, log_dir=self.log_dir, log_server=None)
+        self.pipeline.start()
+    
+    def tearDown(self):
+        self.pipeline.stop()
+    
+    def test_records_written_by_listener(self):
+        self.pipeline.file_handler.enabled_loggers.add("pipeline_test")
+        self.pipeline.handler.handle(_record(name="pipeline_test", msg="hello"))
+        self.pipeline.handler.handle(_record(name="other_logger", msg="skipped"))
+        self.pipeline.stop()
+        
+        self.assertIn("hello", (self.log_dir / "pipeline_test.log").read_text())
+        self.assertFalse((self.log_dir / "other_logger.log").exists())
+    
+    def test_stats(self):
+        self.pipeline.handler.handle(_record())
+        stats = self.pipeline.stats()
+        
+        self.assertEqual(stats["enqueued"], 1)
+        self.assertEqual(stats["dropped_total"], 0)
+        self.assertEqual(stats["capacity"], 100)
+
+
+class TestSetupLogger(unittest.TestCase):
+    """Test that setup_logger only attaches the queue handler"""
+    
+    def test_only_queue_handler_attached(self):
+        test_logger = setup_logger("setup_logger_test", log_file=False)
+        
+        self.assertEqual(test_logger.handlers, [get_log_pipeline().handler])
+        self.assertNotIn("setup_logger_test", get_log_pipeline().file_handler.enabled_loggers)
+    
+    def test_explicit_level(self):
+        test_logger = setup_logger("setup_logger_level_test", level=logging.WARNING, log_file=False)
+        
+        self.assertEqual(test_logger.level, logging.WARNING)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+"""
+Unit tests for prompt fingerprinting, compaction and static prompt caching
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import os
+import sys
+import threading
+import time
+
+# Add project root to path
+current_file = os.path.abspath(__file__)
+project_root = current_file
+for _ in range(4):  # Go up 4 levels from tests/unit/test_prompt_cache.py
+    project_root = os.path.dirname(project_root)
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from oprina.common import prompt_cache
+from oprina.common.prompt_cache import (
+    LocalCacheProvider, PromptCache, compact_prompts, compact_text, fingerprint, instruction_for
+)
+
+INSTRUCTION = "You are the Email Agent.\n" + "- Always confirm before sending any email to anyone\n" * 3
+
+
+def _request(instruction=INSTRUCTION):
+    request = LlmRequest(model="gemini-2.0-flash")
+    request.config.system_instruction = instruction
+    request.config.tools = [types.Tool(function_declarations=[types.FunctionDeclaration(name="gmail_list_messages")])]
+    return request
+
+
+class TestCompaction(unittest.TestCase):
+    """Test fingerprints and compacted prompt variants"""
+    
+    def test_fingerprint_tracks_content(self):
+        self.assertEqual(fingerprint("a", {"b": 1}), fingerprint("a", {"b": 1}))
+        self.assertNotEqual(fingerprint("a"), fingerprint("a "))
+    
+    def test_compact_text(self):
+        text = "**Rules:**\n\n\n   - Always confirm before sending any email to anyone\n" \
+               "- Always confirm before sending any email to anyone!\n```\n    indented example\n```"
+        
+        self.assertEqual(compact_text(text),
+                         "Rules:\n\n- Always confirm before sending any email to anyone\n```\n    indented example\n```")
+    
+    def test_rules_shared_across_prompts_stated_once(self):
+        shared_rule = "- Guide users through setup process when needed"
+        shared, remainders = compact_prompts({
+            "email_agent": f"Email rules\n{shared_rule}",
+            "calendar_agent": f"Calendar rules\n{shared_rule}"
+        })
+        
+        self.assertIn(shared_rule, shared)
+        self.assertEqual(remainders, {"email_agent": "Email rules", "calendar_agent": "Calendar rules"})
+    
+    def test_instruction_unchanged_unless_enabled(self):
+        self.assertEqual(instruction_for("email_agent", INSTRUCTION), INSTRUCTION)
+
+
+class TestPromptCache(unittest.TestCase):
+    """Test the cached content registry against the local stand-in provider"""
+    
+    def setUp(self):
+        self.provider = LocalCacheProvider()
+        self.cache = PromptCache(provider=self.provider, min_tokens=0)
+    
+    def test_static_prefix_registered_once(self):
+        first, second = _request(), _request()
+        
+        self.assertTrue(self.cache.apply(first))
+        self.assertTrue(self.cache.apply(second))
+        
+        self.assertEqual(self.provider.created, 1)
+        self.assertEqual(second.config.cached_content, first.config.cached_content)
+        self.assertIsNone(second.config.system_instruction)
+        self.assertIsNone(second.config.tools)
+        cached = self.provider.contents[first.config.cached_content]
+        self.assertEqual(cached["system_instruction"], INSTRUCTION)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+    
+    def test_changed_prompt_gets_new_cache(self):
+        self.cache.apply(_request())
+        self.cache.apply(_request(INSTRUCTION + "- One more rule for the agent to follow\n"))
+        
+        self.assertEqual(self.provider.created, 2)
+    
+    def test_small_prompt_sent_unchanged(self):
+        cache = PromptCache(provider=self.provider, min_tokens=4096)
+        request = _request()
+        
+        self.assertFalse(cache.apply(request))
+        self.assertEqual(request.config.system_instruction, INSTRUCTION)
+        self.assertEqual(self.provider.created, 0)
+    
+    def test_failed_create_falls_back_without_retrying(self):
+        provider = Mock()
+        provider.create.side_effect = RuntimeError("quota")
+        cache = PromptCache(provider=provider, min_tokens=0)
+        
+        for _ in range(3):
+            request = _request()
+            self.assertFalse(cache.apply(request))
+            self.assertEqual(request.config.system_instruction, INSTRUCTION)
+        
+        provider.create.assert_called_once()
+        self.assertEqual(cache.stats()["errors"], 1)
+    
+    def test_failed_create_retried_after_short_delay(self):
+        provider = Mock()
+        provider.create.side_effect = [RuntimeError("quota"), "cachedContents/retried"]
+        cache = PromptCache(provider=provider, min_tokens=0, retry_after=0)
+        
+        self.assertFalse(cache.apply(_request()))
+        self.assertTrue(cache.apply(_request()))
+        
+        self.assertEqual(provider.create.call_count, 2)
+    
+    def test_create_in_flight_does_not_block_other_callers(self):
+        release = threading.Event()
+        provider = LocalCacheProvider()
+        create = provider.create
+        provider.create = lambda *args: release.wait(5) and create(*args)
+        cache = PromptCache(provider=provider, min_tokens=0)
+        
+        started = time.monotonic()
+        self.assertFalse(cache.apply(_request(), wait=False))
+        self.assertFalse(cache.apply(_request()))
+        self.assertLess(time.monotonic() - started, 1.0)
+        
+        release.set()
+        cache._executor.submit(lambda: None).result(timeout=5)
+        self.assertTrue(cache.apply(_request()))
+        self.assertEqual(provider.created, 1)
+    
+    def test_least_recently_used_evicted(self):
+        cache = PromptCache(provider=self.provider, min_tokens=0, max_entries=1)
+        
+        cache.apply(_request("first instruction"))
+        cache.apply(_request("second instruction"))
+        
+        self.assertEqual(self.provider.deleted, 1)
+        self.assertEqual(len(self.provider.contents), 1)
+    
+    def test_callback_disabled_by_default(self):
+        request = _request()
+        
+        with patch.object(prompt_cache, '_prompt_cache', self.cache):
+            self.assertIsNone(prompt_cache.cache_static_prompt(Mock(), request))
+            self.assertIsNone(request.config.cached_content)
+            
+            with patch.object(prompt_cache, 'PROMPT_CACHE_ENABLED', True):
+                # The first request triggers the create in the background and goes out unchanged
+                prompt_cache.cache_static_prompt(Mock(), request)
+                self.assertIsNone(request.config.cached_content)
+                self.cache._executor.submit(lambda: None).result(timeout=5)
+                
+                prompt_cache.cache_static_prompt(Mock(), request)
+            self.assertIsNotNone(request.config.cached_content)
+
+
+if __name__ == '__main__':
+    unittest.main()
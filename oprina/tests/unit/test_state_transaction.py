@@ -0,0 +1,163 @@
+"""
+Unit tests for coalesced session state writes
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import os
+import sys
+
+# Add project root to path
+current_file = os.path.abspath(__file__)
+project_root = current_file
+for _ in range(4):  # Go up 4 levels from tests/unit/test_state_transaction.py
+    project_root = os.path.dirname(project_root)
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from google.adk.sessions.state import State
+
+from oprina.common import state_transaction
+from oprina.common.state_transaction import state_transaction as transaction_scope, get_state, coalesce_state_writes
+from oprina.common.utils import update_agent_activity, start_workflow, update_workflow
+from oprina.tools.gmail import gmail_list_messages, gmail_star_message
+
+
+def _tool_context(value=None):
+    tool_context = Mock()
+    tool_context.state = State(value=value or {}, delta={})
+    return tool_context
+
+
+class TestStateTransaction(unittest.TestCase):
+    """Test buffering, no-op skipping and commit"""
+    
+    def test_writes_buffered_until_exit(self):
+        tool_context = _tool_context()
+        
+        with transaction_scope(tool_context) as state:
+            state["email:last_query"] = "in:inbox"
+            state["email:last_query"] = "from:boss"
+            self.assertEqual(state["email:last_query"], "from:boss")
+            self.assertNotIn("email:last_query", tool_context.state)
+        
+        self.assertEqual(tool_context.state._delta, {"email:last_query": "from:boss"})
+    
+    def test_unchanged_values_are_skipped(self):
+        tool_context = _tool_context({"email:results_count": 3, "email:current_results": [{"id": "a"}]})
+        
+        with transaction_scope(tool_context) as state:
+            state["email:results_count"] = 3
+            state["email:current_results"] = [{"id": "a"}]
+            state["email:last_fetch"] = "2024-01-15T10:00:00"
+        
+        self.assertEqual(tool_context.state._delta, {"email:last_fetch": "2024-01-15T10:00:00"})
+    
+    def test_in_place_mutation_is_written(self):
+        preferences = {"voice": "calm"}
+        tool_context = _tool_context({"user:preferences": preferences})
+        
+        with transaction_scope(tool_context) as state:
+            current = state["user:preferences"]
+            current["voice"] = "fast"
+            state["user:preferences"] = current
+        
+        self.assertIn("user:preferences", tool_context.state._delta)
+    
+    def test_utilities_join_active_transaction(self):
+        tool_context = _tool_context()
+        
+        with transaction_scope(tool_context):
+            update_agent_activity(tool_context, "email_agent", "listing_messages")
+            self.assertEqual(tool_context.state._delta, {})
+            self.assertEqual(get_state(tool_context)["last_agent_used"], "email_agent")
+        
+        self.assertEqual(tool_context.state["email:last_activity"], "listing_messages")
+    
+    def test_workflow_helpers_join_active_transaction(self):
+        tool_context = _tool_context()
+        
+        with transaction_scope(tool_context):
+            workflow_id = start_workflow(tool_context, "digest", {"total_steps": 2})
+            self.assertTrue(update_workflow(tool_context, workflow_id, {"step": "fetched"}))
+            self.assertEqual(tool_context.state._delta, {})
+        
+        self.assertEqual(tool_context.state[f"workflow:{workflow_id}"]["steps_completed"], 1)
+    
+    def test_commit_on_exception(self):
+        tool_context = _tool_context()
+        
+        with self.assertRaises(RuntimeError):
+            with transaction_scope(tool_context) as state:
+                state["calendar:last_fetch"] = "now"
+                raise RuntimeError("boom")
+        
+        self.assertEqual(tool_context.state["calendar:last_fetch"], "now")
+    
+    def test_kill_switch_writes_through(self):
+        tool_context = _tool_context()
+        
+        with patch.object(state_transaction, 'COALESCE_STATE_WRITES', False):
+            with transaction_scope(tool_context) as state:
+                state["email:last_query"] = "x"
+                self.assertIn("email:last_query", tool_context.state._delta)
+    
+    def test_decorator_commits_once(self):
+        tool_context = _tool_context()
+        
+        @coalesce_state_writes
+        def tool(tool_context=None):
+            state = get_state(tool_context)
+            for i in range(5):
+                state[f"key{i}"] = i
+        
+        with patch.object(State, '__setitem__') as setitem, \
+             patch.object(State, 'update') as update:
+            tool(tool_context=tool_context)
+        
+        setitem.assert_not_called()
+        update.assert_called_once_with({f"key{i}": i for i in range(5)})
+
+
+class TestToolsCoalesce(unittest.TestCase):
+    """Test that state-writing tools produce one coalesced delta"""
+    
+    def test_gmail_list_messages_single_update(self):
+        tool_context = _tool_context()
+        tool_context._invocation_context.user_id = "user-1"
+        service = Mock()
+        service.users().messages().list().execute.return_value = {'messages': [{'id': 'm1'}, {'id': 'm2'}]}
+        service.users().messages().get().execute.return_value = {
+            'payload': {'headers': [{'name': 'From', 'value': 'a@example.com'}, {'name': 'Subject', 'value': 'Hi'}]}
+        }
+        
+        with patch('oprina.tools.gmail.get_gmail_service', return_value=service):
+            gmail_list_messages(tool_context=tool_context)
+            first_delta = dict(tool_context.state._delta)
+            
+            tool_context.state = State(value=tool_context.state.to_dict(), delta={})
+            gmail_list_messages(tool_context=tool_context)
+        
+        self.assertIn("email:listing", first_delta)
+        self.assertIn("last_agent_used", first_delta)
+        self.assertNotIn("email:listing", tool_context.state._delta)
+        self.assertNotIn("last_agent_used", tool_context.state._delta)
+    
+    def test_message_action_tool_single_update(self):
+        tool_context = _tool_context()
+        tool_context._invocation_context.user_id = "user-1"
+        service = Mock()
+        
+        with patch('oprina.tools.gmail.get_gmail_service', return_value=service), \
+             patch.object(State, '__setitem__') as setitem, \
+             patch.object(State, 'update') as update:
+            gmail_star_message("1890a2b3c4d5e6f7", tool_context=tool_context)
+        
+        setitem.assert_not_called()
+        update.assert_called_once()
+        self.assertIn("email:last_operated_message", update.call_args.args[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+Unit tests for per-turn tool selection
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import os
+import sys
+
+# Add project root to path
+current_file = os.path.abspath(__file__)
+project_root = current_file
+for _ in range(4):  # Go up 4 levels from tests/unit/test_tool_selection.py
+    project_root = os.path.dirname(project_root)
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from google.genai import types
+
+from oprina.common import tool_selection
+from oprina.common.session_keys import EMAIL_ACTIVE_TOOL_GROUPS, EMAIL_LAST_OPERATION_TYPE
+from oprina.common.tool_selection import EMAIL_CORE_TOOLS, EMAIL_TOOL_SELECTOR, select_email_tools
+from oprina.tools.gmail import GMAIL_TOOLS
+
+
+def _context(text, state, invocation_id):
+    context = Mock()
+    context.user_content = types.Content(role="user", parts=[types.Part(text=text)])
+    context.agent_name = "email_agent"
+    context.invocation_id = invocation_id
+    context.state = state
+    return context
+
+
+def _request(*names):
+    request = Mock()
+    request.tools_dict = {name: Mock() for name in names}
+    request.config = types.GenerateContentConfig(tools=[types.Tool(
+        function_declarations=[types.FunctionDeclaration(name=name) for name in names]
+    )])
+    return request
+
+
+def _declared(request):
+    return {d.name for d in request.config.tools[0].function_declarations}
+
+
+class TestToolSelector(unittest.TestCase):
+    """Test group selection and declaration trimming for email_agent"""
+    
+    def setUp(self):
+        patcher = patch.object(tool_selection, 'TOOL_SELECTION_ENABLED', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.all_tools = [tool.name for tool in GMAIL_TOOLS] + ["transfer_to_agent"]
+    
+    def test_every_gmail_tool_is_selectable(self):
+        self.assertEqual(EMAIL_TOOL_SELECTOR.managed, {tool.name for tool in GMAIL_TOOLS})
+    
+    def test_reading_turn_exposes_core_only(self):
+        request = _request(*self.all_tools)
+        
+        select_email_tools(_context("Show me my unread emails", {}, "inv-1"), request)
+        
+        self.assertEqual(_declared(request), set(EMAIL_CORE_TOOLS) | {"transfer_to_agent"})
+        self.assertEqual(set(request.tools_dict), set(self.all_tools))
+    
+    def test_group_stays_exposed_for_workflow(self):
+        state = {}
+        texts = ["Send an email to bob@example.com about lunch", "Make it shorter", "Looks good", "Yes, go ahead",
+                 "Thanks"]
+        exposed = []
+        for number, text in enumerate(texts):
+            request = _request(*self.all_tools)
+            select_email_tools(_context(text, state, f"inv-{number}"), request)
+            exposed.append("gmail_send_message" in _declared(request))
+        
+        self.assertEqual(exposed, [True, True, True, True, False])
+        self.assertEqual(state[EMAIL_ACTIVE_TOOL_GROUPS], {})
+    
+    def test_model_calls_in_one_invocation_share_selection(self):
+        state = {}
+        context = _context("Reply saying thanks", state, "inv-1")
+        
+        for _ in range(3):
+            select_email_tools(context, _request(*self.all_tools))
+        
+        self.assertEqual(state[EMAIL_ACTIVE_TOOL_GROUPS], {"reply": tool_selection.STICKY_TURNS})
+    
+    def test_last_operation_selects_its_group(self):
+        request = _request(*self.all_tools)
+        
+        select_email_tools(_context("Actually, undo that", {EMAIL_LAST_OPERATION_TYPE: "star_message"}, "inv-1"),
+                           request)
+        
+        self.assertIn("gmail_unstar_message", _declared(request))
+        self.assertNotIn("gmail_delete_message", _declared(request))
+    
+    def test_disabled_selection_leaves_request_untouched(self):
+        request = _request(*self.all_tools)
+        
+        with patch.object(tool_selection, 'TOOL_SELECTION_ENABLED', False):
+            self.assertIsNone(select_email_tools(_context("Show me my emails", {}, "inv-1"), request))
+        
+        self.assertEqual(_declared(request), set(self.all_tools))
+
+
+if __name__ == '__main__':
+    unittest.main()
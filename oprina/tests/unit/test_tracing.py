@@ -0,0 +1,154 @@
+"""
+Unit tests for tool execution tracing - spans, ring buffer and latency histograms
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add project root to path
+current_file = os.path.abspath(__file__)
+project_root = current_file
+for _ in range(4):  # Go up 4 levels from tests/unit/test_tracing.py
+    project_root = os.path.dirname(project_root)
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from googleapiclient.http import HttpMockSequence
+
+from oprina.common import tracing
+from oprina.common.tracing import (
+    trace_tool, tool_span, llm_call, record_api_call, submit_in_span,
+    get_recent_spans, get_tool_latency_histograms, clear_traces
+)
+from oprina.common.utils import log_tool_execution
+from oprina.tools.auth_utils import TracedHttpRequest
+
+
+class TestToolSpans(unittest.TestCase):
+    """Test span recording and counters"""
+    
+    def setUp(self):
+        clear_traces()
+    
+    def test_decorated_tool_records_span(self):
+        @trace_tool
+        def sample_tool(value: str, tool_context=None) -> str:
+            """Sample tool."""
+            record_api_call(120)
+            with llm_call():
+                time.sleep(0.01)
+            return value.upper()
+        
+        self.assertEqual(sample_tool("hi", tool_context=None), "HI")
+        self.assertEqual(sample_tool.__name__, "sample_tool")
+        self.assertEqual(sample_tool.__doc__, "Sample tool.")
+        
+        span = get_recent_spans()[-1]
+        self.assertEqual(span["tool"], "sample_tool")
+        self.assertTrue(span["success"])
+        self.assertEqual(span["api_calls"], 1)
+        self.assertEqual(span["api_bytes"], 120)
+        self.assertEqual(span["llm_calls"], 1)
+        self.assertGreaterEqual(span["llm_ms"], 10)
+        self.assertGreaterEqual(span["duration_ms"], span["llm_ms"])
+    
+    def test_nested_spans_roll_up_into_parent(self):
+        with tool_span("workflow"):
+            with tool_span("gmail_send_message"):
+                record_api_call(10)
+            record_api_call(5)
+        
+        child, parent = get_recent_spans()
+        self.assertEqual(child["parent"], "workflow")
+        self.assertEqual(child["api_calls"], 1)
+        self.assertEqual(parent["api_calls"], 2)
+        self.assertEqual(parent["api_bytes"], 15)
+    
+    def test_worker_threads_keep_span(self):
+        with tool_span("agenda"):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                futures = [submit_in_span(executor, record_api_call, 1) for _ in range(4)]
+                [future.result() for future in futures]
+        
+        self.assertEqual(get_recent_spans()[-1]["api_calls"], 4)
+    
+    def test_exception_marks_span_failed(self):
+        with self.assertRaises(ValueError):
+            with tool_span("broken"):
+                raise ValueError("bad input")
+        
+        span = get_recent_spans()[-1]
+        self.assertFalse(span["success"])
+        self.assertEqual(span["error"], "ValueError: bad input")
+    
+    def test_log_tool_execution_annotates_span_without_state_writes(self):
+        tool_context = Mock()
+        tool_context.state = {}
+        
+        with tool_span("gmail_list_messages"):
+            log_tool_execution(tool_context, "gmail_list_messages", "list_messages", True, "Query: in:inbox")
+            log_tool_execution(tool_context, "gmail_list_messages", "list_messages", False, "quota")
+        
+        self.assertEqual(tool_context.state, {})
+        span = get_recent_spans()[-1]
+        self.assertEqual(span["operation"], "list_messages")
+        self.assertFalse(span["success"])
+        self.assertEqual(span["details"], "quota")
+
+
+class TestTraceBuffer(unittest.TestCase):
+    """Test the ring buffer bound and histogram export"""
+    
+    def setUp(self):
+        clear_traces()
+    
+    def test_ring_buffer_is_bounded(self):
+        for _ in range(tracing.TRACE_BUFFER_SIZE + 10):
+            with tool_span("noop"):
+                pass
+        
+        self.assertEqual(len(get_recent_spans(limit=tracing.TRACE_BUFFER_SIZE * 2)), tracing.TRACE_BUFFER_SIZE)
+    
+    def test_latency_histograms(self):
+        durations = iter([0.005, 0.03, 0.2, 0.2])
+        with patch('oprina.common.tracing.time.perf_counter') as perf_counter:
+            for duration in durations:
+                perf_counter.side_effect = [100.0, 100.0 + duration]
+                with tool_span("calendar_list_events"):
+                    pass
+        
+        histogram = get_tool_latency_histograms()["calendar_list_events"]
+        self.assertEqual(histogram["count"], 4)
+        self.assertEqual(histogram["p50_ms"], 30.0)
+        self.assertEqual(histogram["max_ms"], 200.0)
+        self.assertEqual(histogram["buckets"]["<=10ms"], 1)
+        self.assertEqual(histogram["buckets"]["<=50ms"], 1)
+        self.assertEqual(histogram["buckets"]["<=250ms"], 2)
+
+
+class TestTracedHttpRequest(unittest.TestCase):
+    """Test API call counting at the HTTP request level"""
+    
+    def setUp(self):
+        clear_traces()
+    
+    def test_api_response_counted(self):
+        http = HttpMockSequence([({'status': '200'}, b'{"id": "abc"}')])
+        request = TracedHttpRequest(http, lambda resp, content: content, "https://example.com/api",
+                                    method="POST", body='{"q": 1}')
+        
+        with tool_span("gmail_get_message"):
+            self.assertEqual(request.execute(), b'{"id": "abc"}')
+        
+        span = get_recent_spans()[-1]
+        self.assertEqual(span["api_calls"], 1)
+        self.assertEqual(span["api_bytes"], len('{"q": 1}') + len(b'{"id": "abc"}'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,519 @@
+"""
+Unit tests for cross-agent workflows - step executor and memoization, deadline extraction and slot finding
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Add project root to path
+current_file = os.path.abspath(__file__)
+project_root = current_file
+for _ in range(4):  # Go up 4 levels from tests/unit/test_workflows.py
+    project_root = os.path.dirname(project_root)
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from oprina.tools import workflows
+from oprina.tools.workflows import (
+    process_emails_for_deadlines_and_schedule, schedule_meeting_with_invitation, coordinate_email_reply_and_meeting,
+    _pack_emails, _truncate_to_token_budget, _schedule_deadlines
+)
+from oprina.tools import workflow_executor
+from oprina.tools.workflow_executor import WorkflowExecutor
+from oprina.common.utils import start_workflow
+from oprina.common.session_keys import (
+    EMAIL_DEADLINES_FOUND, AVAILABILITY_CHECK_RESULTS, MEETING_COORDINATION_ACTIVE, WORKFLOW_STEP_CACHE
+)
+
+
+def _message(msg_id, subject, body="Please send the report by Friday."):
+    import base64
+    return {
+        'id': msg_id,
+        'snippet': body[:50],
+        'payload': {
+            'mimeType': 'text/plain',
+            'headers': [
+                {'name': 'From', 'value': 'boss@example.com'},
+                {'name': 'Subject', 'value': subject}
+            ],
+            'body': {'data': base64.urlsafe_b64encode(body.encode()).decode()}
+        }
+    }
+
+
+def _nested_message(msg_id, subject, body):
+    """A multipart/mixed message whose text sits in a multipart/alternative part"""
+    import base64
+    encoded = base64.urlsafe_b64encode(body.encode()).decode()
+    return {
+        'id': msg_id,
+        'snippet': "See attached",
+        'payload': {
+            'mimeType': 'multipart/mixed',
+            'headers': [
+                {'name': 'From', 'value': 'boss@example.com'},
+                {'name': 'Subject', 'value': subject}
+            ],
+            'parts': [
+                {'mimeType': 'multipart/alternative', 'parts': [
+                    {'mimeType': 'text/plain', 'body': {'data': encoded}},
+                    {'mimeType': 'text/html', 'body': {'data': encoded}}
+                ]},
+                {'mimeType': 'application/pdf', 'body': {}}
+            ]
+        }
+    }
+
+
+class FakeGmailBatch:
+    """Minimal stand-in for a googleapiclient BatchHttpRequest"""
+    
+    def __init__(self, callback, messages):
+        self.callback = callback
+        self.messages = messages
+        self.request_ids = []
+    
+    def add(self, request, request_id=None):
+        self.request_ids.append(request_id)
+    
+    def execute(self):
+        for request_id in self.request_ids:
+            self.callback(request_id, self.messages[request_id], None)
+
+
+class TestDeadlineHelpers(unittest.TestCase):
+    """Test prompt budgeting and slot finding"""
+    
+    def test_truncate_drops_quoted_lines_and_caps_length(self):
+        text = "Real content here\n> quoted reply\n" + "word " * 2000
+        truncated = _truncate_to_token_budget(text, 100)
+        self.assertNotIn("quoted reply", truncated)
+        self.assertLessEqual(len(truncated), 100 * 4 + 4)
+    
+    def test_pack_emails_respects_call_budget(self):
+        emails = [{"id": str(i), "subject": "s", "text": "x" * 2400} for i in range(25)]
+        packs = _pack_emails(emails)
+        self.assertGreater(len(packs), 1)
+        self.assertEqual(sum(len(pack) for pack in packs), 25)
+        for pack in packs:
+            self.assertLessEqual(len(pack) * 610, 6000 + 610)
+    
+    def test_schedule_skips_busy_time_and_respects_due_date(self):
+        # Monday 2024-01-15 08:00 local
+        window_start = datetime(2024, 1, 15, 8, 0)
+        window_end = window_start + timedelta(days=7)
+        busy = [(datetime(2024, 1, 15, 9, 0).timestamp(), datetime(2024, 1, 15, 10, 20).timestamp())]
+        deadlines = [
+            {"task": "Send report", "message_id": "m1", "due_date": "2024-01-15",
+             "priority": "high", "effort_minutes": 60},
+            {"task": "Review deck", "message_id": "m2", "due_date": "2024-01-15",
+             "priority": "medium", "effort_minutes": 30},
+            {"task": "Late task", "message_id": "m3", "due_date": "2024-01-10",
+             "priority": "low", "effort_minutes": 30}
+        ]
+        
+        suggestions = _schedule_deadlines(deadlines, busy, window_start, window_end)
+        
+        self.assertEqual(len(suggestions), 2)
+        self.assertEqual(suggestions[0]["start_time"], "2024-01-15 10:30")
+        self.assertEqual(suggestions[0]["end_time"], "2024-01-15 11:30")
+        self.assertEqual(suggestions[1]["start_time"], "2024-01-15 11:30")
+    
+    def test_schedule_skips_weekends(self):
+        window_start = datetime(2024, 1, 13, 8, 0)  # Saturday
+        deadlines = [{"task": "Prep", "message_id": "m1", "due_date": None,
+                      "priority": "low", "effort_minutes": 45}]
+        
+        suggestions = _schedule_deadlines(deadlines, [], window_start, window_start + timedelta(days=7))
+        
+        self.assertEqual(suggestions[0]["start_time"], "2024-01-15 09:00")
+
+
+class TestDeadlineWorkflow(unittest.TestCase):
+    """Test the end-to-end deadline workflow with batching and caching"""
+    
+    def setUp(self):
+        workflows._user_deadline_caches.clear()
+        self.mock_tool_context = Mock()
+        self.mock_tool_context.state = {}
+        self.mock_tool_context._invocation_context.user_id = "workflow-user"
+        
+        self.messages = {
+            'm1': _message('m1', 'Quarterly report'),
+            'm2': _message('m2', 'Lunch?', body="Want to grab lunch sometime?")
+        }
+        self.service = Mock()
+        self.service.users().messages().list().execute.return_value = {
+            'messages': [{'id': 'm1'}, {'id': 'm2'}]
+        }
+        self.service.new_batch_http_request.side_effect = (
+            lambda callback: FakeGmailBatch(callback, self.messages)
+        )
+        
+        self.llm_client = Mock()
+        self.llm_client.models.generate_content.return_value = Mock(text=json.dumps([
+            {"message_id": "m1", "task": "Send quarterly report", "due_date": "2099-01-02",
+             "priority": "HIGH", "effort_minutes": 90}
+        ]))
+    
+    def _run(self):
+        with patch('oprina.tools.workflows.get_gmail_service', return_value=self.service), \
+             patch('oprina.tools.workflows.get_busy_intervals', return_value=[]), \
+             patch('oprina.tools.workflows.get_genai_client', return_value=self.llm_client), \
+             patch('oprina.tools.workflows.update_agent_activity'):
+            return process_emails_for_deadlines_and_schedule(days_to_check=7, tool_context=self.mock_tool_context)
+    
+    def test_extracts_deadlines_in_one_packed_call(self):
+        result = self._run()
+        
+        self.assertIn("Send quarterly report", result)
+        self.assertEqual(self.llm_client.models.generate_content.call_count, 1)
+        prompt = self.llm_client.models.generate_content.call_args.kwargs["contents"]
+        self.assertIn("[m1]", prompt)
+        self.assertIn("[m2]", prompt)
+        
+        deadlines = self.mock_tool_context.state[EMAIL_DEADLINES_FOUND]
+        self.assertEqual(len(deadlines), 1)
+        self.assertEqual(deadlines[0]["priority"], "high")
+        self.assertEqual(deadlines[0]["effort_minutes"], 90)
+        self.assertEqual(len(self.mock_tool_context.state[AVAILABILITY_CHECK_RESULTS]), 1)
+    
+    def test_rerun_only_processes_new_mail(self):
+        self._run()
+        self.service.new_batch_http_request.reset_mock()
+        
+        result = self._run()
+        
+        self.assertIn("Send quarterly report", result)
+        self.assertEqual(self.llm_client.models.generate_content.call_count, 1)
+        self.service.new_batch_http_request.assert_not_called()
+    
+    def test_failed_extraction_is_retried_next_run(self):
+        self.llm_client.models.generate_content.side_effect = [RuntimeError("quota"), Mock(text="[]")]
+        
+        self._run()
+        self._run()
+        
+        self.assertEqual(self.llm_client.models.generate_content.call_count, 2)
+    
+    def test_nested_multipart_body_reaches_prompt(self):
+        self.messages['m1'] = _nested_message('m1', 'Quarterly report', "Budget numbers are due by Friday noon.")
+        
+        self._run()
+        
+        fields = self.service.users().messages().get.call_args.kwargs["fields"]
+        self.assertIn("parts(mimeType,body/data,parts(mimeType,body/data,parts(", fields)
+        prompt = self.llm_client.models.generate_content.call_args.kwargs["contents"]
+        self.assertIn("Budget numbers are due by Friday noon.", prompt)
+        self.assertNotIn("See attached", prompt)
+
+
+class TestWorkflowExecutor(unittest.TestCase):
+    """Test dependency-ordered concurrent step execution"""
+    
+    def setUp(self):
+        self.mock_tool_context = Mock()
+        self.mock_tool_context.state = {}
+        self.workflow_id = start_workflow(self.mock_tool_context, "test", {"total_steps": 3})
+    
+    def _workflow(self):
+        return self.mock_tool_context.state[f"workflow:{self.workflow_id}"]
+    
+    def test_independent_steps_run_concurrently(self):
+        executor = WorkflowExecutor(self.mock_tool_context, self.workflow_id)
+        executor.add_step("a", lambda inputs: time.sleep(0.2) or "A")
+        executor.add_step("b", lambda inputs: time.sleep(0.2) or "B")
+        executor.add_step("c", lambda inputs: inputs["a"] + inputs["b"], depends_on=["a", "b"])
+        
+        run = executor.run()
+        
+        self.assertEqual(run["status"], "completed")
+        self.assertEqual(run["results"]["c"], "AB")
+        self.assertLess(run["elapsed_ms"], 350)
+        self.assertGreaterEqual(run["serial_ms"], 400)
+        
+        workflow = self._workflow()
+        self.assertEqual(workflow["status"], "completed")
+        self.assertEqual(workflow["steps_completed"], 3)
+        self.assertIn("duration_ms", workflow["results"]["step_1"])
+    
+    def test_shared_resource_is_serialized(self):
+        active, peak = [0], [0]
+        lock = threading.Lock()
+        
+        def use_gmail(inputs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+        
+        executor = WorkflowExecutor(self.mock_tool_context, self.workflow_id)
+        for name in ("a", "b", "c"):
+            executor.add_step(name, use_gmail, resource="gmail")
+        
+        self.assertEqual(executor.run()["status"], "completed")
+        self.assertEqual(peak[0], 1)
+    
+    def test_failure_skips_only_dependents(self):
+        def fail(inputs):
+            raise RuntimeError("calendar down")
+        
+        executor = WorkflowExecutor(self.mock_tool_context, self.workflow_id)
+        executor.add_step("a", fail)
+        executor.add_step("b", lambda inputs: "B")
+        executor.add_step("c", lambda inputs: "C", depends_on=["a"])
+        
+        run = executor.run()
+        
+        self.assertEqual(run["status"], "failed")
+        self.assertEqual(run["states"], {"a": "failed", "b": "completed", "c": "skipped"})
+        self.assertEqual(str(run["errors"]["a"]), "calendar down")
+        self.assertEqual(self._workflow()["status"], "failed")
+    
+    def test_cancel_stops_pending_steps(self):
+        executor = WorkflowExecutor(self.mock_tool_context, self.workflow_id)
+        executor.add_step("a", lambda inputs: executor.cancel())
+        executor.add_step("b", lambda inputs: "B", depends_on=["a"])
+        
+        run = executor.run()
+        
+        self.assertEqual(run["status"], "cancelled")
+        self.assertEqual(run["states"]["b"], "cancelled")
+        self.assertEqual(self._workflow()["status"], "cancelled")
+    
+    def test_memoized_step_skipped_on_rerun(self):
+        calls = []
+        
+        def build(fail_second=False):
+            executor = WorkflowExecutor(self.mock_tool_context, self.workflow_id)
+            executor.add_step("fetch", lambda inputs: calls.append("fetch") or [1, 2], memo_key={"q": "x"})
+            
+            def send(inputs):
+                calls.append("send")
+                if fail_second:
+                    raise RuntimeError("smtp down")
+                return sum(inputs["fetch"])
+            executor.add_step("send", send, depends_on=["fetch"], memo_key={"to": "a"})
+            return executor
+        
+        failed = build(fail_second=True).run()
+        self.assertEqual(failed["status"], "failed")
+        
+        run = build().run()
+        
+        self.assertEqual(run["status"], "completed")
+        self.assertEqual(run["results"]["send"], 3)
+        self.assertEqual(run["cached"], ["fetch"])
+        self.assertEqual(calls, ["fetch", "send", "send"])
+        
+        self.assertEqual(build().run()["cached"], ["fetch", "send"])
+        self.assertEqual(len(calls), 3)
+    
+    def test_memoized_output_expires(self):
+        def run_once():
+            executor = WorkflowExecutor(self.mock_tool_context, self.workflow_id)
+            executor.add_step("fetch", lambda inputs: "data", memo_key={"q": "x"}, memo_ttl=60)
+            return executor.run()
+        
+        run_once()
+        with patch('oprina.tools.workflow_executor.time.time', return_value=time.time() + 61):
+            self.assertEqual(run_once()["cached"], [])
+    
+    def test_step_cache_is_capped(self):
+        with patch.object(workflow_executor, 'STEP_CACHE_MAX_ENTRIES', 3):
+            for i in range(5):
+                executor = WorkflowExecutor(self.mock_tool_context, self.workflow_id)
+                executor.add_step("fetch", lambda inputs, i=i: i, memo_key={"i": i})
+                executor.run()
+        
+        store = self.mock_tool_context.state[WORKFLOW_STEP_CACHE]
+        self.assertEqual(sorted(entry["output"] for entry in store.values()), [2, 3, 4])
+    
+    def test_memoized_outputs_scoped_to_workflow_instance(self):
+        calls = []
+        
+        def run_in(workflow_id):
+            executor = WorkflowExecutor(self.mock_tool_context, workflow_id)
+            executor.add_step("send", lambda inputs: calls.append(workflow_id) or "sent", memo_key={"to": "a"})
+            return executor.run()
+        
+        run_in(self.workflow_id)
+        other = start_workflow(self.mock_tool_context, "other_workflow", {})
+        
+        self.assertEqual(run_in(other)["cached"], [])
+        self.assertEqual(calls, [self.workflow_id, other])
+    
+    def test_step_invalidates_memoized_output(self):
+        reads = []
+        
+        def build():
+            executor = WorkflowExecutor(self.mock_tool_context, self.workflow_id)
+            executor.add_step("read", lambda inputs: reads.append(1) or len(reads), memo_key={"q": "x"})
+            executor.add_step("write", lambda inputs: "created", depends_on=["read"], memo_key={"w": 1},
+                              memo_inputs=False, invalidates=["read"])
+            return executor
+        
+        build().run()
+        run = build().run()
+        
+        self.assertEqual(len(reads), 2)
+        self.assertEqual(run["cached"], ["write"])
+    
+    def test_unknown_dependency_rejected(self):
+        executor = WorkflowExecutor(self.mock_tool_context, self.workflow_id)
+        with self.assertRaises(ValueError):
+            executor.add_step("a", lambda inputs: None, depends_on=["missing"])
+
+
+class TestMeetingWorkflow(unittest.TestCase):
+    """Test the concurrent meeting scheduling workflow"""
+    
+    def setUp(self):
+        self.mock_tool_context = Mock()
+        self.mock_tool_context.state = {}
+    
+    def test_availability_and_draft_overlap(self):
+        def slow_busy(*args, **kwargs):
+            time.sleep(0.2)
+            return []
+        
+        def slow_draft(**kwargs):
+            time.sleep(0.2)
+            return "Subject: Roadmap\n\nHi, could we meet?"
+        
+        with patch('oprina.tools.workflows.get_busy_intervals', side_effect=slow_busy), \
+             patch('oprina.tools.workflows.gmail_generate_email', side_effect=slow_draft), \
+             patch('oprina.tools.workflows.calendar_create_event', return_value={"id": "evt1"}) as create, \
+             patch('oprina.tools.workflows.gmail_send_message', return_value="Email sent successfully to sam@example.com. Subject: x") as send, \
+             patch('oprina.tools.workflows.update_agent_activity'):
+            started = time.perf_counter()
+            result = schedule_meeting_with_invitation(
+                attendee_email="sam@example.com",
+                meeting_subject="Roadmap",
+                preferred_date="2030-03-04",
+                tool_context=self.mock_tool_context
+            )
+            elapsed = time.perf_counter() - started
+        
+        self.assertIn("Meeting coordination completed successfully", result)
+        self.assertLess(elapsed, 0.35)
+        self.assertEqual(create.call_args.kwargs["start_time"], "2030-03-04 14:00")
+        body = send.call_args.kwargs["body"]
+        self.assertTrue(body.startswith("Hi, could we meet?"))
+        self.assertIn("Time: 14:00 - 15:00", body)
+        self.assertEqual(self.mock_tool_context.state[MEETING_COORDINATION_ACTIVE]["event_id"], "evt1")
+    
+    def test_confirm_after_proposal_only_runs_remaining_steps(self):
+        sent = "Email sent successfully to sam@example.com. Subject: Meeting Invitation: Roadmap"
+        with patch('oprina.tools.workflows.get_busy_intervals', return_value=[]) as busy, \
+             patch('oprina.tools.workflows.gmail_generate_email', return_value="Hi, could we meet?") as draft, \
+             patch('oprina.tools.workflows.calendar_create_event', return_value={"id": "evt1"}) as create, \
+             patch('oprina.tools.workflows.gmail_send_message', side_effect=[RuntimeError("quota"), sent]) as send, \
+             patch('oprina.tools.workflows.update_agent_activity'):
+            kwargs = dict(attendee_email="sam@example.com", meeting_subject="Roadmap",
+                          preferred_date="2030-03-04", tool_context=self.mock_tool_context)
+            
+            proposal = schedule_meeting_with_invitation(confirm=False, **kwargs)
+            self.assertIn("2030-03-04 14:00 - 15:00", proposal)
+            self.assertEqual(self.mock_tool_context.state[MEETING_COORDINATION_ACTIVE]["status"], "proposed")
+            create.assert_not_called()
+            
+            failed = schedule_meeting_with_invitation(**kwargs)
+            self.assertIn("could not be sent", failed)
+            
+            result = schedule_meeting_with_invitation(**kwargs)
+        
+        self.assertIn("Meeting coordination completed successfully", result)
+        # The calendar is read again after the event was created, but the event is reused
+        self.assertEqual(busy.call_count, 2)
+        self.assertEqual(draft.call_count, 1)
+        self.assertEqual(create.call_count, 1)
+        self.assertEqual(send.call_count, 2)
+    
+    def test_repeated_or_new_meeting_runs_again(self):
+        sent = "Email sent successfully to sam@example.com. Subject: x"
+        calendar = []
+        
+        def create(**kwargs):
+            start = datetime.strptime(kwargs["start_time"], "%Y-%m-%d %H:%M")
+            end = datetime.strptime(kwargs["end_time"], "%Y-%m-%d %H:%M")
+            calendar.append((start.timestamp(), end.timestamp()))
+            return {"id": f"evt{len(calendar)}"}
+        
+        with patch('oprina.tools.workflows.get_busy_intervals', side_effect=lambda *a: list(calendar)), \
+             patch('oprina.tools.workflows.gmail_generate_email', return_value="Hi, could we meet?"), \
+             patch('oprina.tools.workflows.calendar_create_event', side_effect=create) as create_event, \
+             patch('oprina.tools.workflows.gmail_send_message', return_value=sent) as send, \
+             patch('oprina.tools.workflows.update_agent_activity'):
+            for subject in ("Roadmap", "Roadmap", "Budget"):
+                result = schedule_meeting_with_invitation(
+                    attendee_email="sam@example.com",
+                    meeting_subject=subject,
+                    preferred_date="2030-03-04",
+                    tool_context=self.mock_tool_context
+                )
+                self.assertIn("Meeting coordination completed successfully", result)
+        
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual([call.kwargs["start_time"] for call in create_event.call_args_list],
+                         ["2030-03-04 14:00", "2030-03-04 09:00", "2030-03-04 10:00"])
+    
+    def test_busy_preferred_time_moves_to_free_slot(self):
+        busy = [(datetime(2030, 3, 4, 9, 0).timestamp(), datetime(2030, 3, 4, 15, 0).timestamp())]
+        
+        with patch('oprina.tools.workflows.get_busy_intervals', return_value=busy), \
+             patch('oprina.tools.workflows.gmail_generate_email', return_value="Error generating email: quota"), \
+             patch('oprina.tools.workflows.calendar_create_event', return_value={"id": "evt1"}) as create, \
+             patch('oprina.tools.workflows.gmail_send_message', return_value="Email sent successfully to sam@example.com. Subject: x") as send, \
+             patch('oprina.tools.workflows.update_agent_activity'):
+            schedule_meeting_with_invitation(
+                attendee_email="sam@example.com",
+                meeting_subject="Roadmap",
+                preferred_date="2030-03-04",
+                tool_context=self.mock_tool_context
+            )
+        
+        self.assertEqual(create.call_args.kwargs["start_time"], "2030-03-04 15:00")
+        self.assertIn("I'd like to schedule a meeting with you.", send.call_args.kwargs["body"])
+
+
+
+class TestEmailReplyWorkflow(unittest.TestCase):
+    """Test that replies are only skipped when retrying the same request"""
+    
+    def setUp(self):
+        self.mock_tool_context = Mock()
+        self.mock_tool_context.state = {}
+    
+    def test_same_reply_to_another_email_is_sent(self):
+        senders = {"1": "From: Ann <ann@example.com>", "2": "From: Bob <bob@example.com>"}
+        
+        with patch('oprina.tools.workflows.gmail_get_message', side_effect=lambda ref, **kw: senders[ref]), \
+             patch('oprina.tools.workflows.gmail_send_message',
+                   side_effect=[RuntimeError("quota"), "Email sent successfully", "Email sent successfully"]) as send, \
+             patch('oprina.tools.workflows.update_agent_activity'):
+            results = [
+                coordinate_email_reply_and_meeting(ref, "Thanks, sounds good.", schedule_follow_up=False,
+                                                   tool_context=self.mock_tool_context)
+                for ref in ("1", "1", "2")
+            ]
+        
+        self.assertIn("Could not send reply", results[0])
+        self.assertIn("✅ Reply sent to ann@example.com", results[1])
+        self.assertIn("✅ Reply sent to bob@example.com", results[2])
+        self.assertEqual([call.kwargs["to"] for call in send.call_args_list],
+                         ["ann@example.com", "ann@example.com", "bob@example.com"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,18 +9,38 @@ import json, os
 from typing import Optional, Dict, Any
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
+from googleapiclient.http import HttpRequest
 from oprina.tools.token_service import get_token_service
 from oprina.services.logging.logger import setup_logger
+from oprina.services.logging.sampling import lazy
+from oprina.common.tracing import record_api_call
 
 # Import session state constants
 from oprina.common.session_keys import USER_ID
 
-logger = setup_logger("auth_utils")
+logger = setup_logger("auth_utils", sampling=True)
 
 # Global services cache to avoid recreating
 _user_services = {}
 
 
+class TracedHttpRequest(HttpRequest):
+    """HttpRequest that counts each API response (and its bytes) on the current tool span."""
+    
+    def __init__(self, http, postproc, uri, *args, **kwargs):
+        def traced_postproc(resp, content):
+            request_bytes = len(self.body or b"")
+            record_api_call(request_bytes + len(content or b""))
+            return postproc(resp, content)
+        
+        super().__init__(http, traced_postproc, uri, *args, **kwargs)
+
+
+def _public_attributes(obj) -> list:
+    """Public attribute names of obj (for debug logging)."""
+    return [attr for attr in dir(obj) if not attr.startswith('_')]
+
+
 def extract_user_id_from_context(tool_context) -> Optional[str]:
     """
     Extract user_id from ADK tool context.
@@ -34,85 +54,85 @@ def extract_user_id_from_context(tool_context) -> Optional[str]:
             return None
         
         # Log the entire tool_context structure for debugging
-        logger.info(f"🔍 tool_context type: {type(tool_context)}")
-        logger.info(f"🔍 tool_context attributes: {[attr for attr in dir(tool_context) if not attr.startswith('_')]}")
+        logger.debug("🔍 tool_context type: %s", type(tool_context))
+        logger.debug("🔍 tool_context attributes: %s", lazy(_public_attributes, tool_context))
         
         # Method 1: Check ADK invocation context (where stream_query params are stored)
         if hasattr(tool_context, '_invocation_context'):
             invocation_context = tool_context._invocation_context
-            logger.info(f"🔍 invocation_context type: {type(invocation_context)}")
-            logger.info(f"🔍 invocation_context attributes: {[attr for attr in dir(invocation_context) if not attr.startswith('_')]}")
+            logger.debug("🔍 invocation_context type: %s", type(invocation_context))
+            logger.debug("🔍 invocation_context attributes: %s", lazy(_public_attributes, invocation_context))
             
             # Try to get user_id from invocation context
             if hasattr(invocation_context, 'user_id'):
                 user_id = invocation_context.user_id
-                logger.info(f"🔍 Found user_id in invocation_context: {user_id}")
+                logger.info("🔍 Found user_id in invocation_context: %s", user_id)
                 if user_id:
                     return str(user_id)
             
             # Try userId (alternative naming)
             if hasattr(invocation_context, 'userId'):
                 user_id = invocation_context.userId
-                logger.info(f"🔍 Found userId in invocation_context: {user_id}")
+                logger.info("🔍 Found userId in invocation_context: %s", user_id)
                 if user_id:
                     return str(user_id)
         
         # Method 2: Check tool_context.state (YOUR MISSING METHOD 1)
         if tool_context and hasattr(tool_context, 'state'):
-            logger.info(f"🔍 state type: {type(tool_context.state)}")
-            logger.info(f"🔍 state attributes: {[attr for attr in dir(tool_context.state) if not attr.startswith('_')]}")
+            logger.debug("🔍 state type: %s", type(tool_context.state))
+            logger.debug("🔍 state attributes: %s", lazy(_public_attributes, tool_context.state))
             
             # Try to get from state as dict
             if hasattr(tool_context.state, 'get'):
                 user_id = tool_context.state.get(USER_ID)
                 if user_id:
-                    logger.info(f"🔍 Found user_id in state.get(USER_ID): {user_id}")
+                    logger.info("🔍 Found user_id in state.get(USER_ID): %s", user_id)
                     return str(user_id)
                     
                 # Try other key formats
                 for key in ['user_id', 'userId', 'user:id']:
                     user_id = tool_context.state.get(key)
                     if user_id:
-                        logger.info(f"🔍 Found user_id in state.get({key}): {user_id}")
+                        logger.info("🔍 Found user_id in state.get(%s): %s", key, user_id)
                         return str(user_id)
             
             # Try state as object with attributes
             if hasattr(tool_context.state, 'user_id'):
                 user_id = tool_context.state.user_id
-                logger.info(f"🔍 Found user_id in state.user_id: {user_id}")
+                logger.info("🔍 Found user_id in state.user_id: %s", user_id)
                 if user_id:
                     return str(user_id)
                     
             if hasattr(tool_context.state, 'userId'):
                 user_id = tool_context.state.userId
-                logger.info(f"🔍 Found userId in state.userId: {user_id}")
+                logger.info("🔍 Found userId in state.userId: %s", user_id)
                 if user_id:
                     return str(user_id)
         
         # Method 3: Check direct attributes on tool_context
         if hasattr(tool_context, 'user_id'):
             user_id = tool_context.user_id
-            logger.info(f"🔍 Found user_id on tool_context: {user_id}")
+            logger.info("🔍 Found user_id on tool_context: %s", user_id)
             if user_id:
                 return str(user_id)
                 
         if hasattr(tool_context, 'userId'):
             user_id = tool_context.userId
-            logger.info(f"🔍 Found userId on tool_context: {user_id}")
+            logger.info("🔍 Found userId on tool_context: %s", user_id)
             if user_id:
                 return str(user_id)
         
         # Method 4: Try to access session through ADK session management
         # Since there's no direct session attribute, let's check user_content
         if hasattr(tool_context, 'user_content'):
-            logger.info(f"🔍 user_content type: {type(tool_context.user_content)}")
-            logger.info(f"🔍 user_content: {tool_context.user_content}")
+            logger.debug("🔍 user_content type: %s", type(tool_context.user_content))
+            logger.debug("🔍 user_content: %s", tool_context.user_content)
         
         # Method 5: YOUR MISSING METHOD 2 - Modified for ADK structure
         # ADK doesn't have tool_context.session, but we'll check for session data
         if hasattr(tool_context, '_state') and hasattr(tool_context._state, 'user_id'):
             user_id = tool_context._state.user_id
-            logger.info(f"🔍 Found user_id in _state.user_id: {user_id}")
+            logger.info("🔍 Found user_id in _state.user_id: %s", user_id)
             if user_id:
                 return str(user_id)
         
@@ -123,7 +143,7 @@ def extract_user_id_from_context(tool_context) -> Optional[str]:
                 try:
                     attr_value = getattr(tool_context, attr_name)
                     if 'user' in str(attr_name).lower() or 'user' in str(attr_value).lower():
-                        logger.info(f"🔍 Found user-related attribute {attr_name}: {attr_value}")
+                        logger.info("🔍 Found user-related attribute %s: %s", attr_name, attr_value)
                 except Exception:
                     pass
         
@@ -139,7 +159,7 @@ def extract_user_id_from_context(tool_context) -> Optional[str]:
 def get_oauth_credentials(user_id: str, service_type: str) -> Optional[Credentials]:
     """Get OAuth credentials for a user and service type."""
     try:
-        logger.info(f"Getting {service_type} credentials for user: {user_id}")
+        logger.info("Getting %s credentials for user: %s", service_type, user_id)
         
         token_service = get_token_service()
         user_tokens = token_service.get_user_tokens(user_id)
@@ -188,7 +208,7 @@ def get_oauth_credentials(user_id: str, service_type: str) -> Optional[Credentia
                    'https://www.googleapis.com/auth/gmail.modify']
         )
         
-        logger.info(f"Successfully loaded {service_type} credentials for user {user_id}")
+        logger.info("Successfully loaded %s credentials for user %s", service_type, user_id)
         return creds
         
     except Exception as e:
@@ -209,12 +229,12 @@ def get_gmail_service(tool_context=None, user_id: str = None):
             logger.error("Either user_id or tool_context must be provided")
             return None
     
-    logger.info(f"Creating Gmail service for user: {user_id}")
+    logger.info("Creating Gmail service for user: %s", user_id)
     
     # Check cache
     cache_key = f"gmail_{user_id}"
     if cache_key in _user_services:
-        logger.debug(f"Using cached Gmail service for user {user_id}")
+        logger.debug("Using cached Gmail service for user %s", user_id)
         return _user_services[cache_key]
     
     try:
@@ -230,12 +250,12 @@ def get_gmail_service(tool_context=None, user_id: str = None):
          
         
         # Build service
-        service = build('gmail', 'v1', credentials=creds)
+        service = build('gmail', 'v1', credentials=creds, requestBuilder=TracedHttpRequest)
         
         # Cache the service
         _user_services[cache_key] = service
         
-        logger.info(f"Gmail service created successfully for user {user_id}")
+        logger.info("Gmail service created successfully for user %s", user_id)
         return service
         
     except Exception as e:
@@ -257,12 +277,12 @@ def get_calendar_service(tool_context=None, user_id: str = None):
             logger.error("Either user_id or tool_context must be provided")
             return None
     
-    logger.info(f"Creating Calendar service for user: {user_id}")
+    logger.info("Creating Calendar service for user: %s", user_id)
     
     # Check cache
     cache_key = f"calendar_{user_id}"
     if cache_key in _user_services:
-        logger.debug(f"Using cached Calendar service for user {user_id}")
+        logger.debug("Using cached Calendar service for user %s", user_id)
         return _user_services[cache_key]
     
     try:
@@ -273,12 +293,12 @@ def get_calendar_service(tool_context=None, user_id: str = None):
             return None
         
         # Build service
-        service = build('calendar', 'v3', credentials=creds)
+        service = build('calendar', 'v3', credentials=creds, requestBuilder=TracedHttpRequest)
         
         # Cache the service
         _user_services[cache_key] = service
         
-        logger.info(f"Calendar service created successfully for user {user_id}")
+        logger.info("Calendar service created successfully for user %s", user_id)
         return service
         
     except Exception as e:
@@ -295,7 +315,7 @@ def clear_user_cache(user_id: str = None):
         keys_to_remove = [key for key in _user_services.keys() if key.endswith(f"_{user_id}")]
         for key in keys_to_remove:
             del _user_services[key]
-        logger.info(f"Cleared cache for user {user_id}")
+        logger.info("Cleared cache for user %s", user_id)
     else:
         # Clear all cache
         _user_services.clear()
@@ -323,7 +343,7 @@ def get_user_info(tool_context) -> Dict[str, Any]:
 
 def test_user_authentication(user_id: str) -> Dict[str, Any]:
     """Test authentication for a specific user."""
-    logger.info(f"Testing authentication for user: {user_id}")
+    logger.info("Testing authentication for user: %s", user_id)
     
     result = {
         "user_id": user_id,
@@ -337,7 +357,7 @@ def test_user_authentication(user_id: str) -> Dict[str, Any]:
         gmail_service = get_gmail_service(user_id=user_id)
         result["gmail_service"] = gmail_service is not None
         if gmail_service:
-            logger.info(f"✅ Gmail service working for user {user_id}")
+            logger.info("✅ Gmail service working for user %s", user_id)
         else:
             logger.warning(f"❌ Gmail service not available for user {user_id}")
     except Exception as e:
@@ -350,7 +370,7 @@ def test_user_authentication(user_id: str) -> Dict[str, Any]:
         calendar_service = get_calendar_service(user_id=user_id)
         result["calendar_service"] = calendar_service is not None
         if calendar_service:
-            logger.info(f"✅ Calendar service working for user {user_id}")
+            logger.info("✅ Calendar service working for user %s", user_id)
         else:
             logger.warning(f"❌ Calendar service not available for user {user_id}")
     except Exception as e:
@@ -370,23 +390,23 @@ def validate_user_context(tool_context) -> bool:
         logger.debug("This indicates the session was not properly initialized with user context")
         return False
     
-    logger.debug(f"Tool context validation passed for user: {user_id}")
+    logger.debug("Tool context validation passed for user: %s", user_id)
     return True
 
 def debug_user_tokens(user_id: str) -> str:
     """Debug function to check token availability."""
     try:
-        logger.info(f"🔍 DEBUGGING: Checking tokens for user {user_id}")
+        logger.info("🔍 DEBUGGING: Checking tokens for user %s", user_id)
         
         token_service = get_token_service()
         user_tokens = token_service.get_user_tokens(user_id)
         
         gmail_tokens = user_tokens.get('gmail_tokens')
-        logger.info(f"🔍 Gmail tokens present: {gmail_tokens is not None}")
+        logger.info("🔍 Gmail tokens present: %s", gmail_tokens is not None)
         
         if gmail_tokens:
             tokens = token_service.decrypt_tokens(gmail_tokens)
-            logger.info(f"🔍 Decrypted tokens: {tokens is not None}")
+            logger.info("🔍 Decrypted tokens: %s", tokens is not None)
             
             if tokens:
                 has_access = 'access_token' in tokens
@@ -394,7 +414,7 @@ def debug_user_tokens(user_id: str) -> str:
                 has_client_id = 'client_id' in tokens
                 has_client_secret = 'client_secret' in tokens
                 
-                logger.info(f"🔍 Token fields - access: {has_access}, refresh: {has_refresh}, client_id: {has_client_id}, client_secret: {has_client_secret}")
+                logger.info("🔍 Token fields - access: %s, refresh: %s, client_id: %s, client_secret: %s", has_access, has_refresh, has_client_id, has_client_secret)
                 
                 return f"User {user_id}: Gmail tokens found, access: {has_access}, refresh: {has_refresh}, client_id: {has_client_id}, client_secret: {has_client_secret}"
         
@@ -11,11 +11,16 @@ Adapted from your existing calendar tools with:
 
 import os
 import sys
-from typing import Dict, List, Any, Optional
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import time
 import calendar
 
+import httplib2
+import google_auth_httplib2
+
 # Add project root to path
 current_file = os.path.abspath(__file__)
 project_root = current_file
@@ -29,12 +34,20 @@ from google.adk.tools import FunctionTool
 from oprina.services.logging.logger import setup_logger
 
 # Import simplified auth utils
-from oprina.tools.auth_utils import get_calendar_service
+from oprina.tools.auth_utils import get_calendar_service, get_oauth_credentials, extract_user_id_from_context
+
+# Import per-user event cache and title index
+from oprina.tools.calendar_cache import (
+    CalendarEventCache, get_event_cache, title_similarity, event_time_to_timestamp, pick_title_match,
+    TITLE_EXACT_MATCH_THRESHOLD
+)
 
 # Import ADK utility functions
 from oprina.common.utils import (
     validate_tool_context, update_agent_activity, log_tool_execution
 )
+from oprina.common.tracing import trace_tool, submit_in_span
+from oprina.common.state_transaction import coalesce_state_writes, get_state
 
 # Import session state constants
 from oprina.common.session_keys import (
@@ -42,10 +55,35 @@ from oprina.common.session_keys import (
     CALENDAR_LAST_LIST_DAYS, CALENDAR_LAST_LIST_COUNT,
     CALENDAR_LAST_EVENT_CREATED, CALENDAR_LAST_EVENT_CREATED_AT, CALENDAR_LAST_CREATED_EVENT_ID,
     CALENDAR_LAST_UPDATED_EVENT, CALENDAR_LAST_EVENT_UPDATED_AT,
-    CALENDAR_LAST_DELETED_EVENT, CALENDAR_LAST_DELETED_ID, CALENDAR_LAST_DELETED_AT
+    CALENDAR_LAST_DELETED_EVENT, CALENDAR_LAST_DELETED_ID, CALENDAR_LAST_DELETED_AT,
+    CALENDAR_LAST_CONFLICTS, CALENDAR_LAST_BATCH_RESULT, CALENDAR_LAST_BATCH_AT
 )
 
-logger = setup_logger("calendar_tools", console_output=True)
+logger = setup_logger("calendar_tools", console_output=True, sampling=True)
+
+# Partial response for event listings - only the fields the tools read
+_EVENT_LIST_FIELDS = "nextPageToken,items(id,summary,start,end,location)"
+
+# Page size for events().list (API maximum is 2500, default 250)
+_EVENT_PAGE_SIZE = 250
+
+# Formatted events kept in memory and session state per listing
+_MAX_LISTED_EVENTS = 50
+
+# Google Calendar accepts at most 50 calls per batch HTTP request
+_BATCH_MAX_REQUESTS = 50
+
+# Title matches ranked (and offered back for confirmation) per lookup
+_TITLE_CANDIDATE_LIMIT = 5
+
+# Agenda listings also need iCalUID to spot the same meeting on several calendars
+_AGENDA_LIST_FIELDS = "nextPageToken,items(id,iCalUID,summary,start,end,location)"
+
+# Partial response for calendarList - only what the agenda needs
+_CALENDAR_LIST_FIELDS = "nextPageToken,items(id,summary,summaryOverride,primary,selected,hidden)"
+
+# Calendars fetched in parallel for an aggregated agenda
+_AGENDA_MAX_WORKERS = 8
 
 
 # =============================================================================
@@ -109,7 +147,7 @@ def _get_user_timezone_from_calendar(service) -> str:
             if setting.get("id") == "timezone":
                 return setting.get("value", "America/New_York")
     except Exception as e:
-        logger.debug(f"Could not get timezone from calendar settings: {e}")
+        logger.debug("Could not get timezone from calendar settings: %s", e)
     
     return _get_local_timezone()
 
@@ -118,6 +156,8 @@ def _get_user_timezone_from_calendar(service) -> str:
 # Calendar Event Creation Tool
 # =============================================================================
 
+@trace_tool
+@coalesce_state_writes
 def calendar_create_event(
     summary: str,
     start_time: str,
@@ -132,6 +172,8 @@ def calendar_create_event(
         return {"error": "No valid tool context provided"}
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "calendar_create_event", "create_event", True, 
                          f"Summary: '{summary}', Start: {start_time}, End: {end_time}")
@@ -173,6 +215,13 @@ def calendar_create_event(
         if location:
             event_body["location"] = location
         
+        # Look for overlapping events before writing so the agent can warn in the same turn
+        event_cache = _get_event_cache(tool_context)
+        conflicts = _check_conflicts(
+            service, event_cache, calendar_id,
+            event_time_to_timestamp(event_body["start"]), event_time_to_timestamp(event_body["end"])
+        )
+        
         # Call the Calendar API to create the event
         event = service.events().insert(calendarId=calendar_id, body=event_body).execute()
         
@@ -181,7 +230,7 @@ def calendar_create_event(
         end_formatted = end_dt.strftime('%I:%M %p')
         
         # Update session state with rich data
-        tool_context.state[CALENDAR_LAST_EVENT_CREATED] = {
+        state[CALENDAR_LAST_EVENT_CREATED] = {
             "id": event.get("id"),
             "summary": summary,
             "start": start_dt.isoformat(),
@@ -193,8 +242,15 @@ def calendar_create_event(
             "event_link": event.get("htmlLink", ""),
             "timezone": timezone_id
         }
-        tool_context.state[CALENDAR_LAST_EVENT_CREATED_AT] = _get_local_now().isoformat()
-        tool_context.state[CALENDAR_LAST_CREATED_EVENT_ID] = event.get("id")
+        state[CALENDAR_LAST_EVENT_CREATED_AT] = _get_local_now().isoformat()
+        state[CALENDAR_LAST_CREATED_EVENT_ID] = event.get("id")
+        state[CALENDAR_LAST_CONFLICTS] = conflicts
+        
+        if event_cache is not None:
+            event_cache.add_event(event, calendar_id)
+        
+        if conflicts:
+            event["conflicts"] = conflicts
         
         # Return the actual event object (dict) for proper Google Calendar integration
         log_tool_execution(tool_context, "calendar_create_event", "create_event", True, "Event created successfully")
@@ -211,6 +267,8 @@ def calendar_create_event(
 # Calendar Event Listing Tool
 # =============================================================================
 
+@trace_tool
+@coalesce_state_writes
 def calendar_list_events(
     start_date: str = "",
     days: int = 7,
@@ -222,6 +280,8 @@ def calendar_list_events(
         return "Error: No valid tool context provided"
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "calendar_list_events", "list_events", True, 
                          f"Start date: '{start_date}', Days: {days}")
@@ -255,78 +315,65 @@ def calendar_list_events(
         
         end_time = start_time + timedelta(days=days)
         
-        # Format times for API call - Google Calendar API expects UTC times with Z suffix
-        # So we need to convert local time to UTC for the API call
-        utc_offset_seconds = time.timezone
-        if time.daylight and time.localtime().tm_isdst:
-            utc_offset_seconds = time.altzone
-        
-        start_time_utc = start_time + timedelta(seconds=utc_offset_seconds)
-        end_time_utc = end_time + timedelta(seconds=utc_offset_seconds)
-        
-        time_min = start_time_utc.isoformat() + "Z"
-        time_max = end_time_utc.isoformat() + "Z"
-        
-        # Call the Calendar API (your logic)
-        events_result = service.events().list(
-            calendarId=calendar_id,
-            timeMin=time_min,
-            timeMax=time_max,
-            maxResults=100,  # Large number to get all events
-            singleEvents=True,
-            orderBy="startTime",
-        ).execute()
-        
-        events = events_result.get("items", [])
+        # Google Calendar API expects UTC times with Z suffix
+        time_min = _to_utc_rfc3339(start_time)
+        time_max = _to_utc_rfc3339(end_time)
         
-        # Update session state
-        tool_context.state[CALENDAR_LAST_FETCH] = _get_local_now().isoformat()
-        tool_context.state[CALENDAR_LAST_LIST_START_DATE] = start_date if start_date else "today"
-        tool_context.state[CALENDAR_LAST_LIST_DAYS] = days
-        tool_context.state[CALENDAR_LAST_LIST_COUNT] = len(events)
-        
-        if not events:
-            days_text = "today" if days == 1 else f"the next {days} days"
-            return f"No upcoming events found for {days_text}."
-        
-        # Format events for voice response (your comprehensive formatting)
+        # Stream the window page by page, keeping only a bounded slice in memory
+        event_cache = _get_event_cache(tool_context)
+        total_events = 0
         formatted_events = []
-        for event in events:
+        detailed_events = []
+        for event in _iter_events(service, calendar_id, time_min, time_max):
+            total_events += 1
+            if event_cache is not None:
+                event_cache.add_event(event, calendar_id)
+            if len(detailed_events) >= _MAX_LISTED_EVENTS:
+                continue
+            
             summary = event.get("summary", "Untitled Event")
             start_time_formatted = _format_event_time(event.get("start", {}))
             location = event.get("location", "")
             location_text = f" at {location}" if location else ""
-            
             formatted_events.append(f"{summary} - {start_time_formatted}{location_text}")
-        
-        # Store detailed events in session for other agents to use
-        detailed_events = []
-        for event in events:
+            
+            # Detailed events are stored in session for other agents to use
             detailed_events.append({
                 "id": event.get("id"),
-                "summary": event.get("summary", "Untitled Event"),
-                "start": _format_event_time(event.get("start", {})),
+                "summary": summary,
+                "start": start_time_formatted,
                 "end": _format_event_time(event.get("end", {})),
-                "location": event.get("location", ""),
-                "description": event.get("description", ""),
-                "link": event.get("htmlLink", "")
+                "location": location
             })
         
-        tool_context.state[CALENDAR_CURRENT] = detailed_events
+        if event_cache is not None:
+            event_cache.mark_window_covered(calendar_id, start_time.timestamp(), end_time.timestamp())
+        
+        # Update session state
+        state[CALENDAR_LAST_FETCH] = _get_local_now().isoformat()
+        state[CALENDAR_LAST_LIST_START_DATE] = start_date if start_date else "today"
+        state[CALENDAR_LAST_LIST_DAYS] = days
+        state[CALENDAR_LAST_LIST_COUNT] = total_events
+        
+        if not total_events:
+            days_text = "today" if days == 1 else f"the next {days} days"
+            return f"No upcoming events found for {days_text}."
+        
+        state[CALENDAR_CURRENT] = detailed_events
         
         # Create voice-friendly response
         days_text = "today" if days == 1 else f"the next {days} days"
-        response_lines = [f"Found {len(events)} event(s) for {days_text}:"]
+        response_lines = [f"Found {total_events} event(s) for {days_text}:"]
         
         # Show first 5 events in voice response
         for i, event_text in enumerate(formatted_events[:5], 1):
             response_lines.append(f"{i}. {event_text}")
         
-        if len(events) > 5:
-            response_lines.append(f"... and {len(events) - 5} more events")
+        if total_events > 5:
+            response_lines.append(f"... and {total_events - 5} more events")
         
         log_tool_execution(tool_context, "calendar_list_events", "list_events", True, 
-                         f"Retrieved {len(events)} events")
+                         f"Retrieved {total_events} events")
         
         return "\n".join(response_lines)
         
@@ -336,10 +383,154 @@ def calendar_list_events(
         return f"Error retrieving events: {str(e)}"
 
 
+# =============================================================================
+# Aggregated Agenda Tool
+# =============================================================================
+
+@trace_tool
+@coalesce_state_writes
+def calendar_list_agenda(
+    start_date: str = "",
+    days: int = 7,
+    tool_context=None
+) -> str:
+    """
+    List events from all of the user's visible calendars merged into one agenda.
+    
+    Args:
+        start_date: First day of the agenda (YYYY-MM-DD), defaults to today
+        days: Number of days to cover, defaults to 7
+        tool_context: ADK tool context
+    
+    Returns:
+        str: Time-ordered agenda across calendars, noting any that could not be read
+    """
+    if not validate_tool_context(tool_context, "calendar_list_agenda"):
+        return "Error: No valid tool context provided"
+    
+    try:
+        state = get_state(tool_context)
+        
+        log_tool_execution(tool_context, "calendar_list_agenda", "list_agenda", True, 
+                         f"Start date: '{start_date}', Days: {days}")
+        update_agent_activity(tool_context, "calendar_agent", "listing_agenda")
+        
+        service = get_calendar_service(tool_context)
+        if not service:
+            return "Calendar not set up. Please run: python setup_calendar.py"
+        
+        if not start_date or start_date.strip() == "":
+            start_time = _get_local_now()
+        else:
+            try:
+                start_time = datetime.strptime(start_date, "%Y-%m-%d")
+            except ValueError:
+                return f"Invalid date format: {start_date}. Please use YYYY-MM-DD format."
+        
+        if not days or days < 1:
+            days = 7
+        
+        window_end = start_time + timedelta(days=days)
+        time_min = _to_utc_rfc3339(start_time)
+        time_max = _to_utc_rfc3339(window_end)
+        
+        event_cache = _get_event_cache(tool_context)
+        calendars = _get_visible_calendars(service, event_cache)
+        
+        # Fetch every calendar's window concurrently, each worker on its own HTTP client;
+        # without credentials to build those clients, read them one at a time instead
+        credentials = get_oauth_credentials(extract_user_id_from_context(tool_context), "calendar")
+        if credentials is None:
+            windows = [_fetch_calendar_window(service, cal, time_min, time_max) for cal in calendars]
+        else:
+            with ThreadPoolExecutor(max_workers=min(_AGENDA_MAX_WORKERS, len(calendars))) as executor:
+                futures = [
+                    submit_in_span(executor, _fetch_calendar_window, service, cal, time_min, time_max, credentials)
+                    for cal in calendars
+                ]
+                windows = [future.result() for future in futures]
+        
+        failed_calendars = [cal["name"] for cal, events in zip(calendars, windows) if events is None]
+        streams = []
+        for cal, events in zip(calendars, windows):
+            if not events:
+                continue
+            if event_cache is not None:
+                event_cache.add_events(events, cal["id"])
+                event_cache.mark_window_covered(cal["id"], start_time.timestamp(), window_end.timestamp())
+            streams.append(_agenda_stream(cal, events))
+        
+        # K-way merge of the per-calendar (already time-ordered) streams
+        seen_keys = set()
+        total_events = 0
+        formatted_events = []
+        detailed_events = []
+        for start_ts, _, cal, event in heapq.merge(*streams, key=lambda item: (item[0], item[1])):
+            dedup_key = (event.get("iCalUID") or event.get("id"), start_ts)
+            if dedup_key in seen_keys:
+                continue
+            seen_keys.add(dedup_key)
+            
+            total_events += 1
+            if len(detailed_events) >= _MAX_LISTED_EVENTS:
+                continue
+            
+            summary = event.get("summary", "Untitled Event")
+            start_time_formatted = _format_event_time(event.get("start", {}))
+            location = event.get("location", "")
+            location_text = f" at {location}" if location else ""
+            calendar_text = "" if cal["primary"] else f" ({cal['name']})"
+            formatted_events.append(f"{summary} - {start_time_formatted}{location_text}{calendar_text}")
+            
+            detailed_events.append({
+                "id": event.get("id"),
+                "summary": summary,
+                "start": start_time_formatted,
+                "end": _format_event_time(event.get("end", {})),
+                "location": location,
+                "calendar_id": cal["id"],
+                "calendar": cal["name"]
+            })
+        
+        state[CALENDAR_LAST_FETCH] = _get_local_now().isoformat()
+        state[CALENDAR_LAST_LIST_START_DATE] = start_date if start_date else "today"
+        state[CALENDAR_LAST_LIST_DAYS] = days
+        state[CALENDAR_LAST_LIST_COUNT] = total_events
+        
+        days_text = "today" if days == 1 else f"the next {days} days"
+        calendars_text = f"{len(calendars)} calendar{'s' if len(calendars) != 1 else ''}"
+        
+        if not total_events:
+            response = f"No upcoming events found across your {calendars_text} for {days_text}."
+        else:
+            state[CALENDAR_CURRENT] = detailed_events
+            response_lines = [f"Found {total_events} event(s) across your {calendars_text} for {days_text}:"]
+            for i, event_text in enumerate(formatted_events[:5], 1):
+                response_lines.append(f"{i}. {event_text}")
+            if total_events > 5:
+                response_lines.append(f"... and {total_events - 5} more events")
+            response = "\n".join(response_lines)
+        
+        if failed_calendars:
+            response += f"\nCould not read: {', '.join(failed_calendars)}"
+        
+        log_tool_execution(tool_context, "calendar_list_agenda", "list_agenda", True, 
+                         f"Retrieved {total_events} events from {len(calendars)} calendars")
+        
+        return response
+        
+    except Exception as e:
+        logger.error(f"Error listing calendar agenda: {e}")
+        log_tool_execution(tool_context, "calendar_list_agenda", "list_agenda", False, str(e))
+        return f"Error retrieving agenda: {str(e)}"
+
+
 # =============================================================================
 # Calendar Event Update Tool
 # =============================================================================
 
+@trace_tool
+@coalesce_state_writes
 def calendar_update_event(
     event_id: str,
     summary: str = "",
@@ -355,6 +546,8 @@ def calendar_update_event(
         return {"error": "No valid tool context provided"}
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "calendar_update_event", "update_event", True, 
                          f"Event ID: '{event_id}', New Summary: '{summary}', Start: '{start_time}', End: '{end_time}'")
@@ -369,15 +562,21 @@ def calendar_update_event(
         
         # First get the existing event (your logic)
         # Check if event_id looks like a Google Calendar ID or a title/summary
-        if len(event_id) < 20 or " " in event_id:
+        if not _looks_like_event_id(event_id):
             # Likely a title/summary, search for the event
-            logger.info(f"Searching for event by title: '{event_id}'")
-            event = _find_event_by_summary(service, event_id, calendar_id)
-            if not event:
+            logger.info("Searching for event by title: '%s'", event_id)
+            event, similarity, candidates = _find_event_by_summary(
+                service, event_id, calendar_id, event_cache=_get_event_cache(tool_context)
+            )
+            if not candidates:
                 return {"error": f"Event named '{event_id}' not found in calendar."}
+            if not event or similarity < TITLE_EXACT_MATCH_THRESHOLD:
+                return _title_confirmation(event_id, candidates)
             # Update event_id to the actual Google Calendar ID for the rest of the function
             actual_event_id = event.get("id")
-            logger.info(f"Found event: '{event.get('summary')}' with ID: {actual_event_id}")
+            logger.info("Found event: '%s' with ID: %s", event.get('summary'), actual_event_id)
+            # Title search returns a partial event; fetch the full body so update() keeps all fields
+            event = service.events().get(calendarId=calendar_id, eventId=actual_event_id).execute()
         else:
             # Looks like a proper Google Calendar ID
             try:
@@ -387,13 +586,13 @@ def calendar_update_event(
                 return {"error": f"Event with ID {event_id} not found in calendar."}
         
         original_summary = event.get("summary", "Event")
-        logger.info(f"Original event summary: '{original_summary}'")
+        logger.info("Original event summary: '%s'", original_summary)
         
         # Update the event with new values (your logic)
         updated_fields = []
         
         if summary:
-            logger.info(f"Updating summary from '{original_summary}' to '{summary}'")
+            logger.info("Updating summary from '%s' to '%s'", original_summary, summary)
             event["summary"] = summary
             updated_fields.append("title")
         
@@ -430,24 +629,41 @@ def calendar_update_event(
             event["end"] = {"dateTime": end_dt.isoformat(), "timeZone": timezone_id}
             updated_fields.append("end time")
         
+        # Rescheduling: look for overlaps with other events in the new slot
+        event_cache = _get_event_cache(tool_context)
+        conflicts = []
+        if start_time or end_time:
+            conflicts = _check_conflicts(
+                service, event_cache, calendar_id,
+                event_time_to_timestamp(event.get("start", {})), event_time_to_timestamp(event.get("end", {})),
+                exclude_id=actual_event_id
+            )
+        
         # Update the event
-        logger.info(f"Calling Google Calendar API to update event {actual_event_id} with summary: '{event.get('summary')}'")
+        logger.info("Calling Google Calendar API to update event %s with summary: '%s'", actual_event_id, event.get('summary'))
         updated_event = service.events().update(
             calendarId=calendar_id, 
             eventId=actual_event_id, 
             body=event
         ).execute()
-        logger.info(f"API call completed. Updated event summary: '{updated_event.get('summary')}')")
+        logger.info("API call completed. Updated event summary: '%s')", updated_event.get('summary'))
         
         # Update session state
-        tool_context.state[CALENDAR_LAST_UPDATED_EVENT] = {
+        state[CALENDAR_LAST_UPDATED_EVENT] = {
             "id": actual_event_id,
             "original_summary": original_summary,
             "new_summary": updated_event.get("summary", original_summary),
             "updated_fields": updated_fields,
             "event_link": updated_event.get("htmlLink", "")
         }
-        tool_context.state[CALENDAR_LAST_EVENT_UPDATED_AT] = _get_local_now().isoformat()
+        state[CALENDAR_LAST_EVENT_UPDATED_AT] = _get_local_now().isoformat()
+        state[CALENDAR_LAST_CONFLICTS] = conflicts
+        
+        if event_cache is not None:
+            event_cache.add_event(updated_event, calendar_id)
+        
+        if conflicts:
+            updated_event["conflicts"] = conflicts
         
         log_tool_execution(tool_context, "calendar_update_event", "update_event", True, "Event updated successfully")
         
@@ -464,6 +680,8 @@ def calendar_update_event(
 # Calendar Event Deletion Tool
 # =============================================================================
 
+@trace_tool
+@coalesce_state_writes
 def calendar_delete_event(
     event_id: str,
     confirm: bool = False,
@@ -479,6 +697,8 @@ def calendar_delete_event(
         return {"error": "Please confirm deletion by setting confirm=True. This action cannot be undone."}
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "calendar_delete_event", "delete_event", True, f"Event ID: {event_id}")
         
@@ -492,15 +712,19 @@ def calendar_delete_event(
         
         # Get event details before deletion for better user feedback
         # Check if event_id looks like a Google Calendar ID or a title/summary
-        if len(event_id) < 20 or " " in event_id:
+        if not _looks_like_event_id(event_id):
             # Likely a title/summary, search for the event
-            logger.info(f"Searching for event to delete by title: '{event_id}'")
-            event = _find_event_by_summary(service, event_id, calendar_id)
-            if not event:
+            logger.info("Searching for event to delete by title: '%s'", event_id)
+            event, similarity, candidates = _find_event_by_summary(
+                service, event_id, calendar_id, event_cache=_get_event_cache(tool_context)
+            )
+            if not candidates:
                 return {"error": f"Event named '{event_id}' not found in calendar."}
+            if not event or similarity < TITLE_EXACT_MATCH_THRESHOLD:
+                return _title_confirmation(event_id, candidates)
             # Update event_id to the actual Google Calendar ID for the rest of the function
             actual_event_id = event.get("id")
-            logger.info(f"Found event to delete: '{event.get('summary')}' with ID: {actual_event_id}")
+            logger.info("Found event to delete: '%s' with ID: %s", event.get('summary'), actual_event_id)
         else:
             # Looks like a proper Google Calendar ID
             try:
@@ -513,19 +737,23 @@ def calendar_delete_event(
         event_start = _format_event_time(event.get("start", {}))
         
         # Call the Calendar API to delete the event
-        logger.info(f"Calling Google Calendar API to delete event {actual_event_id} ('{event_summary}')")
+        logger.info("Calling Google Calendar API to delete event %s ('%s')", actual_event_id, event_summary)
         service.events().delete(calendarId=calendar_id, eventId=actual_event_id).execute()
-        logger.info(f"Successfully deleted event '{event_summary}'")
+        logger.info("Successfully deleted event '%s'", event_summary)
         
         # Update session state
-        tool_context.state[CALENDAR_LAST_DELETED_EVENT] = {
+        state[CALENDAR_LAST_DELETED_EVENT] = {
             "id": actual_event_id,
             "summary": event_summary,
             "start": event_start,
             "deleted_at": _get_local_now().isoformat()
         }
-        tool_context.state[CALENDAR_LAST_DELETED_ID] = actual_event_id
-        tool_context.state[CALENDAR_LAST_DELETED_AT] = _get_local_now().isoformat()
+        state[CALENDAR_LAST_DELETED_ID] = actual_event_id
+        state[CALENDAR_LAST_DELETED_AT] = _get_local_now().isoformat()
+        
+        event_cache = _get_event_cache(tool_context)
+        if event_cache is not None:
+            event_cache.remove_event(actual_event_id, calendar_id)
         
         log_tool_execution(tool_context, "calendar_delete_event", "delete_event", True, f"Event '{event_summary}' deleted")
         
@@ -548,52 +776,768 @@ def calendar_delete_event(
 
 
 # =============================================================================
-# Helper Functions (Your Logic)
+# Calendar Batch Mutation Tools
 # =============================================================================
 
-def _find_event_by_summary(service, summary_search: str, calendar_id: str = "primary", days_to_search: int = 30) -> Optional[dict]:
-    """Find an event by searching for matching summary/title."""
+@trace_tool
+@coalesce_state_writes
+def calendar_batch_create_events(
+    events: List[Dict[str, Any]],
+    calendar_id: str = "primary",
+    tool_context=None
+) -> dict:
+    """
+    Create several events in one Google batch request.
+    
+    Args:
+        events: List of events, each with summary, start_time, end_time and
+            optional description and location (same formats as calendar_create_event)
+        calendar_id: Calendar to create the events in
+        tool_context: ADK tool context
+    
+    Returns:
+        dict: Per-event outcomes under "results" plus succeeded/failed counts
+    """
+    if not validate_tool_context(tool_context, "calendar_batch_create_events"):
+        return {"error": "No valid tool context provided"}
+    
+    if not events:
+        return {"error": "No events provided. Please pass a list of events to create."}
+    
     try:
-        # Search within the next and previous days_to_search days
-        start_time = _get_local_now() - timedelta(days=days_to_search)
-        end_time = _get_local_now() + timedelta(days=days_to_search)
-        
-        # Convert to UTC for API call
-        utc_offset_seconds = time.timezone
-        if time.daylight and time.localtime().tm_isdst:
-            utc_offset_seconds = time.altzone
-        
-        start_time_utc = start_time + timedelta(seconds=utc_offset_seconds)
-        end_time_utc = end_time + timedelta(seconds=utc_offset_seconds)
-        
-        time_min = start_time_utc.isoformat() + "Z"
-        time_max = end_time_utc.isoformat() + "Z"
-        
-        # Get events from the specified time range
-        events_result = service.events().list(
-            calendarId=calendar_id,
-            timeMin=time_min,
-            timeMax=time_max,
-            maxResults=100,
-            singleEvents=True,
-            orderBy="startTime",
-        ).execute()
+        log_tool_execution(tool_context, "calendar_batch_create_events", "batch_create", True, 
+                         f"Creating {len(events)} events")
+        update_agent_activity(tool_context, "calendar_agent", "batch_creating_events")
         
-        events = events_result.get("items", [])
+        service = get_calendar_service(tool_context)
+        if not service:
+            return {"error": "Calendar not set up. Please run: python setup_calendar.py"}
         
-        # Search for events with matching summary (case insensitive partial match)
-        summary_lower = summary_search.lower()
-        for event in events:
-            event_summary = event.get("summary", "").lower()
-            if summary_lower in event_summary or event_summary in summary_lower:
-                return event
-                
+        timezone_id = _get_user_timezone_from_calendar(service)
+        results = [None] * len(events)
+        requests = []
+        
+        for index, item in enumerate(events):
+            summary = (item or {}).get("summary", "")
+            start_dt = _parse_datetime((item or {}).get("start_time", ""))
+            end_dt = _parse_datetime((item or {}).get("end_time", ""))
+            if not summary or not start_dt or not end_dt:
+                results[index] = _batch_item_error(index, summary, 
+                    "Each event needs a summary, start_time and end_time in 'YYYY-MM-DD HH:MM' format")
+                continue
+            
+            event_body = {
+                "summary": summary,
+                "start": {"dateTime": start_dt.isoformat(), "timeZone": timezone_id},
+                "end": {"dateTime": end_dt.isoformat(), "timeZone": timezone_id}
+            }
+            if item.get("description"):
+                event_body["description"] = item["description"]
+            if item.get("location"):
+                event_body["location"] = item["location"]
+            
+            requests.append((index, service.events().insert(calendarId=calendar_id, body=event_body)))
+        
+        event_cache = _get_event_cache(tool_context)
+        for index, (response, error) in _execute_batch(service, requests).items():
+            summary = events[index].get("summary", "")
+            if error is not None:
+                results[index] = _batch_item_error(index, summary, str(error))
+                continue
+            if event_cache is not None:
+                event_cache.add_event(response, calendar_id)
+            results[index] = {
+                "index": index,
+                "status": "created",
+                "event_id": response.get("id"),
+                "summary": response.get("summary", summary),
+                "start": _format_event_time(response.get("start", {})),
+                "event_link": response.get("htmlLink", "")
+            }
+        
+        return _finish_batch(tool_context, "calendar_batch_create_events", "batch_create", results)
+        
+    except Exception as e:
+        logger.error(f"Error batch creating calendar events: {e}")
+        log_tool_execution(tool_context, "calendar_batch_create_events", "batch_create", False, str(e))
+        return {"error": f"Error creating events: {str(e)}"}
+
+
+@trace_tool
+@coalesce_state_writes
+def calendar_batch_update_events(
+    updates: List[Dict[str, Any]],
+    calendar_id: str = "primary",
+    tool_context=None
+) -> dict:
+    """
+    Update several events in one Google batch request.
+    
+    Args:
+        updates: List of updates, each with event_id (ID or event title) and any of
+            summary, start_time, end_time, description, location, or shift_minutes
+            to move the event by that many minutes (negative moves it earlier)
+        calendar_id: Calendar containing the events
+        tool_context: ADK tool context
+    
+    Returns:
+        dict: Per-event outcomes under "results" plus succeeded/failed counts
+    """
+    if not validate_tool_context(tool_context, "calendar_batch_update_events"):
+        return {"error": "No valid tool context provided"}
+    
+    if not updates:
+        return {"error": "No updates provided. Please pass a list of event updates."}
+    
+    try:
+        log_tool_execution(tool_context, "calendar_batch_update_events", "batch_update", True, 
+                         f"Updating {len(updates)} events")
+        update_agent_activity(tool_context, "calendar_agent", "batch_updating_events")
+        
+        service = get_calendar_service(tool_context)
+        if not service:
+            return {"error": "Calendar not set up. Please run: python setup_calendar.py"}
+        
+        event_cache = _get_event_cache(tool_context)
+        references = [(item or {}).get("event_id", "") for item in updates]
+        targets, unconfirmed = _resolve_batch_targets(service, references, calendar_id, event_cache)
+        # Shifts start from the event's current times; fetch any target known only by ID
+        _fetch_untimed_targets(
+            service, targets,
+            [reference for reference, item in zip(references, updates) if (item or {}).get("shift_minutes")],
+            calendar_id, event_cache
+        )
+        timezone_id = None
+        results = [None] * len(updates)
+        requests = []
+        
+        for index, item in enumerate(updates):
+            item = item or {}
+            reference = item.get("event_id", "")
+            event = targets.get(reference)
+            if reference in unconfirmed:
+                results[index] = _batch_item_error(
+                    index, reference, _title_confirmation(reference, unconfirmed[reference])["error"]
+                )
+                continue
+            if not event:
+                results[index] = _batch_item_error(index, reference, f"Event '{reference}' not found in calendar")
+                continue
+            
+            patch_body = {}
+            for field in ("summary", "description", "location"):
+                if item.get(field):
+                    patch_body[field] = item[field]
+            
+            try:
+                shift_minutes = int(item.get("shift_minutes") or 0)
+            except (TypeError, ValueError):
+                results[index] = _batch_item_error(index, reference, "shift_minutes must be a whole number of minutes")
+                continue
+            
+            if shift_minutes and (item.get("start_time") or item.get("end_time")):
+                results[index] = _batch_item_error(index, reference, 
+                    "Give either shift_minutes or start_time/end_time, not both")
+                continue
+            
+            if item.get("start_time") or item.get("end_time"):
+                if timezone_id is None:
+                    timezone_id = _get_user_timezone_from_calendar(service)
+                for field in ("start", "end"):
+                    value = item.get(f"{field}_time")
+                    if not value:
+                        continue
+                    parsed = _parse_datetime(value)
+                    if not parsed:
+                        patch_body = None
+                        break
+                    patch_body[field] = {
+                        "dateTime": parsed.isoformat(),
+                        "timeZone": event.get(field, {}).get("timeZone", timezone_id)
+                    }
+                if patch_body is None:
+                    results[index] = _batch_item_error(index, reference, 
+                        "Invalid time format. Please use YYYY-MM-DD HH:MM format.")
+                    continue
+            elif shift_minutes:
+                shifted = _shift_event_times(event, shift_minutes)
+                if not shifted:
+                    results[index] = _batch_item_error(index, reference, 
+                        "Event times unknown - list the events first or give start_time and end_time")
+                    continue
+                patch_body.update(shifted)
+            
+            if not patch_body:
+                results[index] = _batch_item_error(index, reference, "No fields provided to update")
+                continue
+            
+            requests.append((index, service.events().patch(
+                calendarId=calendar_id, eventId=event["id"], body=patch_body
+            )))
+        
+        for index, (response, error) in _execute_batch(service, requests).items():
+            reference = updates[index].get("event_id", "")
+            if error is not None:
+                results[index] = _batch_item_error(index, reference, str(error))
+                continue
+            if event_cache is not None:
+                event_cache.add_event(response, calendar_id)
+            results[index] = {
+                "index": index,
+                "status": "updated",
+                "event_id": response.get("id"),
+                "summary": response.get("summary", ""),
+                "start": _format_event_time(response.get("start", {})),
+                "event_link": response.get("htmlLink", "")
+            }
+        
+        return _finish_batch(tool_context, "calendar_batch_update_events", "batch_update", results)
+        
+    except Exception as e:
+        logger.error(f"Error batch updating calendar events: {e}")
+        log_tool_execution(tool_context, "calendar_batch_update_events", "batch_update", False, str(e))
+        return {"error": f"Error updating events: {str(e)}"}
+
+
+@trace_tool
+@coalesce_state_writes
+def calendar_batch_delete_events(
+    event_ids: List[str],
+    confirm: bool = False,
+    calendar_id: str = "primary",
+    tool_context=None
+) -> dict:
+    """
+    Delete several events in one Google batch request.
+    
+    Args:
+        event_ids: Event IDs or event titles to delete
+        confirm: Must be True - deletions cannot be undone
+        calendar_id: Calendar containing the events
+        tool_context: ADK tool context
+    
+    Returns:
+        dict: Per-event outcomes under "results" plus succeeded/failed counts
+    """
+    if not validate_tool_context(tool_context, "calendar_batch_delete_events"):
+        return {"error": "No valid tool context provided"}
+    
+    # Safety check - require explicit confirmation
+    if not confirm:
+        return {"error": "Please confirm deletion by setting confirm=True. This action cannot be undone."}
+    
+    if not event_ids:
+        return {"error": "No events provided. Please pass the events to delete."}
+    
+    try:
+        log_tool_execution(tool_context, "calendar_batch_delete_events", "batch_delete", True, 
+                         f"Deleting {len(event_ids)} events")
+        update_agent_activity(tool_context, "calendar_agent", "batch_deleting_events")
+        
+        service = get_calendar_service(tool_context)
+        if not service:
+            return {"error": "Calendar not set up. Please run: python setup_calendar.py"}
+        
+        event_cache = _get_event_cache(tool_context)
+        targets, unconfirmed = _resolve_batch_targets(service, event_ids, calendar_id, event_cache)
+        results = [None] * len(event_ids)
+        requests = []
+        
+        for index, reference in enumerate(event_ids):
+            event = targets.get(reference)
+            if reference in unconfirmed:
+                results[index] = _batch_item_error(
+                    index, reference, _title_confirmation(reference, unconfirmed[reference])["error"]
+                )
+                continue
+            if not event:
+                results[index] = _batch_item_error(index, reference, f"Event '{reference}' not found in calendar")
+                continue
+            requests.append((index, service.events().delete(calendarId=calendar_id, eventId=event["id"])))
+        
+        for index, (response, error) in _execute_batch(service, requests).items():
+            reference = event_ids[index]
+            event = targets[reference]
+            if error is not None:
+                results[index] = _batch_item_error(index, reference, str(error))
+                continue
+            if event_cache is not None:
+                event_cache.remove_event(event["id"], calendar_id)
+            results[index] = {
+                "index": index,
+                "status": "deleted",
+                "event_id": event["id"],
+                "summary": event.get("summary", reference),
+                "start": _format_event_time(event.get("start", {})) if event.get("start") else ""
+            }
+        
+        return _finish_batch(tool_context, "calendar_batch_delete_events", "batch_delete", results)
+        
+    except Exception as e:
+        logger.error(f"Error batch deleting calendar events: {e}")
+        log_tool_execution(tool_context, "calendar_batch_delete_events", "batch_delete", False, str(e))
+        return {"error": f"Error deleting events: {str(e)}"}
+
+
+# =============================================================================
+# Shared Helpers for Other Tools
+# =============================================================================
+
+def get_busy_intervals(tool_context, start_dt: datetime, end_dt: datetime, calendar_id: str = "primary") -> Optional[List[tuple]]:
+    """
+    Busy (start_ts, end_ts) intervals of timed events between two local datetimes.
+    
+    Used by cross-agent workflows for slot finding. Reads the cached window when a
+    fresh listing covers it, otherwise lists the window once (feeding the cache).
+    
+    Returns:
+        Sorted list of (start_ts, end_ts) epoch-second tuples; None if Calendar is not set up
+    """
+    service = get_calendar_service(tool_context)
+    if not service:
         return None
+    
+    start_ts, end_ts = start_dt.timestamp(), end_dt.timestamp()
+    cache = _get_event_cache(tool_context)
+    if cache is None:
+        cache = CalendarEventCache()
+    
+    if not cache.covers(calendar_id, start_ts, end_ts):
+        for event in _iter_events(service, calendar_id, _to_utc_rfc3339(start_dt), _to_utc_rfc3339(end_dt)):
+            cache.add_event(event, calendar_id)
+        cache.mark_window_covered(calendar_id, start_ts, end_ts)
+    
+    intervals = []
+    for event in cache.find_overlapping(calendar_id, start_ts, end_ts):
+        event_start = event_time_to_timestamp(event.get("start", {}))
+        event_end = event_time_to_timestamp(event.get("end", {}))
+        if event_start is not None and event_end is not None:
+            intervals.append((event_start, event_end))
+    
+    return sorted(intervals)
+
+
+# =============================================================================
+# Helper Functions (Your Logic)
+# =============================================================================
+
+def _find_event_by_summary(
+    service,
+    summary_search: str,
+    calendar_id: str = "primary",
+    days_to_search: int = 30,
+    event_cache=None
+) -> Tuple[Optional[dict], float, List[dict]]:
+    """
+    Find an event by title, using the user's event cache before the Calendar API.
+    
+    A cache that has listed the whole search window answers on its own, fuzzy
+    matches included; otherwise the window is listed once (stopping at an exact
+    title) and fed to the cache.
+    
+    Returns:
+        (event, similarity, candidates) as from pick_title_match; event is None
+        when no title matches or the best fuzzy match has no clear lead
+    """
+    # Search within the previous and next days_to_search days
+    window_start, window_end = _title_search_window(days_to_search)
+    if _cache_covers_window(event_cache, calendar_id, window_start, window_end):
+        ranked = event_cache.search(summary_search, calendar_id, limit=_TITLE_CANDIDATE_LIMIT)
+        logger.debug("Event title '%s' resolved from cache (%d candidates)", summary_search, len(ranked))
+        return pick_title_match([(similarity, event) for _, similarity, event in ranked])
+    
+    try:
+        time_min = _to_utc_rfc3339(window_start)
+        time_max = _to_utc_rfc3339(window_end)
+        
+        # An exact title match is confident enough to stop paging; otherwise
+        # rank every match above the threshold once the window is done
+        matches = []
+        for event in _iter_events(service, calendar_id, time_min, time_max):
+            if event_cache is not None:
+                event_cache.add_event(event, calendar_id)
+            similarity = title_similarity(summary_search, event.get("summary", ""))
+            if similarity >= 1.0:
+                return event, similarity, [event]
+            matches.append((similarity, event))
+        
+        if event_cache is not None:
+            event_cache.mark_window_covered(calendar_id, window_start.timestamp(), window_end.timestamp())
+                
+        return pick_title_match(matches)
         
     except Exception as e:
         logger.warning(f"Error searching for event by summary: {e}")
+        return None, 0.0, []
+
+
+def _title_confirmation(title: str, candidates: List[dict]) -> dict:
+    """Error listing the events a title might mean, so the user can confirm one before it is changed."""
+    options = "; ".join(
+        f"'{event.get('summary', 'Untitled')}' on {_format_event_time(event.get('start', {}))} (ID: {event.get('id')})"
+        for event in candidates[:_TITLE_CANDIDATE_LIMIT]
+    )
+    return {
+        "error": f"No event is titled exactly '{title}'. Did you mean: {options}? Confirm which one by its event ID.",
+        "candidates": [
+            {"id": event.get("id"), "summary": event.get("summary", ""), "start": event.get("start", {})}
+            for event in candidates[:_TITLE_CANDIDATE_LIMIT]
+        ]
+    }
+
+
+def _title_search_window(days: int) -> Tuple[datetime, datetime]:
+    """Local window searched for event titles, aligned to midnight so repeated lookups share it."""
+    today = _get_local_now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=days), today + timedelta(days=days + 1)
+
+
+def _cache_covers_window(event_cache, calendar_id: str, window_start: datetime, window_end: datetime) -> bool:
+    """Whether the cache has listed the whole window, so its title matches can be trusted."""
+    return event_cache is not None and event_cache.covers(calendar_id, window_start.timestamp(), window_end.timestamp())
+
+
+def _get_event_cache(tool_context):
+    """Get the event cache for the user behind this tool context, if one can be identified."""
+    try:
+        return get_event_cache(extract_user_id_from_context(tool_context))
+    except Exception as e:
+        logger.debug("Event cache unavailable: %s", e)
+        return None
+
+
+def _to_utc_rfc3339(local_dt: datetime) -> str:
+    """Convert a naive local datetime into the UTC 'Z' timestamp the Calendar API expects."""
+    utc_offset_seconds = time.timezone
+    if time.daylight and time.localtime().tm_isdst:
+        utc_offset_seconds = time.altzone
+    return (local_dt + timedelta(seconds=utc_offset_seconds)).isoformat() + "Z"
+
+
+def _iter_event_pages(
+    service,
+    calendar_id: str,
+    time_min: str,
+    time_max: str,
+    page_size: int = _EVENT_PAGE_SIZE,
+    fields: str = _EVENT_LIST_FIELDS,
+    http=None
+):
+    """Yield pages of events from events().list, following nextPageToken until exhausted."""
+    page_token = None
+    while True:
+        request_args = {
+            "calendarId": calendar_id,
+            "timeMin": time_min,
+            "timeMax": time_max,
+            "maxResults": page_size,
+            "singleEvents": True,
+            "orderBy": "startTime",
+            "fields": fields,
+        }
+        if page_token:
+            request_args["pageToken"] = page_token
+        
+        request = service.events().list(**request_args)
+        page = request.execute(http=http) if http is not None else request.execute()
+        yield page.get("items", [])
+        
+        page_token = page.get("nextPageToken")
+        if not page_token:
+            break
+
+
+def _iter_events(service, calendar_id: str, time_min: str, time_max: str, **page_options):
+    """Stream individual events across all pages of a time window."""
+    for items in _iter_event_pages(service, calendar_id, time_min, time_max, **page_options):
+        yield from items
+
+def _looks_like_event_id(reference: str) -> bool:
+    """Google Calendar IDs are long and have no spaces; anything else is treated as a title."""
+    return len(reference) >= 20 and " " not in reference
+
+
+def _resolve_batch_targets(
+    service,
+    references: List[str],
+    calendar_id: str,
+    event_cache=None
+) -> Tuple[Dict[str, dict], Dict[str, List[dict]]]:
+    """
+    Resolve event IDs and titles for a batch with at most one listing.
+    
+    IDs resolve to the cached event (or a bare {"id": ...}); titles are ranked
+    by the event cache when it has listed the search window, otherwise against
+    a single scan of it.
+    
+    Returns:
+        (targets, unconfirmed): references resolved to events, and titles with
+        only fuzzy or ambiguous matches mapped to their candidate events
+    """
+    resolved = {}
+    unconfirmed = {}
+    titles = []
+    window_start, window_end = _title_search_window(30)
+    
+    for reference in dict.fromkeys(references):
+        if not reference:
+            continue
+        if _looks_like_event_id(reference):
+            cached = event_cache.get_event(reference, calendar_id) if event_cache is not None else None
+            resolved[reference] = cached or {"id": reference}
+        else:
+            titles.append(reference)
+    
+    if not titles:
+        return resolved, unconfirmed
+    
+    if _cache_covers_window(event_cache, calendar_id, window_start, window_end):
+        matches = {
+            title: [(similarity, event) for _, similarity, event in
+                    event_cache.search(title, calendar_id, limit=_TITLE_CANDIDATE_LIMIT)]
+            for title in titles
+        }
+    else:
+        time_min = _to_utc_rfc3339(window_start)
+        time_max = _to_utc_rfc3339(window_end)
+        matches = {title: [] for title in titles}
+        
+        for event in _iter_events(service, calendar_id, time_min, time_max):
+            if event_cache is not None:
+                event_cache.add_event(event, calendar_id)
+            for title in titles:
+                matches[title].append((title_similarity(title, event.get("summary", "")), event))
+        
+        if event_cache is not None:
+            event_cache.mark_window_covered(calendar_id, window_start.timestamp(), window_end.timestamp())
+    
+    for title in titles:
+        event, similarity, candidates = pick_title_match(matches[title])
+        if event and similarity >= TITLE_EXACT_MATCH_THRESHOLD:
+            resolved[title] = event
+        elif candidates:
+            unconfirmed[title] = candidates
+    
+    return resolved, unconfirmed
+
+
+def _fetch_untimed_targets(service, targets: Dict[str, dict], references: List[str], calendar_id: str,
+                           event_cache=None) -> None:
+    """
+    Fill in start/end for resolved events that were only known by ID, in one batch request.
+    
+    Events that cannot be fetched keep their bare entry and fail later as unknown times.
+    """
+    untimed = {}
+    for reference in dict.fromkeys(references):
+        event = targets.get(reference)
+        if event and not event.get("start"):
+            untimed.setdefault(event["id"], []).append(reference)
+    
+    if not untimed:
+        return
+    
+    event_ids = list(untimed)
+    requests = [
+        (index, service.events().get(calendarId=calendar_id, eventId=event_id))
+        for index, event_id in enumerate(event_ids)
+    ]
+    for index, (response, error) in _execute_batch(service, requests).items():
+        if error is not None or not response:
+            logger.warning(f"Could not fetch event '{event_ids[index]}' to shift it: {error}")
+            continue
+        if event_cache is not None:
+            event_cache.add_event(response, calendar_id)
+        for reference in untimed[event_ids[index]]:
+            targets[reference] = response
+
+
+def _execute_batch(service, requests: List[tuple]) -> Dict[int, tuple]:
+    """
+    Send (index, HttpRequest) pairs as Google batch HTTP requests.
+    
+    Returns:
+        Dict mapping each index to a (response, exception) tuple
+    """
+    outcomes = {}
+    
+    def _callback(request_id, response, exception):
+        outcomes[int(request_id)] = (response, exception)
+    
+    for chunk_start in range(0, len(requests), _BATCH_MAX_REQUESTS):
+        batch = service.new_batch_http_request(callback=_callback)
+        for index, request in requests[chunk_start:chunk_start + _BATCH_MAX_REQUESTS]:
+            batch.add(request, request_id=str(index))
+        batch.execute()
+    
+    return outcomes
+
+
+def _batch_item_error(index: int, reference: str, message: str) -> dict:
+    """Per-item failure entry for batch tool results."""
+    return {"index": index, "status": "error", "event": reference, "error": message}
+
+
+def _finish_batch(tool_context, tool_name: str, operation: str, results: List[dict]) -> dict:
+    """Summarize batch outcomes, store them in session state and log the execution."""
+    results = [
+        result or _batch_item_error(index, "", "No response received from Calendar")
+        for index, result in enumerate(results)
+    ]
+    succeeded = sum(1 for result in results if result and result.get("status") != "error")
+    failed = len(results) - succeeded
+    summary = {
+        "success": failed == 0,
+        "succeeded": succeeded,
+        "failed": failed,
+        "results": results
+    }
+    
+    state = get_state(tool_context)
+    state[CALENDAR_LAST_BATCH_RESULT] = {
+        "operation": operation,
+        "succeeded": succeeded,
+        "failed": failed,
+        "event_ids": [result.get("event_id") for result in results if result.get("event_id")]
+    }
+    state[CALENDAR_LAST_BATCH_AT] = _get_local_now().isoformat()
+    
+    log_tool_execution(tool_context, tool_name, operation, failed == 0, 
+                     f"{succeeded} succeeded, {failed} failed")
+    return summary
+
+
+def _shift_event_times(event: dict, shift_minutes: int) -> Optional[dict]:
+    """Build start/end patch fields moving a timed event by shift_minutes."""
+    shifted = {}
+    for field in ("start", "end"):
+        event_time = event.get(field) or {}
+        if "dateTime" not in event_time:
+            return None
+        try:
+            moved = datetime.fromisoformat(event_time["dateTime"].replace("Z", "+00:00")) + timedelta(minutes=shift_minutes)
+        except ValueError:
+            return None
+        shifted[field] = {"dateTime": moved.isoformat()}
+        if event_time.get("timeZone"):
+            shifted[field]["timeZone"] = event_time["timeZone"]
+    return shifted
+
+
+def _get_visible_calendars(service, event_cache=None) -> List[dict]:
+    """
+    Read the user's visible calendars, reusing the cached calendarList when fresh.
+    
+    Returns:
+        List of {"id", "name", "primary"} dicts, primary calendar first
+    """
+    entries = event_cache.get_calendar_list() if event_cache is not None else None
+    
+    if entries is None:
+        entries = []
+        page_token = None
+        while True:
+            request_args = {"fields": _CALENDAR_LIST_FIELDS, "minAccessRole": "reader"}
+            if page_token:
+                request_args["pageToken"] = page_token
+            page = service.calendarList().list(**request_args).execute()
+            entries.extend(page.get("items", []))
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                break
+        if event_cache is not None:
+            event_cache.set_calendar_list(entries)
+    
+    calendars = []
+    for entry in entries:
+        if entry.get("hidden") or (entry.get("selected") is False and not entry.get("primary")):
+            continue
+        calendars.append({
+            "id": "primary" if entry.get("primary") else entry.get("id"),
+            "name": entry.get("summaryOverride") or entry.get("summary") or entry.get("id"),
+            "primary": bool(entry.get("primary"))
+        })
+    
+    if not calendars:
+        calendars = [{"id": "primary", "name": "Primary", "primary": True}]
+    
+    calendars.sort(key=lambda cal: not cal["primary"])
+    return calendars
+
+
+def _fetch_calendar_window(service, cal: dict, time_min: str, time_max: str,
+                           credentials=None) -> Optional[List[dict]]:
+    """Fetch one calendar's events for the window (None on failure), on its own HTTP client given credentials."""
+    try:
+        http = _new_thread_http(credentials) if credentials is not None else None
+        return list(_iter_events(service, cal["id"], time_min, time_max, fields=_AGENDA_LIST_FIELDS, http=http))
+    except Exception as e:
+        logger.warning(f"Could not fetch events for calendar '{cal['name']}': {e}")
         return None
 
+
+def _new_thread_http(credentials):
+    """
+    Build a fresh authorized HTTP client for the user's credentials.
+    
+    httplib2 connections are not thread-safe, so concurrent fetches must not
+    share the service's own client.
+    """
+    return google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http())
+
+
+def _agenda_stream(cal: dict, events: List[dict]):
+    """Yield (start_ts, sequence, calendar, event) tuples for heap merging."""
+    for sequence, event in enumerate(events):
+        start_ts = event_time_to_timestamp(event.get("start", {}))
+        yield (start_ts if start_ts is not None else float("inf"), sequence, cal, event)
+
+
+def _check_conflicts(
+    service,
+    event_cache,
+    calendar_id: str,
+    start_ts: Optional[float],
+    end_ts: Optional[float],
+    exclude_id: Optional[str] = None
+) -> List[dict]:
+    """
+    Find events overlapping a proposed slot.
+    
+    Answered from the event cache's interval index when a fresh listing covers
+    the slot; otherwise only the slot itself is fetched. Never raises - a failed
+    check just reports no conflicts.
+    """
+    try:
+        if start_ts is None or end_ts is None or end_ts <= start_ts:
+            return []
+        
+        cache = event_cache if event_cache is not None else CalendarEventCache()
+        if not cache.covers(calendar_id, start_ts, end_ts):
+            for event in _iter_events(service, calendar_id, _timestamp_to_rfc3339(start_ts), _timestamp_to_rfc3339(end_ts)):
+                cache.add_event(event, calendar_id)
+            cache.mark_window_covered(calendar_id, start_ts, end_ts)
+        
+        return [
+            {
+                "id": event.get("id"),
+                "summary": event.get("summary", "Untitled Event"),
+                "start": _format_event_time(event.get("start", {})),
+                "end": _format_event_time(event.get("end", {}))
+            }
+            for event in cache.find_overlapping(calendar_id, start_ts, end_ts, exclude_id=exclude_id)
+        ]
+        
+    except Exception as e:
+        logger.warning(f"Could not check for conflicts: {e}")
+        return []
+
+
+def _timestamp_to_rfc3339(timestamp: float) -> str:
+    """Epoch seconds as a UTC 'Z' timestamp for the Calendar API."""
+    return datetime.utcfromtimestamp(timestamp).isoformat() + "Z"
+
+
 def _parse_datetime(datetime_str: str) -> Optional[datetime]:
     """Parse a datetime string into a datetime object (your logic)."""
     formats = [
@@ -660,25 +1604,41 @@ calendar_create_event_tool = FunctionTool(func=calendar_create_event)
 # Event listing tool
 calendar_list_events_tool = FunctionTool(func=calendar_list_events)
 
+# Aggregated multi-calendar agenda tool
+calendar_list_agenda_tool = FunctionTool(func=calendar_list_agenda)
+
 # Event update tool
 calendar_update_event_tool = FunctionTool(func=calendar_update_event)
 
 # Event deletion tool
 calendar_delete_event_tool = FunctionTool(func=calendar_delete_event)
 
+# Batch mutation tools
+calendar_batch_create_events_tool = FunctionTool(func=calendar_batch_create_events)
+calendar_batch_update_events_tool = FunctionTool(func=calendar_batch_update_events)
+calendar_batch_delete_events_tool = FunctionTool(func=calendar_batch_delete_events)
+
 # Calendar tools collection
 CALENDAR_TOOLS = [
     calendar_create_event_tool,
     calendar_list_events_tool,
+    calendar_list_agenda_tool,
     calendar_update_event_tool,
-    calendar_delete_event_tool
+    calendar_delete_event_tool,
+    calendar_batch_create_events_tool,
+    calendar_batch_update_events_tool,
+    calendar_batch_delete_events_tool
 ]
 
 # Export for easy access
 __all__ = [
     "calendar_create_event",
     "calendar_list_events", 
+    "calendar_list_agenda",
     "calendar_update_event",
     "calendar_delete_event",
+    "calendar_batch_create_events",
+    "calendar_batch_update_events",
+    "calendar_batch_delete_events",
     "CALENDAR_TOOLS"
 ]
\ No newline at end of file
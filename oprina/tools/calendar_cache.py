@@ -0,0 +1,414 @@
+"""
+Calendar Event Cache for ADK Tools
+
+Per-user in-memory cache of recently seen calendar events:
+- Fed by every event listing, creation, update and deletion
+- Entries keyed by (calendar_id, event_id): an invited meeting keeps one entry
+  per calendar it appears on
+- Title index (normalized tokens and trigrams -> entry keys) for fuzzy lookups
+- Ranked matches combine title similarity with date proximity
+- Interval index over timed events for overlap (conflict) queries
+- Entries expire after a short TTL so external edits are picked up again
+"""
+
+import bisect
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from oprina.services.logging.logger import setup_logger
+
+logger = setup_logger("calendar_cache")
+
+# How long a cached event is trusted before the API must be asked again
+EVENT_CACHE_TTL_SECONDS = 300
+
+# Upper bound on events held per user (oldest are evicted first)
+EVENT_CACHE_MAX_EVENTS = 2000
+
+# Title similarity (0-1) a fuzzy match needs to be accepted
+TITLE_MATCH_THRESHOLD = 0.6
+
+# Title similarity (0-1) a match needs to be acted on without confirmation
+TITLE_EXACT_MATCH_THRESHOLD = 0.95
+
+# Similarity lead a fuzzy match needs over the runner-up to be picked at all
+TITLE_MATCH_MARGIN = 0.1
+
+# Weight of date proximity in the final ranking score
+DATE_PROXIMITY_WEIGHT = 0.15
+
+# Distance in days at which the proximity bonus halves
+DATE_PROXIMITY_HALF_LIFE_DAYS = 7
+
+# How long the user's calendarList is reused before it is read again
+CALENDAR_LIST_TTL_SECONDS = 1800
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+# =============================================================================
+# Title Normalization and Scoring
+# =============================================================================
+
+def normalize_title(title: str) -> str:
+    """Lowercase a title and collapse punctuation/whitespace to single spaces."""
+    return _NON_ALNUM.sub(" ", (title or "").lower()).strip()
+
+
+def title_trigrams(normalized: str) -> Set[str]:
+    """Character trigrams of a normalized title, padded so short words still match."""
+    if not normalized:
+        return set()
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def title_similarity(query: str, title: str) -> float:
+    """
+    Score how well an event title matches a spoken query (0-1).
+
+    Half of the score is the share of query words present in the title, the
+    other half is trigram (Dice) similarity, so "lunch" ranks the event
+    "Lunch" above "Team Lunch Planning" and never matches "Launch Review".
+    """
+    query_norm = normalize_title(query)
+    title_norm = normalize_title(title)
+    if not query_norm or not title_norm:
+        return 0.0
+    if query_norm == title_norm:
+        return 1.0
+
+    query_tokens = set(query_norm.split())
+    title_tokens = set(title_norm.split())
+    coverage = len(query_tokens & title_tokens) / len(query_tokens)
+
+    query_grams = title_trigrams(query_norm)
+    title_grams = title_trigrams(title_norm)
+    dice = 2 * len(query_grams & title_grams) / (len(query_grams) + len(title_grams))
+
+    return 0.5 * coverage + 0.5 * dice
+
+
+def pick_title_match(matches: List[Tuple[float, dict]]) -> Tuple[Optional[dict], float, List[dict]]:
+    """
+    Pick the event a title refers to from (similarity, event) pairs.
+
+    Pairs are expected in preference order (e.g. nearest first); ties on
+    similarity keep that order. A fuzzy best match is only picked when it leads
+    the runner-up by TITLE_MATCH_MARGIN.
+
+    Returns:
+        (event or None, its similarity, candidate events above TITLE_MATCH_THRESHOLD)
+    """
+    ranked = sorted(
+        (pair for pair in matches if pair[0] >= TITLE_MATCH_THRESHOLD),
+        key=lambda pair: pair[0],
+        reverse=True
+    )
+    candidates = [event for _, event in ranked]
+    if not ranked:
+        return None, 0.0, candidates
+    best_similarity, best_event = ranked[0]
+    if (best_similarity < TITLE_EXACT_MATCH_THRESHOLD and len(ranked) > 1
+            and best_similarity - ranked[1][0] < TITLE_MATCH_MARGIN):
+        return None, best_similarity, candidates
+    return best_event, best_similarity, candidates
+
+
+def event_time_to_timestamp(event_time: dict) -> Optional[float]:
+    """Convert a Calendar API start/end dict (dateTime or all-day date) to epoch seconds."""
+    if not event_time:
+        return None
+    try:
+        if "dateTime" in event_time:
+            parsed = datetime.fromisoformat(event_time["dateTime"].replace("Z", "+00:00"))
+            if parsed.tzinfo is None and event_time.get("timeZone"):
+                # Request bodies carry a naive local time plus an IANA zone
+                try:
+                    parsed = parsed.replace(tzinfo=ZoneInfo(event_time["timeZone"]))
+                except ZoneInfoNotFoundError:
+                    pass
+            return parsed.timestamp()
+        if "date" in event_time:
+            return datetime.strptime(event_time["date"], "%Y-%m-%d").timestamp()
+    except (ValueError, TypeError):
+        return None
+    return None
+
+
+def _date_proximity(start_ts: Optional[float], reference_ts: float) -> float:
+    """Bonus (0-1) for events close to the reference time."""
+    if start_ts is None:
+        return 0.0
+    distance_days = abs(start_ts - reference_ts) / 86400
+    return 1.0 / (1.0 + distance_days / DATE_PROXIMITY_HALF_LIFE_DAYS)
+
+
+# =============================================================================
+# Per-User Event Cache
+# =============================================================================
+
+class CalendarEventCache:
+    """Cached events for a single user with an inverted title index."""
+
+    def __init__(self, ttl_seconds: int = EVENT_CACHE_TTL_SECONDS, max_events: int = EVENT_CACHE_MAX_EVENTS):
+        self.ttl_seconds = ttl_seconds
+        self.max_events = max_events
+        # (calendar_id, event_id) -> {"event", "calendar_id", "start_ts", "end_ts", "cached_at", "grams"}
+        self._entries: "OrderedDict[Tuple[str, str], dict]" = OrderedDict()
+        self._gram_index: Dict[str, Set[Tuple[str, str]]] = defaultdict(set)
+        # calendar_id -> (sorted starts, [(start_ts, end_ts, event_id)], longest duration)
+        self._intervals: Dict[str, Tuple[List[float], List[Tuple[float, float, str]], float]] = {}
+        self._intervals_dirty = True
+        # calendar_id -> [(start_ts, end_ts, fetched_at)] windows listed in full
+        self._covered_windows: Dict[str, List[Tuple[float, float, float]]] = defaultdict(list)
+        self._calendar_list: Optional[List[dict]] = None
+        self._calendar_list_fetched_at = 0.0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add_event(self, event: dict, calendar_id: str = "primary") -> None:
+        """Insert or refresh a single event."""
+        event_id = event.get("id") if event else None
+        if not event_id:
+            return
+
+        key = (calendar_id, event_id)
+        with self._lock:
+            self._remove_locked(key)
+            grams = title_trigrams(normalize_title(event.get("summary", "")))
+            self._entries[key] = {
+                "event": {
+                    "id": event_id,
+                    "summary": event.get("summary", ""),
+                    "start": event.get("start", {}),
+                    "end": event.get("end", {}),
+                    "location": event.get("location", ""),
+                },
+                "calendar_id": calendar_id,
+                "start_ts": event_time_to_timestamp(event.get("start", {})),
+                "end_ts": event_time_to_timestamp(event.get("end", {})),
+                "timed": "dateTime" in (event.get("start") or {}),
+                "cached_at": time.time(),
+                "grams": grams,
+            }
+            for gram in grams:
+                self._gram_index[gram].add(key)
+            self._intervals_dirty = True
+
+            if len(self._entries) > self.max_events:
+                # Evicted events leave holes in listed windows
+                self._covered_windows.clear()
+            while len(self._entries) > self.max_events:
+                self._remove_locked(next(iter(self._entries)))
+
+    def add_events(self, events: List[dict], calendar_id: str = "primary") -> None:
+        """Insert or refresh a batch of events (e.g. a listing page)."""
+        for event in events:
+            self.add_event(event, calendar_id)
+
+    def get_event(self, event_id: str, calendar_id: str = "primary") -> Optional[dict]:
+        """Return a cached event of a calendar by id if it has not expired."""
+        key = (calendar_id, event_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            if time.time() - entry["cached_at"] > self.ttl_seconds:
+                self._remove_locked(key)
+                return None
+            return dict(entry["event"])
+
+    def remove_event(self, event_id: str, calendar_id: str = "primary") -> None:
+        """Drop an event from a calendar, e.g. after it was deleted there."""
+        with self._lock:
+            self._remove_locked((calendar_id, event_id))
+
+    def clear(self) -> None:
+        """Drop every cached event and the cached calendar list."""
+        with self._lock:
+            self._entries.clear()
+            self._gram_index.clear()
+            self._intervals.clear()
+            self._covered_windows.clear()
+            self._calendar_list = None
+
+    def get_calendar_list(self) -> Optional[List[dict]]:
+        """Return the cached calendarList entries if they are still fresh."""
+        with self._lock:
+            if self._calendar_list is None:
+                return None
+            if time.time() - self._calendar_list_fetched_at > CALENDAR_LIST_TTL_SECONDS:
+                self._calendar_list = None
+                return None
+            return list(self._calendar_list)
+
+    def set_calendar_list(self, calendars: List[dict]) -> None:
+        """Cache the user's calendarList entries."""
+        with self._lock:
+            self._calendar_list = list(calendars)
+            self._calendar_list_fetched_at = time.time()
+
+    def search(
+        self,
+        query: str,
+        calendar_id: str = "primary",
+        reference_time: Optional[float] = None,
+        limit: int = 5
+    ) -> List[Tuple[float, float, dict]]:
+        """
+        Rank cached events against a title query.
+
+        Returns:
+            List of (score, title_similarity, event) tuples, best first
+        """
+        query_grams = title_trigrams(normalize_title(query))
+        if not query_grams:
+            return []
+        reference_ts = reference_time if reference_time is not None else time.time()
+
+        with self._lock:
+            candidate_keys: Set[Tuple[str, str]] = set()
+            for gram in query_grams:
+                candidate_keys |= {key for key in self._gram_index.get(gram, ()) if key[0] == calendar_id}
+
+            now = time.time()
+            ranked = []
+            expired = []
+            for key in candidate_keys:
+                entry = self._entries[key]
+                if now - entry["cached_at"] > self.ttl_seconds:
+                    expired.append(key)
+                    continue
+                similarity = title_similarity(query, entry["event"]["summary"])
+                proximity = _date_proximity(entry["start_ts"], reference_ts)
+                score = (1 - DATE_PROXIMITY_WEIGHT) * similarity + DATE_PROXIMITY_WEIGHT * proximity
+                ranked.append((score, similarity, dict(entry["event"])))
+
+            for key in expired:
+                self._remove_locked(key)
+
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        return ranked[:limit]
+
+    def find_best(
+        self,
+        query: str,
+        calendar_id: str = "primary",
+        min_similarity: float = TITLE_MATCH_THRESHOLD
+    ) -> Optional[dict]:
+        """Return the best cached match if its title similarity clears min_similarity."""
+        for score, similarity, event in self.search(query, calendar_id):
+            if similarity >= min_similarity:
+                return event
+        return None
+
+    def mark_window_covered(self, calendar_id: str, start_ts: float, end_ts: float) -> None:
+        """Record that every event of a calendar in [start_ts, end_ts) was just cached."""
+        with self._lock:
+            now = time.time()
+            windows = [w for w in self._covered_windows.get(calendar_id, []) if now - w[2] <= self.ttl_seconds]
+            windows.append((start_ts, end_ts, now))
+            self._covered_windows[calendar_id] = windows
+
+    def covers(self, calendar_id: str, start_ts: float, end_ts: float) -> bool:
+        """Whether a fresh full listing of this calendar includes [start_ts, end_ts)."""
+        with self._lock:
+            now = time.time()
+            fresh = [w for w in self._covered_windows.get(calendar_id, []) if now - w[2] <= self.ttl_seconds]
+            self._covered_windows[calendar_id] = fresh
+            return any(w_start <= start_ts and end_ts <= w_end for w_start, w_end, _ in fresh)
+
+    def find_overlapping(
+        self,
+        calendar_id: str,
+        start_ts: float,
+        end_ts: float,
+        exclude_id: Optional[str] = None
+    ) -> List[dict]:
+        """
+        Return cached timed events on a calendar that overlap [start_ts, end_ts).
+
+        Uses binary search over event starts: only events starting within the
+        longest cached duration before start_ts can still be running.
+        """
+        with self._lock:
+            if self._intervals_dirty:
+                self._rebuild_intervals_locked()
+            starts, intervals, longest = self._intervals.get(calendar_id, ([], [], 0.0))
+
+            low = bisect.bisect_left(starts, start_ts - longest)
+            high = bisect.bisect_left(starts, end_ts)
+
+            now = time.time()
+            overlapping = []
+            for interval_start, interval_end, event_id in intervals[low:high]:
+                if interval_end <= start_ts or event_id == exclude_id:
+                    continue
+                entry = self._entries.get((calendar_id, event_id))
+                if not entry or now - entry["cached_at"] > self.ttl_seconds:
+                    continue
+                overlapping.append(dict(entry["event"]))
+            return overlapping
+
+    def _rebuild_intervals_locked(self) -> None:
+        by_calendar: Dict[str, List[Tuple[float, float, str]]] = defaultdict(list)
+        for (calendar_id, event_id), entry in self._entries.items():
+            if not entry["timed"] or entry["start_ts"] is None:
+                continue
+            end_ts = entry["end_ts"] if entry["end_ts"] is not None else entry["start_ts"]
+            by_calendar[calendar_id].append((entry["start_ts"], end_ts, event_id))
+
+        self._intervals = {}
+        for calendar_id, intervals in by_calendar.items():
+            intervals.sort()
+            longest = max(end - start for start, end, _ in intervals)
+            self._intervals[calendar_id] = ([start for start, _, _ in intervals], intervals, longest)
+        self._intervals_dirty = False
+
+    def _remove_locked(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if not entry:
+            return
+        self._intervals_dirty = True
+        for gram in entry["grams"]:
+            postings = self._gram_index.get(gram)
+            if postings is not None:
+                postings.discard(key)
+                if not postings:
+                    del self._gram_index[gram]
+
+
+# Global per-user caches, mirroring the service cache in auth_utils
+_user_event_caches: Dict[str, CalendarEventCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_event_cache(user_id: str) -> Optional[CalendarEventCache]:
+    """Get (or create) the event cache for a user."""
+    if not user_id:
+        return None
+    with _caches_lock:
+        cache = _user_event_caches.get(user_id)
+        if cache is None:
+            cache = CalendarEventCache()
+            _user_event_caches[user_id] = cache
+        return cache
+
+
+def clear_event_cache(user_id: str = None) -> None:
+    """Clear cached events for a user or all users."""
+    with _caches_lock:
+        if user_id:
+            _user_event_caches.pop(user_id, None)
+            logger.info(f"Cleared event cache for user {user_id}")
+        else:
+            _user_event_caches.clear()
+            logger.info("Cleared all event caches")
@@ -0,0 +1,134 @@
+"""
+Compact email listing record for session state.
+
+The last email listing is stored once, under EMAIL_LISTING, as parallel columns:
+
+    {
+        "q": "in:inbox",                 # query that produced the listing
+        "ids": ["18d0...", ...],         # Gmail message ids, in listed order
+        "from": ["Sam <sam@...>", ...],
+        "subj": ["Quarterly plan", ...],
+        "ts": [1705300000, ...]          # message Date header (epoch seconds, 0 if unknown)
+    }
+
+Positions are 1-based and implied by list order, so no separate index map or
+per-message dict copies are kept. The record carries no fetch time, so listing
+the same results again is a no-op write. Use the accessors below instead of
+reading the record directly.
+"""
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional
+
+from oprina.common.session_keys import (
+    EMAIL_LISTING, EMAIL_LAST_LISTED_MESSAGES
+)
+
+
+def build_listing(query: str, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build a listing record from message summaries ({"id", "from", "subject", "date"})."""
+    return {
+        "q": query,
+        "ids": [msg["id"] for msg in messages],
+        "from": [msg.get("from", "Unknown") for msg in messages],
+        "subj": [msg.get("subject", "No Subject") for msg in messages],
+        "ts": [date_header_to_epoch(msg.get("date")) for msg in messages]
+    }
+
+
+def store_listing(state, query: str, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build and store the listing record; returns it."""
+    listing = build_listing(query, messages)
+    state[EMAIL_LISTING] = listing
+    return listing
+
+
+def get_listing(state) -> Optional[Dict[str, Any]]:
+    """
+    The stored listing record, or None.
+
+    Sessions created before the compact record still carry EMAIL_LAST_LISTED_MESSAGES;
+    that list is converted on read.
+    """
+    if state is None:
+        return None
+    listing = state.get(EMAIL_LISTING)
+    if listing:
+        return listing
+
+    legacy = state.get(EMAIL_LAST_LISTED_MESSAGES)
+    if legacy:
+        return build_listing("", legacy)
+    return None
+
+
+def listing_size(listing: Optional[Dict[str, Any]]) -> int:
+    """Number of messages in the listing."""
+    return len(listing["ids"]) if listing else 0
+
+
+def listing_message_id(listing: Optional[Dict[str, Any]], position: int) -> Optional[str]:
+    """Message id at a 1-based position, or None when out of range."""
+    if not listing or position < 1 or position > len(listing["ids"]):
+        return None
+    return listing["ids"][position - 1]
+
+
+def listing_message(listing: Optional[Dict[str, Any]], position: int) -> Optional[Dict[str, Any]]:
+    """Message summary ({"id", "from", "subject", "date", "timestamp", "position"}) at a 1-based position."""
+    if listing_message_id(listing, position) is None:
+        return None
+    index = position - 1
+    timestamp = listing["ts"][index]
+    return {
+        "id": listing["ids"][index],
+        "from": listing["from"][index],
+        "subject": listing["subj"][index],
+        "date": epoch_to_display(timestamp),
+        "timestamp": timestamp,
+        "position": position
+    }
+
+
+def listing_messages(listing: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """All message summaries in listed order."""
+    return [listing_message(listing, position) for position in range(1, listing_size(listing) + 1)]
+
+
+def listing_index_map(listing: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Position (as a string) -> message id."""
+    if not listing:
+        return {}
+    return {str(position): msg_id for position, msg_id in enumerate(listing["ids"], 1)}
+
+
+def date_header_to_epoch(date_header: Optional[str]) -> int:
+    """Parse an RFC 2822 Date header to epoch seconds (0 if missing or unparseable)."""
+    if not date_header:
+        return 0
+    try:
+        return int(parsedate_to_datetime(date_header).timestamp())
+    except (TypeError, ValueError, IndexError):
+        return 0
+
+
+def epoch_to_display(timestamp: int) -> str:
+    """Format epoch seconds for display ('Unknown' for 0)."""
+    if not timestamp:
+        return "Unknown"
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%a, %d %b %Y %H:%M UTC')
+
+
+__all__ = [
+    "build_listing",
+    "store_listing",
+    "get_listing",
+    "listing_size",
+    "listing_message_id",
+    "listing_message",
+    "listing_messages",
+    "listing_index_map",
+    "date_header_to_epoch",
+    "epoch_to_display"
+]
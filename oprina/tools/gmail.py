@@ -30,12 +30,17 @@ from oprina.tools.auth_utils import get_gmail_service
 from oprina.common.utils import (
     validate_tool_context, update_agent_activity, log_tool_execution
 )
+from oprina.common.tracing import trace_tool, llm_call
+from oprina.common.state_transaction import coalesce_state_writes, get_state
+from oprina.tools.email_listing import (
+    build_listing, store_listing, get_listing, listing_size, listing_message_id,
+    listing_message, listing_messages, listing_index_map
+)
 
 # Import session state constants
 from oprina.common.session_keys import (
     USER_EMAIL,
-    EMAIL_CURRENT_RESULTS, EMAIL_LAST_FETCH, EMAIL_LAST_QUERY, 
-    EMAIL_RESULTS_COUNT, EMAIL_LAST_SENT_TO, EMAIL_LAST_SENT,
+    EMAIL_LISTING, EMAIL_LAST_SENT_TO, EMAIL_LAST_SENT,
     EMAIL_LAST_MESSAGE_VIEWED, EMAIL_LAST_MESSAGE_VIEWED_AT,
     EMAIL_LAST_SENT_SUBJECT, EMAIL_LAST_SENT_ID,
     EMAIL_LAST_REPLY_SENT, EMAIL_LAST_REPLY_TO, EMAIL_LAST_REPLY_ID, EMAIL_LAST_REPLY_THREAD,
@@ -49,7 +54,6 @@ from oprina.common.session_keys import (
     EMAIL_LAST_GENERATED_REPLY, EMAIL_LAST_REPLY_GENERATION_AT,
     EMAIL_PENDING_SEND, EMAIL_PENDING_REPLY,
     EMAIL_LAST_GENERATED_EMAIL, EMAIL_LAST_EMAIL_GENERATION_AT, EMAIL_LAST_GENERATED_EMAIL_TO,
-    EMAIL_LAST_LISTED_MESSAGES, EMAIL_MESSAGE_INDEX_MAP,
     EMAIL_LAST_SINGLE_RESULT,
     EMAIL_LAST_DRAFT_CREATED, EMAIL_LAST_DRAFT_CREATED_AT,
     EMAIL_DRAFTS_COUNT, EMAIL_LAST_DRAFTS_FETCH,
@@ -80,17 +84,21 @@ from oprina.common.session_keys import (
     EMAIL_LAST_OPERATED_MESSAGE_AT
 )
 
-logger = setup_logger("gmail_tools", console_output=True)
+logger = setup_logger("gmail_tools", console_output=True, sampling=True)
 
 # =============================================================================
 # Gmail Email Reading Tools
 # =============================================================================
 
+@trace_tool
+@coalesce_state_writes
 def gmail_list_messages(query: str = "", max_results: int = 10, tool_context=None) -> str:
     """List Gmail messages with optional search query."""
     validate_tool_context(tool_context, "gmail_list_message")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation start
         log_tool_execution(tool_context, "gmail_list_messages", "list_messages", True, 
                          f"Query: '{query}', Max results: {max_results}")
@@ -116,12 +124,7 @@ def gmail_list_messages(query: str = "", max_results: int = 10, tool_context=Non
             response = f"No messages found{' for query: ' + query if query else ''}"
             
             # Update session state even for empty results
-            tool_context.state[EMAIL_LAST_FETCH] = datetime.utcnow().isoformat()
-            tool_context.state[EMAIL_LAST_QUERY] = query
-            tool_context.state[EMAIL_RESULTS_COUNT] = 0
-            tool_context.state[EMAIL_CURRENT_RESULTS] = []
-            tool_context.state[EMAIL_MESSAGE_INDEX_MAP] = {}
-            tool_context.state[EMAIL_LAST_LISTED_MESSAGES] = []
+            store_listing(state, query, [])
             
             return response
         
@@ -149,32 +152,15 @@ def gmail_list_messages(query: str = "", max_results: int = 10, tool_context=Non
                 logger.warning(f"Error getting message {msg['id']}: {e}")
                 continue
         
-        # Update session state with results including message ID mapping
-        tool_context.state[EMAIL_LAST_FETCH] = datetime.utcnow().isoformat()
-        tool_context.state[EMAIL_LAST_QUERY] = query
-        tool_context.state[EMAIL_RESULTS_COUNT] = len(message_summaries)
-        tool_context.state[EMAIL_CURRENT_RESULTS] = message_summaries
-        
-        # Store message ID mapping for easy reference by agents
-        message_index_map = {}
-        detailed_messages = []
-        
-        for i, msg in enumerate(message_summaries, 1):
-            message_index_map[str(i)] = msg['id']
-            # Store more complete message data including position
-            detailed_msg = msg.copy()
-            detailed_msg['position'] = i
-            detailed_messages.append(detailed_msg)
-        
-        tool_context.state[EMAIL_MESSAGE_INDEX_MAP] = message_index_map
-        tool_context.state[EMAIL_LAST_LISTED_MESSAGES] = detailed_messages
+        # Store the listing; positions are implied by order for later references
+        listing = store_listing(state, query, message_summaries)
         
         # Store single result for confirmatory responses, clear for multiple
         if len(message_summaries) == 1:
             stored_id = message_summaries[0]['id']
-            tool_context.state[EMAIL_LAST_SINGLE_RESULT] = stored_id
-            logger.info(f"Stored single result ID for 'yes' responses: {stored_id}")
-            logger.debug(f"Single result details - From: {message_summaries[0]['from']}, Subject: {message_summaries[0]['subject']}")
+            state[EMAIL_LAST_SINGLE_RESULT] = stored_id
+            logger.info("Stored single result ID for 'yes' responses: %s", stored_id)
+            logger.debug("Single result details - From: %s, Subject: %s", message_summaries[0]['from'], message_summaries[0]['subject'])
             
             # Immediately test if this message ID can be retrieved
             try:
@@ -183,20 +169,20 @@ def gmail_list_messages(query: str = "", max_results: int = 10, tool_context=Non
                     id=stored_id, 
                     format='minimal'
                 ).execute()
-                logger.info(f"Verification successful - message ID {stored_id} is accessible")
+                logger.info("Verification successful - message ID %s is accessible", stored_id)
             except Exception as e:
                 logger.error(f"Verification FAILED - message ID {stored_id} cannot be retrieved: {e}")
                 # Store None to prevent issues later
-                tool_context.state[EMAIL_LAST_SINGLE_RESULT] = None
+                state[EMAIL_LAST_SINGLE_RESULT] = None
                 logger.warning(f"Cleared single result due to verification failure")
         else:
             # Clear single result if multiple results
-            tool_context.state[EMAIL_LAST_SINGLE_RESULT] = None
-            logger.debug(f"Cleared single result (found {len(message_summaries)} messages)")
+            state[EMAIL_LAST_SINGLE_RESULT] = None
+            logger.debug("Cleared single result (found %s messages)", len(message_summaries))
         
         # Debug log to ensure data is stored
-        logger.debug(f"Stored {len(message_index_map)} messages in index map")
-        logger.debug(f"First message ID: {message_index_map.get('1', 'None')}")
+        logger.debug("Stored %s messages in listing", listing_size(listing))
+        logger.debug("First message ID: %s", listing_message_id(listing, 1))
         
         # Format response with clean, voice-optimized display
         if len(message_summaries) == 1:
@@ -246,11 +232,15 @@ def gmail_list_messages(query: str = "", max_results: int = 10, tool_context=Non
         return f"Error retrieving emails: {str(e)}"
 
 
+@trace_tool
+@coalesce_state_writes
 def gmail_get_message(message_id: str, tool_context=None) -> str:
     """Get detailed content of a specific Gmail message."""
     validate_tool_context(tool_context, "gmail_get_message")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_get_message", "get_message", True, f"Message ID/Reference: {message_id}")
         
@@ -263,25 +253,24 @@ def gmail_get_message(message_id: str, tool_context=None) -> str:
             return "Gmail not set up. Please run: python setup_gmail.py"
         
         # Use helper function to resolve message reference
-        logger.info(f"GET_MESSAGE: Starting resolution for '{message_id}'")
-        logger.debug(f"GET_MESSAGE: Session state available: {hasattr(tool_context, 'state') and tool_context.state is not None}")
+        logger.info("GET_MESSAGE: Starting resolution for '%s'", message_id)
+        logger.debug("GET_MESSAGE: Session state available: %s", hasattr(tool_context, 'state') and state is not None)
         
         if tool_context and hasattr(tool_context, 'state'):
-            single_result_id = tool_context.state.get(EMAIL_LAST_SINGLE_RESULT)
-            message_index_map = tool_context.state.get(EMAIL_MESSAGE_INDEX_MAP, {})
-            last_listed_messages = tool_context.state.get(EMAIL_LAST_LISTED_MESSAGES, [])
+            single_result_id = state.get(EMAIL_LAST_SINGLE_RESULT)
+            listing = get_listing(state)
             
-            logger.info(f"GET_MESSAGE: Single result ID in session: {single_result_id}")
-            logger.info(f"GET_MESSAGE: Message index map has {len(message_index_map)} entries: {message_index_map}")
-            logger.info(f"GET_MESSAGE: Last listed messages: {len(last_listed_messages)} entries")
+            logger.info("GET_MESSAGE: Single result ID in session: %s", single_result_id)
+            logger.debug("GET_MESSAGE: Last listing has %s entries: %s", listing_size(listing), listing['ids'] if listing else [])
             
-            if last_listed_messages:
-                logger.debug(f"GET_MESSAGE: First listed message: ID={last_listed_messages[0].get('id')}, From={last_listed_messages[0].get('from')}")
+            first_listed = listing_message(listing, 1)
+            if first_listed:
+                logger.debug("GET_MESSAGE: First listed message: ID=%s, From=%s", first_listed['id'], first_listed['from'])
         
         actual_message_id = _get_message_id_by_reference(message_id, tool_context) or message_id
         
-        logger.info(f"GET_MESSAGE: Helper resolved '{message_id}' to '{actual_message_id}'")
-        logger.info(f"GET_MESSAGE: About to retrieve message ID: {actual_message_id}")
+        logger.info("GET_MESSAGE: Helper resolved '%s' to '%s'", message_id, actual_message_id)
+        logger.info("GET_MESSAGE: About to retrieve message ID: %s", actual_message_id)
         
         try:
             message = service.users().messages().get(
@@ -303,8 +292,8 @@ def gmail_get_message(message_id: str, tool_context=None) -> str:
         body = _extract_message_body(message.get('payload', {}))
         
         # Update session state
-        tool_context.state[EMAIL_LAST_MESSAGE_VIEWED] = actual_message_id
-        tool_context.state[EMAIL_LAST_MESSAGE_VIEWED_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_MESSAGE_VIEWED] = actual_message_id
+        state[EMAIL_LAST_MESSAGE_VIEWED_AT] = datetime.utcnow().isoformat()
         
         # Clean up sender name for more natural display
         from_sender = headers.get('From', 'Unknown')
@@ -346,11 +335,15 @@ Would you like me to try replying to this email based on the subject line?"""
         log_tool_execution(tool_context, "gmail_get_message", "get_message", False, str(e))
         return f"Error retrieving email: {str(e)}"
 
+@trace_tool
+@coalesce_state_writes
 def gmail_search_messages(search_query: str, max_results: int = 10, tool_context=None) -> str:
     """Search Gmail messages using Gmail search syntax."""
     validate_tool_context(tool_context, "gmail_search_message")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_search_messages", "search_messages", True, f"Search: '{search_query}'")
         
@@ -388,12 +381,7 @@ def gmail_search_messages(search_query: str, max_results: int = 10, tool_context
                 response = f"I couldn't find any emails matching '{search_query}'. Try using different keywords, checking the sender's name, or looking for specific words from the subject line."
             
             # Clear search results in session
-            tool_context.state[EMAIL_LAST_FETCH] = datetime.utcnow().isoformat()
-            tool_context.state[EMAIL_LAST_QUERY] = search_query
-            tool_context.state[EMAIL_RESULTS_COUNT] = 0
-            tool_context.state[EMAIL_CURRENT_RESULTS] = []
-            tool_context.state[EMAIL_MESSAGE_INDEX_MAP] = {}
-            tool_context.state[EMAIL_LAST_LISTED_MESSAGES] = []
+            store_listing(state, search_query, [])
             
             return response
         
@@ -401,7 +389,7 @@ def gmail_search_messages(search_query: str, max_results: int = 10, tool_context
         message_summaries = []
         for msg in messages[:max_results]:
             try:
-                logger.debug(f"Processing search result message with ID: {msg['id']}")
+                logger.debug("Processing search result message with ID: %s", msg['id'])
                 
                 # Validate the message ID before trying to get metadata
                 if not msg['id'] or len(msg['id'].strip()) < 10:
@@ -429,7 +417,7 @@ def gmail_search_messages(search_query: str, max_results: int = 10, tool_context
                 }
                 message_summaries.append(summary)
                 
-                logger.debug(f"Successfully processed message: ID={msg['id']}, From={summary['from']}, Subject={summary['subject']}")
+                logger.debug("Successfully processed message: ID=%s, From=%s, Subject=%s", msg['id'], summary['from'], summary['subject'])
                 
             except Exception as e:
                 logger.error(f"Error getting search result message {msg['id']}: {e}")
@@ -444,39 +432,23 @@ def gmail_search_messages(search_query: str, max_results: int = 10, tool_context
                 logger.warning(f"Stored basic info for message {msg['id']} despite metadata failure")
                 continue
         
-        # Store search results in session with proper ID mapping
-        tool_context.state[EMAIL_LAST_FETCH] = datetime.utcnow().isoformat()
-        tool_context.state[EMAIL_LAST_QUERY] = search_query
-        tool_context.state[EMAIL_RESULTS_COUNT] = len(message_summaries)
-        tool_context.state[EMAIL_CURRENT_RESULTS] = message_summaries
-        
-        # Create message ID mapping for easy reference resolution
-        message_index_map = {}
-        detailed_messages = []
-        
-        for i, msg in enumerate(message_summaries, 1):
-            message_index_map[str(i)] = msg['id']  # Map position to message ID
-            detailed_msg = msg.copy()
-            detailed_msg['position'] = i
-            detailed_messages.append(detailed_msg)
-        
-        tool_context.state[EMAIL_MESSAGE_INDEX_MAP] = message_index_map
-        tool_context.state[EMAIL_LAST_LISTED_MESSAGES] = detailed_messages
+        # Store search results as the current listing for reference resolution
+        listing = store_listing(state, search_query, message_summaries)
         
         # Store single result for confirmatory responses, clear for multiple
         if len(message_summaries) == 1:
             stored_id = message_summaries[0]['id']
-            tool_context.state[EMAIL_LAST_SINGLE_RESULT] = stored_id
-            logger.info(f"SEARCH: Stored single result ID for 'yes' responses: {stored_id}")
-            logger.debug(f"SEARCH: Single result details - From: {message_summaries[0]['from']}, Subject: {message_summaries[0]['subject']}")
+            state[EMAIL_LAST_SINGLE_RESULT] = stored_id
+            logger.info("SEARCH: Stored single result ID for 'yes' responses: %s", stored_id)
+            logger.debug("SEARCH: Single result details - From: %s, Subject: %s", message_summaries[0]['from'], message_summaries[0]['subject'])
         else:
             # Clear single result if multiple results
-            tool_context.state[EMAIL_LAST_SINGLE_RESULT] = None
-            logger.debug(f"SEARCH: Cleared single result (found {len(message_summaries)} messages)")
+            state[EMAIL_LAST_SINGLE_RESULT] = None
+            logger.debug("SEARCH: Cleared single result (found %s messages)", len(message_summaries))
         
         # Debug logging to verify ID storage
-        logger.debug(f"Search results stored: {len(message_index_map)} messages")
-        logger.debug(f"First message ID from search: {message_index_map.get('1', 'None')}")
+        logger.debug("Search results stored: %s messages", listing_size(listing))
+        logger.debug("First message ID from search: %s", listing_message_id(listing, 1))
         
         # Format search results with voice-optimized display
         if len(message_summaries) == 1:
@@ -552,12 +524,16 @@ def gmail_search_messages(search_query: str, max_results: int = 10, tool_context
 # Gmail Sending Tools
 # =============================================================================
 
+@trace_tool
+@coalesce_state_writes
 def gmail_send_message(to: str, subject: str, body: str, cc: str = "", bcc: str = "", 
                       style_check: bool = True, tool_context=None) -> str:
     """Send a Gmail message with optional style checking."""
     validate_tool_context(tool_context, "gmail_send_message")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_send_message", "send_message", True, 
                          f"To: {to}, Subject: '{subject}', CC: {cc}, BCC: {bcc}")
@@ -586,12 +562,12 @@ Please let me know how you'd like to proceed."""
             return "Gmail not set up. Please run: python setup_gmail.py"
         
         # Get sender email from session or profile
-        sender_email = tool_context.state.get(USER_EMAIL, "")
+        sender_email = state.get(USER_EMAIL, "")
         if not sender_email:
             try:
                 profile = service.users().getProfile(userId='me').execute()
                 sender_email = profile.get('emailAddress', '')
-                tool_context.state[USER_EMAIL] = sender_email
+                state[USER_EMAIL] = sender_email
             except:
                 sender_email = "me"
         
@@ -619,10 +595,10 @@ Please let me know how you'd like to proceed."""
         ).execute()
         
         # Update session state after successful send
-        tool_context.state[EMAIL_LAST_SENT] = datetime.utcnow().isoformat()
-        tool_context.state[EMAIL_LAST_SENT_TO] = to
-        tool_context.state[EMAIL_LAST_SENT_SUBJECT] = subject
-        tool_context.state[EMAIL_LAST_SENT_ID] = sent_message.get('id', '')
+        state[EMAIL_LAST_SENT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_SENT_TO] = to
+        state[EMAIL_LAST_SENT_SUBJECT] = subject
+        state[EMAIL_LAST_SENT_ID] = sent_message.get('id', '')
         
         log_tool_execution(tool_context, "gmail_send_message", "send_message", True, "Email sent successfully")
         return f"Email sent successfully to {to}. Subject: {subject}"
@@ -633,11 +609,15 @@ Please let me know how you'd like to proceed."""
         return f"Error sending email: {str(e)}"
 
 
+@trace_tool
+@coalesce_state_writes
 def gmail_reply_to_message(message_id: str, reply_body: str, tool_context=None) -> str:
     """Reply to a specific Gmail message."""
     validate_tool_context(tool_context, "gmail_reply_message")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_reply_to_message", "reply_message", True, 
                          f"Reply to message ID/Reference: {message_id}")
@@ -692,7 +672,7 @@ def gmail_reply_to_message(message_id: str, reply_body: str, tool_context=None)
         if not re.match(email_pattern, clean_email):
             return f"Error: Invalid email address format found: '{clean_email}'. Please check the original message."
         
-        logger.info(f"REPLY: Replying to email: {clean_email}")
+        logger.info("REPLY: Replying to email: %s", clean_email)
         
         # Create reply
         from email.mime.text import MIMEText
@@ -712,10 +692,10 @@ def gmail_reply_to_message(message_id: str, reply_body: str, tool_context=None)
         ).execute()
         
         # Update session state
-        tool_context.state[EMAIL_LAST_REPLY_SENT] = datetime.utcnow().isoformat()
-        tool_context.state[EMAIL_LAST_REPLY_TO] = clean_email
-        tool_context.state[EMAIL_LAST_REPLY_ID] = sent_reply.get('id', '')
-        tool_context.state[EMAIL_LAST_REPLY_THREAD] = thread_id
+        state[EMAIL_LAST_REPLY_SENT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_REPLY_TO] = clean_email
+        state[EMAIL_LAST_REPLY_ID] = sent_reply.get('id', '')
+        state[EMAIL_LAST_REPLY_THREAD] = thread_id
         
         log_tool_execution(tool_context, "gmail_reply_to_message", "reply_message", True, f"Reply sent to {clean_email}")
         return f"Reply sent to {clean_email}"
@@ -725,12 +705,16 @@ def gmail_reply_to_message(message_id: str, reply_body: str, tool_context=None)
         log_tool_execution(tool_context, "gmail_reply_to_message", "reply_message", False, str(e))
         return f"Error sending reply: {str(e)}"
 
+@trace_tool
+@coalesce_state_writes
 def gmail_confirm_and_send(to: str, subject: str, body: str, cc: str = "", bcc: str = "", 
                           tool_context=None) -> str:
     """Prepare email for confirmation before sending."""
     validate_tool_context(tool_context, "gmail_confirm_and_send")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_confirm_and_send", "prepare_send", True, f"To: {to}")
         
@@ -744,7 +728,7 @@ def gmail_confirm_and_send(to: str, subject: str, body: str, cc: str = "", bcc:
             'timestamp': datetime.utcnow().isoformat()
         }
         
-        tool_context.state[EMAIL_PENDING_SEND] = pending_email
+        state[EMAIL_PENDING_SEND] = pending_email
         
         # Format confirmation message for agent
         confirmation_text = f"""Ready to send email:
@@ -767,11 +751,15 @@ Body:
         return f"Error preparing email: {str(e)}"
 
 
+@trace_tool
+@coalesce_state_writes
 def gmail_confirm_and_reply(message_id: str, reply_body: str, tool_context=None) -> str:
     """Prepare reply for confirmation before sending."""
     validate_tool_context(tool_context, "gmail_confirm_and_reply")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_confirm_and_reply", "prepare_reply", True, f"Message: {message_id}")
         
@@ -802,7 +790,7 @@ def gmail_confirm_and_reply(message_id: str, reply_body: str, tool_context=None)
             'timestamp': datetime.utcnow().isoformat()
         }
         
-        tool_context.state[EMAIL_PENDING_REPLY] = pending_reply
+        state[EMAIL_PENDING_REPLY] = pending_reply
         
         # Format confirmation message for agent
         confirmation_text = f"""Ready to send reply:
@@ -826,11 +814,15 @@ Reply:
 # Gmail Organization Tools
 # =============================================================================
 
+@trace_tool
+@coalesce_state_writes
 def gmail_mark_as_read(message_id: str, tool_context=None) -> str:
     """Mark a Gmail message as read."""
     validate_tool_context(tool_context, "gmail_markread_message")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_mark_as_read", "mark_read", True, f"Message ID/Reference: {message_id}")
         
@@ -858,8 +850,8 @@ def gmail_mark_as_read(message_id: str, tool_context=None) -> str:
                 return f"Could not find email with reference '{message_id}'. Please use 'list emails' first, then refer to emails by position (e.g., '1', '2') or sender name."
         
         # Update session state
-        tool_context.state[EMAIL_LAST_MARKED_READ] = actual_message_id
-        tool_context.state[EMAIL_LAST_MARKED_READ_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_MARKED_READ] = actual_message_id
+        state[EMAIL_LAST_MARKED_READ_AT] = datetime.utcnow().isoformat()
         
         # Track for follow-up actions
         _track_message_operation(actual_message_id, "mark_as_read", tool_context)
@@ -873,11 +865,15 @@ def gmail_mark_as_read(message_id: str, tool_context=None) -> str:
         return f"Error marking as read: {str(e)}"
 
 
+@trace_tool
+@coalesce_state_writes
 def gmail_archive_message(message_id: str, tool_context=None) -> str:
     """Archive a Gmail message."""
     validate_tool_context(tool_context, "gmail_archive_message")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_archive_message", "archive_message", True, f"Message ID/Reference: {message_id}")
         
@@ -905,8 +901,8 @@ def gmail_archive_message(message_id: str, tool_context=None) -> str:
                 return f"Could not find email with reference '{message_id}'. Please use 'list emails' first, then refer to emails by position (e.g., '1', '2') or sender name."
         
         # Update session state
-        tool_context.state[EMAIL_LAST_ARCHIVED] = actual_message_id
-        tool_context.state[EMAIL_LAST_ARCHIVED_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_ARCHIVED] = actual_message_id
+        state[EMAIL_LAST_ARCHIVED_AT] = datetime.utcnow().isoformat()
         
         # Track for follow-up actions
         _track_message_operation(actual_message_id, "archive_message", tool_context)
@@ -919,11 +915,15 @@ def gmail_archive_message(message_id: str, tool_context=None) -> str:
         log_tool_execution(tool_context, "gmail_archive_message", "archive_message", False, str(e))
         return f"Error archiving message: {str(e)}"
 
+@trace_tool
+@coalesce_state_writes
 def gmail_delete_message(message_id: str, tool_context=None) -> str:
     """Delete a Gmail message."""
     validate_tool_context(tool_context, "gmail_delete_message")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_delete_message", "delete", True, f"Message ID/Reference: {message_id}")
         
@@ -950,8 +950,8 @@ def gmail_delete_message(message_id: str, tool_context=None) -> str:
                 return f"Could not find email with reference '{message_id}'. Please use 'list emails' first, then refer to emails by position (e.g., '1', '2') or sender name."
         
         # Update session state
-        tool_context.state[EMAIL_LAST_DELETED] = actual_message_id
-        tool_context.state[EMAIL_LAST_DELETED_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_DELETED] = actual_message_id
+        state[EMAIL_LAST_DELETED_AT] = datetime.utcnow().isoformat()
         
         log_tool_execution(tool_context, "gmail_delete_message", "delete", True, "Message moved to trash")
         return f"Message moved to trash"
@@ -965,15 +965,25 @@ def gmail_delete_message(message_id: str, tool_context=None) -> str:
 # AI Shared tools Functions
 # =============================================================================
 
-def _process_with_ai(content: str, task_type: str, **kwargs) -> str:
-    """Shared AI processing function for all email content tasks"""
-    try:
-        # Initialize Gemini client
-        client = genai.Client(
+_genai_client = None
+
+
+def get_genai_client():
+    """Shared Gemini client for email and workflow LLM calls."""
+    global _genai_client
+    if _genai_client is None:
+        _genai_client = genai.Client(
             vertexai=True,
             project=os.getenv('GOOGLE_CLOUD_PROJECT'),
             location=os.getenv('GOOGLE_CLOUD_LOCATION', 'us-central1')
         )
+    return _genai_client
+
+
+def _process_with_ai(content: str, task_type: str, **kwargs) -> str:
+    """Shared AI processing function for all email content tasks"""
+    try:
+        client = get_genai_client()
         
         # Build prompt based on task type
         prompts = {
@@ -985,10 +995,11 @@ def _process_with_ai(content: str, task_type: str, **kwargs) -> str:
         }
         
         # Call Gemini API
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompts.get(task_type, f"Process this email content:\n{content}")
-        )
+        with llm_call():
+            response = client.models.generate_content(
+                model="gemini-2.0-flash",
+                contents=prompts.get(task_type, f"Process this email content:\n{content}")
+            )
         
         return response.text
         
@@ -997,12 +1008,16 @@ def _process_with_ai(content: str, task_type: str, **kwargs) -> str:
         return f"AI processing temporarily unavailable. Error: {str(e)}"
 
 
+@trace_tool
+@coalesce_state_writes
 def gmail_generate_email(to: str, subject_intent: str, email_intent: str, 
                         style: str = "professional", context: str = "", tool_context=None) -> str:
     """Generate a complete email using AI for composition (not replies)."""
     validate_tool_context(tool_context, "gmail_generate_email")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_generate_email", "ai_compose_email", True, 
                          f"To: {to}, Intent: {email_intent}")
@@ -1024,9 +1039,9 @@ def gmail_generate_email(to: str, subject_intent: str, email_intent: str,
         email_content = _process_with_ai(composition_requirements, "compose", style=style)
         
         # Update session state
-        tool_context.state[EMAIL_LAST_GENERATED_EMAIL] = email_content
-        tool_context.state[EMAIL_LAST_EMAIL_GENERATION_AT] = datetime.utcnow().isoformat()
-        tool_context.state[EMAIL_LAST_GENERATED_EMAIL_TO] = to
+        state[EMAIL_LAST_GENERATED_EMAIL] = email_content
+        state[EMAIL_LAST_EMAIL_GENERATION_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_GENERATED_EMAIL_TO] = to
         
         log_tool_execution(tool_context, "gmail_generate_email", "ai_compose_email", True, "Email composition completed")
         return email_content
@@ -1036,11 +1051,15 @@ def gmail_generate_email(to: str, subject_intent: str, email_intent: str,
         log_tool_execution(tool_context, "gmail_generate_email", "ai_compose_email", False, str(e))
         return f"Error generating email: {str(e)}"
 
+@trace_tool
+@coalesce_state_writes
 def gmail_summarize_message(message_id: str, detail_level: str = "moderate", tool_context=None) -> str:
     """Summarize a specific Gmail message using AI."""
     validate_tool_context(tool_context, "gmail_summarize_message")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_summarize_message", "ai_summarize", True, f"Message ID/Reference: {message_id}")
         
@@ -1071,8 +1090,8 @@ def gmail_summarize_message(message_id: str, detail_level: str = "moderate", too
         summary = _process_with_ai(body, "summarize")
         
         # Update session state using proper keys
-        tool_context.state[EMAIL_LAST_AI_SUMMARY] = summary
-        tool_context.state[EMAIL_LAST_AI_SUMMARY_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_AI_SUMMARY] = summary
+        state[EMAIL_LAST_AI_SUMMARY_AT] = datetime.utcnow().isoformat()
         
         log_tool_execution(tool_context, "gmail_summarize_message", "ai_summarize", True, "AI summary completed")
         return summary
@@ -1083,11 +1102,15 @@ def gmail_summarize_message(message_id: str, detail_level: str = "moderate", too
         return f"Error summarizing message: {str(e)}"
 
 
+@trace_tool
+@coalesce_state_writes
 def gmail_analyze_sentiment(message_id: str, tool_context=None) -> str:
     """Analyze sentiment of a Gmail message using AI."""
     validate_tool_context(tool_context, "gmail_analyze_sentiment")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_analyze_sentiment", "ai_sentiment", True, f"Message ID/Reference: {message_id}")
         
@@ -1119,8 +1142,8 @@ def gmail_analyze_sentiment(message_id: str, tool_context=None) -> str:
         analysis = _process_with_ai(body, "sentiment")
         
         # Update session state using proper keys
-        tool_context.state[EMAIL_LAST_SENTIMENT_ANALYSIS] = analysis
-        tool_context.state[EMAIL_LAST_SENTIMENT_ANALYSIS_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_SENTIMENT_ANALYSIS] = analysis
+        state[EMAIL_LAST_SENTIMENT_ANALYSIS_AT] = datetime.utcnow().isoformat()
         
         log_tool_execution(tool_context, "gmail_analyze_sentiment", "ai_sentiment", True, "AI sentiment analysis completed")
         return analysis
@@ -1131,11 +1154,15 @@ def gmail_analyze_sentiment(message_id: str, tool_context=None) -> str:
         return f"Error analyzing sentiment: {str(e)}"
 
 
+@trace_tool
+@coalesce_state_writes
 def gmail_extract_action_items(message_id: str, tool_context=None) -> str:
     """Extract action items from a Gmail message using AI."""
     validate_tool_context(tool_context, "gmail_extract_action_items")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_extract_action_items", "ai_extract_tasks", True, f"Message ID/Reference: {message_id}")
         
@@ -1166,8 +1193,8 @@ def gmail_extract_action_items(message_id: str, tool_context=None) -> str:
         tasks = _process_with_ai(body, "tasks")
         
         # Update session state using proper keys
-        tool_context.state[EMAIL_LAST_EXTRACTED_TASKS] = tasks
-        tool_context.state[EMAIL_LAST_TASK_EXTRACTION_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_EXTRACTED_TASKS] = tasks
+        state[EMAIL_LAST_TASK_EXTRACTION_AT] = datetime.utcnow().isoformat()
         
         log_tool_execution(tool_context, "gmail_extract_action_items", "ai_extract_tasks", True, "AI task extraction completed")
         return tasks
@@ -1178,11 +1205,15 @@ def gmail_extract_action_items(message_id: str, tool_context=None) -> str:
         return f"Error extracting action items: {str(e)}"
 
 
+@trace_tool
+@coalesce_state_writes
 def gmail_generate_reply(message_id: str, reply_intent: str, style: str = "professional", tool_context=None) -> str:
     """Generate AI reply to a Gmail message."""
     validate_tool_context(tool_context, "gmail_generate_reply")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_generate_reply", "ai_generate_reply", True, f"Message ID/Reference: {message_id}")
         
@@ -1213,8 +1244,8 @@ def gmail_generate_reply(message_id: str, reply_intent: str, style: str = "profe
         reply = _process_with_ai(body, "reply", intent=reply_intent, style=style)
         
         # Update session state using proper keys
-        tool_context.state[EMAIL_LAST_GENERATED_REPLY] = reply
-        tool_context.state[EMAIL_LAST_REPLY_GENERATION_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_GENERATED_REPLY] = reply
+        state[EMAIL_LAST_REPLY_GENERATION_AT] = datetime.utcnow().isoformat()
         
         log_tool_execution(tool_context, "gmail_generate_reply", "ai_generate_reply", True, "AI reply generation completed")
         return reply
@@ -1229,11 +1260,15 @@ def gmail_generate_reply(message_id: str, reply_intent: str, style: str = "profe
 # Gmail Draft Management Tools
 # =============================================================================
 
+@trace_tool
+@coalesce_state_writes
 def gmail_create_draft(to: str, subject: str, body: str, cc: str = "", bcc: str = "", tool_context=None) -> str:
     """Create a new Gmail draft."""
     validate_tool_context(tool_context, "gmail_create_draft")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_create_draft", "create_draft", True, 
                          f"To: {to}, Subject: '{subject}'")
@@ -1266,8 +1301,8 @@ def gmail_create_draft(to: str, subject: str, body: str, cc: str = "", bcc: str
         ).execute()
         
         # Update session state
-        tool_context.state[EMAIL_LAST_DRAFT_CREATED] = draft.get('id', '')
-        tool_context.state[EMAIL_LAST_DRAFT_CREATED_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_DRAFT_CREATED] = draft.get('id', '')
+        state[EMAIL_LAST_DRAFT_CREATED_AT] = datetime.utcnow().isoformat()
         
         log_tool_execution(tool_context, "gmail_create_draft", "create_draft", True, f"Draft created with ID {draft.get('id', '')}")
         return f"Draft created successfully. Draft ID: {draft.get('id', '')}"
@@ -1277,11 +1312,15 @@ def gmail_create_draft(to: str, subject: str, body: str, cc: str = "", bcc: str
         log_tool_execution(tool_context, "gmail_create_draft", "create_draft", False, str(e))
         return f"Error creating draft: {str(e)}"
 
+@trace_tool
+@coalesce_state_writes
 def gmail_list_drafts(max_results: int = 10, tool_context=None) -> str:
     """List Gmail drafts."""
     validate_tool_context(tool_context, "gmail_list_drafts")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_list_drafts", "list_drafts", True, f"Max results: {max_results}")
         
@@ -1298,7 +1337,7 @@ def gmail_list_drafts(max_results: int = 10, tool_context=None) -> str:
         drafts = result.get('drafts', [])
         
         if not drafts:
-            tool_context.state[EMAIL_DRAFTS_COUNT] = 0
+            state[EMAIL_DRAFTS_COUNT] = 0
             log_tool_execution(tool_context, "gmail_list_drafts", "list_drafts", True, "No drafts found")
             return "You have no drafts in your Gmail account."
         
@@ -1323,8 +1362,8 @@ def gmail_list_drafts(max_results: int = 10, tool_context=None) -> str:
                 continue
         
         # Update session state
-        tool_context.state[EMAIL_DRAFTS_COUNT] = len(draft_summaries)
-        tool_context.state[EMAIL_LAST_DRAFTS_FETCH] = datetime.utcnow().isoformat()
+        state[EMAIL_DRAFTS_COUNT] = len(draft_summaries)
+        state[EMAIL_LAST_DRAFTS_FETCH] = datetime.utcnow().isoformat()
         
         # Format response
         response_lines = [f"You have {len(draft_summaries)} draft(s):"]
@@ -1343,11 +1382,15 @@ def gmail_list_drafts(max_results: int = 10, tool_context=None) -> str:
         log_tool_execution(tool_context, "gmail_list_drafts", "list_drafts", False, str(e))
         return f"Error retrieving drafts: {str(e)}"
 
+@trace_tool
+@coalesce_state_writes
 def gmail_send_draft(draft_id: str, tool_context=None) -> str:
     """Send a Gmail draft."""
     validate_tool_context(tool_context, "gmail_send_draft")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_send_draft", "send_draft", True, f"Draft ID: {draft_id}")
         
@@ -1366,9 +1409,9 @@ def gmail_send_draft(draft_id: str, tool_context=None) -> str:
         ).execute()
         
         # Update session state
-        tool_context.state[EMAIL_LAST_DRAFT_SENT] = draft_id
-        tool_context.state[EMAIL_LAST_DRAFT_SENT_AT] = datetime.utcnow().isoformat()
-        tool_context.state[EMAIL_LAST_SENT_MESSAGE_ID] = sent_message.get('id', '')
+        state[EMAIL_LAST_DRAFT_SENT] = draft_id
+        state[EMAIL_LAST_DRAFT_SENT_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_SENT_MESSAGE_ID] = sent_message.get('id', '')
         
         log_tool_execution(tool_context, "gmail_send_draft", "send_draft", True, f"Draft {draft_id} sent successfully")
         return f"Draft sent successfully. Message ID: {sent_message.get('id', '')}"
@@ -1378,11 +1421,15 @@ def gmail_send_draft(draft_id: str, tool_context=None) -> str:
         log_tool_execution(tool_context, "gmail_send_draft", "send_draft", False, str(e))
         return f"Error sending draft: {str(e)}"
 
+@trace_tool
+@coalesce_state_writes
 def gmail_delete_draft(draft_id: str, tool_context=None) -> str:
     """Delete a Gmail draft."""
     validate_tool_context(tool_context, "gmail_delete_draft")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_delete_draft", "delete_draft", True, f"Draft ID: {draft_id}")
         
@@ -1398,8 +1445,8 @@ def gmail_delete_draft(draft_id: str, tool_context=None) -> str:
         service.users().drafts().delete(userId='me', id=draft_id).execute()
         
         # Update session state
-        tool_context.state[EMAIL_LAST_DRAFT_DELETED] = draft_id
-        tool_context.state[EMAIL_LAST_DRAFT_DELETED_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_DRAFT_DELETED] = draft_id
+        state[EMAIL_LAST_DRAFT_DELETED_AT] = datetime.utcnow().isoformat()
         
         log_tool_execution(tool_context, "gmail_delete_draft", "delete_draft", True, f"Draft {draft_id} deleted")
         return f"Draft deleted successfully"
@@ -1413,11 +1460,15 @@ def gmail_delete_draft(draft_id: str, tool_context=None) -> str:
 # Gmail Label Management Tools
 # =============================================================================
 
+@trace_tool
+@coalesce_state_writes
 def gmail_list_labels(tool_context=None) -> str:
     """List all Gmail labels."""
     validate_tool_context(tool_context, "gmail_list_labels")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_list_labels", "list_labels", True, "Retrieving labels")
         
@@ -1448,8 +1499,8 @@ def gmail_list_labels(tool_context=None) -> str:
                 user_labels.append(label)
         
         # Update session state
-        tool_context.state[EMAIL_LABELS_COUNT] = len(labels)
-        tool_context.state[EMAIL_LAST_LABELS_FETCH] = datetime.utcnow().isoformat()
+        state[EMAIL_LABELS_COUNT] = len(labels)
+        state[EMAIL_LAST_LABELS_FETCH] = datetime.utcnow().isoformat()
         
         # Format response
         response_lines = [f"Gmail Labels ({len(labels)} total):"]
@@ -1474,11 +1525,15 @@ def gmail_list_labels(tool_context=None) -> str:
         log_tool_execution(tool_context, "gmail_list_labels", "list_labels", False, str(e))
         return f"Error retrieving labels: {str(e)}"
 
+@trace_tool
+@coalesce_state_writes
 def gmail_create_label(label_name: str, tool_context=None) -> str:
     """Create a new Gmail label."""
     validate_tool_context(tool_context, "gmail_create_label")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_create_label", "create_label", True, f"Label name: '{label_name}'")
         
@@ -1503,9 +1558,9 @@ def gmail_create_label(label_name: str, tool_context=None) -> str:
         ).execute()
         
         # Update session state
-        tool_context.state[EMAIL_LAST_LABEL_CREATED] = created_label.get('id', '')
-        tool_context.state[EMAIL_LAST_LABEL_CREATED_AT] = datetime.utcnow().isoformat()
-        tool_context.state[EMAIL_LAST_LABEL_CREATED_NAME] = label_name
+        state[EMAIL_LAST_LABEL_CREATED] = created_label.get('id', '')
+        state[EMAIL_LAST_LABEL_CREATED_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_LABEL_CREATED_NAME] = label_name
         
         log_tool_execution(tool_context, "gmail_create_label", "create_label", True, f"Label '{label_name}' created with ID {created_label.get('id', '')}")
         return f"Label '{label_name}' created successfully. Label ID: {created_label.get('id', '')}"
@@ -1515,11 +1570,15 @@ def gmail_create_label(label_name: str, tool_context=None) -> str:
         log_tool_execution(tool_context, "gmail_create_label", "create_label", False, str(e))
         return f"Error creating label: {str(e)}"
 
+@trace_tool
+@coalesce_state_writes
 def gmail_apply_label(message_id: str, label_name: str, tool_context=None) -> str:
     """Apply a label to a Gmail message."""
     validate_tool_context(tool_context, "gmail_apply_label")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_apply_label", "apply_label", True, 
                          f"Message ID/Reference: {message_id}, Label: '{label_name}'")
@@ -1556,9 +1615,9 @@ def gmail_apply_label(message_id: str, label_name: str, tool_context=None) -> st
         ).execute()
         
         # Update session state
-        tool_context.state[EMAIL_LAST_LABEL_APPLIED] = label_name
-        tool_context.state[EMAIL_LAST_LABEL_APPLIED_AT] = datetime.utcnow().isoformat()
-        tool_context.state[EMAIL_LAST_LABEL_APPLIED_TO] = actual_message_id
+        state[EMAIL_LAST_LABEL_APPLIED] = label_name
+        state[EMAIL_LAST_LABEL_APPLIED_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_LABEL_APPLIED_TO] = actual_message_id
         
         log_tool_execution(tool_context, "gmail_apply_label", "apply_label", True, f"Label '{label_name}' applied to message")
         return f"Label '{label_name}' applied to message successfully"
@@ -1568,11 +1627,15 @@ def gmail_apply_label(message_id: str, label_name: str, tool_context=None) -> st
         log_tool_execution(tool_context, "gmail_apply_label", "apply_label", False, str(e))
         return f"Error applying label: {str(e)}"
 
+@trace_tool
+@coalesce_state_writes
 def gmail_remove_label(message_id: str, label_name: str, tool_context=None) -> str:
     """Remove a label from a Gmail message."""
     validate_tool_context(tool_context, "gmail_remove_label")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_remove_label", "remove_label", True, 
                          f"Message ID/Reference: {message_id}, Label: '{label_name}'")
@@ -1609,9 +1672,9 @@ def gmail_remove_label(message_id: str, label_name: str, tool_context=None) -> s
         ).execute()
         
         # Update session state
-        tool_context.state[EMAIL_LAST_LABEL_REMOVED] = label_name
-        tool_context.state[EMAIL_LAST_LABEL_REMOVED_AT] = datetime.utcnow().isoformat()
-        tool_context.state[EMAIL_LAST_LABEL_REMOVED_FROM] = actual_message_id
+        state[EMAIL_LAST_LABEL_REMOVED] = label_name
+        state[EMAIL_LAST_LABEL_REMOVED_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_LABEL_REMOVED_FROM] = actual_message_id
         
         log_tool_execution(tool_context, "gmail_remove_label", "remove_label", True, f"Label '{label_name}' removed from message")
         return f"Label '{label_name}' removed from message successfully"
@@ -1625,11 +1688,15 @@ def gmail_remove_label(message_id: str, label_name: str, tool_context=None) -> s
 # Gmail Enhanced Status Management Tools
 # =============================================================================
 
+@trace_tool
+@coalesce_state_writes
 def gmail_star_message(message_id: str, tool_context=None) -> str:
     """Star a Gmail message."""
     validate_tool_context(tool_context, "gmail_star_message")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_star_message", "star_message", True, f"Message ID/Reference: {message_id}")
         
@@ -1652,8 +1719,8 @@ def gmail_star_message(message_id: str, tool_context=None) -> str:
         ).execute()
         
         # Update session state
-        tool_context.state[EMAIL_LAST_STARRED] = actual_message_id
-        tool_context.state[EMAIL_LAST_STARRED_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_STARRED] = actual_message_id
+        state[EMAIL_LAST_STARRED_AT] = datetime.utcnow().isoformat()
         
         # Track for follow-up actions
         _track_message_operation(actual_message_id, "star_message", tool_context)
@@ -1666,11 +1733,15 @@ def gmail_star_message(message_id: str, tool_context=None) -> str:
         log_tool_execution(tool_context, "gmail_star_message", "star_message", False, str(e))
         return f"Error starring message: {str(e)}"
 
+@trace_tool
+@coalesce_state_writes
 def gmail_unstar_message(message_id: str, tool_context=None) -> str:
     """Unstar a Gmail message."""
     validate_tool_context(tool_context, "gmail_unstar_message")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_unstar_message", "unstar_message", True, f"Message ID/Reference: {message_id}")
         
@@ -1693,8 +1764,8 @@ def gmail_unstar_message(message_id: str, tool_context=None) -> str:
         ).execute()
         
         # Update session state
-        tool_context.state[EMAIL_LAST_UNSTARRED] = actual_message_id
-        tool_context.state[EMAIL_LAST_UNSTARRED_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_UNSTARRED] = actual_message_id
+        state[EMAIL_LAST_UNSTARRED_AT] = datetime.utcnow().isoformat()
         
         # Track for follow-up actions
         _track_message_operation(actual_message_id, "unstar_message", tool_context)
@@ -1707,11 +1778,15 @@ def gmail_unstar_message(message_id: str, tool_context=None) -> str:
         log_tool_execution(tool_context, "gmail_unstar_message", "unstar_message", False, str(e))
         return f"Error unstarring message: {str(e)}"
 
+@trace_tool
+@coalesce_state_writes
 def gmail_mark_important(message_id: str, tool_context=None) -> str:
     """Mark a Gmail message as important."""
     validate_tool_context(tool_context, "gmail_mark_important")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_mark_important", "mark_important", True, f"Message ID/Reference: {message_id}")
         
@@ -1734,8 +1809,8 @@ def gmail_mark_important(message_id: str, tool_context=None) -> str:
         ).execute()
         
         # Update session state
-        tool_context.state[EMAIL_LAST_MARKED_IMPORTANT] = actual_message_id
-        tool_context.state[EMAIL_LAST_MARKED_IMPORTANT_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_MARKED_IMPORTANT] = actual_message_id
+        state[EMAIL_LAST_MARKED_IMPORTANT_AT] = datetime.utcnow().isoformat()
         
         # Track for follow-up actions
         _track_message_operation(actual_message_id, "mark_important", tool_context)
@@ -1748,11 +1823,15 @@ def gmail_mark_important(message_id: str, tool_context=None) -> str:
         log_tool_execution(tool_context, "gmail_mark_important", "mark_important", False, str(e))
         return f"Error marking as important: {str(e)}"
 
+@trace_tool
+@coalesce_state_writes
 def gmail_mark_not_important(message_id: str, tool_context=None) -> str:
     """Mark a Gmail message as not important."""
     validate_tool_context(tool_context, "gmail_mark_not_important")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_mark_not_important", "mark_not_important", True, f"Message ID/Reference: {message_id}")
         
@@ -1775,8 +1854,8 @@ def gmail_mark_not_important(message_id: str, tool_context=None) -> str:
         ).execute()
         
         # Update session state
-        tool_context.state[EMAIL_LAST_MARKED_NOT_IMPORTANT] = actual_message_id
-        tool_context.state[EMAIL_LAST_MARKED_NOT_IMPORTANT_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_MARKED_NOT_IMPORTANT] = actual_message_id
+        state[EMAIL_LAST_MARKED_NOT_IMPORTANT_AT] = datetime.utcnow().isoformat()
         
         log_tool_execution(tool_context, "gmail_mark_not_important", "mark_not_important", True, "Message marked as not important")
         return "Message marked as not important successfully"
@@ -1790,11 +1869,15 @@ def gmail_mark_not_important(message_id: str, tool_context=None) -> str:
 # Gmail Spam Management Tools
 # =============================================================================
 
+@trace_tool
+@coalesce_state_writes
 def gmail_mark_spam(message_id: str, tool_context=None) -> str:
     """Move a Gmail message to spam."""
     validate_tool_context(tool_context, "gmail_mark_spam")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_mark_spam", "mark_spam", True, f"Message ID/Reference: {message_id}")
         
@@ -1820,8 +1903,8 @@ def gmail_mark_spam(message_id: str, tool_context=None) -> str:
         ).execute()
         
         # Update session state
-        tool_context.state[EMAIL_LAST_MARKED_SPAM] = actual_message_id
-        tool_context.state[EMAIL_LAST_MARKED_SPAM_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_MARKED_SPAM] = actual_message_id
+        state[EMAIL_LAST_MARKED_SPAM_AT] = datetime.utcnow().isoformat()
         
         log_tool_execution(tool_context, "gmail_mark_spam", "mark_spam", True, "Message moved to spam")
         return "Message moved to spam successfully"
@@ -1831,11 +1914,15 @@ def gmail_mark_spam(message_id: str, tool_context=None) -> str:
         log_tool_execution(tool_context, "gmail_mark_spam", "mark_spam", False, str(e))
         return f"Error marking as spam: {str(e)}"
 
+@trace_tool
+@coalesce_state_writes
 def gmail_unmark_spam(message_id: str, tool_context=None) -> str:
     """Remove a Gmail message from spam."""
     validate_tool_context(tool_context, "gmail_unmark_spam")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_unmark_spam", "unmark_spam", True, f"Message ID/Reference: {message_id}")
         
@@ -1861,8 +1948,8 @@ def gmail_unmark_spam(message_id: str, tool_context=None) -> str:
         ).execute()
         
         # Update session state
-        tool_context.state[EMAIL_LAST_UNMARKED_SPAM] = actual_message_id
-        tool_context.state[EMAIL_LAST_UNMARKED_SPAM_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_UNMARKED_SPAM] = actual_message_id
+        state[EMAIL_LAST_UNMARKED_SPAM_AT] = datetime.utcnow().isoformat()
         
         log_tool_execution(tool_context, "gmail_unmark_spam", "unmark_spam", True, "Message removed from spam")
         return "Message removed from spam successfully"
@@ -1876,11 +1963,15 @@ def gmail_unmark_spam(message_id: str, tool_context=None) -> str:
 # Gmail Thread Management Tools
 # =============================================================================
 
+@trace_tool
+@coalesce_state_writes
 def gmail_get_thread(thread_id_or_message_id: str, tool_context=None) -> str:
     """Get a complete Gmail thread (conversation). Can accept either thread ID or message ID."""
     validate_tool_context(tool_context, "gmail_get_thread")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_get_thread", "get_thread", True, f"Thread/Message ID: {thread_id_or_message_id}")
         
@@ -1946,9 +2037,9 @@ Subject: {subject}
 {'='*50}""")
         
         # Update session state
-        tool_context.state[EMAIL_LAST_THREAD_VIEWED] = thread_id
-        tool_context.state[EMAIL_LAST_THREAD_VIEWED_AT] = datetime.utcnow().isoformat()
-        tool_context.state[EMAIL_LAST_THREAD_MESSAGE_COUNT] = len(messages)
+        state[EMAIL_LAST_THREAD_VIEWED] = thread_id
+        state[EMAIL_LAST_THREAD_VIEWED_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_THREAD_MESSAGE_COUNT] = len(messages)
         
         response = f"Gmail Thread ({len(messages)} messages):\n\n" + "\n\n".join(conversation_parts)
         
@@ -1960,11 +2051,15 @@ Subject: {subject}
         log_tool_execution(tool_context, "gmail_get_thread", "get_thread", False, str(e))
         return f"Error retrieving thread: {str(e)}"
 
+@trace_tool
+@coalesce_state_writes
 def gmail_modify_thread(thread_id: str, add_labels: str = "", remove_labels: str = "", tool_context=None) -> str:
     """Modify labels on an entire Gmail thread."""
     validate_tool_context(tool_context, "gmail_modify_thread")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_modify_thread", "modify_thread", True, 
                          f"Thread ID: {thread_id}, Add: '{add_labels}', Remove: '{remove_labels}'")
@@ -2023,8 +2118,8 @@ def gmail_modify_thread(thread_id: str, add_labels: str = "", remove_labels: str
         ).execute()
         
         # Update session state
-        tool_context.state[EMAIL_LAST_THREAD_MODIFIED] = thread_id
-        tool_context.state[EMAIL_LAST_THREAD_MODIFIED_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_LAST_THREAD_MODIFIED] = thread_id
+        state[EMAIL_LAST_THREAD_MODIFIED_AT] = datetime.utcnow().isoformat()
         
         log_tool_execution(tool_context, "gmail_modify_thread", "modify_thread", True, "Thread modified successfully")
         return f"Thread labels modified successfully. Added: {add_labels or 'none'}, Removed: {remove_labels or 'none'}"
@@ -2038,11 +2133,15 @@ def gmail_modify_thread(thread_id: str, add_labels: str = "", remove_labels: str
 # Gmail Attachment Tools
 # =============================================================================
 
+@trace_tool
+@coalesce_state_writes
 def gmail_list_attachments(message_id: str, tool_context=None) -> str:
     """List attachments in a Gmail message."""
     validate_tool_context(tool_context, "gmail_list_attachments")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_list_attachments", "list_attachments", True, f"Message ID/Reference: {message_id}")
         
@@ -2097,9 +2196,9 @@ def gmail_list_attachments(message_id: str, tool_context=None) -> str:
             return "This message has no attachments"
         
         # Update session state
-        tool_context.state[EMAIL_LAST_ATTACHMENTS_LISTED] = actual_message_id
-        tool_context.state[EMAIL_LAST_ATTACHMENTS_COUNT] = len(attachments)
-        tool_context.state[EMAIL_LAST_ATTACHMENTS_DATA] = attachments
+        state[EMAIL_LAST_ATTACHMENTS_LISTED] = actual_message_id
+        state[EMAIL_LAST_ATTACHMENTS_COUNT] = len(attachments)
+        state[EMAIL_LAST_ATTACHMENTS_DATA] = attachments
         
         # Format response
         response_lines = [f"Message has {len(attachments)} attachment(s):"]
@@ -2121,11 +2220,15 @@ def gmail_list_attachments(message_id: str, tool_context=None) -> str:
 # Gmail User Profile Tools
 # =============================================================================
 
+@trace_tool
+@coalesce_state_writes
 def gmail_get_profile(tool_context=None) -> str:
     """Get Gmail user profile information."""
     validate_tool_context(tool_context, "gmail_get_profile")
     
     try:
+        state = get_state(tool_context)
+        
         # Log operation
         log_tool_execution(tool_context, "gmail_get_profile", "get_profile", True, "Retrieving profile")
         
@@ -2141,10 +2244,10 @@ def gmail_get_profile(tool_context=None) -> str:
         profile = service.users().getProfile(userId='me').execute()
         
         # Update session state
-        tool_context.state[EMAIL_USER_EMAIL] = profile.get('emailAddress', '')
-        tool_context.state[EMAIL_PROFILE_FETCHED_AT] = datetime.utcnow().isoformat()
-        tool_context.state[EMAIL_MESSAGES_TOTAL] = profile.get('messagesTotal', 0)
-        tool_context.state[EMAIL_THREADS_TOTAL] = profile.get('threadsTotal', 0)
+        state[EMAIL_USER_EMAIL] = profile.get('emailAddress', '')
+        state[EMAIL_PROFILE_FETCHED_AT] = datetime.utcnow().isoformat()
+        state[EMAIL_MESSAGES_TOTAL] = profile.get('messagesTotal', 0)
+        state[EMAIL_THREADS_TOTAL] = profile.get('threadsTotal', 0)
         
         # Format response
         response_lines = [
@@ -2214,8 +2317,9 @@ def _get_message_id_by_reference(reference: str, tool_context=None) -> Optional[
             return None
             
         # Get stored message data from session state (using your session key constants)
-        message_index_map = tool_context.state.get(EMAIL_MESSAGE_INDEX_MAP, {})
-        last_listed_messages = tool_context.state.get(EMAIL_LAST_LISTED_MESSAGES, [])
+        listing = get_listing(get_state(tool_context))
+        message_index_map = listing_index_map(listing)
+        last_listed_messages = listing_messages(listing)
         
         # If no session data, try to build it with fresh email fetch
         if not message_index_map or not last_listed_messages:
@@ -2223,45 +2327,42 @@ def _get_message_id_by_reference(reference: str, tool_context=None) -> Optional[
                 # Get Gmail service for fresh fetch
                 service = get_gmail_service(tool_context)
                 if service:
-                    logger.info(f"RESOLVE: No session data found, attempting fresh email fetch for reference '{reference}'")
+                    logger.info("RESOLVE: No session data found, attempting fresh email fetch for reference '%s'", reference)
                     recent_result = service.users().messages().list(userId='me', maxResults=10).execute()
                     recent_messages = recent_result.get('messages', [])
                     
-                    # Build session index
-                    message_index_map = {}
-                    last_listed_messages = []
-                    for i, msg in enumerate(recent_messages, 1):
-                        message_index_map[str(i)] = msg['id']
+                    # Build session listing
+                    message_summaries = []
+                    for msg in recent_messages:
                         try:
                             msg_data = service.users().messages().get(userId='me', id=msg['id'], format='metadata').execute()
                             headers = {h['name']: h['value'] for h in msg_data.get('payload', {}).get('headers', [])}
-                            detailed_msg = {
+                            message_summaries.append({
                                 "id": msg['id'],
                                 "from": headers.get('From', 'Unknown'),
                                 "subject": headers.get('Subject', 'No Subject'),
-                                "date": headers.get('Date', 'Unknown'),
-                                "position": i
-                            }
-                            last_listed_messages.append(detailed_msg)
+                                "date": headers.get('Date', 'Unknown')
+                            })
                         except Exception:
                             # If metadata fails, store basic info
-                            detailed_msg = {
+                            message_summaries.append({
                                 "id": msg['id'],
                                 "from": "Unknown",
                                 "subject": "Unknown", 
-                                "date": "Unknown",
-                                "position": i
-                            }
-                            last_listed_messages.append(detailed_msg)
+                                "date": "Unknown"
+                            })
                             continue
                     
+                    listing = build_listing("", message_summaries)
+                    message_index_map = listing_index_map(listing)
+                    last_listed_messages = listing_messages(listing)
+                    
                     # Store in session for future use
                     if tool_context and hasattr(tool_context, 'state'):
-                        tool_context.state[EMAIL_MESSAGE_INDEX_MAP] = message_index_map
-                        tool_context.state[EMAIL_LAST_LISTED_MESSAGES] = last_listed_messages
-                        logger.info(f"RESOLVE: Built fresh index with {len(message_index_map)} messages and updated session state")
+                        get_state(tool_context)[EMAIL_LISTING] = listing
+                        logger.info("RESOLVE: Built fresh index with %s messages and updated session state", len(message_index_map))
                     else:
-                        logger.debug(f"RESOLVE: Built fresh index with {len(message_index_map)} messages but couldn't update session state")
+                        logger.debug("RESOLVE: Built fresh index with %s messages but couldn't update session state", len(message_index_map))
                 
             except Exception as e:
                 logger.warning(f"RESOLVE: Failed to fetch fresh emails for reference resolution: {e}")
@@ -2278,21 +2379,21 @@ def _get_message_id_by_reference(reference: str, tool_context=None) -> Optional[
         # Define reference_lower at the start to avoid NameError
         reference_lower = reference.lower().strip()
         
-        logger.debug(f"Processing reference: '{reference}' -> normalized: '{reference_lower}'")
-        logger.debug(f"Available positions in message_index_map: {list(message_index_map.keys())}")
-        logger.debug(f"Number of messages in last_listed_messages: {len(last_listed_messages)}")
+        logger.debug("Processing reference: '%s' -> normalized: '%s'", reference, reference_lower)
+        logger.debug("Available positions in message_index_map: %s", list(message_index_map.keys()))
+        logger.debug("Number of messages in last_listed_messages: %s", len(last_listed_messages))
         
         # Special debug for position-based requests
         if any(char.isdigit() for char in reference_lower):
-            logger.debug(f"Reference contains digits, checking position lookup")
+            logger.debug("Reference contains digits, checking position lookup")
         if any(word in reference_lower for word in ['fifth', 'fifth one', 'the fifth']):
-            logger.debug(f"Reference contains 'fifth', should map to position '5'")
-            logger.debug(f"Is position '5' in message_index_map? {'5' in message_index_map}")
+            logger.debug("Reference contains 'fifth', should map to position '5'")
+            logger.debug("Is position '5' in message_index_map? %s", '5' in message_index_map)
             if '5' in message_index_map:
-                logger.debug(f"Position '5' maps to message ID: {message_index_map['5']}")
-            logger.debug(f"Does last_listed_messages have 5+ emails? {len(last_listed_messages) >= 5}")
+                logger.debug("Position '5' maps to message ID: %s", message_index_map['5'])
+            logger.debug("Does last_listed_messages have 5+ emails? %s", len(last_listed_messages) >= 5)
             if len(last_listed_messages) >= 5:
-                logger.debug(f"Fifth message ID from list: {last_listed_messages[4].get('id', 'None')}")
+                logger.debug("Fifth message ID from list: %s", last_listed_messages[4].get('id', 'None'))
         
         # Handle confirmatory responses that refer to the most recent/first email
         confirmatory_responses = ['yes', 'yeah', 'yep', 'sure', 'okay', 'ok', 'that one', 'it', 'that email', 'this one']
@@ -2301,26 +2402,26 @@ def _get_message_id_by_reference(reference: str, tool_context=None) -> Optional[
         followup_references = ['it', 'that', 'that email', 'the same email', 'same one', 'that one', 'this email', 'this one']
         
         if any(phrase == reference_lower for phrase in followup_references):
-            logger.debug(f"Detected follow-up reference: '{reference_lower}'")
+            logger.debug("Detected follow-up reference: '%s'", reference_lower)
             
             # Check for last operated message first
-            last_operated_message = tool_context.state.get(EMAIL_LAST_OPERATED_MESSAGE)
+            last_operated_message = get_state(tool_context).get(EMAIL_LAST_OPERATED_MESSAGE)
             if last_operated_message:
-                logger.info(f"RESOLVE: Found last operated message for follow-up reference: {last_operated_message}")
+                logger.info("RESOLVE: Found last operated message for follow-up reference: %s", last_operated_message)
                 log_tool_execution(tool_context, "_get_message_id_by_reference", "resolve_reference", True,
                                  f"Resolved follow-up '{reference}' to last operated message {last_operated_message}")
                 return last_operated_message
             else:
-                logger.debug(f"RESOLVE: No last operated message found, treating as confirmatory response")
+                logger.debug("RESOLVE: No last operated message found, treating as confirmatory response")
                 # Fall through to confirmatory response handling
         
         if any(phrase == reference_lower for phrase in confirmatory_responses):
-            logger.debug(f"Detected confirmatory response: '{reference_lower}'")
+            logger.debug("Detected confirmatory response: '%s'", reference_lower)
             
             # First check if there's a specific single result stored
-            single_result_id = tool_context.state.get(EMAIL_LAST_SINGLE_RESULT)
+            single_result_id = get_state(tool_context).get(EMAIL_LAST_SINGLE_RESULT)
             if single_result_id:
-                logger.info(f"RESOLVE: Found single result ID for confirmatory response: {single_result_id}")
+                logger.info("RESOLVE: Found single result ID for confirmatory response: %s", single_result_id)
                 log_tool_execution(tool_context, "_get_message_id_by_reference", "resolve_reference", True,
                                  f"Resolved confirmatory '{reference}' to single result ID {single_result_id}")
                 return single_result_id
@@ -2330,19 +2431,19 @@ def _get_message_id_by_reference(reference: str, tool_context=None) -> Optional[
             # Fallback to first message in the list
             if last_listed_messages and len(last_listed_messages) > 0:
                 resolved_id = last_listed_messages[0].get('id')
-                logger.debug(f"RESOLVE: Found message ID by confirmatory response '{reference}' from messages list: {resolved_id}")
+                logger.debug("RESOLVE: Found message ID by confirmatory response '%s' from messages list: %s", reference, resolved_id)
                 log_tool_execution(tool_context, "_get_message_id_by_reference", "resolve_reference", True,
                                  f"Resolved confirmatory '{reference}' to first message ID {resolved_id}")
                 return resolved_id
             # If no stored messages, try to use position 1 from index map
             elif message_index_map and '1' in message_index_map:
                 resolved_id = message_index_map['1']
-                logger.debug(f"RESOLVE: Found message ID by confirmatory response '{reference}' from index: {resolved_id}")
+                logger.debug("RESOLVE: Found message ID by confirmatory response '%s' from index: %s", reference, resolved_id)
                 log_tool_execution(tool_context, "_get_message_id_by_reference", "resolve_reference", True,
                                  f"Resolved confirmatory '{reference}' to position 1 ID {resolved_id}")
                 return resolved_id
             else:
-                logger.debug(f"RESOLVE: Confirmatory response '{reference_lower}' detected but no messages available")
+                logger.debug("RESOLVE: Confirmatory response '%s' detected but no messages available", reference_lower)
         
         # Handle natural language expressions for "first", "first one", etc.
         first_indicators = ['most recent', 'latest', 'newest', 'first', 'first one', 'top', 'first email', '1st', 'number 1', 'the first', 'the first one', 'the first email']
@@ -2350,14 +2451,14 @@ def _get_message_id_by_reference(reference: str, tool_context=None) -> Optional[
             # Return the first message in the list (most recent)
             if last_listed_messages and len(last_listed_messages) > 0:
                 resolved_id = last_listed_messages[0].get('id')
-                logger.debug(f"Found message ID by natural language request '{reference}': {resolved_id}")
+                logger.debug("Found message ID by natural language request '%s': %s", reference, resolved_id)
                 log_tool_execution(tool_context, "_get_message_id_by_reference", "resolve_reference", True,
                                  f"Resolved '{reference}' to first message ID {resolved_id}")
                 return resolved_id
             # If no stored messages, try to use position 1 from index map
             elif message_index_map and '1' in message_index_map:
                 resolved_id = message_index_map['1']
-                logger.debug(f"Found message ID by natural language request '{reference}' from index: {resolved_id}")
+                logger.debug("Found message ID by natural language request '%s' from index: %s", reference, resolved_id)
                 log_tool_execution(tool_context, "_get_message_id_by_reference", "resolve_reference", True,
                                  f"Resolved '{reference}' to position 1 ID {resolved_id}")
                 return resolved_id
@@ -2375,7 +2476,7 @@ def _get_message_id_by_reference(reference: str, tool_context=None) -> Optional[
             if word in reference_lower:
                 if position in message_index_map:
                     resolved_id = message_index_map[position]
-                    logger.debug(f"Found message ID by number word '{word}': {resolved_id}")
+                    logger.debug("Found message ID by number word '%s': %s", word, resolved_id)
                     log_tool_execution(tool_context, "_get_message_id_by_reference", "resolve_reference", True,
                                      f"Resolved '{reference}' to position {position} ID {resolved_id}")
                     return resolved_id
@@ -2384,12 +2485,12 @@ def _get_message_id_by_reference(reference: str, tool_context=None) -> Optional[
                     position_int = int(position)
                     if last_listed_messages and len(last_listed_messages) >= position_int and position_int > 0:
                         resolved_id = last_listed_messages[position_int - 1].get('id')  # Convert to 0-based index
-                        logger.debug(f"Found message ID by number word '{word}' from messages list: {resolved_id}")
+                        logger.debug("Found message ID by number word '%s' from messages list: %s", word, resolved_id)
                         log_tool_execution(tool_context, "_get_message_id_by_reference", "resolve_reference", True,
                                          f"Resolved '{reference}' to position {position} ID {resolved_id} via messages list")
                         return resolved_id
                     else:
-                        logger.debug(f"Number word '{word}' mapped to position {position} but no email at that position in messages list")
+                        logger.debug("Number word '%s' mapped to position %s but no email at that position in messages list", word, position)
                         break  # Found the pattern but no email at that position
         
         # Try to parse as position number (1, 2, 3, etc.)
@@ -2397,7 +2498,7 @@ def _get_message_id_by_reference(reference: str, tool_context=None) -> Optional[
             position = int(reference)
             if str(position) in message_index_map:
                 resolved_id = message_index_map[str(position)]
-                logger.debug(f"Found message ID by position {position}: {resolved_id}")
+                logger.debug("Found message ID by position %s: %s", position, resolved_id)
                 log_tool_execution(tool_context, "_get_message_id_by_reference", "resolve_reference", True,
                                  f"Resolved position {position} to ID {resolved_id}")
                 return resolved_id
@@ -2405,12 +2506,12 @@ def _get_message_id_by_reference(reference: str, tool_context=None) -> Optional[
                 # Fallback: try to get from last_listed_messages array directly
                 if last_listed_messages and len(last_listed_messages) >= position and position > 0:
                     resolved_id = last_listed_messages[position - 1].get('id')  # Convert to 0-based index
-                    logger.debug(f"Found message ID by position {position} from messages list: {resolved_id}")
+                    logger.debug("Found message ID by position %s from messages list: %s", position, resolved_id)
                     log_tool_execution(tool_context, "_get_message_id_by_reference", "resolve_reference", True,
                                      f"Resolved position {position} to ID {resolved_id} via messages list")
                     return resolved_id
                 else:
-                    logger.debug(f"Position {position} not found in index map and not enough messages in list")
+                    logger.debug("Position %s not found in index map and not enough messages in list", position)
         except ValueError:
             pass  # Not a number, continue with other methods
         
@@ -2419,7 +2520,7 @@ def _get_message_id_by_reference(reference: str, tool_context=None) -> Optional[
             sender = msg.get('from', '').lower()
             if reference_lower in sender:
                 resolved_id = msg.get('id')
-                logger.debug(f"Found message ID by sender match: {reference} -> {resolved_id}")
+                logger.debug("Found message ID by sender match: %s -> %s", reference, resolved_id)
                 log_tool_execution(tool_context, "_get_message_id_by_reference", "resolve_reference", True,
                                  f"Resolved sender '{reference}' to ID {resolved_id}")
                 return resolved_id
@@ -2431,7 +2532,7 @@ def _get_message_id_by_reference(reference: str, tool_context=None) -> Optional[
             # Smart subject matching - handle common user expressions
             if any(keyword in reference_lower for keyword in ['welcome', 'oprina']) and any(keyword in subject for keyword in ['welcome', 'oprina']):
                 resolved_id = msg.get('id')
-                logger.debug(f"Found message ID by smart subject match: {reference} -> {resolved_id}")
+                logger.debug("Found message ID by smart subject match: %s -> %s", reference, resolved_id)
                 log_tool_execution(tool_context, "_get_message_id_by_reference", "resolve_reference", True,
                                  f"Resolved subject '{reference}' to ID {resolved_id}")
                 return resolved_id
@@ -2439,13 +2540,13 @@ def _get_message_id_by_reference(reference: str, tool_context=None) -> Optional[
             # Standard partial matching
             elif reference_lower in subject:
                 resolved_id = msg.get('id')
-                logger.debug(f"Found message ID by subject match: {reference} -> {resolved_id}")
+                logger.debug("Found message ID by subject match: %s -> %s", reference, resolved_id)
                 log_tool_execution(tool_context, "_get_message_id_by_reference", "resolve_reference", True,
                                  f"Resolved subject '{reference}' to ID {resolved_id}")
                 return resolved_id
         
         # No match found
-        logger.debug(f"Could not resolve message reference: {reference} - returning None for fallback")
+        logger.debug("Could not resolve message reference: %s - returning None for fallback", reference)
         if tool_context:
             log_tool_execution(tool_context, "_get_message_id_by_reference", "resolve_reference", False,
                              f"Could not resolve reference: {reference}")
@@ -2457,6 +2558,7 @@ def _get_message_id_by_reference(reference: str, tool_context=None) -> Optional[
             log_tool_execution(tool_context, "_get_message_id_by_reference", "resolve_reference", False, str(e))
         return None
 
+@trace_tool
 def gmail_parse_subject_and_body(ai_generated_content: str, tool_context=None) -> str:
     """Parse AI-generated email content into subject and body components and return formatted result."""
     validate_tool_context(tool_context, "gmail_parse_email_content")
@@ -2506,35 +2608,38 @@ def gmail_parse_subject_and_body(ai_generated_content: str, tool_context=None) -
 def _extract_message_body(payload: Dict[str, Any]) -> str:
     """Extract text body from Gmail message payload."""
     try:
-        # Handle multipart messages
-        if 'parts' in payload:
-            for part in payload['parts']:
-                if part.get('mimeType') == 'text/plain':  # Added .get() for safety
-                    data = part.get('body', {}).get('data', '')
-                    if data:
-                        import base64
-                        return base64.urlsafe_b64decode(data).decode('utf-8')
-        
-        # Handle single part messages
-        elif payload.get('mimeType') == 'text/plain':  # Added .get() for safety
-            data = payload.get('body', {}).get('data', '')
-            if data:
-                import base64
-                return base64.urlsafe_b64decode(data).decode('utf-8')
-        
-        return "Unable to extract message content"
+        body = _find_plain_text(payload)
+        return body if body is not None else "Unable to extract message content"
         
     except Exception as e:
         logger.warning(f"Error extracting message body: {e}")
         return "Error reading message content"
 
+def _find_plain_text(part: Dict[str, Any]) -> Optional[str]:
+    """Depth-first search for the first text/plain body, descending into nested multipart parts."""
+    # Handle multipart messages (e.g. multipart/mixed wrapping multipart/alternative)
+    if 'parts' in part:
+        for child in part['parts']:
+            body = _find_plain_text(child)
+            if body is not None:
+                return body
+        return None
+    
+    # Handle single part messages
+    if part.get('mimeType') == 'text/plain':
+        data = part.get('body', {}).get('data', '')
+        if data:
+            import base64
+            return base64.urlsafe_b64decode(data).decode('utf-8')
+    return None
+
 def _track_message_operation(message_id: str, operation_type: str, tool_context=None):
     """Track the last message operation for follow-up actions."""
     if tool_context and hasattr(tool_context, 'state'):
-        tool_context.state[EMAIL_LAST_OPERATED_MESSAGE] = message_id
-        tool_context.state[EMAIL_LAST_OPERATED_MESSAGE_AT] = datetime.utcnow().isoformat()
-        tool_context.state[EMAIL_LAST_OPERATION_TYPE] = operation_type
-        logger.debug(f"TRACK: Recorded {operation_type} operation on message {message_id}")
+        get_state(tool_context)[EMAIL_LAST_OPERATED_MESSAGE] = message_id
+        get_state(tool_context)[EMAIL_LAST_OPERATED_MESSAGE_AT] = datetime.utcnow().isoformat()
+        get_state(tool_context)[EMAIL_LAST_OPERATION_TYPE] = operation_type
+        logger.debug("TRACK: Recorded %s operation on message %s", operation_type, message_id)
 
 
 # =============================================================================
@@ -0,0 +1,408 @@
+"""
+Workflow Step Executor for Cross-Agent Workflows
+
+Runs the steps of a workflow as a small dependency graph:
+- Steps declare the steps they depend on and receive their outputs
+- Independent steps run concurrently on a thread pool, so workflow latency
+  follows the critical path instead of the sum of all steps
+- Steps sharing a resource (e.g. the user's Gmail service, whose HTTP client
+  is not thread-safe) never run at the same time
+- Each finished step is recorded with its timing through update_workflow
+- A failed step skips only the steps that depend on it
+- cancel() (or the overall timeout) stops any further steps from starting
+- Steps declared with a memo_key persist their output in session state, keyed
+  by the workflow instance, the key and their inputs, so re-invoking the same
+  workflow (e.g. after a failure or a confirmation turn) skips steps that
+  already completed; other workflow instances never see those outputs
+"""
+
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from oprina.services.logging.logger import setup_logger
+from oprina.common.utils import update_workflow, finish_workflow
+from oprina.common.session_keys import WORKFLOW_STEP_CACHE
+from oprina.common.tracing import submit_in_span
+from oprina.common.state_transaction import get_state
+
+logger = setup_logger("workflow_executor")
+
+# Default number of steps allowed in flight at once
+DEFAULT_MAX_WORKERS = 4
+
+# How long a memoized step output is reused by default
+STEP_CACHE_TTL_SECONDS = 1800
+
+# Upper bound on memoized outputs kept in session state (oldest are evicted first)
+STEP_CACHE_MAX_ENTRIES = 50
+
+# Outputs larger than this (serialized) are not memoized
+STEP_CACHE_MAX_OUTPUT_BYTES = 16000
+
+# Step states reported in run results
+STEP_COMPLETED = "completed"
+STEP_FAILED = "failed"
+STEP_SKIPPED = "skipped"
+STEP_CANCELLED = "cancelled"
+
+
+class WorkflowStep:
+    """A named unit of work with dependencies on other steps."""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Dict[str, Any]], Any],
+        depends_on: Iterable[str] = (),
+        resource: Optional[str] = None,
+        summarize: Optional[Callable[[Any], Dict[str, Any]]] = None,
+        memo_key: Any = None,
+        memo_ttl: int = STEP_CACHE_TTL_SECONDS,
+        memo_inputs: bool = True,
+        invalidates: Iterable[str] = ()
+    ):
+        """
+        Args:
+            name: Unique step name within the workflow
+            func: Called with {dependency name: output}; its return value is the step output
+            depends_on: Names of steps that must complete first
+            resource: Steps with the same resource name are serialized
+            summarize: Builds the update_workflow payload from the step output
+            memo_key: JSON-serializable arguments of the step; when given, the output is
+                memoized under a hash of this key and the step's inputs
+            memo_ttl: Seconds a memoized output stays valid
+            memo_inputs: False to key the memoized output on memo_key alone, so a
+                side-effecting step is not repeated when an upstream output changes
+            invalidates: Steps whose memoized outputs are dropped once this step has run
+                (e.g. a calendar read that creating an event makes stale)
+        """
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.resource = resource
+        self.summarize = summarize
+        self.memo_key = memo_key
+        self.memo_ttl = memo_ttl
+        self.memo_inputs = memo_inputs
+        self.invalidates = tuple(invalidates)
+
+
+class WorkflowExecutor:
+    """Runs WorkflowSteps concurrently in dependency order for one workflow."""
+
+    def __init__(
+        self,
+        tool_context,
+        workflow_id: str,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        timeout: Optional[float] = None,
+        memo_scope: Optional[str] = None
+    ):
+        """
+        Args:
+            tool_context: ADK tool context
+            workflow_id: Workflow the steps are recorded under
+            max_workers: Steps allowed in flight at once
+            timeout: Seconds before steps that have not started are cancelled
+            memo_scope: Instance whose memoized outputs the steps may reuse (defaults
+                to workflow_id), e.g. the workflow that proposed what this one confirms
+        """
+        self.tool_context = tool_context
+        self.workflow_id = workflow_id
+        self.memo_scope = memo_scope or workflow_id
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._steps: Dict[str, WorkflowStep] = {}
+        self._cancel_event = threading.Event()
+        self._run_started = 0.0
+
+    def add_step(
+        self,
+        name: str,
+        func: Callable[[Dict[str, Any]], Any],
+        depends_on: Iterable[str] = (),
+        resource: Optional[str] = None,
+        summarize: Optional[Callable[[Any], Dict[str, Any]]] = None,
+        memo_key: Any = None,
+        memo_ttl: int = STEP_CACHE_TTL_SECONDS,
+        memo_inputs: bool = True,
+        invalidates: Iterable[str] = ()
+    ) -> "WorkflowExecutor":
+        """Declare a step. Dependencies must already be declared."""
+        if name in self._steps:
+            raise ValueError(f"Duplicate workflow step: {name}")
+        missing = [dep for dep in depends_on if dep not in self._steps]
+        if missing:
+            raise ValueError(f"Step {name} depends on unknown steps: {', '.join(missing)}")
+
+        self._steps[name] = WorkflowStep(name, func, depends_on, resource, summarize, memo_key, memo_ttl,
+                                         memo_inputs, invalidates)
+        return self
+
+    def cancel(self) -> None:
+        """Stop scheduling new steps; steps already running are allowed to finish."""
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Execute all declared steps.
+
+        Returns:
+            Dict with status ("completed", "failed" or "cancelled"), step outputs in
+            "results", exceptions in "errors", per-step "states" and "timings_ms",
+            names of steps served from memoized outputs in "cached", plus
+            "elapsed_ms" (wall clock) and "serial_ms" (sum of step durations)
+        """
+        run_started = self._run_started = time.perf_counter()
+        deadline = run_started + self.timeout if self.timeout else None
+
+        results: Dict[str, Any] = {}
+        errors: Dict[str, Exception] = {}
+        states: Dict[str, str] = {}
+        timings: Dict[str, float] = {}
+        cached: List[str] = []
+        memo_hashes: Dict[str, str] = {}
+
+        pending: List[str] = list(self._steps)
+        running = {}
+        busy_resources = set()
+        timed_out = False
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="workflow")
+        try:
+            while pending or running:
+                # Skip steps whose dependencies can no longer complete
+                for name in list(pending):
+                    blocked = [dep for dep in self._steps[name].depends_on
+                               if states.get(dep) in (STEP_FAILED, STEP_SKIPPED)]
+                    if blocked:
+                        states[name] = STEP_SKIPPED
+                        pending.remove(name)
+                        logger.info(f"Workflow {self.workflow_id}: skipping {name} (blocked by {', '.join(blocked)})")
+
+                # Start every ready step whose resource is free, in declaration order;
+                # memoized steps complete immediately from their stored output
+                resolved_from_cache = False
+                if not self.cancelled:
+                    for name in list(pending):
+                        step = self._steps[name]
+                        if any(states.get(dep) != STEP_COMPLETED for dep in step.depends_on):
+                            continue
+                        inputs = {dep: results[dep] for dep in step.depends_on}
+
+                        if step.memo_key is not None:
+                            memo_hashes[name] = _step_input_hash(self.memo_scope, step, inputs)
+                            hit, output = _load_step_output(self.tool_context, memo_hashes[name])
+                            if hit:
+                                results[name] = output
+                                states[name] = STEP_COMPLETED
+                                timings[name] = 0.0
+                                cached.append(name)
+                                pending.remove(name)
+                                resolved_from_cache = True
+                                self._record_step(step, STEP_COMPLETED, output, None, time.perf_counter(), 0.0, cached=True)
+                                continue
+
+                        if step.resource and step.resource in busy_resources:
+                            continue
+                        if step.resource:
+                            busy_resources.add(step.resource)
+                        running[submit_in_span(pool, self._run_step, step, inputs)] = name
+                        pending.remove(name)
+
+                if resolved_from_cache:
+                    continue
+                if not running:
+                    break
+
+                wait_timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+                done, _ = wait(running, timeout=wait_timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    timed_out = True
+                    self.cancel()
+                    logger.warning(f"Workflow {self.workflow_id} timed out after {self.timeout}s")
+                    break
+
+                for future in done:
+                    name = running.pop(future)
+                    step = self._steps[name]
+                    if step.resource:
+                        busy_resources.discard(step.resource)
+
+                    output, error, started, duration = future.result()
+                    timings[name] = duration
+                    if error is None:
+                        results[name] = output
+                        states[name] = STEP_COMPLETED
+                        if name in memo_hashes:
+                            _store_step_output(self.tool_context, memo_hashes[name], step, output)
+                        stale = [memo_hashes[other] for other in step.invalidates if other in memo_hashes]
+                        if stale:
+                            _drop_step_outputs(self.tool_context, stale)
+                    else:
+                        errors[name] = error
+                        states[name] = STEP_FAILED
+                        logger.warning(f"Workflow {self.workflow_id}: step {name} failed: {error}")
+
+                    self._record_step(step, states[name], output, error, started, duration)
+        finally:
+            pool.shutdown(wait=not timed_out, cancel_futures=True)
+
+        for name in pending:
+            states[name] = STEP_CANCELLED
+        for name in running.values():
+            states[name] = STEP_CANCELLED
+
+        if self.cancelled and (pending or running):
+            status = "cancelled"
+        elif errors or any(state != STEP_COMPLETED for state in states.values()):
+            status = "failed"
+        else:
+            status = "completed"
+
+        elapsed_ms = round((time.perf_counter() - run_started) * 1000, 1)
+        serial_ms = round(sum(timings.values()), 1)
+        finish_workflow(self.tool_context, self.workflow_id, status, {
+            "elapsed_ms": elapsed_ms,
+            "serial_ms": serial_ms,
+            "step_states": dict(states),
+            "cached_steps": list(cached)
+        })
+
+        logger.info(f"Workflow {self.workflow_id} {status} in {elapsed_ms}ms "
+                    f"(steps total {serial_ms}ms, {len(cached)} from cache)")
+
+        return {
+            "status": status,
+            "results": results,
+            "errors": errors,
+            "states": states,
+            "timings_ms": timings,
+            "cached": cached,
+            "elapsed_ms": elapsed_ms,
+            "serial_ms": serial_ms
+        }
+
+    def _run_step(self, step: WorkflowStep, inputs: Dict[str, Any]):
+        """Run one step on a worker thread, capturing its output or exception."""
+        started = time.perf_counter()
+        try:
+            output, error = step.func(inputs), None
+        except Exception as e:
+            output, error = None, e
+        finished = time.perf_counter()
+        return output, error, started, round((finished - started) * 1000, 1)
+
+    def _record_step(self, step: WorkflowStep, state: str, output: Any, error: Optional[Exception],
+                     started: float, duration_ms: float, cached: bool = False) -> None:
+        """Record a finished step (with timing) in the workflow's session state."""
+        step_result = {
+            "step": step.name,
+            "status": state,
+            "duration_ms": duration_ms,
+            "offset_ms": round((started - self._run_started) * 1000, 1)
+        }
+        if cached:
+            step_result["cached"] = True
+        if error is not None:
+            step_result["error"] = str(error)
+        elif step.summarize:
+            try:
+                step_result.update(step.summarize(output))
+            except Exception as e:
+                logger.warning(f"Could not summarize workflow step {step.name}: {e}")
+
+        update_workflow(self.tool_context, self.workflow_id, step_result)
+
+
+# =============================================================================
+# Step Memoization
+# =============================================================================
+
+def _step_input_hash(scope: str, step: WorkflowStep, inputs: Dict[str, Any]) -> str:
+    """Stable hash of the workflow instance, the step's identity, memo key and dependency outputs."""
+    payload = json.dumps(
+        {"workflow": scope, "step": step.name, "key": step.memo_key,
+         "inputs": inputs if step.memo_inputs else None},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _load_step_output(tool_context, input_hash: str):
+    """Return (hit, output) for a memoized step output that has not expired."""
+    if not (tool_context and hasattr(tool_context, 'state')):
+        return False, None
+
+    entry = (get_state(tool_context).get(WORKFLOW_STEP_CACHE) or {}).get(input_hash)
+    if not entry or entry.get("expires_at", 0) <= time.time():
+        return False, None
+    return True, entry.get("output")
+
+
+def _store_step_output(tool_context, input_hash: str, step: WorkflowStep, output: Any) -> None:
+    """Persist a step output in session state, pruning expired and oldest entries."""
+    if not (tool_context and hasattr(tool_context, 'state')):
+        return
+
+    try:
+        serialized = json.dumps(output)
+    except (TypeError, ValueError):
+        logger.debug(f"Not memoizing step {step.name}: output is not JSON-serializable")
+        return
+    if len(serialized) > STEP_CACHE_MAX_OUTPUT_BYTES:
+        logger.debug(f"Not memoizing step {step.name}: output is {len(serialized)} bytes")
+        return
+
+    state = get_state(tool_context)
+    now = time.time()
+    store = {
+        key: entry
+        for key, entry in (state.get(WORKFLOW_STEP_CACHE) or {}).items()
+        if entry.get("expires_at", 0) > now
+    }
+    store[input_hash] = {
+        "step": step.name,
+        "output": json.loads(serialized),
+        "stored_at": now,
+        "expires_at": now + step.memo_ttl
+    }
+
+    if len(store) > STEP_CACHE_MAX_ENTRIES:
+        newest = sorted(store, key=lambda key: store[key]["stored_at"], reverse=True)[:STEP_CACHE_MAX_ENTRIES]
+        store = {key: store[key] for key in newest}
+
+    state[WORKFLOW_STEP_CACHE] = store
+
+
+def _drop_step_outputs(tool_context, input_hashes: List[str]) -> None:
+    """Remove memoized step outputs that are no longer valid."""
+    if not (tool_context and hasattr(tool_context, 'state')):
+        return
+
+    state = get_state(tool_context)
+    store = dict(state.get(WORKFLOW_STEP_CACHE) or {})
+    for input_hash in input_hashes:
+        store.pop(input_hash, None)
+    state[WORKFLOW_STEP_CACHE] = store
+
+
+__all__ = [
+    "WorkflowStep",
+    "WorkflowExecutor",
+    "DEFAULT_MAX_WORKERS",
+    "STEP_CACHE_TTL_SECONDS",
+    "STEP_CACHE_MAX_ENTRIES",
+    "STEP_COMPLETED",
+    "STEP_FAILED",
+    "STEP_SKIPPED",
+    "STEP_CANCELLED"
+]